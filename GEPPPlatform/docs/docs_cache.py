@@ -0,0 +1,69 @@
+"""
+Rendered documentation pages, built once per container.
+
+The docs endpoints are public and unauthenticated, and every hit rebuilt the
+OpenAPI spec from the swagger modules and rendered the HTML around it again.
+Their output only changes with a deploy, so each page is rendered on first use,
+kept in memory, and served with a strong ETag (the SHA-256 of the body) so a
+browser or CDN can revalidate with a 304 instead of downloading it again.
+
+tests/test_docs_cache.py checks that a cached page still matches a fresh render
+and that every documented path is served by the route table, so a stale spec
+fails there rather than in front of an integrator.
+"""
+
+import hashlib
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Revalidate on every use, but let shared caches keep the body.
+CACHE_CONTROL = 'public, no-cache'
+
+
+@dataclass(frozen=True)
+class DocsPage:
+    content_type: str
+    body: str
+    etag: str
+
+
+def content_etag(body: str) -> str:
+    """Strong ETag for *body*: its SHA-256."""
+    return '"' + hashlib.sha256(body.encode('utf-8')).hexdigest() + '"'
+
+
+class DocsCache:
+    """Rendered pages by key; a page is built at most once per container."""
+
+    def __init__(self):
+        self._pages: Dict[Hashable, DocsPage] = {}
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable, render: Callable[[], Tuple[str, str]]) -> DocsPage:
+        """The page for *key*, rendering it with ``render() -> (content_type, body)`` on a miss.
+
+        A render that raises is not cached; the next request tries again.
+        """
+        page = self._pages.get(key)
+        if page is None:
+            with self._lock:
+                page = self._pages.get(key)
+                if page is None:
+                    content_type, body = render()
+                    page = DocsPage(content_type, body, content_etag(body))
+                    self._pages[key] = page
+        return page
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pages.clear()
+
+    def __len__(self) -> int:
+        return len(self._pages)
+
+    def __contains__(self, key: Any) -> bool:
+        return key in self._pages
+
+
+docs_cache = DocsCache()
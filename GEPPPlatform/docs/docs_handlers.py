@@ -3,10 +3,11 @@ Documentation API handlers
 Serves Swagger/OpenAPI documentation
 """
 
-from typing import Dict, Any
+from typing import Dict, Any, Tuple
 import json
 import logging
 
+from .docs_cache import docs_cache
 from .swagger.aggregator import (
     get_full_swagger_spec,
     get_swagger_ui_html,
@@ -20,108 +21,99 @@ from .swagger.bma_public import (
 logger = logging.getLogger(__name__)
 
 
-def handle_docs_routes(event: Dict[str, Any], **params) -> Dict[str, Any]:
+BMA_PUBLIC_DOCS_PATH = '/docs/bma/0a70bf9ef2fcb7c2dc6c2b046ebb052c'
+
+
+def resolve_docs_page(path: str) -> str:
     """
-    Main handler for documentation routes
+    Name of the documentation page served for *path*
 
     Routes:
     - GET /documents/api-docs - Swagger UI (default)
     - GET /documents/api-docs/swagger - Swagger UI
     - GET /documents/api-docs/redoc - ReDoc UI
     - GET /documents/api-docs/openapi.json - OpenAPI JSON specification
+    - GET /documents/api-docs/openapi.yaml - OpenAPI YAML specification
+    - GET /documents/api-docs/* - Index page
     """
-    path = event.get("rawPath", "")
-    method = params.get('method', 'GET')
-    path_params = params.get('path_params', {})
+    # BMA Public Documentation (specific hash-protected endpoint)
+    if BMA_PUBLIC_DOCS_PATH in path:
+        return 'bma_openapi.json' if path.endswith('/openapi.json') else 'bma_swagger'
 
-    # Extract deployment state from path params (set by app.py)
-    deployment_state = path_params.get('deployment_state', 'dev')
+    trimmed = path.rstrip('/')
+    if trimmed.endswith('/documents/api-docs') or trimmed.endswith('/documents/api-docs/swagger'):
+        return 'swagger'
+    if trimmed.endswith('/documents/api-docs/redoc'):
+        return 'redoc'
+    if path.endswith('/documents/api-docs/openapi.json'):
+        return 'openapi.json'
+    if path.endswith('/documents/api-docs/openapi.yaml') or path.endswith('/documents/api-docs/openapi.yml'):
+        return 'openapi.yaml'
+    if '/documents/api-docs' in path:
+        return 'index'
+    return 'not_found'
 
-    try:
-        # BMA Public Documentation (specific hash-protected endpoint)
-        if '/docs/bma/0a70bf9ef2fcb7c2dc6c2b046ebb052c' in path:
-            if path.endswith('/openapi.json'):
-                # Return BMA public OpenAPI spec
-                spec = get_bma_public_swagger_spec(deployment_state)
-                return {
-                    'content_type': 'application/json',
-                    'body': json.dumps(spec, indent=2)
-                }
-            else:
-                # Return BMA public Swagger UI
-                return {
-                    'content_type': 'text/html',
-                    'body': get_bma_public_swagger_html(deployment_state)
-                }
 
-        # Swagger UI (default)
-        elif path.endswith('/documents/api-docs') or path.endswith('/documents/api-docs/'):
-            return {
-                'content_type': 'text/html',
-                'body': get_swagger_ui_html(deployment_state)
-            }
-
-        # Swagger UI (explicit)
-        elif path.endswith('/documents/api-docs/swagger') or path.endswith('/documents/api-docs/swagger/'):
-            return {
-                'content_type': 'text/html',
-                'body': get_swagger_ui_html(deployment_state)
-            }
+def render_docs_page(page: str, deployment_state: str = 'dev') -> Tuple[str, str]:
+    """Build *page* from the swagger modules: ``(content_type, body)``."""
+    if page == 'bma_openapi.json':
+        return 'application/json', json.dumps(get_bma_public_swagger_spec(deployment_state), indent=2)
+    if page == 'bma_swagger':
+        return 'text/html', get_bma_public_swagger_html(deployment_state)
+    if page == 'swagger':
+        return 'text/html', get_swagger_ui_html(deployment_state)
+    if page == 'redoc':
+        return 'text/html', get_redoc_html(deployment_state)
+    if page == 'openapi.json':
+        return 'application/json', json.dumps(get_full_swagger_spec(deployment_state), indent=2)
+    if page == 'openapi.yaml':
+        try:
+            import yaml
+        except ImportError:
+            return 'application/json', json.dumps({
+                'error': 'YAML support not available. Install PyYAML package.',
+                'alternative': f'/{deployment_state}/documents/api-docs/openapi.json'
+            })
+        spec = get_full_swagger_spec(deployment_state)
+        return 'application/x-yaml', yaml.dump(spec, default_flow_style=False, sort_keys=False)
+    if page == 'index':
+        return 'text/html', get_docs_index_html(deployment_state)
+    return 'application/json', json.dumps({
+        'error': 'Route not found',
+        'available_routes': [
+            f'/{deployment_state}/documents/api-docs',
+            f'/{deployment_state}/documents/api-docs/swagger',
+            f'/{deployment_state}/documents/api-docs/redoc',
+            f'/{deployment_state}/documents/api-docs/openapi.json',
+            f'/{deployment_state}/documents/api-docs/openapi.yaml'
+        ]
+    })
 
-        # ReDoc UI
-        elif path.endswith('/documents/api-docs/redoc') or path.endswith('/documents/api-docs/redoc/'):
-            return {
-                'content_type': 'text/html',
-                'body': get_redoc_html(deployment_state)
-            }
 
-        # OpenAPI JSON specification
-        elif path.endswith('/documents/api-docs/openapi.json'):
-            spec = get_full_swagger_spec(deployment_state)
-            return {
-                'content_type': 'application/json',
-                'body': json.dumps(spec, indent=2)
-            }
+def handle_docs_routes(event: Dict[str, Any], **params) -> Dict[str, Any]:
+    """
+    Main handler for documentation routes (see resolve_docs_page)
 
-        # OpenAPI YAML specification
-        elif path.endswith('/documents/api-docs/openapi.yaml') or path.endswith('/documents/api-docs/openapi.yml'):
-            try:
-                import yaml
-                spec = get_full_swagger_spec(deployment_state)
-                return {
-                'content_type': 'application/x-yaml',
-                    'body': yaml.dump(spec, default_flow_style=False, sort_keys=False)
-                }
-            except ImportError:
-                return {
-                    'content_type': 'application/json',
-                    'body': json.dumps({
-                        'error': 'YAML support not available. Install PyYAML package.',
-                        'alternative': f'/{deployment_state}/documents/api-docs/openapi.json'
-                    })
-                }
+    Pages are rendered once per container and deployment state and served
+    from docs_cache afterwards; the result carries the page's ETag.
+    """
+    path = event.get("rawPath", "")
+    path_params = params.get('path_params', {})
 
-        # Index page
-        elif '/documents/api-docs' in path:
-            return {
-                'content_type': 'text/html',
-                'body': get_docs_index_html(deployment_state)
-            }
+    # Extract deployment state from path params (set by app.py)
+    deployment_state = path_params.get('deployment_state', 'dev')
 
-        else:
-            return {
-                'content_type': 'application/json',
-                'body': json.dumps({
-                    'error': 'Route not found',
-                    'available_routes': [
-                        f'/{deployment_state}/documents/api-docs',
-                        f'/{deployment_state}/documents/api-docs/swagger',
-                        f'/{deployment_state}/documents/api-docs/redoc',
-                        f'/{deployment_state}/documents/api-docs/openapi.json',
-                        f'/{deployment_state}/documents/api-docs/openapi.yaml'
-                    ]
-                })
-            }
+    try:
+        page = resolve_docs_page(path)
+        cached = docs_cache.get(
+            (page, deployment_state),
+            lambda: render_docs_page(page, deployment_state)
+        )
+        return {
+            'content_type': cached.content_type,
+            'body': cached.body,
+            'etag': cached.etag
+        }
 
     except Exception as e:
         logger.error(f"Error serving documentation: {str(e)}")
@@ -2,10 +2,13 @@
 
 from typing import Any, Dict
 
+from GEPPPlatform.libs.database import statement_budget
+from GEPPPlatform.libs.query_stats import recording
 from GEPPPlatform.services.cores.pdf_export_hub import lambda_handler as _lambda_handler
 
 
 def lambda_handler(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     """Delegate PDF export Lambda invocations to the service hub."""
-    return _lambda_handler(event, context)
+    with statement_budget('export'), recording('pdf_export_hub'):
+        return _lambda_handler(event, context)
 
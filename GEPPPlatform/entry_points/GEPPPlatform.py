@@ -1,56 +1,35 @@
-from datetime import datetime, timedelta, timezone
-from time import time
-from urllib.parse import urlencode
-from urllib.request import urlopen, Request
-from dateutil.parser import parse
-import threading
-import boto3
-import zipfile
-
-# import pandas as pd
-import numpy as np
-import zlib
-import base64
-
+# Cold-start accounting has to start before anything heavy is imported.
+from GEPPPlatform.libs import startup
+startup.begin()
+
+# Only what main() itself uses is imported here. boto3, numpy, bcrypt, pgvector
+# and friends used to be imported eagerly at this point without being referenced
+# by the dispatcher — every cold start paid for them. Handler modules import what
+# they need, and `libs.startup.lazy_module` defers the ones only some paths use.
 import json
-from decimal import Decimal
-
-from GEPPPlatform.libs.http_response import maybe_gzip
-
-
-class DateTimeEncoder(json.JSONEncoder):
-    def default(self, obj):
-        if isinstance(obj, datetime):
-            return obj.isoformat()
-        if isinstance(obj, Decimal):
-            return float(obj)
-        return super().default(obj)
-
-
+import logging
 import os
-from glob import glob
-import math
-import gzip
-import pickle
-import re
-from boto3.dynamodb.conditions import Key, Attr
-import bcrypt
 
-
-from pgvector.psycopg2 import register_vector
-import psycopg2 as pg
-import jwt
-
-from GEPPPlatform.services.auth import handle_auth_routes
+from GEPPPlatform.libs import query_stats, request_timing
+from GEPPPlatform.libs.http_response import (
+    EXPOSED_HEADER_NAMES,
+    VERSION_HEADERS,
+    dumps_response,
+    maybe_gzip,
+)
 from GEPPPlatform.services.auth.auth_handlers import AuthHandlers
-from GEPPPlatform.libs import authGuard
 from GEPPPlatform.libs.exceptions import APIException, UnauthorizedException
-from GEPPPlatform.libs.database import get_session
-from GEPPPlatform.libs import config as app_config
-
-import random
-import string
-import logging
+from GEPPPlatform.libs.database import get_session, route_reads, statement_budget
+from GEPPPlatform.libs.response_offload import offload_large_response
+from GEPPPlatform.entry_points.routes import (
+    AUTHED_ROUTES,
+    PUBLIC_ROUTES,
+    RouteRequest,
+    available_routes,
+    match_route,
+)
+
+startup.end()
 
 logger = logging.getLogger(__name__)
 
@@ -63,19 +42,76 @@ if not os.environ.get('MAILCHIMP_WEBHOOK_KEY'):
 
 
 # ── Version response headers (deployment freshness check) ──────────────────
-# Centralised so every code path that builds a response can share them. The
-# frontend reads X-App-Version to detect stale Lambda deployments — see
-# config.py for how to bump.
-_VERSION_HEADERS = {
-    "X-App-Version": app_config.VERSION,
-    "X-App-Build-Commit": app_config.BUILD_COMMIT,
-}
-# CORS Expose-Headers is required so the browser actually surfaces these to
-# JS — without it, XHR/fetch can't read them at all.
-_EXPOSED_HEADER_NAMES = ", ".join(_VERSION_HEADERS.keys())
+# Defined in libs/http_response.py so the route adapters share them.
+_VERSION_HEADERS = VERSION_HEADERS
+_EXPOSED_HEADER_NAMES = EXPOSED_HEADER_NAMES
+
+
+def _cors_preflight(event, path):
+    """Answer an OPTIONS request that reached the Lambda."""
+    # Origin-restricted preflight for customer-leads (marketing site).
+    # Browser will refuse the actual POST unless this preflight echoes
+    # back the exact Origin from the allowlist — `*` is rejected when
+    # the request needs credentials/origin trust.
+    if "/api/public/customer-leads" in path or "/api/public/cookie-consent" in path:
+        from GEPPPlatform.services.public.customer_leads_handler import (
+            ALLOWED_ORIGINS, is_origin_allowed,
+        )
+        origin = (event.get("headers") or {}).get("origin") \
+              or (event.get("headers") or {}).get("Origin")
+        if is_origin_allowed(origin):
+            return {
+                "statusCode": 200,
+                "headers": {
+                    "Access-Control-Allow-Origin": origin,
+                    "Access-Control-Allow-Methods": "POST, OPTIONS",
+                    "Access-Control-Allow-Headers": "Content-Type",
+                    "Access-Control-Max-Age": "86400",
+                    "Vary": "Origin",
+                    "Content-Type": "application/json",
+                    **_VERSION_HEADERS,
+                },
+                "body": json.dumps({"message": "CORS preflight"})
+            }
+        return {
+            "statusCode": 403,
+            "headers": {
+                "Vary": "Origin",
+                "Content-Type": "application/json",
+                **_VERSION_HEADERS,
+            },
+            "body": json.dumps({
+                "error": "origin_not_allowed",
+                "allowed_origins": sorted(ALLOWED_ORIGINS),
+            }),
+        }
+
+    return {
+        "statusCode": 200,
+        "headers": {
+            "Access-Control-Allow-Origin": "*",
+            "Access-Control-Allow-Methods": "GET, POST, PUT, PATCH, DELETE, OPTIONS",
+            "Access-Control-Allow-Headers": "Content-Type, Authorization",
+            "Access-Control-Expose-Headers": _EXPOSED_HEADER_NAMES,
+            "Content-Type": "application/json",
+            **_VERSION_HEADERS,
+        },
+        "body": json.dumps({"message": "CORS preflight"})
+    }
 
 
 def main(event, context):
+    timer = request_timing.start()
+    stats = query_stats.start()
+    try:
+        response = _dispatch(event, context)
+    finally:
+        stats.label = timer.route
+        query_stats.finish(stats)
+    return request_timing.finish(timer, response)
+
+
+def _dispatch(event, context):
     try:
         # Get HTTP method
         http_method = event['requestContext']['http'].get("method", "POST")
@@ -102,55 +138,8 @@ def main(event, context):
         # and never forwards to Lambda. If OPTIONS reaches here, API Gateway CORS is
         # not configured — so we handle it in Lambda.
         if http_method == "OPTIONS":
-            # Origin-restricted preflight for customer-leads (marketing site).
-            # Browser will refuse the actual POST unless this preflight echoes
-            # back the exact Origin from the allowlist — `*` is rejected when
-            # the request needs credentials/origin trust.
-            if "/api/public/customer-leads" in path or "/api/public/cookie-consent" in path:
-                from GEPPPlatform.services.public.customer_leads_handler import (
-                    ALLOWED_ORIGINS, is_origin_allowed,
-                )
-                origin = (event.get("headers") or {}).get("origin") \
-                      or (event.get("headers") or {}).get("Origin")
-                if is_origin_allowed(origin):
-                    return {
-                        "statusCode": 200,
-                        "headers": {
-                            "Access-Control-Allow-Origin": origin,
-                            "Access-Control-Allow-Methods": "POST, OPTIONS",
-                            "Access-Control-Allow-Headers": "Content-Type",
-                            "Access-Control-Max-Age": "86400",
-                            "Vary": "Origin",
-                            "Content-Type": "application/json",
-                            **_VERSION_HEADERS,
-                        },
-                        "body": json.dumps({"message": "CORS preflight"})
-                    }
-                return {
-                    "statusCode": 403,
-                    "headers": {
-                        "Vary": "Origin",
-                        "Content-Type": "application/json",
-                        **_VERSION_HEADERS,
-                    },
-                    "body": json.dumps({
-                        "error": "origin_not_allowed",
-                        "allowed_origins": sorted(ALLOWED_ORIGINS),
-                    }),
-                }
-
-            return {
-                "statusCode": 200,
-                "headers": {
-                    "Access-Control-Allow-Origin": "*",
-                    "Access-Control-Allow-Methods": "GET, POST, PUT, PATCH, DELETE, OPTIONS",
-                    "Access-Control-Allow-Headers": "Content-Type, Authorization",
-                    "Access-Control-Expose-Headers": _EXPOSED_HEADER_NAMES,
-                    "Content-Type": "application/json",
-                    **_VERSION_HEADERS,
-                },
-                "body": json.dumps({"message": "CORS preflight"})
-            }
+            with request_timing.stage('cors'):
+                return _cors_preflight(event, path)
 
         # Parse request body and query parameters
         body = {}
@@ -194,8 +183,16 @@ def main(event, context):
             **_VERSION_HEADERS,
         }
 
+
+        # Look the route up before opening the session so its statement budget
+        # (libs/database.py) covers every transaction of the request, auth included.
+        public_match = match_route(PUBLIC_ROUTES, path, http_method)
+        authed_match = None if public_match is not None else match_route(AUTHED_ROUTES, path, http_method)
+        route_match = public_match or authed_match
+        budget = route_match.route.options.get('db_budget', 'interactive') if route_match else 'interactive'
+
         # Use SQLAlchemy session instead of direct psycopg2 connection
-        with get_session() as session:
+        with statement_budget(budget), get_session() as session:
             commonParams = {
                 "db_session": session,
                 "method": http_method,
@@ -203,589 +200,35 @@ def main(event, context):
                 "path_params": path_params,
                 "headers": event.get("headers", {}),
             }
-
-            # Route based on path and method
-            if "/api/admin/login" in path and http_method == "POST":
-                # Admin login endpoint (no authorization required)
-                from GEPPPlatform.services.admin import handle_admin_routes
-                admin_result = handle_admin_routes(path, data=body, **commonParams)
-                results = {"data": admin_result}
-
-            elif "/api/auth" in path:
-                # Handle all auth routes through auth module (no authorization required)
-                # Includes: login, register, register/check-email, refresh, validate, etc.
-                # Support both legacy format and direct data for POST requests
-                auth_result = handle_auth_routes(path, data=body, **commonParams)
-                results = {"data": auth_result}
-
-            elif "/api/iot-hardwares" in path:
-                # PUBLIC: physical-tablet self-checkin (every ~15 s, pre-login).
-                # See migration 051 + iot_hardwares_handlers.py for the
-                # rationale. Routed here so unauthenticated tablets can
-                # report MAC + serial without needing device-token first.
-                from GEPPPlatform.services.cores.iot_hardwares.iot_hardwares_handlers import (
-                    handle_iot_hardware_routes,
-                )
-                hw_result = handle_iot_hardware_routes(event, data=body, **commonParams)
-                results = {"success": True, "data": hw_result}
-
-            elif "/api/epr/ai_audit" in path:
-                # PUBLIC: EPR AI audit ingestion + lookup endpoints.
-                # Routed here (before the auth gate) so external integrations
-                # can POST transactions without a JWT. Ported from
-                # gepp-v2-backend (GEPPV2.services.ai_audit).
-                from GEPPPlatform.services.cores.epr_ai_audit.api.handlers import handle_epr_ai_audit_routes
-
-                epr_ai_audit_result = handle_epr_ai_audit_routes(event, data=body, **commonParams)
-                results = {
-                    "success": True,
-                    "data": epr_ai_audit_result
-                }
-
-            elif "/documents/api-docs" in raw_path or "/docs/bma/" in raw_path:
-                # Handle documentation routes (no authorization required)
-                from GEPPPlatform.docs.docs_handlers import handle_docs_routes
-
-                docs_result = handle_docs_routes(event, **commonParams)
-                content_type = docs_result.get('content_type', 'application/json')
-
-                return {
-                    "statusCode": 200,
-                    "headers": {
-                        "Content-Type": content_type,
-                    },
-                    "body": docs_result.get('body', '')
-                }
-
-            elif path == "/health" or "/health" in path:
-                # Health check endpoint (no authorization required)
-                results = {"status": "healthy", "timestamp": datetime.now().isoformat(), "method": http_method}
-
-            elif path == "/api/version" or path.endswith("/api/version"):
-                # Public version probe (no auth) — confirms which code revision
-                # the Lambda is actually running. Same info is also on every
-                # response as X-App-Version / X-App-Build-Commit headers.
-                results = {"success": True, "data": app_config.version_payload()}
-
-            elif "/api/webhooks/mailchimp/inbound" in path and http_method == "POST":
-                # Mailchimp Transactional INBOUND reply webhook (Sprint 10 P1 inbox)
-                from GEPPPlatform.services.webhooks.mailchimp_inbound_handler import handle_mailchimp_inbound_webhook
-                return handle_mailchimp_inbound_webhook(event, session)
-
-            elif "/api/webhooks/mailchimp" in path and http_method == "POST":
-                # Mailchimp Transactional activity webhook (public, HMAC-signed)
-                from GEPPPlatform.services.webhooks.mailchimp_handler import handle_mailchimp_webhook
-                return handle_mailchimp_webhook(event, session)
-
-            elif "/api/crm/unsubscribe/" in path and http_method == "GET":
-                # Public unsubscribe landing page (token-signed)
-                from GEPPPlatform.services.public.crm_unsubscribe_handler import handle_unsubscribe
-                token = path.split('/api/crm/unsubscribe/')[1].split('/')[0].split('?')[0]
-                return handle_unsubscribe(token, session)
-
-            elif "/api/public/leads" in path and http_method == "POST":
-                # Public lead capture — no auth required.
-                # Accepts form submissions from embedded widgets.
-                from GEPPPlatform.services.public.leads_capture_handler import handle_public_lead_capture
-                request_meta = {
-                    "ip_address": (event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
-                    "user_agent": (event.get("headers") or {}).get("user-agent"),
-                }
-                lead_result = handle_public_lead_capture(body, session, request_meta=request_meta)
-                results = {"success": True, "data": lead_result}
-
-            elif "/api/public/customer-leads" in path and http_method == "POST":
-                # Marketing-site lead capture (gepp.me Contact form).
-                # Origin-allowlisted; rejects requests from anywhere else.
-                from GEPPPlatform.services.public.customer_leads_handler import (
-                    handle_customer_lead_capture, is_origin_allowed, ALLOWED_ORIGINS,
-                )
-                req_headers = event.get("headers") or {}
-                origin = req_headers.get("origin") or req_headers.get("Origin")
-                if not is_origin_allowed(origin):
-                    return {
-                        "statusCode": 403,
-                        "headers": {
-                            "Vary": "Origin",
-                            "Content-Type": "application/json",
-                            **_VERSION_HEADERS,
-                        },
-                        "body": json.dumps({
-                            "success": False,
-                            "error": "origin_not_allowed",
-                            "allowed_origins": sorted(ALLOWED_ORIGINS),
-                        }),
-                    }
-                request_meta = {
-                    "origin":     origin,
-                    "ip_address": (event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
-                    "user_agent": req_headers.get("user-agent") or req_headers.get("User-Agent"),
-                    "referrer":   req_headers.get("referer")   or req_headers.get("Referer"),
-                }
-                lead_result = handle_customer_lead_capture(body, session, request_meta=request_meta)
-                return {
-                    "statusCode": 200,
-                    "headers": {
-                        "Access-Control-Allow-Origin": origin,
-                        "Vary": "Origin",
-                        "Content-Type": "application/json",
-                        **_VERSION_HEADERS,
-                    },
-                    "body": json.dumps({"success": True, "data": lead_result}),
-                }
-
-            elif "/api/public/cookie-consent" in path and http_method == "POST":
-                # PDPA cookie-consent audit log (gepp.me banner). Origin-allowlisted, same list as
-                # customer-leads. Append-only record of each accept/reject/custom decision.
-                from GEPPPlatform.services.public.cookie_consent_handler import (
-                    handle_cookie_consent_log, is_origin_allowed, ALLOWED_ORIGINS,
-                )
-                req_headers = event.get("headers") or {}
-                origin = req_headers.get("origin") or req_headers.get("Origin")
-                if not is_origin_allowed(origin):
-                    return {
-                        "statusCode": 403,
-                        "headers": {"Vary": "Origin", "Content-Type": "application/json", **_VERSION_HEADERS},
-                        "body": json.dumps({
-                            "success": False,
-                            "error": "origin_not_allowed",
-                            "allowed_origins": sorted(ALLOWED_ORIGINS),
-                        }),
-                    }
-                request_meta = {
-                    "origin":     origin,
-                    "ip_address": (event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
-                    "user_agent": req_headers.get("user-agent") or req_headers.get("User-Agent"),
-                    "referrer":   req_headers.get("referer")    or req_headers.get("Referer"),
-                    # coarse country from CloudFront (never the raw IP) — PDPA data-minimization
-                    "country":    req_headers.get("cloudfront-viewer-country")
-                               or req_headers.get("CloudFront-Viewer-Country"),
-                }
-                consent_result = handle_cookie_consent_log(body, session, request_meta=request_meta)
-                return {
-                    "statusCode": 200,
-                    "headers": {
-                        "Access-Control-Allow-Origin": origin,
-                        "Vary": "Origin",
-                        "Content-Type": "application/json",
-                        **_VERSION_HEADERS,
-                    },
-                    "body": json.dumps({"success": True, "data": consent_result}),
-                }
-
-            elif "/api/userapi/documents/" in path:
-                # PUBLIC: Handle API documentation routes (no authentication required)
-                # Pattern: /api/userapi/documents/{service_path}
-                # Example: /api/userapi/documents/ai_audit/v1
-                try:
-                    # Extract service_path from URL
-                    parts = path.split('/api/userapi/documents/')[1].split('/')
-                    if len(parts) < 1:
-                        return {
-                            "statusCode": 400,
-                            "headers": headers,
-                            "body": json.dumps({
-                                "success": False,
-                                "message": "Invalid documentation path. Expected: /api/userapi/documents/{service_path}",
-                                "error_code": "INVALID_PATH"
-                            })
-                        }
-                    
-                    # Reconstruct service_path (e.g., "ai_audit/v1")
-                    service_path = '/'.join(parts).split('?')[0]
-                    
-                    logger.info(f"Documentation request for service_path: {service_path}")
-                    
-                    # Try to import the swagger module for the service
-                    try:
-                        # Map service_path to function module
-                        # For example: 'ai_audit/v1' -> 'ai_audit_v1'
-                        function_module_name = service_path.replace('/', '_')
-                        
-                        # Import the swagger module dynamically
-                        swagger_module = __import__(
-                            f'GEPPPlatform.services.custom.functions.{function_module_name}.swagger',
-                            fromlist=['get_swagger_spec']
-                        )
-                        
-                        # Get the swagger spec
-                        swagger_spec = swagger_module.get_swagger_spec()
-                        
-                        # Generate Swagger UI HTML page
-                        html_content = f"""<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{swagger_spec['info']['title']} - API Documentation</title>
-    <link rel="stylesheet" type="text/css" href="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.10.5/swagger-ui.css" />
-    <style>
-        body {{
-            margin: 0;
-            padding: 0;
-        }}
-    </style>
-</head>
-<body>
-    <div id="swagger-ui"></div>
-    
-    <script src="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.10.5/swagger-ui-bundle.js"></script>
-    <script src="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.10.5/swagger-ui-standalone-preset.js"></script>
-    <script>
-        window.onload = function() {{
-            const spec = {json.dumps(swagger_spec)};
-            
-            SwaggerUIBundle({{
-                spec: spec,
-                dom_id: '#swagger-ui',
-                deepLinking: true,
-                presets: [
-                    SwaggerUIBundle.presets.apis,
-                    SwaggerUIStandalonePreset
-                ],
-                plugins: [
-                    SwaggerUIBundle.plugins.DownloadUrl
-                ],
-                layout: "StandaloneLayout"
-            }});
-        }};
-    </script>
-</body>
-</html>"""
-                        
-                        return {
-                            "statusCode": 200,
-                            "headers": {
-                                "Content-Type": "text/html; charset=utf-8"
-                            },
-                            "body": html_content
-                        }
-                        
-                    except ImportError as e:
-                        return {
-                            "statusCode": 404,
-                            "headers": headers,
-                            "body": json.dumps({
-                                "success": False,
-                                "message": f"Documentation not found for service: {service_path}",
-                                "error_code": "DOCS_NOT_FOUND",
-                                "detail": str(e)
-                            })
-                        }
-                    except AttributeError:
-                        return {
-                            "statusCode": 500,
-                            "headers": headers,
-                            "body": json.dumps({
-                                "success": False,
-                                "message": "Documentation module does not have get_swagger_spec function",
-                                "error_code": "INVALID_DOCS_MODULE"
-                            })
-                        }
-                        
-                except Exception as docs_err:
-                    logger.error(f"Documentation error: {docs_err}", exc_info=True)
-                    return {
-                        "statusCode": 500,
-                        "headers": headers,
-                        "body": json.dumps({
-                            "success": False,
-                            "message": "Error retrieving documentation",
-                            "error_code": "DOCS_ERROR",
-                            "detail": str(docs_err)
-                        })
-                    }
-
-            elif path == '/api/esg/liff/invitation/accept' and http_method == 'POST':
-                # Public: Accept invitation (no JWT required — user doesn't have one yet)
-                from GEPPPlatform.services.esg.liff_auth_service import LiffAuthService
-
-                with get_session() as session:
-                    liff_svc = LiffAuthService(session)
-                    try:
-                        accept_result = liff_svc.accept_invitation(
-                            invitation_token=body.get('invitation_token', ''),
-                            line_access_token=body.get('access_token', ''),
-                        )
-                        results = {"success": True, "data": accept_result}
-                    except ValueError as ve:
-                        results = {"success": False, "message": str(ve), "error_code": "BAD_REQUEST"}
-
-            elif path == '/api/esg/line/webhook' and http_method == 'POST':
-                # Public ESG LINE webhook (no JWT required, signature verified internally)
-                from GEPPPlatform.services.esg.esg_line_service import EsgLineService
-
-                _raw_h = event.get('headers', {}) or {}
-                _lc_h = {k.lower(): v for k, v in _raw_h.items()}
-                signature = _lc_h.get('x-line-signature', '')
-                raw_body = event.get('body', '{}')
-                logger.info("----------- LINE WEBHOOK RECEIVED -----------")
-                logger.info(f"[LINE-WEBHOOK] body_len={len(raw_body or '')}")
-                logger.info(f"[LINE-WEBHOOK] signature={signature[:30] if signature else 'NONE'}")
-                logger.info(f"[LINE-WEBHOOK] raw_body={raw_body[:500] if raw_body else 'EMPTY'}")
-                logger.info("----------------------------------------------")
-
-                # Pass simulator headers if present (case-insensitive lookup — Flask uses Title-Case)
-                raw_headers = event.get('headers', {})
-                h = {k.lower(): v for k, v in raw_headers.items()} if raw_headers else {}
-                simulator_opts = {}
-                if h.get('x-simulator') == 'true':
-                    simulator_opts['org_id'] = int(h.get('x-simulator-org-id', 0)) or None
-                    simulator_opts['user_id'] = h.get('x-simulator-user-id', '')
-                    simulator_opts['dry_run'] = h.get('x-simulator-dry-run') == 'true'
-                    logger.info(f"[LINE-WEBHOOK] SIMULATOR MODE: org_id={simulator_opts.get('org_id')}, dry_run={simulator_opts.get('dry_run')}, user_id={simulator_opts.get('user_id', '')[:20]}")
-
-                try:
-                    with get_session() as session:
-                        line_service = EsgLineService(session)
-                        webhook_result = line_service.handle_webhook(raw_body, signature, simulator_opts=simulator_opts)
-                        results = {
-                            "success": True,
-                            "data": webhook_result
-                        }
-                        logger.info(f"[LINE-WEBHOOK] Result: {json.dumps(webhook_result, default=str)[:500]}")
-                except Exception as webhook_err:
-                    logger.error(f"[LINE-WEBHOOK] Error: {webhook_err}", exc_info=True)
-                    results = {"success": False, "message": str(webhook_err)}
-
-            elif "/api/scale-report/" in path:
-                # PUBLIC: daily scale report opened by scanning the QR shown on
-                # a weighing tablet. Access is controlled by an expiring HMAC
-                # token in the path rather than a JWT, so it has to sit ahead of
-                # the auth gate — same placement rationale as
-                # /api/input-channel/ below.
-                #
-                # The reader is a walk-in customer, so the response goes through
-                # to_public_payload(), which is an allowlist — internal ids and
-                # anything transaction-level never leave the organisation.
-                #
-                # ?date= lets the page step between days, but only inside the
-                # window the token authorises (resolve_requested_day). Without
-                # that bound a single QR would unlock the station's whole
-                # history to whoever photographed it.
-                from GEPPPlatform.services.cores.scale_reports.scale_report_service import (
-                    get_daily_summary,
-                    to_public_payload,
-                )
-                from GEPPPlatform.services.cores.scale_reports.scale_report_token import (
-                    resolve_requested_day,
-                    verify_report_token,
-                )
-
-                report_token = path.split('/api/scale-report/')[1].split('/')[0].split('?')[0]
-                claims = verify_report_token(report_token)   # raises 401 / 410
-                report_day = resolve_requested_day(          # raises 422 / 403
-                    claims, query_params.get('date')
-                )
-                results = {
-                    "success": True,
-                    "data": to_public_payload(
-                        get_daily_summary(
-                            session,
-                            claims['origin_id'],
-                            claims['org_id'],
-                            report_day,
-                        )
-                    ),
-                }
-
-            elif "/api/input-channel/" in path:
-                # Public input channel access (no authorization required)
-                # Used for QR code mobile input
-                from GEPPPlatform.services.cores.users.input_channel_service import InputChannelService
-
-                # Extract hash from path: /api/input-channel/{hash} or /api/input-channel/{hash}/submit or /api/input-channel/{hash}/preferences or /api/input-channel/{hash}/materials or /api/input-channel/{hash}/location-materials
-                path_parts = path.split('/api/input-channel/')[1].split('/')
-                hash_value = path_parts[0].split('?')[0]
-                is_submit = len(path_parts) > 1 and path_parts[1] == 'submit'
-                is_preferences = len(path_parts) > 1 and path_parts[1].startswith('preferences')
-                is_location_materials = len(path_parts) > 1 and path_parts[1] == 'location-materials'
-                is_materials = len(path_parts) > 1 and path_parts[1] == 'materials'
-
-                input_service = InputChannelService(session)
-
-                if is_location_materials and http_method == 'GET':
-                    # Get allowed materials for a specific location (hierarchy-based filtering)
-                    qr_name = query_params.get('qr_name', '')
-                    location_id = int(query_params.get('location_id', '0'))
-                    loc_materials_result = input_service.get_location_materials(hash_value, qr_name, location_id)
-                    results = {
-                        "success": loc_materials_result.get('success', False),
-                        "data": {
-                            "materials": loc_materials_result.get('materials', []),
-                            "categories": loc_materials_result.get('categories', []),
-                            "main_materials": loc_materials_result.get('main_materials', []),
-                            "is_filtered": loc_materials_result.get('is_filtered', False),
-                        }
-                    }
-                    if not loc_materials_result.get('success'):
-                        results["message"] = loc_materials_result.get('message', '')
-                elif is_materials and http_method == 'GET':
-                    # Get all materials for the material picker (with channel-based auth)
-                    qr_name = query_params.get('qr_name', '')
-                    materials_result = input_service.get_all_materials_for_picker(hash_value, qr_name)
-                    results = {
-                        "success": materials_result.get('success', False),
-                        "data": {
-                            "materials": materials_result.get('materials', []),
-                            "categories": materials_result.get('categories', []),
-                            "main_materials": materials_result.get('main_materials', [])
-                        }
-                    }
-                elif is_preferences:
-                    # Handle preferences GET/POST
-                    subuser = query_params.get('subuser') or body.get('subuser', '')
-                    if http_method == 'GET':
-                        # Get subuser preferences
-                        prefs = input_service.get_subuser_preferences(hash_value, subuser)
-                        results = {
-                            "success": True,
-                            "data": prefs
-                        }
-                    elif http_method == 'POST':
-                        # Save subuser preferences
-                        material_ids = body.get('material_ids', [])
-                        save_result = input_service.save_subuser_preferences(hash_value, subuser, material_ids)
-                        results = {
-                            "success": save_result.get('success', False),
-                            "data": save_result
-                        }
-                        if not save_result.get('success'):
-                            return {
-                                "statusCode": 400,
-                                "headers": headers,
-                                "body": json.dumps({
-                                    'success': False,
-                                    'message': save_result.get('message', 'Failed to save preferences')
-                                })
-                            }
-                    else:
-                        return {
-                            "statusCode": 405,
-                            "headers": headers,
-                            "body": json.dumps({'success': False, 'message': 'Method not allowed'})
-                        }
-                elif is_submit and http_method == 'POST':
-                    # Handle transaction submission from QR input
-                    submit_result = input_service.submit_transaction_by_hash(hash_value, body)
-                    if submit_result.get('status') == 'success':
-                        results = {
-                            "success": True,
-                            "data": submit_result
-                        }
-                    else:
-                        return {
-                            "statusCode": 400,
-                            "headers": headers,
-                            "body": json.dumps({
-                                'success': False,
-                                'message': submit_result.get('message', 'Submission failed'),
-                                'data': submit_result
-                            })
-                        }
-                else:
-                    # Get channel data
-                    qr_name = query_params.get('qr_name')
-                    channel_data = input_service.get_input_channel_by_hash(hash_value, qr_name)
-
-                    if channel_data:
-                        results = {
-                            "success": True,
-                            "data": channel_data
-                        }
-                    else:
-                        return {
-                            "statusCode": 404,
-                            "headers": headers,
-                            "body": json.dumps({'success': False, 'message': 'Input channel not found'})
-                        }
-
-            # Check for channel-based authentication for materials endpoints (QR mobile input)
-            elif path.startswith('/api/materials') and http_method == 'GET':
-                # Allow materials access with channel_hash + subuser authentication
-                channel_hash = query_params.get('channel_hash')
-                qr_name = query_params.get('qr_name')
-
-                if channel_hash and qr_name:
-                    # Validate channel and user by qr_name
-                    from GEPPPlatform.services.cores.users.input_channel_service import InputChannelService
-                    input_service = InputChannelService(session)
-                    channel_data = input_service.get_input_channel_by_hash(channel_hash, qr_name)
-
-                    if channel_data and channel_data.get('subUser', {}).get('isValid'):
-                        # Valid channel access - serve materials data without token
-                        from GEPPPlatform.services.cores.materials.materials_handlers import handle_materials_routes
-                        materials_result = handle_materials_routes(
-                            event,
-                            db_session=session,
-                            method=http_method,
-                            query_params=query_params,
-                            path_params={},
-                            headers=event.get('headers', {}),
-                            current_user={'channel_auth': True, 'organization_id': channel_data.get('organization_id')}
-                        )
-                        results = {
-                            "success": True,
-                            "data": materials_result
-                        }
-                    else:
-                        return {
-                            "statusCode": 401,
-                            "headers": headers,
-                            "body": json.dumps({'success': False, 'message': 'Invalid channel or subuser'})
-                        }
-                else:
-                    # No channel auth provided, fall through to regular token auth
-                    auth_header = event.get('headers', {}).get('Authorization', '') or event.get('headers', {}).get('authorization', '')
-                    if not auth_header.startswith('Bearer '):
-                        return {
-                            "statusCode": 401,
-                            "headers": headers,
-                            "body": json.dumps({'success': False, 'message': 'Missing or invalid authorization header'})
-                        }
-                    token = auth_header[7:]
-                    auth_handler = AuthHandlers(session)
-                    token_data = auth_handler.verify_jwt_token(token, path)
-                    if token_data is None:
-                        return {
-                            "statusCode": 401,
-                            "headers": headers,
-                            "body": json.dumps({'success': False, 'message': 'Invalid token or insufficient permissions'})
-                        }
-                    # Handle materials routes with token auth
-                    from GEPPPlatform.services.cores.materials.materials_handlers import handle_materials_routes
-                    current_user = {
-                        'user_id': token_data['user_id'],
-                        'organization_id': token_data.get('organization_id'),
-                        'email': token_data.get('email'),
-                        'token_data': token_data
-                    }
-                    materials_result = handle_materials_routes(
-                        event,
-                        db_session=session,
-                        method=http_method,
-                        query_params=query_params,
-                        path_params={},
-                        headers=event.get('headers', {}),
-                        current_user=current_user
-                    )
-                    results = {
-                        "success": True,
-                        "data": materials_result
-                    }
-
-            elif "/api/rewards/public" in path:
-                # Public reward/LIFF endpoints (no JWT required, auth via LINE user_id)
-                from GEPPPlatform.services.rewards.reward_handlers import handle_reward_routes
-
-                reward_result = handle_reward_routes(event, data=body, **commonParams)
-                results = {
-                    "success": True,
-                    "data": reward_result
-                }
+            req = RouteRequest(
+                event=event,
+                context=context,
+                path=path,
+                method=http_method,
+                body=body,
+                query_params=query_params,
+                session=session,
+                common_params=commonParams,
+                headers=headers,
+            )
+
+            # Public routes are served before the auth gate.
+            matched = public_match
+            if matched is not None:
+                req.params = matched.params
+                startup.set_active_route(matched.key)
+                request_timing.set_route(matched.key)
+                with request_timing.stage('handler'):
+                    results = matched.route.handler(req)
 
             else:
-                # All other routes require authorization
+                # All other routes require authorization. The lookup itself is
+                # cheap, so it happens first; an unknown route still answers 401
+                # to an anonymous caller and 404 only once the token checks out.
+                matched = authed_match
+                options = matched.route.options if matched is not None else {}
+                log_auth = options.get('log_auth', False)
+
                 auth_header = event.get('headers', {}).get('Authorization', '') or event.get('headers', {}).get('authorization', '')
 
                 if not auth_header.startswith('Bearer '):
@@ -798,26 +241,28 @@ def main(event, context):
                 token = auth_header[7:]  # Remove 'Bearer ' prefix
                 # Create AuthHandlers instance for token verification
                 auth_handler = AuthHandlers(session)
-                
+
                 # Add logging for custom API paths
-                if "/api/userapi/" in path:
+                if log_auth:
                     logger.info(f"[CUSTOM_API_AUTH] Verifying token for path: {path}")
                     logger.info(f"[CUSTOM_API_AUTH] Token (first 20 chars): {token[:20]}...")
-                
-                token_data = auth_handler.verify_jwt_token(token, path)
+
+                with request_timing.stage('auth'):
+                    token_data = auth_handler.verify_jwt_token(token, path)
 
                 if token_data is None:
-                    if "/api/userapi/" in path:
+                    if log_auth:
                         logger.error(f"[CUSTOM_API_AUTH] Token verification FAILED for path: {path}")
                     return {
                         "statusCode": 401,
                         "headers": headers,
                         "body": json.dumps({'success': False, 'message': 'Invalid token or insufficient permissions'})
                     }
-                
-                if "/api/userapi/" in path:
+
+                if log_auth:
                     logger.info(f"[CUSTOM_API_AUTH] Token verification SUCCESS - token_data: {token_data}")
-                if '/api/iot-devices' in path:
+                current_user = None
+                if options.get('principal') == 'device':
                     current_device = {
                         'device_id': token_data['device_id'],
                         'token_data': token_data  # Include full token data for future use
@@ -833,7 +278,8 @@ def main(event, context):
                         user_token = None
 
                     if user_token:
-                        user_token_data = auth_handler.verify_jwt_token(user_token, path)
+                        with request_timing.stage('auth'):
+                            user_token_data = auth_handler.verify_jwt_token(user_token, path)
                         if user_token_data and user_token_data.get('user_id'):
                             current_user = {
                                 'user_id': user_token_data['user_id'],
@@ -843,7 +289,7 @@ def main(event, context):
                             }
                             commonParams['current_user'] = current_user
                 else:
-                # Extract full user info from JWT token and add to commonParams
+                    # Extract full user info from JWT token and add to commonParams
                     current_user = {
                         'user_id': token_data['user_id'],
                         'organization_id': token_data.get('organization_id'),
@@ -853,550 +299,38 @@ def main(event, context):
                     }
                     commonParams['current_user'] = current_user
 
-                # Route to appropriate handler (all handlers can assume user is authenticated)
-                try:
-                    if "/api/admin" in path:
-                        # Admin backoffice routes (require admin role in JWT)
-                        admin_role = token_data.get('admin_role')
-                        if admin_role not in ['super-admin', 'gepp-admin']:
-                            return {
-                                "statusCode": 403,
-                                "headers": headers,
-                                "body": json.dumps({'success': False, 'message': 'Admin access required'})
-                            }
-                        from GEPPPlatform.services.admin import handle_admin_routes
-                        admin_result = handle_admin_routes(path, data=body, **commonParams)
-                        # Allow admin handlers to return a raw proxy response
-                        # (e.g. 304 Not Modified for ETag-aware endpoints).
-                        if isinstance(admin_result, dict) and isinstance(admin_result.get('__http__'), dict):
-                            http_meta = admin_result['__http__']
-                            if 'statusCode' in http_meta:
-                                # Full proxy response — return directly.
-                                proxy_headers = dict(headers)
-                                proxy_headers.update(http_meta.get('headers', {}) or {})
-                                results = {
-                                    "statusCode": http_meta['statusCode'],
-                                    "headers": proxy_headers,
-                                    "body": http_meta.get('body', ''),
-                                }
-                            else:
-                                # Headers-only override (e.g. attach ETag to a normal JSON response).
-                                extra_headers = http_meta.get('headers', {}) or {}
-                                # Strip the meta key from the payload before serialising.
-                                payload = {k: v for k, v in admin_result.items() if k != '__http__'}
-                                body_dict = {"success": True, "data": payload}
-                                merged_headers = dict(headers)
-                                merged_headers.update(extra_headers)
-                                results = {
-                                    "statusCode": 200,
-                                    "headers": merged_headers,
-                                    "body": json.dumps(body_dict, cls=DateTimeEncoder),
-                                }
-                        else:
-                            results = {
-                                "success": True,
-                                "data": admin_result
-                            }
-                    elif "/api/crm/events" in path and http_method == "POST":
-                        # Authed client-side event ingest (user JWT)
-                        from GEPPPlatform.services.public.crm_client_events_handler import handle_client_event
-                        request_meta = {
-                            "session_id": (event.get("headers") or {}).get("x-session-id"),
-                            "ip_address": (event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
-                            "user_agent": (event.get("headers") or {}).get("user-agent"),
-                        }
-                        crm_evt_result = handle_client_event(body, current_user, request_meta, session)
-                        results = {"success": True, "data": crm_evt_result}
-
-                    elif "/api/iot-devices" in path:
-                        # Handle all IoT devices management routes
-                        from GEPPPlatform.services.cores.iot_devices.iot_devices_handlers import handle_iot_devices_routes
-
-                        iot_devices_result = handle_iot_devices_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": iot_devices_result
-                        }
-                    elif "/api/users" in path or "/api/locations" in path or "/api/input-channels" in path:
-                        # Handle all user management routes (including organization-level input channels)
-                        from GEPPPlatform.services.cores.users.user_handlers import handle_user_routes
-
-                        user_result = handle_user_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": user_result
-                        }
-
-                    elif "/api/organizations" in path:
-                        # Handle all organization management routes
-                        from GEPPPlatform.services.cores.organizations.organization_handlers import organization_routes
-
-                        org_result = organization_routes(event, context, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": org_result
-                        }
-
-                    elif "/api/shared-locations" in path:
-                        # Cross-organization location data sharing routes
-                        from GEPPPlatform.services.cores.sharing.shared_location_handlers import shared_location_routes
-
-                        shared_result = shared_location_routes(event, context, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": shared_result
-                        }
-
-                    elif "/api/materials" in path:
-                        # Handle all materials management routes
-                        from GEPPPlatform.services.cores.materials.materials_handlers import handle_materials_routes
-
-                        materials_result = handle_materials_routes(event, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": materials_result
-                        }
-
-                    elif "/api/reports" in path:
-                        # Handle all materials management routes
-                        from GEPPPlatform.services.cores.reports.reports_handlers import handle_reports_routes
-
-                        reports_result = handle_reports_routes(event, **commonParams)
-                        # If handler returned an API Gateway proxy response (e.g., raw PDF),
-                        # pass it through directly without wrapping.
-                        if isinstance(reports_result, dict) and \
-                           "statusCode" in reports_result and \
-                           "headers" in reports_result and \
-                           "body" in reports_result:
-                            results = reports_result
-                        else:
-                            results = {
-                                "success": True,
-                                "data": reports_result
-                            }
-                    elif "/api/gri" in path:
-                        # Handle all GRI routes
-                        from GEPPPlatform.services.cores.gri.gri_handlers import handle_gri_routes
-
-                        gri_result = handle_gri_routes(event, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": gri_result
-                        }
-                        
-                    elif "/api/rewards" in path:
-                        # Handle all reward management routes
-                        from GEPPPlatform.services.rewards.reward_handlers import handle_reward_routes
-
-                        reward_result = handle_reward_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": reward_result
-                        }
-
-                    elif "/api/import-files" in path:
-                        # Handle all bulk data-import routes (Excel upload → transactions)
-                        from GEPPPlatform.services.cores.imports.import_handlers import handle_import_routes
-
-                        import_result = handle_import_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": import_result
-                        }
-
-                    elif "/api/transactions" in path:
-                        # Handle all transaction management routes
-                        from GEPPPlatform.services.cores.transactions.transaction_handlers import handle_transaction_routes
-
-                        transaction_result = handle_transaction_routes(event, data=body, **commonParams)
-                        # Transaction handlers return complete response structure, don't double-wrap
-                        results = {
-                            "success": True,
-                            "data": transaction_result
-                        }
-
-                    elif "/api/transaction_audit" in path:
-                        # Handle all transaction audit routes
-                        from GEPPPlatform.services.cores.transaction_audit.transaction_audit_handlers import handle_transaction_audit_routes
-
-                        audit_result = handle_transaction_audit_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": audit_result
-                        }
-
-                    elif "/api/traceability" in path:
-                        # Handle all traceability routes
-                        from GEPPPlatform.services.cores.traceability.traceability_handlers import handle_traceability_routes
-
-                        traceability_result = handle_traceability_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": traceability_result
-                        }
-
-                    elif "/api/audit-settings" in path:
-                        # Handle AI audit settings routes (doc types, doc requires, check columns)
-                        from GEPPPlatform.services.cores.audit_settings.audit_settings_handlers import handle_audit_settings_routes
-
-                        settings_result = handle_audit_settings_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": settings_result
-                        }
-
-                    elif "/api/audit" in path:
-                        if "/api/audit/manual" in path:
-                            # Handle all manual audit routes
-                            from GEPPPlatform.services.cores.transaction_audit.manual_audit_handlers import handle_manual_audit_routes
-
-                            manual_audit_result = handle_manual_audit_routes(event, data=body, **commonParams)
-                            results = {
-                                "success": True,
-                                "data": manual_audit_result
-                            }
-                        else:
-                            # Handle all audit rules management routes
-                            from GEPPPlatform.services.cores.audit_rules.audit_rules_handlers import handle_audit_rules_routes
-
-                            rules_result = handle_audit_rules_routes(event, data=body, **commonParams)
-                            results = {
-                                "success": True,
-                                "data": rules_result
-                            }
-
-                    elif "/api/esg" in path:
-                        # Handle all ESG routes (settings, documents, waste records, dashboard)
-                        from GEPPPlatform.services.esg.esg_handlers import handle_esg_routes
-
-                        esg_result = handle_esg_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": esg_result
-                        }
-
-                    elif "/api/debug" in path:
-                        # Handle all debug routes (development only)
-                        from GEPPPlatform.services.debug.debug_handlers import handle_debug_routes
-
-                        debug_result = handle_debug_routes(event, data=body, **commonParams)
-                        results = {
-                            "success": True,
-                            "data": debug_result
-                        }
-
-                    elif "/api/integration" in path:
-                        # Handle all integration routes
-                        if "/api/integration/bma" in path:
-                            # Handle BMA integration routes
-                            from GEPPPlatform.services.integrations.bma.bma_handlers import handle_bma_routes
-
-                            bma_result = handle_bma_routes(event, data=body, **commonParams)
-                            results = {
-                                "success": True,
-                                "data": bma_result
-                            }
-                        else:
-                            # Handle other integration routes here
-                            available_integration_routes = ["/api/integration/bma/*"]
-                            return {
-                                "statusCode": 404,
-                                "headers": headers,
-                                "body": json.dumps({
-                                    "success": False,
-                                    "message": "Integration route not found",
-                                    "error_code": "ROUTE_NOT_FOUND",
-                                    "path": path,
-                                    "method": http_method,
-                                    "available_integration_routes": available_integration_routes
-                                })
-                            }
-
-                    elif "/api/userapi/" in path:
-                        # Handle custom API routes: /api/userapi/{api_path}/{service_path}/...
-                        from GEPPPlatform.services.custom.custom_api_service import CustomApiService
-                        from GEPPPlatform.services.custom import execute_custom_function
-                        
-                        try:
-                            # Extract api_path and service_path from URL
-                            # Pattern: /api/userapi/{api_path}/{service_path}/...
-                            parts = path.split('/api/userapi/')[1].split('/')
-                            if len(parts) < 2:
-                                return {
-                                    "statusCode": 400,
-                                    "headers": headers,
-                                    "body": json.dumps({
-                                        "success": False,
-                                        "message": "Invalid custom API path. Expected: /api/userapi/{api_path}/{service_path}/...",
-                                        "error_code": "INVALID_PATH"
-                                    })
-                                }
-                            
-                            api_path = parts[0]
-                            # Extract service_path and remaining_path
-                            # We need to find where the service_path ends by checking against database
-                            # Try progressively longer paths: "ai_audit", "ai_audit/v1", "ai_audit/v1/test", etc.
-                            remaining_parts = parts[1:]
-                            
-                            logger.info(f"[CUSTOM_API] Parsing URL - api_path={api_path}, remaining_parts={remaining_parts}")
-                            
-                            # Initialize service
-                            custom_api_service = CustomApiService(session)
-                            
-                            # Try to find the service by progressively building the service_path
-                            # Start with just the first segment, then first+second, etc.
-                            service_path = None
-                            remaining_path = ""
-                            custom_api = None
-                            
-                            for i in range(len(remaining_parts), 0, -1):
-                                potential_service_path = '/'.join(remaining_parts[:i]).split('?')[0]
-                                logger.info(f"[CUSTOM_API] Trying service_path: {potential_service_path}")
-                                
-                                # Try to find this service_path in the database
-                                potential_api = custom_api_service.get_custom_api_by_service_path(potential_service_path)
-                                if potential_api:
-                                    service_path = potential_service_path
-                                    remaining_path = '/'.join(remaining_parts[i:]) if i < len(remaining_parts) else ""
-                                    custom_api = potential_api
-                                    logger.info(f"[CUSTOM_API] Found service: {service_path}, remaining: {remaining_path}")
-                                    break
-                            
-                            if not service_path or not custom_api:
-                                # No matching service found
-                                attempted_paths = ['/'.join(remaining_parts[:i]).split('?')[0] for i in range(1, len(remaining_parts) + 1)]
-                                return {
-                                    "statusCode": 404,
-                                    "headers": headers,
-                                    "body": json.dumps({
-                                        "success": False,
-                                        "message": "API service not found",
-                                        "error_code": "API_NOT_FOUND",
-                                        "debug_info": {
-                                            "api_path": api_path,
-                                            "attempted_service_paths": attempted_paths
-                                        }
-                                    })
-                                }
-                            
-                            # Get the organization for this api_path
-                            organization = custom_api_service.get_organization_by_api_path(api_path)
-                            if not organization:
-                                return {
-                                    "statusCode": 404,
-                                    "headers": headers,
-                                    "body": json.dumps({
-                                        "success": False,
-                                        "message": f"Organization not found for api_path: {api_path}",
-                                        "error_code": "ORG_NOT_FOUND",
-                                        "debug_info": {
-                                            "api_path": api_path,
-                                            "service_path": service_path
-                                        }
-                                    })
-                                }
-                            
-                            # Get organization API access
-                            org_api = custom_api_service.get_organization_api_access(organization.id, custom_api.id)
-                            if not org_api:
-                                return {
-                                    "statusCode": 403,
-                                    "headers": headers,
-                                    "body": json.dumps({
-                                        "success": False,
-                                        "message": "Organization does not have access to this API",
-                                        "error_code": "API_ACCESS_DENIED",
-                                        "debug_info": {
-                                            "api_path": api_path,
-                                            "service_path": service_path,
-                                            "organization_id": organization.id,
-                                            "organization_name": organization.name
-                                        }
-                                    })
-                                }
-                            
-                            # Validate access (enabled, not expired, has quota)
-                            try:
-                                # Check if enabled
-                                if not org_api.enable:
-                                    raise APIException(
-                                        status_code=403,
-                                        message="API access is disabled for this organization",
-                                        error_code="API_DISABLED"
-                                    )
-                                
-                                # Check expiration
-                                if org_api.expired_date and org_api.expired_date < datetime.now(timezone.utc):
-                                    raise APIException(
-                                        status_code=403,
-                                        message="API access has expired",
-                                        error_code="API_EXPIRED"
-                                    )
-                                
-                                # Check API call quota
-                                if not org_api.has_api_quota():
-                                    raise APIException(
-                                        status_code=429,
-                                        message="API call quota exceeded",
-                                        error_code="QUOTA_EXCEEDED"
-                                    )
-                                    
-                                logger.info(f"[CUSTOM_API] Access validated - org_id={organization.id}, api={custom_api.name}")
-                                
-                            except APIException:
-                                raise  # Re-raise API exceptions as-is
-                            
-                            logger.info(f"[CUSTOM_API] JWT current_user: {current_user}")
-                            # This prevents users from accessing other organizations' APIs even with valid tokens
-                            token_org_id = current_user.get('organization_id')
-                            logger.info(f"[CUSTOM_API] Org match check - token_org_id={token_org_id}, api_org_id={organization.id}")
-                            
-                            if not token_org_id:
-                                logger.warning(f"[CUSTOM_API] Missing organization_id in JWT token")
-                                return {
-                                    "statusCode": 403,
-                                    "headers": headers,
-                                    "body": json.dumps({
-                                        "success": False,
-                                        "message": "JWT token does not contain organization_id claim",
-                                        "error_code": "MISSING_ORG_CLAIM",
-                                        "debug_info": {
-                                            "api_path": api_path,
-                                            "service_path": service_path,
-                                            "jwt_claims": list(current_user.keys()) if current_user else []
-                                        }
-                                    })
-                                }
-                            
-                            if token_org_id != organization.id:
-                                logger.warning(f"[CUSTOM_API] Organization mismatch: JWT token org_id={token_org_id}, api_path org_id={organization.id}")
-                                return {
-                                    "statusCode": 403,
-                                    "headers": headers,
-                                    "body": json.dumps({
-                                        "success": False,
-                                        "message": "Access denied. Your organization does not match this API path.",
-                                        "error_code": "ORG_MISMATCH",
-                                        "debug_info": {
-                                            "api_path": api_path,
-                                            "service_path": service_path,
-                                            "jwt_organization_id": token_org_id,
-                                            "api_organization_id": organization.id,
-                                            "api_organization_name": organization.name
-                                        }
-                                    })
-                                }
-                            
-                            logger.info(f"[CUSTOM_API] Organization match successful - proceeding to execute function")
-                            
-                            # Execute the custom function
-                            result = execute_custom_function(
-                                root_fn_name=custom_api.root_fn_name,
-                                db_session=session,
-                                organization_id=organization.id,
-                                method=http_method,
-                                path=remaining_path,
-                                query_params=query_params,
-                                body=body,
-                                headers=event.get("headers", {}),
-                                current_user=current_user,
-                                api_path=api_path,
-                                custom_api_id=custom_api.id,
-                                full_path=path
-                            )
-                            
-                            # Record API usage (increment counters)
-                            process_units = result.get('process_units', 0)  # Functions can report units consumed
-                            custom_api_service.record_api_call(org_api, process_units)
-
-                            # Check if result contains quota error in audit_result
-                            require_quota = None
-                            if isinstance(result, dict) and 'audit_result' in result:
-                                audit_result = result['audit_result']
-                                if isinstance(audit_result, dict) and audit_result.get('error') == 'PROCESS_QUOTA_EXCEEDED':
-                                    # Extract require_quota_for_this_call from audit_result.process_units
-                                    if 'process_units' in audit_result and isinstance(audit_result['process_units'], dict):
-                                        require_quota = audit_result['process_units'].get('require_quota_for_this_call')
-
-                            # Return result
-                            results = {
-                                "success": True,
-                                "data": result,
-                                "quota": custom_api_service.get_quota_status(org_api, require_quota)
-                            }
-                            
-                        except APIException as api_err:
-                            # Custom API validation errors (already have proper status codes)
-                            error_detail = {
-                                "success": False,
-                                "message": api_err.message,
-                                "error_code": api_err.error_code,
-                                "debug_info": {
-                                    "api_path": api_path,
-                                    "service_path": service_path,
-                                    "status_code": api_err.status_code
-                                }
-                            }
-                            logger.error(f"[CUSTOM_API] APIException: {api_err.error_code} - {api_err.message}")
-                            return {
-                                "statusCode": api_err.status_code,
-                                "headers": headers,
-                                "body": json.dumps(error_detail)
-                            }
-                        except ValueError as val_err:
-                            # Function not found in registry
-                            error_detail = {
-                                "success": False,
-                                "message": str(val_err),
-                                "error_code": "FUNCTION_NOT_FOUND",
-                                "debug_info": {
-                                    "api_path": api_path,
-                                    "service_path": service_path,
-                                    "function_registry_name": custom_api.root_fn_name if 'custom_api' in locals() else None
-                                }
-                            }
-                            logger.error(f"[CUSTOM_API] Function not found: {val_err}")
-                            return {
-                                "statusCode": 404,
-                                "headers": headers,
-                                "body": json.dumps(error_detail)
-                            }
-                        except Exception as custom_err:
-                            logger.error(f"[CUSTOM_API] Unexpected error: {custom_err}", exc_info=True)
-                            error_detail = {
-                                "success": False,
-                                "message": "Internal error processing custom API request",
-                                "error_code": "CUSTOM_API_ERROR",
-                                "error_type": type(custom_err).__name__,
-                                "detail": str(custom_err),
-                                "debug_info": {
-                                    "api_path": api_path if 'api_path' in locals() else None,
-                                    "service_path": service_path if 'service_path' in locals() else None
-                                }
-                            }
-                            return {
-                                "statusCode": 500,
-                                "headers": headers,
-                                "body": json.dumps(error_detail)
-                            }
+                if matched is None:
+                    return {
+                        "statusCode": 404,
+                        "headers": headers,
+                        "body": json.dumps({
+                            "success": False,
+                            "message": "Route not found",
+                            "error_code": "ROUTE_NOT_FOUND",
+                            "path": path,
+                            "method": http_method,
+                            "available_routes": available_routes(),
+                        })
+                    }
 
+                req.params = matched.params
+                req.token_data = token_data
+                req.current_user = current_user
 
+                # Auth ran on the primary; GETs on read-only routes may read the
+                # rest from the replica unless this user has just written.
+                route_reads(
+                    session,
+                    writer=token_data.get('user_id'),
+                    replica=http_method == 'GET' and options.get('db_role') == 'replica',
+                )
 
-                    else:
-                        # Handle other future modules here
-                        available_routes = ["/api/auth/*", "/api/users/*", "/api/organizations/*", "/api/materials/*", "/api/locations/*", "/api/reports/*", "/api/transactions/*", "/api/transaction_audit/*", "/api/traceability/*", "/api/audit/*", "/api/audit-settings/*", "/api/epr/ai_audit/*", "/api/esg/*", "/api/debug/*", "/api/integration/*", "/api/userapi/{api_path}/{service_path}/*", "/health"]
-                        return {
-                            "statusCode": 404,
-                            "headers": headers,
-                            "body": json.dumps({
-                                "success": False,
-                                "message": "Route not found",
-                                "error_code": "ROUTE_NOT_FOUND",
-                                "path": path,
-                                "method": http_method,
-                                "available_routes": available_routes
-                            })
-                        }
+                # Route to appropriate handler (all handlers can assume user is authenticated)
+                try:
+                    startup.set_active_route(matched.key)
+                    request_timing.set_route(matched.key)
+                    with request_timing.stage('handler'):
+                        results = matched.route.handler(req)
 
                 except APIException as api_error:
                     # Handle custom API exceptions with proper status codes
@@ -1430,17 +364,23 @@ def main(event, context):
         if isinstance(results, dict) and "statusCode" in results and "body" in results:
             # Already-built responses (file downloads, redirects) pass through as-is;
             # _maybe_gzip declines anything already base64-encoded.
-            return maybe_gzip(results, event)
+            with request_timing.stage('gzip'):
+                response = maybe_gzip(results, event)
         else:
-            return maybe_gzip({
-                "statusCode": 200,
-                "headers": {
-                    "Content-Type": "application/json",
-                    "Access-Control-Expose-Headers": _EXPOSED_HEADER_NAMES,
-                    **_VERSION_HEADERS,
-                },
-                "body": json.dumps(results, cls=DateTimeEncoder),
-            }, event)
+            with request_timing.stage('serialize'):
+                response_body = dumps_response(results)
+            with request_timing.stage('gzip'):
+                response = maybe_gzip({
+                    "statusCode": 200,
+                    "headers": {
+                        "Content-Type": "application/json",
+                        "Access-Control-Expose-Headers": _EXPOSED_HEADER_NAMES,
+                        **_VERSION_HEADERS,
+                    },
+                    "body": response_body,
+                }, event)
+        # Still past Lambda's 6 MB cap after gzip: serve it from S3 via a 303.
+        return offload_large_response(response)
 
     except UnauthorizedException as auth_error:
         return {
@@ -1496,3 +436,6 @@ def main(event, context):
                 "stack_trace": traceback.format_exc()
             })
         }
+
+    finally:
+        startup.log_cold_start()
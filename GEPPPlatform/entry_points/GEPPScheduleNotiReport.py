@@ -2,10 +2,13 @@
 
 from typing import Any, Dict
 
+from GEPPPlatform.libs.database import statement_budget
+from GEPPPlatform.libs.query_stats import recording
 from GEPPPlatform.services.cores.reports.schedule_report import main
 
 
 def lambda_handler(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     """Run the scheduled report job."""
-    return main()
+    with statement_budget('cron'), recording('schedule_report'):
+        return main()
 
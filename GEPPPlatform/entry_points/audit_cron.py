@@ -27,10 +27,12 @@ def cron_process_audits(event, context):
 
     try:
         from GEPPPlatform.prompts.ai_audit_v1.default.scripts.audit_scripts import run_default_audit
-        from GEPPPlatform.libs.database import db_manager
+        from GEPPPlatform.libs.database import db_manager, statement_budget
+        from GEPPPlatform.libs.query_stats import recording
 
         logger.info("Starting default AI audit processing from transaction_audit_history queue")
-        result = run_default_audit(db_manager.get_session_factory)
+        with statement_budget('cron'), recording('audit_cron'):
+            result = run_default_audit(db_manager.get_session_factory)
         logger.info(f"Default AI audit completed: {json.dumps(result, default=str)}")
 
         return {
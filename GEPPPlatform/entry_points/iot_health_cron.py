@@ -25,9 +25,10 @@ def cron_iot_health_snapshot(event, context):
 
     try:
         from GEPPPlatform.services.admin.admin_service import AdminService
-        from GEPPPlatform.libs.database import get_session
+        from GEPPPlatform.libs.database import get_session, statement_budget
+        from GEPPPlatform.libs.query_stats import recording
 
-        with get_session() as session:
+        with statement_budget('cron'), recording('iot_health_cron'), get_session() as session:
             svc = AdminService(session)
             result = svc.aggregate_health_snapshot()
         logger.info(
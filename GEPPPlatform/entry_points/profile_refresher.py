@@ -2,6 +2,8 @@
 
 from typing import Any, Dict
 
+from GEPPPlatform.libs.database import statement_budget
+from GEPPPlatform.libs.query_stats import recording
 from GEPPPlatform.services.admin.crm.profile_refresher_lambda import (
     lambda_handler as _lambda_handler,
 )
@@ -9,5 +11,6 @@ from GEPPPlatform.services.admin.crm.profile_refresher_lambda import (
 
 def lambda_handler(event: Dict[str, Any], context: Any = None) -> Dict[str, Any]:
     """Delegate CRM profile refresh invocations to the service wrapper."""
-    return _lambda_handler(event, context)
+    with statement_budget('cron'), recording('profile_refresher'):
+        return _lambda_handler(event, context)
 
@@ -0,0 +1,1102 @@
+"""Route registrations for the main HTTP Lambda.
+
+Each former branch of the `main()` elif chain is a small adapter here, registered
+into one of two tables:
+
+  • ``PUBLIC_ROUTES`` — served before the auth gate (login, webhooks, QR pages,
+    documentation, token-in-path links);
+  • ``AUTHED_ROUTES`` — served after the bearer token has been verified.
+
+The tables are compiled into segment tries on first lookup (see libs/routing.py),
+so dispatch no longer depends on elif order. Handler modules are still imported
+inside the adapters, not here: pulling every service in at module level would put
+ReportLab, openpyxl and the rest on every cold start.
+
+Adapters take a ``RouteRequest`` and return either a ``results`` payload, which
+`main()` wraps as JSON, or a complete proxy response (``statusCode`` + ``body``),
+which is passed through untouched apart from compression. Read endpoints that
+dashboards poll are wrapped in ``conditional_get`` with a probe from
+version_probes.py, so an unchanged poll is answered 304 before the handler runs.
+
+Route options read by the dispatcher: ``db_budget`` picks the statement budget
+(libs/database.py), and ``db_role='replica'`` lets GET requests read from the
+read replica — reports, GRI, traceability, ESG dashboards and exports.
+"""
+
+import json
+import logging
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from GEPPPlatform.entry_points import version_probes
+from GEPPPlatform.libs import config as app_config
+from GEPPPlatform.libs.conditional import conditional_get, etag_matches, if_none_match, not_modified
+from GEPPPlatform.libs.exceptions import APIException
+from GEPPPlatform.libs.http_response import VERSION_HEADERS, dumps_response
+from GEPPPlatform.libs.routing import RouteMatch, RouteTable
+
+logger = logging.getLogger(__name__)
+
+
+PUBLIC_ROUTES = RouteTable('public')
+AUTHED_ROUTES = RouteTable('authed')
+
+
+@dataclass
+class RouteRequest:
+    """Everything an adapter needs, resolved once by `main()`."""
+    event: Dict[str, Any]
+    context: Any
+    path: str
+    method: str
+    body: Any
+    query_params: Dict[str, Any]
+    session: Any
+    common_params: Dict[str, Any]
+    headers: Dict[str, str]          # CORS/version headers for responses built here
+    params: Dict[str, str] = field(default_factory=dict)
+    token_data: Optional[Dict[str, Any]] = None
+    current_user: Optional[Dict[str, Any]] = None
+
+    @property
+    def raw_path(self) -> str:
+        return self.event.get("rawPath") or ''
+
+    @property
+    def request_headers(self) -> Dict[str, Any]:
+        return self.event.get("headers") or {}
+
+
+def match_route(table: RouteTable, path: str, method: str) -> Optional[RouteMatch]:
+    """Look *path* up in *table*, allowing a stage prefix on non-API paths.
+
+    `/{stage}/api/*` is normalised to `/api/*` before routing, but the docs and
+    health endpoints live outside `/api` and arrive as `/v1/documents/api-docs`
+    or `/dev/health` with the stage still attached.
+    """
+    found = table.match(path, method)
+    if found is None and not path.startswith('/api/'):
+        parts = [p for p in path.split('/') if p]
+        if len(parts) > 1:
+            found = table.match('/' + '/'.join(parts[1:]), method)
+    return found
+
+
+def available_routes():
+    """Every registered pattern, for the 404 body and for tests."""
+    seen = []
+    for table in (PUBLIC_ROUTES, AUTHED_ROUTES):
+        for route in table.routes():
+            if route.pattern not in seen:
+                seen.append(route.pattern)
+    return seen
+
+
+def _json_response(status_code: int, headers: Dict[str, str], payload: Dict[str, Any]) -> Dict[str, Any]:
+    return {"statusCode": status_code, "headers": headers, "body": json.dumps(payload)}
+
+
+def _origin_response_headers(origin: Optional[str]) -> Dict[str, str]:
+    out = {"Vary": "Origin", "Content-Type": "application/json", **VERSION_HEADERS}
+    if origin:
+        out["Access-Control-Allow-Origin"] = origin
+    return out
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Public routes (no JWT)
+# ──────────────────────────────────────────────────────────────────────────────
+
+@PUBLIC_ROUTES.route('/api/admin/login', methods='POST')
+def _admin_login(req: RouteRequest):
+    # Admin login endpoint (no authorization required)
+    from GEPPPlatform.services.admin import handle_admin_routes
+    admin_result = handle_admin_routes(req.path, data=req.body, **req.common_params)
+    return {"data": admin_result}
+
+
+@PUBLIC_ROUTES.route('/api/auth')
+def _auth(req: RouteRequest):
+    # Handle all auth routes through auth module (no authorization required)
+    # Includes: login, register, register/check-email, refresh, validate, etc.
+    # Support both legacy format and direct data for POST requests
+    from GEPPPlatform.services.auth import handle_auth_routes
+    auth_result = handle_auth_routes(req.path, data=req.body, **req.common_params)
+    return {"data": auth_result}
+
+
+@PUBLIC_ROUTES.route('/api/iot-hardwares')
+def _iot_hardwares(req: RouteRequest):
+    # PUBLIC: physical-tablet self-checkin (every ~15 s, pre-login).
+    # See migration 051 + iot_hardwares_handlers.py for the
+    # rationale. Routed here so unauthenticated tablets can
+    # report MAC + serial without needing device-token first.
+    from GEPPPlatform.services.cores.iot_hardwares.iot_hardwares_handlers import (
+        handle_iot_hardware_routes,
+    )
+    hw_result = handle_iot_hardware_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": hw_result}
+
+
+@PUBLIC_ROUTES.route('/api/epr/ai_audit')
+def _epr_ai_audit(req: RouteRequest):
+    # PUBLIC: EPR AI audit ingestion + lookup endpoints.
+    # Routed here (before the auth gate) so external integrations
+    # can POST transactions without a JWT. Ported from
+    # gepp-v2-backend (GEPPV2.services.ai_audit).
+    from GEPPPlatform.services.cores.epr_ai_audit.api.handlers import handle_epr_ai_audit_routes
+
+    epr_ai_audit_result = handle_epr_ai_audit_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": epr_ai_audit_result}
+
+
+@PUBLIC_ROUTES.route('/documents/api-docs', '/docs/bma')
+def _docs(req: RouteRequest):
+    # Handle documentation routes (no authorization required)
+    from GEPPPlatform.docs.docs_handlers import handle_docs_routes
+
+    docs_result = handle_docs_routes(req.event, **req.common_params)
+    return _docs_response(req, docs_result.get('content_type', 'application/json'),
+                          docs_result.get('body', ''), docs_result.get('etag'))
+
+
+def _docs_response(req: RouteRequest, content_type: str, body: str, etag: Optional[str]):
+    # Pre-rendered docs carry a content-hash ETag; answer revalidations with a 304.
+    from GEPPPlatform.docs.docs_cache import CACHE_CONTROL as DOCS_CACHE_CONTROL
+
+    if etag and etag_matches(if_none_match(req.request_headers), etag):
+        return not_modified(etag, cache_control=DOCS_CACHE_CONTROL)
+    headers = {"Content-Type": content_type}
+    if etag:
+        headers.update({"ETag": etag, "Cache-Control": DOCS_CACHE_CONTROL})
+    return {"statusCode": 200, "headers": headers, "body": body}
+
+
+@PUBLIC_ROUTES.route('/health')
+def _health(req: RouteRequest):
+    # Health check endpoint (no authorization required)
+    return {"status": "healthy", "timestamp": datetime.now().isoformat(), "method": req.method}
+
+
+@PUBLIC_ROUTES.route('/api/version', exact=True)
+def _version(req: RouteRequest):
+    # Public version probe (no auth) — confirms which code revision
+    # the Lambda is actually running. Same info is also on every
+    # response as X-App-Version / X-App-Build-Commit headers.
+    return {"success": True, "data": app_config.version_payload()}
+
+
+@PUBLIC_ROUTES.route('/api/webhooks/mailchimp/inbound', methods='POST')
+def _mailchimp_inbound(req: RouteRequest):
+    # Mailchimp Transactional INBOUND reply webhook (Sprint 10 P1 inbox)
+    from GEPPPlatform.services.webhooks.mailchimp_inbound_handler import handle_mailchimp_inbound_webhook
+    return handle_mailchimp_inbound_webhook(req.event, req.session)
+
+
+@PUBLIC_ROUTES.route('/api/webhooks/mailchimp', methods='POST')
+def _mailchimp(req: RouteRequest):
+    # Mailchimp Transactional activity webhook (public, HMAC-signed)
+    from GEPPPlatform.services.webhooks.mailchimp_handler import handle_mailchimp_webhook
+    return handle_mailchimp_webhook(req.event, req.session)
+
+
+@PUBLIC_ROUTES.route('/api/crm/unsubscribe/{token}', methods='GET')
+def _crm_unsubscribe(req: RouteRequest):
+    # Public unsubscribe landing page (token-signed)
+    from GEPPPlatform.services.public.crm_unsubscribe_handler import handle_unsubscribe
+    return handle_unsubscribe(req.params['token'], req.session)
+
+
+@PUBLIC_ROUTES.route('/api/public/leads', methods='POST')
+def _public_leads(req: RouteRequest):
+    # Public lead capture — no auth required.
+    # Accepts form submissions from embedded widgets.
+    from GEPPPlatform.services.public.leads_capture_handler import handle_public_lead_capture
+    request_meta = {
+        "ip_address": (req.event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
+        "user_agent": req.request_headers.get("user-agent"),
+    }
+    lead_result = handle_public_lead_capture(req.body, req.session, request_meta=request_meta)
+    return {"success": True, "data": lead_result}
+
+
+@PUBLIC_ROUTES.route('/api/public/customer-leads', methods='POST')
+def _public_customer_leads(req: RouteRequest):
+    # Marketing-site lead capture (gepp.me Contact form).
+    # Origin-allowlisted; rejects requests from anywhere else.
+    from GEPPPlatform.services.public.customer_leads_handler import (
+        handle_customer_lead_capture, is_origin_allowed, ALLOWED_ORIGINS,
+    )
+    req_headers = req.request_headers
+    origin = req_headers.get("origin") or req_headers.get("Origin")
+    if not is_origin_allowed(origin):
+        return _json_response(403, _origin_response_headers(None), {
+            "success": False,
+            "error": "origin_not_allowed",
+            "allowed_origins": sorted(ALLOWED_ORIGINS),
+        })
+    request_meta = {
+        "origin":     origin,
+        "ip_address": (req.event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
+        "user_agent": req_headers.get("user-agent") or req_headers.get("User-Agent"),
+        "referrer":   req_headers.get("referer")   or req_headers.get("Referer"),
+    }
+    lead_result = handle_customer_lead_capture(req.body, req.session, request_meta=request_meta)
+    return _json_response(200, _origin_response_headers(origin), {"success": True, "data": lead_result})
+
+
+@PUBLIC_ROUTES.route('/api/public/cookie-consent', methods='POST')
+def _public_cookie_consent(req: RouteRequest):
+    # PDPA cookie-consent audit log (gepp.me banner). Origin-allowlisted, same list as
+    # customer-leads. Append-only record of each accept/reject/custom decision.
+    from GEPPPlatform.services.public.cookie_consent_handler import (
+        handle_cookie_consent_log, is_origin_allowed, ALLOWED_ORIGINS,
+    )
+    req_headers = req.request_headers
+    origin = req_headers.get("origin") or req_headers.get("Origin")
+    if not is_origin_allowed(origin):
+        return _json_response(403, _origin_response_headers(None), {
+            "success": False,
+            "error": "origin_not_allowed",
+            "allowed_origins": sorted(ALLOWED_ORIGINS),
+        })
+    request_meta = {
+        "origin":     origin,
+        "ip_address": (req.event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
+        "user_agent": req_headers.get("user-agent") or req_headers.get("User-Agent"),
+        "referrer":   req_headers.get("referer")    or req_headers.get("Referer"),
+        # coarse country from CloudFront (never the raw IP) — PDPA data-minimization
+        "country":    req_headers.get("cloudfront-viewer-country")
+                   or req_headers.get("CloudFront-Viewer-Country"),
+    }
+    consent_result = handle_cookie_consent_log(req.body, req.session, request_meta=request_meta)
+    return _json_response(200, _origin_response_headers(origin), {"success": True, "data": consent_result})
+
+
+_USERAPI_DOCS_HTML = """<!DOCTYPE html>
+<html lang="en">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title} - API Documentation</title>
+    <link rel="stylesheet" type="text/css" href="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.10.5/swagger-ui.css" />
+    <style>
+        body {{
+            margin: 0;
+            padding: 0;
+        }}
+    </style>
+</head>
+<body>
+    <div id="swagger-ui"></div>
+
+    <script src="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.10.5/swagger-ui-bundle.js"></script>
+    <script src="https://cdn.jsdelivr.net/npm/swagger-ui-dist@5.10.5/swagger-ui-standalone-preset.js"></script>
+    <script>
+        window.onload = function() {{
+            const spec = {spec_json};
+
+            SwaggerUIBundle({{
+                spec: spec,
+                dom_id: '#swagger-ui',
+                deepLinking: true,
+                presets: [
+                    SwaggerUIBundle.presets.apis,
+                    SwaggerUIStandalonePreset
+                ],
+                plugins: [
+                    SwaggerUIBundle.plugins.DownloadUrl
+                ],
+                layout: "StandaloneLayout"
+            }});
+        }};
+    </script>
+</body>
+</html>"""
+
+
+def _render_userapi_docs(service_path: str) -> str:
+    # Map service_path to function module
+    # For example: 'ai_audit/v1' -> 'ai_audit_v1'
+    function_module_name = service_path.replace('/', '_')
+
+    # Import the swagger module dynamically
+    swagger_module = __import__(
+        f'GEPPPlatform.services.custom.functions.{function_module_name}.swagger',
+        fromlist=['get_swagger_spec']
+    )
+
+    # Get the swagger spec
+    swagger_spec = swagger_module.get_swagger_spec()
+
+    # Generate Swagger UI HTML page
+    return _USERAPI_DOCS_HTML.format(
+        title=swagger_spec['info']['title'],
+        spec_json=json.dumps(swagger_spec),
+    )
+
+
+@PUBLIC_ROUTES.route('/api/userapi/documents/{service}')
+def _userapi_documents(req: RouteRequest):
+    # PUBLIC: Handle API documentation routes (no authentication required)
+    # Pattern: /api/userapi/documents/{service_path}
+    # Example: /api/userapi/documents/ai_audit/v1
+    from GEPPPlatform.docs.docs_cache import docs_cache
+
+    headers = req.headers
+    try:
+        # Reconstruct service_path (e.g., "ai_audit/v1")
+        parts = req.path.split('/api/userapi/documents/')[1].split('/')
+        service_path = '/'.join(parts).split('?')[0]
+
+        logger.info(f"Documentation request for service_path: {service_path}")
+
+        # Try to import the swagger module for the service
+        try:
+            # Rendered once per container; failures are not cached.
+            page = docs_cache.get(('userapi', service_path),
+                                  lambda: ('text/html; charset=utf-8', _render_userapi_docs(service_path)))
+            return _docs_response(req, page.content_type, page.body, page.etag)
+
+        except ImportError as e:
+            return _json_response(404, headers, {
+                "success": False,
+                "message": f"Documentation not found for service: {service_path}",
+                "error_code": "DOCS_NOT_FOUND",
+                "detail": str(e)
+            })
+        except AttributeError:
+            return _json_response(500, headers, {
+                "success": False,
+                "message": "Documentation module does not have get_swagger_spec function",
+                "error_code": "INVALID_DOCS_MODULE"
+            })
+
+    except Exception as docs_err:
+        logger.error(f"Documentation error: {docs_err}", exc_info=True)
+        return _json_response(500, headers, {
+            "success": False,
+            "message": "Error retrieving documentation",
+            "error_code": "DOCS_ERROR",
+            "detail": str(docs_err)
+        })
+
+
+@PUBLIC_ROUTES.route('/api/esg/liff/invitation/accept', methods='POST', exact=True)
+def _esg_liff_invitation_accept(req: RouteRequest):
+    # Public: Accept invitation (no JWT required — user doesn't have one yet)
+    from GEPPPlatform.libs.database import get_session
+    from GEPPPlatform.services.esg.liff_auth_service import LiffAuthService
+
+    with get_session() as session:
+        liff_svc = LiffAuthService(session)
+        try:
+            accept_result = liff_svc.accept_invitation(
+                invitation_token=req.body.get('invitation_token', ''),
+                line_access_token=req.body.get('access_token', ''),
+            )
+            return {"success": True, "data": accept_result}
+        except ValueError as ve:
+            return {"success": False, "message": str(ve), "error_code": "BAD_REQUEST"}
+
+
+@PUBLIC_ROUTES.route('/api/esg/line/webhook', methods='POST', exact=True)
+def _esg_line_webhook(req: RouteRequest):
+    # Public ESG LINE webhook (no JWT required, signature verified internally)
+    from GEPPPlatform.libs.database import get_session
+    from GEPPPlatform.services.esg.esg_line_service import EsgLineService
+
+    _raw_h = req.event.get('headers', {}) or {}
+    _lc_h = {k.lower(): v for k, v in _raw_h.items()}
+    signature = _lc_h.get('x-line-signature', '')
+    raw_body = req.event.get('body', '{}')
+    logger.info("----------- LINE WEBHOOK RECEIVED -----------")
+    logger.info(f"[LINE-WEBHOOK] body_len={len(raw_body or '')}")
+    logger.info(f"[LINE-WEBHOOK] signature={signature[:30] if signature else 'NONE'}")
+    logger.info(f"[LINE-WEBHOOK] raw_body={raw_body[:500] if raw_body else 'EMPTY'}")
+    logger.info("----------------------------------------------")
+
+    # Pass simulator headers if present (case-insensitive lookup — Flask uses Title-Case)
+    h = _lc_h
+    simulator_opts = {}
+    if h.get('x-simulator') == 'true':
+        simulator_opts['org_id'] = int(h.get('x-simulator-org-id', 0)) or None
+        simulator_opts['user_id'] = h.get('x-simulator-user-id', '')
+        simulator_opts['dry_run'] = h.get('x-simulator-dry-run') == 'true'
+        logger.info(f"[LINE-WEBHOOK] SIMULATOR MODE: org_id={simulator_opts.get('org_id')}, dry_run={simulator_opts.get('dry_run')}, user_id={simulator_opts.get('user_id', '')[:20]}")
+
+    try:
+        with get_session() as session:
+            line_service = EsgLineService(session)
+            webhook_result = line_service.handle_webhook(raw_body, signature, simulator_opts=simulator_opts)
+            logger.info(f"[LINE-WEBHOOK] Result: {json.dumps(webhook_result, default=str)[:500]}")
+            return {"success": True, "data": webhook_result}
+    except Exception as webhook_err:
+        logger.error(f"[LINE-WEBHOOK] Error: {webhook_err}", exc_info=True)
+        return {"success": False, "message": str(webhook_err)}
+
+
+@PUBLIC_ROUTES.route('/api/scale-report/{token}')
+def _scale_report(req: RouteRequest):
+    # PUBLIC: daily scale report opened by scanning the QR shown on
+    # a weighing tablet. Access is controlled by an expiring HMAC
+    # token in the path rather than a JWT, so it has to sit ahead of
+    # the auth gate — same placement rationale as
+    # /api/input-channel/ below.
+    #
+    # The reader is a walk-in customer, so the response goes through
+    # to_public_payload(), which is an allowlist — internal ids and
+    # anything transaction-level never leave the organisation.
+    #
+    # ?date= lets the page step between days, but only inside the
+    # window the token authorises (resolve_requested_day). Without
+    # that bound a single QR would unlock the station's whole
+    # history to whoever photographed it.
+    from GEPPPlatform.services.cores.scale_reports.scale_report_service import (
+        get_daily_summary,
+        to_public_payload,
+    )
+    from GEPPPlatform.services.cores.scale_reports.scale_report_token import (
+        resolve_requested_day,
+        verify_report_token,
+    )
+
+    claims = verify_report_token(req.params['token'])   # raises 401 / 410
+    report_day = resolve_requested_day(                  # raises 422 / 403
+        claims, req.query_params.get('date')
+    )
+    return {
+        "success": True,
+        "data": to_public_payload(
+            get_daily_summary(
+                req.session,
+                claims['origin_id'],
+                claims['org_id'],
+                report_day,
+            )
+        ),
+    }
+
+
+@PUBLIC_ROUTES.route('/api/input-channel/{hash}')
+def _input_channel(req: RouteRequest):
+    # Public input channel access (no authorization required)
+    # Used for QR code mobile input
+    from GEPPPlatform.services.cores.users.input_channel_service import InputChannelService
+
+    headers = req.headers
+    query_params = req.query_params
+    body = req.body
+    http_method = req.method
+
+    # Extract hash from path: /api/input-channel/{hash} or /api/input-channel/{hash}/submit or /api/input-channel/{hash}/preferences or /api/input-channel/{hash}/materials or /api/input-channel/{hash}/location-materials
+    path_parts = req.path.split('/api/input-channel/')[1].split('/')
+    hash_value = req.params['hash']
+    is_submit = len(path_parts) > 1 and path_parts[1] == 'submit'
+    is_preferences = len(path_parts) > 1 and path_parts[1].startswith('preferences')
+    is_location_materials = len(path_parts) > 1 and path_parts[1] == 'location-materials'
+    is_materials = len(path_parts) > 1 and path_parts[1] == 'materials'
+
+    input_service = InputChannelService(req.session)
+
+    if is_location_materials and http_method == 'GET':
+        # Get allowed materials for a specific location (hierarchy-based filtering)
+        qr_name = query_params.get('qr_name', '')
+        location_id = int(query_params.get('location_id', '0'))
+        loc_materials_result = input_service.get_location_materials(hash_value, qr_name, location_id)
+        results = {
+            "success": loc_materials_result.get('success', False),
+            "data": {
+                "materials": loc_materials_result.get('materials', []),
+                "categories": loc_materials_result.get('categories', []),
+                "main_materials": loc_materials_result.get('main_materials', []),
+                "is_filtered": loc_materials_result.get('is_filtered', False),
+            }
+        }
+        if not loc_materials_result.get('success'):
+            results["message"] = loc_materials_result.get('message', '')
+        return results
+    elif is_materials and http_method == 'GET':
+        # Get all materials for the material picker (with channel-based auth)
+        qr_name = query_params.get('qr_name', '')
+        materials_result = input_service.get_all_materials_for_picker(hash_value, qr_name)
+        return {
+            "success": materials_result.get('success', False),
+            "data": {
+                "materials": materials_result.get('materials', []),
+                "categories": materials_result.get('categories', []),
+                "main_materials": materials_result.get('main_materials', [])
+            }
+        }
+    elif is_preferences:
+        # Handle preferences GET/POST
+        subuser = query_params.get('subuser') or body.get('subuser', '')
+        if http_method == 'GET':
+            # Get subuser preferences
+            prefs = input_service.get_subuser_preferences(hash_value, subuser)
+            return {"success": True, "data": prefs}
+        elif http_method == 'POST':
+            # Save subuser preferences
+            material_ids = body.get('material_ids', [])
+            save_result = input_service.save_subuser_preferences(hash_value, subuser, material_ids)
+            if not save_result.get('success'):
+                return _json_response(400, headers, {
+                    'success': False,
+                    'message': save_result.get('message', 'Failed to save preferences')
+                })
+            return {"success": save_result.get('success', False), "data": save_result}
+        else:
+            return _json_response(405, headers, {'success': False, 'message': 'Method not allowed'})
+    elif is_submit and http_method == 'POST':
+        # Handle transaction submission from QR input
+        submit_result = input_service.submit_transaction_by_hash(hash_value, body)
+        if submit_result.get('status') == 'success':
+            return {"success": True, "data": submit_result}
+        return _json_response(400, headers, {
+            'success': False,
+            'message': submit_result.get('message', 'Submission failed'),
+            'data': submit_result
+        })
+    else:
+        # Get channel data
+        qr_name = query_params.get('qr_name')
+        channel_data = input_service.get_input_channel_by_hash(hash_value, qr_name)
+
+        if channel_data:
+            return {"success": True, "data": channel_data}
+        return _json_response(404, headers, {'success': False, 'message': 'Input channel not found'})
+
+
+@PUBLIC_ROUTES.route('/api/materials', methods='GET')
+def _materials_channel_or_token(req: RouteRequest):
+    # Check for channel-based authentication for materials endpoints (QR mobile input)
+    # Allow materials access with channel_hash + subuser authentication
+    from GEPPPlatform.services.cores.materials.materials_handlers import handle_materials_routes
+
+    headers = req.headers
+    channel_hash = req.query_params.get('channel_hash')
+    qr_name = req.query_params.get('qr_name')
+
+    if channel_hash and qr_name:
+        # Validate channel and user by qr_name
+        from GEPPPlatform.services.cores.users.input_channel_service import InputChannelService
+        input_service = InputChannelService(req.session)
+        channel_data = input_service.get_input_channel_by_hash(channel_hash, qr_name)
+
+        if channel_data and channel_data.get('subUser', {}).get('isValid'):
+            # Valid channel access - serve materials data without token
+            materials_result = handle_materials_routes(
+                req.event,
+                db_session=req.session,
+                method=req.method,
+                query_params=req.query_params,
+                path_params={},
+                headers=req.event.get('headers', {}),
+                current_user={'channel_auth': True, 'organization_id': channel_data.get('organization_id')}
+            )
+            return {"success": True, "data": materials_result}
+        return _json_response(401, headers, {'success': False, 'message': 'Invalid channel or subuser'})
+
+    # No channel auth provided, fall through to regular token auth
+    from GEPPPlatform.services.auth.auth_handlers import AuthHandlers
+    auth_header = req.event.get('headers', {}).get('Authorization', '') or req.event.get('headers', {}).get('authorization', '')
+    if not auth_header.startswith('Bearer '):
+        return _json_response(401, headers, {'success': False, 'message': 'Missing or invalid authorization header'})
+    token = auth_header[7:]
+    auth_handler = AuthHandlers(req.session)
+    token_data = auth_handler.verify_jwt_token(token, req.path)
+    if token_data is None:
+        return _json_response(401, headers, {'success': False, 'message': 'Invalid token or insufficient permissions'})
+    # Handle materials routes with token auth
+    current_user = {
+        'user_id': token_data['user_id'],
+        'organization_id': token_data.get('organization_id'),
+        'email': token_data.get('email'),
+        'token_data': token_data
+    }
+    materials_result = handle_materials_routes(
+        req.event,
+        db_session=req.session,
+        method=req.method,
+        query_params=req.query_params,
+        path_params={},
+        headers=req.event.get('headers', {}),
+        current_user=current_user
+    )
+    return {"success": True, "data": materials_result}
+
+
+@PUBLIC_ROUTES.route('/api/rewards/public')
+def _rewards_public(req: RouteRequest):
+    # Public reward/LIFF endpoints (no JWT required, auth via LINE user_id)
+    from GEPPPlatform.services.rewards.reward_handlers import handle_reward_routes
+
+    reward_result = handle_reward_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": reward_result}
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Authenticated routes — main() has verified the bearer token before any of
+# these run. ``principal='device'`` routes get current_device instead of
+# current_user; ``log_auth`` turns on the verbose custom-API auth logging.
+# ──────────────────────────────────────────────────────────────────────────────
+
+@AUTHED_ROUTES.route('/api/admin')
+@AUTHED_ROUTES.route('/api/admin/organizations/{id}/transactions-export',
+                      '/api/admin/organizations/{id}/setup-export', db_budget='export', db_role='replica')
+def _admin(req: RouteRequest):
+    # Admin backoffice routes (require admin role in JWT)
+    headers = req.headers
+    admin_role = req.token_data.get('admin_role')
+    if admin_role not in ['super-admin', 'gepp-admin']:
+        return _json_response(403, headers, {'success': False, 'message': 'Admin access required'})
+    from GEPPPlatform.services.admin import handle_admin_routes
+    admin_result = handle_admin_routes(req.path, data=req.body, **req.common_params)
+    # Allow admin handlers to return a raw proxy response
+    # (e.g. 304 Not Modified for ETag-aware endpoints).
+    if isinstance(admin_result, dict) and isinstance(admin_result.get('__http__'), dict):
+        http_meta = admin_result['__http__']
+        if 'statusCode' in http_meta:
+            # Full proxy response — return directly.
+            proxy_headers = dict(headers)
+            proxy_headers.update(http_meta.get('headers', {}) or {})
+            return {
+                "statusCode": http_meta['statusCode'],
+                "headers": proxy_headers,
+                "body": http_meta.get('body', ''),
+            }
+        # Headers-only override (e.g. attach ETag to a normal JSON response).
+        extra_headers = http_meta.get('headers', {}) or {}
+        # Strip the meta key from the payload before serialising.
+        payload = {k: v for k, v in admin_result.items() if k != '__http__'}
+        body_dict = {"success": True, "data": payload}
+        merged_headers = dict(headers)
+        merged_headers.update(extra_headers)
+        return {
+            "statusCode": 200,
+            "headers": merged_headers,
+            "body": dumps_response(body_dict),
+        }
+    return {"success": True, "data": admin_result}
+
+
+@AUTHED_ROUTES.route('/api/crm/events', methods='POST')
+def _crm_events(req: RouteRequest):
+    # Authed client-side event ingest (user JWT)
+    from GEPPPlatform.services.public.crm_client_events_handler import handle_client_event
+    request_meta = {
+        "session_id": req.request_headers.get("x-session-id"),
+        "ip_address": (req.event.get("requestContext", {}).get("http", {}) or {}).get("sourceIp"),
+        "user_agent": req.request_headers.get("user-agent"),
+    }
+    crm_evt_result = handle_client_event(req.body, req.current_user, request_meta, req.session)
+    return {"success": True, "data": crm_evt_result}
+
+
+@AUTHED_ROUTES.route('/api/iot-devices', principal='device')
+def _iot_devices(req: RouteRequest):
+    # Handle all IoT devices management routes
+    from GEPPPlatform.services.cores.iot_devices.iot_devices_handlers import handle_iot_devices_routes
+
+    iot_devices_result = handle_iot_devices_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": iot_devices_result}
+
+
+@AUTHED_ROUTES.route('/api/users', '/api/locations', '/api/input-channels')
+def _users(req: RouteRequest):
+    # Handle all user management routes (including organization-level input channels)
+    from GEPPPlatform.services.cores.users.user_handlers import handle_user_routes
+
+    user_result = handle_user_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": user_result}
+
+
+@AUTHED_ROUTES.route('/api/organizations')
+def _organizations(req: RouteRequest):
+    # Handle all organization management routes
+    from GEPPPlatform.services.cores.organizations.organization_handlers import organization_routes
+
+    org_result = organization_routes(req.event, req.context, **req.common_params)
+    return {"success": True, "data": org_result}
+
+
+@AUTHED_ROUTES.route('/api/shared-locations')
+def _shared_locations(req: RouteRequest):
+    # Cross-organization location data sharing routes
+    from GEPPPlatform.services.cores.sharing.shared_location_handlers import shared_location_routes
+
+    shared_result = shared_location_routes(req.event, req.context, **req.common_params)
+    return {"success": True, "data": shared_result}
+
+
+@AUTHED_ROUTES.route('/api/materials')
+def _materials(req: RouteRequest):
+    # Handle all materials management routes
+    from GEPPPlatform.services.cores.materials.materials_handlers import handle_materials_routes
+
+    materials_result = handle_materials_routes(req.event, **req.common_params)
+    return {"success": True, "data": materials_result}
+
+
+@AUTHED_ROUTES.route('/api/reports', db_role='replica')
+@AUTHED_ROUTES.route('/api/reports/export', db_budget='export', db_role='replica')
+@conditional_get(version_probes.reports_version)
+def _reports(req: RouteRequest):
+    from GEPPPlatform.services.cores.reports.reports_handlers import handle_reports_routes
+
+    reports_result = handle_reports_routes(req.event, **req.common_params)
+    # If handler returned an API Gateway proxy response (e.g., raw PDF),
+    # pass it through directly without wrapping.
+    if isinstance(reports_result, dict) and \
+       "statusCode" in reports_result and \
+       "headers" in reports_result and \
+       "body" in reports_result:
+        return reports_result
+    return {"success": True, "data": reports_result}
+
+
+@AUTHED_ROUTES.route('/api/gri', db_role='replica')
+@AUTHED_ROUTES.route('/api/gri/export', db_budget='export', db_role='replica')
+def _gri(req: RouteRequest):
+    # Handle all GRI routes
+    from GEPPPlatform.services.cores.gri.gri_handlers import handle_gri_routes
+
+    gri_result = handle_gri_routes(req.event, **req.common_params)
+    return {"success": True, "data": gri_result}
+
+
+@AUTHED_ROUTES.route('/api/rewards')
+@conditional_get(version_probes.rewards_overview_version)
+def _rewards(req: RouteRequest):
+    # Handle all reward management routes
+    from GEPPPlatform.services.rewards.reward_handlers import handle_reward_routes
+
+    reward_result = handle_reward_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": reward_result}
+
+
+@AUTHED_ROUTES.route('/api/import-files')
+def _import_files(req: RouteRequest):
+    # Handle all bulk data-import routes (Excel upload → transactions)
+    from GEPPPlatform.services.cores.imports.import_handlers import handle_import_routes
+
+    import_result = handle_import_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": import_result}
+
+
+@AUTHED_ROUTES.route('/api/transactions')
+def _transactions(req: RouteRequest):
+    # Handle all transaction management routes
+    from GEPPPlatform.services.cores.transactions.transaction_handlers import handle_transaction_routes
+
+    transaction_result = handle_transaction_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": transaction_result}
+
+
+@AUTHED_ROUTES.route('/api/transaction_audit')
+def _transaction_audit(req: RouteRequest):
+    # Handle all transaction audit routes
+    from GEPPPlatform.services.cores.transaction_audit.transaction_audit_handlers import handle_transaction_audit_routes
+
+    audit_result = handle_transaction_audit_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": audit_result}
+
+
+@AUTHED_ROUTES.route('/api/traceability', db_role='replica')
+@AUTHED_ROUTES.route('/api/traceability/export', db_budget='export', db_role='replica')
+@conditional_get(version_probes.traceability_version)
+def _traceability(req: RouteRequest):
+    # Handle all traceability routes
+    from GEPPPlatform.services.cores.traceability.traceability_handlers import handle_traceability_routes
+
+    traceability_result = handle_traceability_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": traceability_result}
+
+
+@AUTHED_ROUTES.route('/api/audit-settings')
+def _audit_settings(req: RouteRequest):
+    # Handle AI audit settings routes (doc types, doc requires, check columns)
+    from GEPPPlatform.services.cores.audit_settings.audit_settings_handlers import handle_audit_settings_routes
+
+    settings_result = handle_audit_settings_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": settings_result}
+
+
+@AUTHED_ROUTES.route('/api/audit/manual')
+def _manual_audit(req: RouteRequest):
+    # Handle all manual audit routes
+    from GEPPPlatform.services.cores.transaction_audit.manual_audit_handlers import handle_manual_audit_routes
+
+    manual_audit_result = handle_manual_audit_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": manual_audit_result}
+
+
+@AUTHED_ROUTES.route('/api/audit')
+def _audit_rules(req: RouteRequest):
+    # Handle all audit rules management routes
+    from GEPPPlatform.services.cores.audit_rules.audit_rules_handlers import handle_audit_rules_routes
+
+    rules_result = handle_audit_rules_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": rules_result}
+
+
+@AUTHED_ROUTES.route('/api/esg')
+@AUTHED_ROUTES.route('/api/esg/export', '/api/esg/scope3-export', '/api/esg/liff/export',
+                      '/api/esg/liff/scope3-export', db_budget='export', db_role='replica')
+@AUTHED_ROUTES.route('/api/esg/liff/summary', '/api/esg/liff/charts', '/api/esg/liff/report',
+                      '/api/esg/completeness', '/api/esg/positioning', db_role='replica')
+def _esg(req: RouteRequest):
+    # Handle all ESG routes (settings, documents, waste records, dashboard)
+    from GEPPPlatform.services.esg.esg_handlers import handle_esg_routes
+
+    esg_result = handle_esg_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": esg_result}
+
+
+@AUTHED_ROUTES.route('/api/debug')
+def _debug(req: RouteRequest):
+    # Handle all debug routes (development only)
+    from GEPPPlatform.services.debug.debug_handlers import handle_debug_routes
+
+    debug_result = handle_debug_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": debug_result}
+
+
+@AUTHED_ROUTES.route('/api/integration/bma')
+def _integration_bma(req: RouteRequest):
+    # Handle BMA integration routes
+    from GEPPPlatform.services.integrations.bma.bma_handlers import handle_bma_routes
+
+    bma_result = handle_bma_routes(req.event, data=req.body, **req.common_params)
+    return {"success": True, "data": bma_result}
+
+
+@AUTHED_ROUTES.route('/api/integration')
+def _integration_unknown(req: RouteRequest):
+    # Handle other integration routes here
+    available_integration_routes = ["/api/integration/bma/*"]
+    return _json_response(404, req.headers, {
+        "success": False,
+        "message": "Integration route not found",
+        "error_code": "ROUTE_NOT_FOUND",
+        "path": req.path,
+        "method": req.method,
+        "available_integration_routes": available_integration_routes
+    })
+
+
+@AUTHED_ROUTES.route('/api/userapi', log_auth=True)
+def _custom_api(req: RouteRequest):
+    # Handle custom API routes: /api/userapi/{api_path}/{service_path}/...
+    from GEPPPlatform.services.custom.custom_api_service import CustomApiService, custom_api_index
+    from GEPPPlatform.services.custom import execute_custom_function
+
+    headers = req.headers
+    path = req.path
+    current_user = req.current_user
+    api_path = None
+    service_path = None
+    custom_api = None
+
+    try:
+        # Extract api_path and service_path from URL
+        # Pattern: /api/userapi/{api_path}/{service_path}/...
+        parts = path.split('/api/userapi/')[1].split('/') if '/api/userapi/' in path else []
+        if len(parts) < 2:
+            return _json_response(400, headers, {
+                "success": False,
+                "message": "Invalid custom API path. Expected: /api/userapi/{api_path}/{service_path}/...",
+                "error_code": "INVALID_PATH"
+            })
+
+        api_path = parts[0]
+        # The service_path may span several segments ("ai_audit/v1"); the longest
+        # published prefix of the rest wins and whatever follows is passed on.
+        remaining_parts = parts[1:]
+
+        logger.info(f"[CUSTOM_API] Parsing URL - api_path={api_path}, remaining_parts={remaining_parts}")
+
+        # Initialize service
+        custom_api_service = CustomApiService(req.session)
+
+        match = custom_api_index.match_service(req.session, remaining_parts)
+        if match is None:
+            # No matching service found
+            attempted_paths = ['/'.join(remaining_parts[:i]).split('?')[0] for i in range(1, len(remaining_parts) + 1)]
+            return _json_response(404, headers, {
+                "success": False,
+                "message": "API service not found",
+                "error_code": "API_NOT_FOUND",
+                "debug_info": {
+                    "api_path": api_path,
+                    "attempted_service_paths": attempted_paths
+                }
+            })
+        custom_api, service_path, remaining_path = match
+        logger.info(f"[CUSTOM_API] Found service: {service_path}, remaining: {remaining_path}")
+
+        # Get the organization for this api_path
+        organization = custom_api_index.organization(req.session, api_path)
+        if not organization:
+            return _json_response(404, headers, {
+                "success": False,
+                "message": f"Organization not found for api_path: {api_path}",
+                "error_code": "ORG_NOT_FOUND",
+                "debug_info": {
+                    "api_path": api_path,
+                    "service_path": service_path
+                }
+            })
+
+        # Get organization API access
+        org_api = custom_api_service.get_organization_api_access(organization.id, custom_api.id)
+        if not org_api:
+            return _json_response(403, headers, {
+                "success": False,
+                "message": "Organization does not have access to this API",
+                "error_code": "API_ACCESS_DENIED",
+                "debug_info": {
+                    "api_path": api_path,
+                    "service_path": service_path,
+                    "organization_id": organization.id,
+                    "organization_name": organization.name
+                }
+            })
+
+        # Validate access (enabled, not expired, has quota)
+        if not org_api.enable:
+            raise APIException(
+                status_code=403,
+                message="API access is disabled for this organization",
+                error_code="API_DISABLED"
+            )
+
+        # Check expiration
+        if org_api.expired_date and org_api.expired_date < datetime.now(timezone.utc):
+            raise APIException(
+                status_code=403,
+                message="API access has expired",
+                error_code="API_EXPIRED"
+            )
+
+        # Check API call quota
+        if not org_api.has_api_quota():
+            raise APIException(
+                status_code=429,
+                message="API call quota exceeded",
+                error_code="QUOTA_EXCEEDED"
+            )
+
+        logger.info(f"[CUSTOM_API] Access validated - org_id={organization.id}, api={custom_api.name}")
+
+        logger.info(f"[CUSTOM_API] JWT current_user: {current_user}")
+        # This prevents users from accessing other organizations' APIs even with valid tokens
+        token_org_id = current_user.get('organization_id')
+        logger.info(f"[CUSTOM_API] Org match check - token_org_id={token_org_id}, api_org_id={organization.id}")
+
+        if not token_org_id:
+            logger.warning(f"[CUSTOM_API] Missing organization_id in JWT token")
+            return _json_response(403, headers, {
+                "success": False,
+                "message": "JWT token does not contain organization_id claim",
+                "error_code": "MISSING_ORG_CLAIM",
+                "debug_info": {
+                    "api_path": api_path,
+                    "service_path": service_path,
+                    "jwt_claims": list(current_user.keys()) if current_user else []
+                }
+            })
+
+        if token_org_id != organization.id:
+            logger.warning(f"[CUSTOM_API] Organization mismatch: JWT token org_id={token_org_id}, api_path org_id={organization.id}")
+            return _json_response(403, headers, {
+                "success": False,
+                "message": "Access denied. Your organization does not match this API path.",
+                "error_code": "ORG_MISMATCH",
+                "debug_info": {
+                    "api_path": api_path,
+                    "service_path": service_path,
+                    "jwt_organization_id": token_org_id,
+                    "api_organization_id": organization.id,
+                    "api_organization_name": organization.name
+                }
+            })
+
+        logger.info(f"[CUSTOM_API] Organization match successful - proceeding to execute function")
+
+        # Execute the custom function
+        result = execute_custom_function(
+            root_fn_name=custom_api.root_fn_name,
+            db_session=req.session,
+            organization_id=organization.id,
+            method=req.method,
+            path=remaining_path,
+            query_params=req.query_params,
+            body=req.body,
+            headers=req.event.get("headers", {}),
+            current_user=current_user,
+            api_path=api_path,
+            custom_api_id=custom_api.id,
+            full_path=path
+        )
+
+        # Record API usage (increment counters)
+        process_units = result.get('process_units', 0)  # Functions can report units consumed
+        custom_api_service.record_api_call(org_api, process_units)
+
+        # Check if result contains quota error in audit_result
+        require_quota = None
+        if isinstance(result, dict) and 'audit_result' in result:
+            audit_result = result['audit_result']
+            if isinstance(audit_result, dict) and audit_result.get('error') == 'PROCESS_QUOTA_EXCEEDED':
+                # Extract require_quota_for_this_call from audit_result.process_units
+                if 'process_units' in audit_result and isinstance(audit_result['process_units'], dict):
+                    require_quota = audit_result['process_units'].get('require_quota_for_this_call')
+
+        # Return result
+        return {
+            "success": True,
+            "data": result,
+            "quota": custom_api_service.get_quota_status(org_api, require_quota)
+        }
+
+    except APIException as api_err:
+        # Custom API validation errors (already have proper status codes)
+        logger.error(f"[CUSTOM_API] APIException: {api_err.error_code} - {api_err.message}")
+        return _json_response(api_err.status_code, headers, {
+            "success": False,
+            "message": api_err.message,
+            "error_code": api_err.error_code,
+            "debug_info": {
+                "api_path": api_path,
+                "service_path": service_path,
+                "status_code": api_err.status_code
+            }
+        })
+    except ValueError as val_err:
+        # Function not found in registry
+        logger.error(f"[CUSTOM_API] Function not found: {val_err}")
+        return _json_response(404, headers, {
+            "success": False,
+            "message": str(val_err),
+            "error_code": "FUNCTION_NOT_FOUND",
+            "debug_info": {
+                "api_path": api_path,
+                "service_path": service_path,
+                "function_registry_name": custom_api.root_fn_name if custom_api else None
+            }
+        })
+    except Exception as custom_err:
+        logger.error(f"[CUSTOM_API] Unexpected error: {custom_err}", exc_info=True)
+        return _json_response(500, headers, {
+            "success": False,
+            "message": "Internal error processing custom API request",
+            "error_code": "CUSTOM_API_ERROR",
+            "error_type": type(custom_err).__name__,
+            "detail": str(custom_err),
+            "debug_info": {
+                "api_path": api_path,
+                "service_path": service_path
+            }
+        })
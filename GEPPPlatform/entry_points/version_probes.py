@@ -0,0 +1,83 @@
+"""Version probes for the conditional GET routes (see libs/conditional.py).
+
+Each probe is one round trip of index-backed aggregates over the tables an
+endpoint family reads, for the caller's organisation. They return ``None`` when
+there is no organisation to scope by, which turns the ETag off for that request.
+``COUNT(*)`` is included next to ``MAX(updated_date)`` so a hard delete — which
+leaves no newer timestamp behind — still changes the version.
+
+Reports use the report cache's data watermark (libs/report_cache.py) instead of
+a query of their own, so the ETag and the cached bodies move together and a GET
+pays for the aggregate once. Probes run in a savepoint: a failed probe must not
+abort the transaction the handler runs in next.
+"""
+
+from typing import Any, Optional, Tuple
+
+from sqlalchemy import text
+
+from GEPPPlatform.libs import report_cache
+
+_TRANSACTIONS = """
+    (SELECT MAX(updated_date) FROM transactions WHERE organization_id = :org),
+    (SELECT COUNT(*) FROM transactions WHERE organization_id = :org),
+    (SELECT MAX(r.updated_date)
+       FROM transaction_records r
+       JOIN transactions t ON t.id = r.created_transaction_id
+      WHERE t.organization_id = :org),
+    (SELECT MAX(updated_date) FROM user_locations WHERE organization_id = :org),
+    (SELECT MAX(updated_date) FROM organization_setup WHERE organization_id = :org)
+"""
+
+_TRACEABILITY_SQL = text("SELECT" + _TRANSACTIONS + """,
+    (SELECT MAX(updated_date) FROM traceability_transaction_group WHERE organization_id = :org),
+    (SELECT COUNT(*) FROM traceability_transaction_group WHERE organization_id = :org),
+    (SELECT MAX(updated_date) FROM traceability_transport_transactions WHERE organization_id = :org)
+""")
+
+_REWARDS_OVERVIEW_SQL = text("""
+    SELECT
+        (SELECT MAX(updated_date) FROM reward_point_transactions WHERE organization_id = :org),
+        (SELECT COUNT(*) FROM reward_point_transactions WHERE organization_id = :org),
+        (SELECT MAX(updated_date) FROM reward_redemptions WHERE organization_id = :org),
+        (SELECT COUNT(*) FROM reward_redemptions WHERE organization_id = :org),
+        (SELECT MAX(updated_date) FROM reward_campaigns WHERE organization_id = :org),
+        (SELECT MAX(updated_date) FROM reward_catalog WHERE organization_id = :org),
+        (SELECT MAX(updated_date) FROM organization_reward_users WHERE organization_id = :org)
+""")
+
+
+def _organization_id(req) -> Optional[int]:
+    org_id = (req.current_user or {}).get('organization_id')
+    return int(org_id) if org_id else None
+
+
+def _run(req, sql) -> Optional[Tuple[Any, ...]]:
+    org_id = _organization_id(req)
+    if org_id is None:
+        return None
+    with req.session.begin_nested():
+        row = req.session.execute(sql, {'org': org_id}).fetchone()
+    return tuple(row) if row is not None else None
+
+
+def reports_version(req) -> Optional[Tuple[Any, ...]]:
+    # Exports are one-off downloads, never polled.
+    if req.path.startswith('/api/reports/export'):
+        return None
+    org_id = _organization_id(req)
+    if org_id is None:
+        return None
+    # Without a ?tz= (already in the ETag) the handlers bucket dates in the caller's zone.
+    return (report_cache.request_watermark(req.session, org_id), (req.current_user or {}).get('timezone'))
+
+
+def traceability_version(req) -> Optional[Tuple[Any, ...]]:
+    return _run(req, _TRACEABILITY_SQL)
+
+
+def rewards_overview_version(req) -> Optional[Tuple[Any, ...]]:
+    # Only the overview dashboard; member and catalog screens read other tables.
+    if not req.path.startswith('/api/rewards/overview'):
+        return None
+    return _run(req, _REWARDS_OVERVIEW_SQL)
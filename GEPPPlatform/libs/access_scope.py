@@ -0,0 +1,172 @@
+"""In-process cache of resolved access scopes.
+
+``UserService.resolve_access_scope`` runs on nearly every authenticated read
+(transactions, reports, audit, traceability, IoT) and often twice per request.
+Each run loaded the org's setup, every location's ``members`` array, the
+created-by chain, every tag and tenant, and walked the tree once per grant —
+for an answer that only changes when somebody edits the org chart or a grant.
+
+``AccessScopeCache`` keeps resolved scopes per (organization, user), tagged
+with what they were computed from:
+
+  • the setup version of the org tree (``org_tree.load_org_tree``), and
+  • a grants version — one aggregate query over the organization owner and
+    the org's ``user_locations``, ``user_location_tags`` and ``user_tenants``
+    (row count and newest ``updated_date`` of each), which moves on any
+    membership, tag, tenant, binding or user change written through the ORM.
+
+An entry is served only while both still match, so a change made in another
+container is seen on its next request. Mutation paths in this codebase also
+call ``invalidate(org_id)``, which retires every entry of the org here at
+once, and entries expire after ``ACCESS_SCOPE_CACHE_TTL`` seconds (default
+300) as a bound for writes that bypass ``updated_date``. Within one
+transaction the resolved scope is also memoized on the session, so a second
+call in the same request costs nothing at all.
+
+Callers get their own copy of the sets and grant dicts; mutating a returned
+scope never reaches the cache. ``ACCESS_SCOPE_CACHE_SIZE`` bounds the entries
+(default 1024).
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from sqlalchemy import func, select
+
+DEFAULT_MAX_ENTRIES = 1024
+DEFAULT_TTL_SECONDS = 300
+
+_SESSION_KEY = 'gepp_access_scopes'
+
+
+def copy_scope(scope: Dict[str, Any]) -> Dict[str, Any]:
+    """A copy of *scope* whose sets, grants and per-location buckets are the caller's own."""
+    copied = dict(scope)
+    for key in ('assigned_ids', 'ancestor_ids', 'member_ids', 'scoped_ids'):
+        if key in copied:
+            copied[key] = set(copied[key])
+    copied['scoped_grants'] = [
+        {**grant, 'location_ids': set(grant.get('location_ids') or ())}
+        for grant in scope.get('scoped_grants') or []
+    ]
+    copied['scoped_by_location'] = {
+        loc_id: {'tag_ids': set(bucket['tag_ids']), 'tenant_ids': set(bucket['tenant_ids'])}
+        for loc_id, bucket in (scope.get('scoped_by_location') or {}).items()
+    }
+    return copied
+
+
+class AccessScopeCache:
+    """Bounded LRU of resolved scopes, keyed by (org, user) and tagged with their versions."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or int(os.environ.get('ACCESS_SCOPE_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.environ.get('ACCESS_SCOPE_CACHE_TTL', DEFAULT_TTL_SECONDS))
+        # (org, user) -> (version, scope, valid_until)
+        self._entries: 'OrderedDict[Tuple[Any, Any], Tuple[Any, Dict[str, Any], float]]' = OrderedDict()
+        # org -> local generation, bumped by invalidate()
+        self._generations: Dict[Any, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def generation(self, organization_id: Any) -> int:
+        return self._generations.get(organization_id, 0)
+
+    def get(self, organization_id: Any, user_id: Any, version: Any) -> Optional[Dict[str, Any]]:
+        key = (organization_id, user_id)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and (entry[0] != version or time.time() >= entry[2]):
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+        return copy_scope(entry[1])
+
+    def put(self, organization_id: Any, user_id: Any, version: Any, scope: Dict[str, Any]) -> None:
+        key = (organization_id, user_id)
+        with self._lock:
+            self._entries[key] = (version, copy_scope(scope), time.time() + self.ttl_seconds)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, organization_id: Any) -> None:
+        with self._lock:
+            self._generations[organization_id] = self._generations.get(organization_id, 0) + 1
+            for key in [k for k in self._entries if k[0] == organization_id]:
+                del self._entries[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+access_scopes = AccessScopeCache()
+
+
+def grants_version(db_session, organization_id: Any) -> Tuple[Any, ...]:
+    """Owner plus (count, newest ``updated_date``) of the org's users/locations, tags and tenants."""
+    from ..models.subscriptions.organizations import Organization
+    from ..models.users.user_location import UserLocation
+    from ..models.users.user_related import UserLocationTag, UserTenant
+
+    columns = [select(Organization.owner_id).where(Organization.id == organization_id).scalar_subquery()]
+    for model in (UserLocation, UserLocationTag, UserTenant):
+        in_org = model.organization_id == organization_id
+        columns.append(select(func.count()).select_from(model).where(in_org).scalar_subquery())
+        columns.append(select(func.max(model.updated_date)).where(in_org).scalar_subquery())
+    return tuple(db_session.execute(select(*columns)).one())
+
+
+def scope_version(db_session, organization_id: Any, setup_version: Any) -> Tuple[Any, ...]:
+    """Everything a cached scope for *organization_id* must still match to be served."""
+    return (setup_version, grants_version(db_session, organization_id),
+            access_scopes.generation(organization_id))
+
+
+def memoized(db_session, organization_id: Any, user_id: Any) -> Optional[Dict[str, Any]]:
+    """The scope already resolved for this user in *db_session*'s current transaction."""
+    memo = _memo(db_session)
+    scope = memo.get((organization_id, user_id)) if memo is not None else None
+    return copy_scope(scope) if scope is not None else None
+
+
+def memoize(db_session, organization_id: Any, user_id: Any, scope: Dict[str, Any]) -> None:
+    memo = _memo(db_session, create=True)
+    if memo is not None:
+        memo[(organization_id, user_id)] = copy_scope(scope)
+
+
+def _memo(db_session, create: bool = False) -> Optional[Dict[Any, Dict[str, Any]]]:
+    # Tied to the root transaction like org_tree's memo: commit or rollback ends it.
+    transaction = db_session.get_transaction()
+    if transaction is None:
+        return None
+    entry = db_session.info.get(_SESSION_KEY)
+    if entry is None or entry[0] is not transaction:
+        if not create:
+            return None
+        entry = (transaction, {})
+        db_session.info[_SESSION_KEY] = entry
+    return entry[1]
+
+
+def invalidate(organization_id: Any, db_session=None) -> None:
+    """Drop every cached scope of *organization_id* (call after a grant or membership change)."""
+    access_scopes.invalidate(organization_id)
+    memo = _memo(db_session) if db_session is not None else None
+    if memo:
+        for key in [k for k in memo if k[0] == organization_id]:
+            del memo[key]
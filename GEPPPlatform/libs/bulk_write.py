@@ -0,0 +1,244 @@
+"""Set-based inserts for high-volume append paths.
+
+Event logs, device telemetry and debug logs used to be written one row per
+statement — ``session.add`` in a loop, or a ``text()`` INSERT per entry — so a
+batch of N rows cost N round trips and held its locks for all of them.
+``bulk_insert`` writes a whole batch at once:
+
+    below ``BULK_COPY_MIN_ROWS`` (100)   one multi-row ``INSERT ... VALUES``
+                                        (SQLAlchemy batches an executemany)
+    at or above it, on psycopg2         ``COPY ... FROM STDIN`` — straight into
+                                        the target, or with *conflict* into a
+                                        temp table merged by ``INSERT ... SELECT
+                                        ... ON CONFLICT``
+
+Rows are dicts or ORM-like objects, keyed by mapped attribute or column name.
+Values go through each column type's own bind processor before being rendered
+in COPY text format, so JSON/JSONB, enums, arrays and pgvector ``Vector``
+columns arrive exactly as an ORM flush would send them. Columns nobody set are
+left out, so server defaults (``id``, ``created_date``) still apply; Python-side
+scalar defaults are filled in. COPY goes through the raw DBAPI cursor, which
+engine events do not see, so its time is charged to the request's ``db`` stage
+and SQL stats here.
+
+Nothing comes back but a row count: callers that need generated ids or ORM
+side effects (``TransactionService.create_transaction``, traceability groups)
+keep writing through the session.
+"""
+
+import io
+import json
+import os
+import time
+import uuid
+from datetime import date, datetime, time as dt_time
+from decimal import Decimal
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from sqlalchemy import inspect as sa_inspect
+
+from . import query_stats, request_timing
+
+DEFAULT_COPY_MIN_ROWS = 100
+
+_NULL = '\\N'
+_COPY_ESCAPES = str.maketrans({'\\': '\\\\', '\t': '\\t', '\n': '\\n', '\r': '\\r'})
+
+
+def _resolve(target) -> Tuple[Any, Dict[str, Any]]:
+    """(table, {row key: column}) for an ORM class, a ``Table`` or a ``table()`` clause."""
+    mapper = sa_inspect(target, raiseerr=False)
+    if mapper is not None and hasattr(mapper, 'column_attrs'):
+        table = mapper.local_table
+        keys = {}
+        for prop in mapper.column_attrs:
+            column = prop.columns[0]
+            if column.table is table:
+                keys[prop.key] = column
+                keys.setdefault(column.name, column)
+        return table, keys
+    return target, {column.name: column for column in target.columns}
+
+
+def _value(row, key: str, column) -> Any:
+    if isinstance(row, dict):
+        return row[key] if key in row else row.get(column.name)
+    return getattr(row, key, None)
+
+
+def _python_default(column) -> Optional[Callable[[], Any]]:
+    """A function producing *column*'s Python-side default, or None without one."""
+    default = getattr(column, 'default', None)
+    if default is None:
+        return None
+    if default.is_scalar:
+        return lambda: default.arg
+    if default.is_callable:
+        # SQLAlchemy wraps zero-argument callables to accept the execution context.
+        return lambda: default.arg(None)
+    return None
+
+
+def _prepare(target, rows: Sequence[Any], columns: Optional[Sequence[str]]) -> Tuple[Any, List[Any], List[List[Any]]]:
+    """Table, the columns to write and each row's values for them, defaults applied."""
+    table, keys = _resolve(target)
+    wanted = list(columns) if columns is not None else list(dict.fromkeys(keys))
+    unknown = [key for key in wanted if key not in keys]
+    if unknown:
+        raise ValueError(f"{table.name} has no column(s) {', '.join(unknown)}")
+
+    chosen, seen = [], set()
+    for key in wanted:
+        column = keys[key]
+        if column.name in seen:
+            continue
+        values = [_value(row, key, column) for row in rows]
+        default = _python_default(column)
+        if columns is None and default is None and all(v is None for v in values):
+            continue
+        if default is not None:
+            values = [default() if v is None else v for v in values]
+        seen.add(column.name)
+        chosen.append((column, values))
+
+    out_columns = [column for column, _ in chosen]
+    out_rows = [list(values) for values in zip(*(values for _, values in chosen))] if chosen else []
+    return table, out_columns, out_rows
+
+
+def _array_literal(values: Iterable[Any]) -> str:
+    parts = []
+    for item in values:
+        if item is None:
+            parts.append('NULL')
+        elif isinstance(item, (list, tuple)):
+            parts.append(_array_literal(item))
+        else:
+            text = _copy_text(item)
+            parts.append('"' + text.replace('\\', '\\\\').replace('"', '\\"') + '"')
+    return '{' + ','.join(parts) + '}'
+
+
+def _copy_text(value: Any) -> str:
+    """*value* after its bind processor, as Postgres parses it from text input."""
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, (datetime, date, dt_time)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple)):
+        return _array_literal(value)
+    if isinstance(value, dict):
+        return json.dumps(value, default=str)
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return '\\x' + bytes(value).hex()
+    if isinstance(value, (Decimal, float, int)):
+        return str(value)
+    if hasattr(value, 'tolist'):  # numpy arrays from pgvector's own processor
+        return _copy_text(value.tolist())
+    return str(value)
+
+
+def encode_copy_rows(columns: Sequence[Any], rows: Iterable[Sequence[Any]], dialect) -> str:
+    """*rows* in ``COPY ... FROM STDIN`` text format, each value through its column's bind processor."""
+    processors = [column.type.dialect_impl(dialect).bind_processor(dialect) for column in columns]
+    lines = []
+    for row in rows:
+        fields = []
+        for processor, value in zip(processors, row):
+            if processor is not None and value is not None:
+                value = processor(value)
+            fields.append(_NULL if value is None else _copy_text(value).translate(_COPY_ESCAPES))
+        lines.append('\t'.join(fields) + '\n')
+    return ''.join(lines)
+
+
+def _copy_min_rows() -> int:
+    return int(os.environ.get('BULK_COPY_MIN_ROWS', DEFAULT_COPY_MIN_ROWS))
+
+
+def _insert_statement(table, dialect_name: str, conflict, update):
+    if conflict is None:
+        from sqlalchemy import insert
+        return insert(table)
+    if dialect_name == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise ValueError(f"bulk_insert: ON CONFLICT is not supported on {dialect_name}")
+    stmt = insert(table)
+    if update:
+        return stmt.on_conflict_do_update(
+            index_elements=list(conflict),
+            set_={name: stmt.excluded[name] for name in update})
+    return stmt.on_conflict_do_nothing(index_elements=list(conflict))
+
+
+def _copy(conn, table, columns, rows, conflict, update) -> int:
+    dialect = conn.dialect
+    quote = dialect.identifier_preparer.quote
+    column_list = ', '.join(quote(column.name) for column in columns)
+    target = dialect.identifier_preparer.format_table(table)
+    payload = io.StringIO(encode_copy_rows(columns, rows, dialect))
+
+    staging = target
+    if conflict is not None:
+        staging = quote(f"_bulk_{table.name}_{uuid.uuid4().hex[:8]}")
+        conn.exec_driver_sql(
+            f"CREATE TEMP TABLE {staging} ON COMMIT DROP AS "
+            f"SELECT {column_list} FROM {target} WITH NO DATA")
+
+    copy_sql = f"COPY {staging} ({column_list}) FROM STDIN"
+    started = time.perf_counter()
+    try:
+        with conn.connection.dbapi_connection.cursor() as cursor:
+            cursor.copy_expert(copy_sql, payload)
+    finally:
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        request_timing.add('db', elapsed_ms)
+        query_stats.record(copy_sql, elapsed_ms)
+
+    if conflict is None:
+        return len(rows)
+    try:
+        action = 'NOTHING'
+        if update:
+            action = 'UPDATE SET ' + ', '.join(f"{quote(name)} = EXCLUDED.{quote(name)}" for name in update)
+        result = conn.exec_driver_sql(
+            f"INSERT INTO {target} ({column_list}) SELECT {column_list} FROM {staging} "
+            f"ON CONFLICT ({', '.join(quote(name) for name in conflict)}) DO {action}")
+        return result.rowcount
+    finally:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {staging}")
+
+
+def bulk_insert(session, target, rows: Sequence[Any], *, columns: Optional[Sequence[str]] = None,
+                conflict: Optional[Sequence[str]] = None, update: Optional[Sequence[str]] = None) -> int:
+    """Insert *rows* into *target* in one set-based write; returns the rows written.
+
+    *target* is an ORM class, a ``Table`` or a ``sqlalchemy.table()`` clause.
+    *columns* limits (and fixes) the columns written; by default every column
+    some row sets, plus those with a Python default. *conflict* names the
+    unique columns to merge on: conflicting rows are skipped, or with *update*
+    those columns are overwritten from the new row. Pending ORM changes are
+    flushed first so the batch sees them; the session's transaction is not
+    committed.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    session.flush()
+    table, out_columns, values = _prepare(target, rows, columns)
+    if not out_columns:
+        raise ValueError(f"bulk_insert: no values to write to {table.name}")
+    names = [column.name for column in out_columns]
+
+    # An INSERT clause routes to the primary even on a replica-reading session.
+    conn = session.connection(bind_arguments={'clause': table.insert()})
+    if (conn.dialect.name == 'postgresql' and conn.dialect.driver == 'psycopg2'
+            and len(values) >= _copy_min_rows()):
+        return _copy(conn, table, out_columns, values, conflict, update)
+
+    insert_stmt = _insert_statement(table, conn.dialect.name, conflict, update)
+    result = conn.execute(insert_stmt, [dict(zip(names, row)) for row in values])
+    return len(values) if conflict is None else max(result.rowcount, 0)
@@ -0,0 +1,133 @@
+"""ETag / If-None-Match support for read endpoints that dashboards poll.
+
+The report, traceability, rewards-overview and IoT fleet screens re-request the
+same data every few seconds, and almost every time nothing has changed — yet
+each poll re-ran the full aggregation and shipped the full body again. The admin
+realtime device list was the one endpoint that avoided this, with a hand-built
+md5 over a cheap ``MAX(last_seen_at), COUNT(*)`` query; this module is that idea
+made reusable.
+
+An endpoint declares a *version probe*: a function that runs one cheap query and
+returns values that change whenever the response would (typically ``MAX(updated_date)``
+and ``COUNT(*)`` over the tables behind it). ``conditional_get`` hashes the probe
+result together with the path, query string and caller into an ETag. If the
+client's ``If-None-Match`` already carries it, the route answers ``304`` without
+calling the handler at all; otherwise the handler runs and the response carries
+the ETag for the next poll.
+
+Probes see only what their query sees — a rewrite that bypasses ``updated_date``,
+or a table the probe leaves out, would go unnoticed — so the ETag
+also includes a time bucket (``stale_after``, five minutes by default) that
+bounds how long a missed change can be served as "not modified".
+"""
+
+import hashlib
+import logging
+import time
+from functools import wraps
+from typing import Any, Callable, Dict, Iterable, Optional
+
+from GEPPPlatform.libs import request_timing
+from GEPPPlatform.libs.http_response import dumps_response
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STALE_AFTER_SECONDS = 300
+
+# Revalidate on every use: the browser keeps the body and sends If-None-Match.
+CACHE_CONTROL = 'private, no-cache'
+
+
+def make_etag(*parts: Any) -> str:
+    """Strong ETag over *parts* (their ``repr``s, so order and types matter)."""
+    digest = hashlib.md5('|'.join(repr(p) for p in parts).encode('utf-8')).hexdigest()
+    return f'"{digest}"'
+
+
+def if_none_match(headers: Optional[Dict[str, Any]]) -> Optional[str]:
+    """The request's If-None-Match header, whatever its casing."""
+    for key, value in (headers or {}).items():
+        if str(key).lower() == 'if-none-match':
+            return value
+    return None
+
+
+def etag_matches(header_value: Optional[str], etag: str) -> bool:
+    """RFC 9110 weak comparison of an If-None-Match value against *etag*."""
+    if not header_value:
+        return False
+    bare = etag[2:] if etag.startswith('W/') else etag
+    for candidate in str(header_value).split(','):
+        candidate = candidate.strip()
+        if candidate == '*':
+            return True
+        if candidate.startswith('W/'):
+            candidate = candidate[2:]
+        if candidate == bare:
+            return True
+    return False
+
+
+def not_modified(etag: str, headers: Optional[Dict[str, str]] = None,
+                 cache_control: str = CACHE_CONTROL) -> Dict[str, Any]:
+    """A 304 proxy response carrying *etag*."""
+    return {
+        'statusCode': 304,
+        'headers': {**(headers or {}), 'ETag': etag, 'Cache-Control': cache_control},
+        'body': '',
+    }
+
+
+def conditional_get(probe: Callable[[Any], Optional[Iterable[Any]]],
+                    stale_after: int = DEFAULT_STALE_AFTER_SECONDS):
+    """Decorate a route adapter so its GETs answer If-None-Match from *probe*.
+
+    *probe(req)* returns the version values for the request, or ``None`` for a
+    path it does not cover (that request then runs unconditionally). A probe
+    that raises is logged and ignored — a missing ETag costs a full response,
+    a wrong 304 costs the user stale data. A probe that queries the request's
+    session must do so in a savepoint (``session.begin_nested()``), or its
+    failure would abort the transaction the handler then runs in.
+    """
+    def decorate(handler):
+        @wraps(handler)
+        def wrapper(req):
+            if (req.method or '').upper() != 'GET':
+                return handler(req)
+            try:
+                with request_timing.stage('etag_probe'):
+                    version = probe(req)
+            except Exception as exc:  # noqa: BLE001 — see docstring
+                logger.warning(f"[ETAG] version probe failed for {req.path}: {exc}")
+                version = None
+            if version is None:
+                return handler(req)
+
+            user = req.current_user or {}
+            etag = make_etag(
+                req.path,
+                sorted((req.query_params or {}).items()),
+                user.get('user_id'),
+                user.get('organization_id'),
+                tuple(version),
+                int(time.time() // stale_after),
+            )
+            if etag_matches(if_none_match(req.request_headers), etag):
+                return not_modified(etag, req.headers)
+
+            result = handler(req)
+            if isinstance(result, dict) and 'statusCode' in result and 'body' in result:
+                if result.get('statusCode') != 200:
+                    return result
+                return {**result, 'headers': {**(result.get('headers') or {}),
+                                              'ETag': etag, 'Cache-Control': CACHE_CONTROL}}
+            with request_timing.stage('serialize'):
+                body = dumps_response(result)
+            return {
+                'statusCode': 200,
+                'headers': {**req.headers, 'ETag': etag, 'Cache-Control': CACHE_CONTROL},
+                'body': body,
+            }
+        wrapper.version_probe = probe
+        return wrapper
+    return decorate
@@ -1,13 +1,67 @@
 """
 Database configuration and connection management for SQLAlchemy
+
+Connection policy (``DB_POOL_MODE``) — chosen for how the process runs:
+
+  lambda  default inside Lambda. A container serves one request at a time,
+          so it keeps one connection (plus ``DB_MAX_OVERFLOW``, default 2, for
+          the odd nested session) instead of up to 15. Scale-out to N
+          containers then costs ~N connections, not 15N.
+  null    NullPool: connect per checkout and close on return. Use it when
+          DB_HOST is a connection pooler (RDS Proxy, or PgBouncer standing in
+          for one locally) that already owns the pooling.
+  queue   default elsewhere (local server, scripts): QueuePool with
+          ``DB_POOL_SIZE`` (5) and ``DB_MAX_OVERFLOW`` (10).
+
+The engine is created on first use, not at import, so code paths that never
+touch the database never build one.
+
+Statement budgets: every transaction opened while a budget is active starts
+with ``SET LOCAL statement_timeout`` and ``idle_in_transaction_session_timeout``
+from ``STATEMENT_BUDGETS``. The API dispatcher activates the budget its route
+declares (``db_budget=...``, default ``interactive``) and cron entry points use
+``cron``, so a runaway report query is cancelled instead of pinning a
+connection. Outside any budget (scripts, migrations) nothing is set and the
+server defaults apply. The budget lives in a ContextVar, so worker threads
+started without copying the context also run on server defaults.
+
+Read replica: when ``DB_REPLICA_HOST`` is set, sessions are ``RoutingSession``s
+that can send their reads to a second engine. A session starts on the primary;
+``route_reads`` (called by the dispatcher for GET requests on routes declared
+``db_role='replica'``: reports, GRI, traceability, ESG dashboards and exports)
+moves its remaining reads to the replica. Flushes, INSERT/UPDATE/DELETE,
+``SELECT ... FOR UPDATE/SHARE``, ``connection()`` and raw ``text()`` always go
+to the primary, and once a session has done any of these its reads stay there
+too. A ``text()`` SELECT is sent to the replica only when it is built with
+``.execution_options(replica_safe=True)``: a plain read, without row locks or
+calls such as ``nextval``, ``set_config`` or ``pg_advisory_*`` that a hot
+standby refuses or that must run where the session's writes do. For a short window after a user's request
+wrote (``DB_REPLICA_STICKY_SECONDS``, default 10), that user's reads stay on
+the primary as well, so a report opened right after saving a transaction shows
+it. The window is per container; a request landing elsewhere can lag by the
+replica's replay delay, which reports and dashboards tolerate.
+
+The replica's host, port, database, user and password come from
+``DB_REPLICA_HOST`` / ``_PORT`` / ``_NAME`` / ``_USER`` / ``_PASS``, each
+defaulting to the primary's setting. Locally, ``DB_REPLICA_HOST=localhost``
+with ``DB_REPLICA_NAME`` naming a second database stands in for a replica.
 """
 
 import os
-from sqlalchemy import create_engine
+import time
+from contextvars import ContextVar
+import threading
+from typing import Dict, Hashable, Optional, Tuple
+from sqlalchemy import create_engine, event
 from sqlalchemy.orm import sessionmaker, scoped_session
-from sqlalchemy.pool import QueuePool
+from sqlalchemy.orm.session import Session
+from sqlalchemy.pool import NullPool, QueuePool
+from sqlalchemy.sql import Select, text
+from sqlalchemy.sql.elements import TextClause
 from contextlib import contextmanager
 
+from GEPPPlatform.libs import query_stats, request_timing, transaction_rollup
+
 # Import all models to ensure they're registered with SQLAlchemy
 from GEPPPlatform.models.base import Base
 from GEPPPlatform.models.users.user_location import UserLocation
@@ -22,9 +76,225 @@ from GEPPPlatform.models.transactions.ai_audit_document_types import AiAuditDocu
 from GEPPPlatform.models.transactions.ai_audit_column_details import AiAuditColumnDetail
 from GEPPPlatform.models.subscriptions.organization_audit_settings import OrganizationAuditDocRequireTypes, OrganizationAuditCheckColumns
 
+
+def _time_statements(engine):
+    """Charge each statement to the request's ``db`` stage and its query stats."""
+
+    @event.listens_for(engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("gepp_statement_started", []).append(time.perf_counter())
+
+    @event.listens_for(engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get("gepp_statement_started")
+        if started:
+            elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+            request_timing.add("db", elapsed_ms)
+            query_stats.record(statement, elapsed_ms)
+
+    @event.listens_for(engine, "handle_error")
+    def _failed(context):
+        conn = context.connection
+        started = conn.info.get("gepp_statement_started") if conn is not None else None
+        if started:
+            elapsed_ms = (time.perf_counter() - started.pop()) * 1000
+            request_timing.add("db", elapsed_ms)
+            query_stats.record(context.statement or "", elapsed_ms)
+
+
+# (statement_timeout, idle_in_transaction_session_timeout) in milliseconds.
+STATEMENT_BUDGETS = {
+    # API Gateway gives up after 30 s; past that nobody is waiting for the result.
+    'interactive': (25_000, 30_000),
+    # File exports and bulk reads that legitimately scan a lot.
+    'export': (300_000, 60_000),
+    # Scheduled jobs: bounded only by Lambda's own 15-minute limit.
+    'cron': (840_000, 120_000),
+}
+
+_statement_budget: ContextVar[Optional[str]] = ContextVar('gepp_statement_budget', default=None)
+
+_APPLY_BUDGET = text(
+    "SELECT set_config('statement_timeout', :statement_timeout, true), "
+    "set_config('idle_in_transaction_session_timeout', :idle_timeout, true)"
+)
+
+
+def budget_timeouts(name: Optional[str]) -> Optional[Tuple[int, int]]:
+    """The ``(statement, idle in transaction)`` timeouts of budget *name*."""
+    if name is None:
+        return None
+    if name not in STATEMENT_BUDGETS:
+        raise ValueError(f"Unknown statement budget: {name}")
+    return STATEMENT_BUDGETS[name]
+
+
+@contextmanager
+def statement_budget(name: Optional[str]):
+    """Apply budget *name* to every transaction begun inside this block."""
+    budget_timeouts(name)
+    token = _statement_budget.set(name)
+    try:
+        yield
+    finally:
+        _statement_budget.reset(token)
+
+
+def current_statement_budget() -> Optional[str]:
+    return _statement_budget.get()
+
+
+def _apply_statement_budget(session, transaction, connection):
+    timeouts = budget_timeouts(_statement_budget.get())
+    if timeouts is None or connection.dialect.name != 'postgresql':
+        return
+    statement_ms, idle_ms = timeouts
+    connection.execute(_APPLY_BUDGET, {
+        'statement_timeout': f'{statement_ms}ms',
+        'idle_timeout': f'{idle_ms}ms',
+    })
+
+
+def pool_mode() -> str:
+    mode = os.environ.get('DB_POOL_MODE', '').strip().lower()
+    if not mode:
+        mode = 'lambda' if os.environ.get('AWS_LAMBDA_FUNCTION_NAME') else 'queue'
+    if mode not in ('lambda', 'null', 'queue'):
+        raise ValueError(f"Unknown DB_POOL_MODE: {mode}")
+    return mode
+
+
+def engine_options(mode: str) -> dict:
+    """``create_engine`` pool arguments for connection policy *mode*."""
+    if mode == 'null':
+        # The pooler in front of Postgres owns pooling; a pre-ping on a
+        # brand-new connection would only add a round trip.
+        return {'poolclass': NullPool}
+    if mode == 'lambda':
+        return {
+            'poolclass': QueuePool,
+            'pool_size': int(os.environ.get('DB_POOL_SIZE', 1)),
+            'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 2)),
+            # A frozen container's connection may have been dropped server-side.
+            'pool_pre_ping': True,
+            'pool_recycle': 300,
+            'pool_timeout': 10,
+        }
+    return {
+        'poolclass': QueuePool,
+        'pool_size': int(os.environ.get('DB_POOL_SIZE', 5)),
+        'max_overflow': int(os.environ.get('DB_MAX_OVERFLOW', 10)),
+        'pool_pre_ping': True,
+    }
+
+
+PRIMARY = 'primary'
+REPLICA = 'replica'
+
+DEFAULT_STICKY_SECONDS = 10.0
+
+
+def _is_read(clause) -> bool:
+    if isinstance(clause, Select):
+        # SELECT ... FOR UPDATE/SHARE takes row locks, which a hot standby refuses.
+        return clause._for_update_arg is None
+    if isinstance(clause, TextClause):
+        # Raw SQL may lock, bump a sequence or set session state behind a
+        # SELECT; only statements marked as plain reads leave the primary.
+        return bool(clause.get_execution_options().get('replica_safe'))
+    return False
+
+
+class RoutingSession(Session):
+    """Session that reads from ``replica_bind`` while ``info['db_role']`` is ``replica``.
+
+    Everything else (flushes, DML, locking SELECTs, text not marked
+    ``replica_safe``, ``connection()`` without a clause) uses the primary bind
+    and pins the session's later reads there too.
+    """
+
+    def __init__(self, *args, replica_bind=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.replica_bind = replica_bind
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        if self._flushing or clause is None or not _is_read(clause):
+            self.info['wrote'] = True
+        elif (self.replica_bind is not None and self.info.get('db_role') == REPLICA
+              and not self.info.get('wrote')):
+            return self.replica_bind
+        return super().get_bind(mapper, clause=clause, **kwargs)
+
+
+class RecentWriters:
+    """Who wrote within the last ``window`` seconds, in this container."""
+
+    def __init__(self, window: Optional[float] = None, max_entries: int = 10_000):
+        self.window = window if window is not None else float(
+            os.environ.get('DB_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS))
+        self.max_entries = max_entries
+        self._until: Dict[Hashable, float] = {}
+        self._lock = threading.Lock()
+
+    def note(self, writer: Hashable) -> None:
+        now = time.monotonic()
+        with self._lock:
+            if len(self._until) >= self.max_entries:
+                self._until = {k: v for k, v in self._until.items() if v > now}
+            self._until[writer] = now + self.window
+
+    def active(self, writer: Hashable) -> bool:
+        until = self._until.get(writer)
+        return until is not None and until > time.monotonic()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._until.clear()
+
+
+recent_writers = RecentWriters()
+
+
+def routing_session_factory(bind, replica_bind=None) -> sessionmaker:
+    """The sessionmaker behind ``get_session``: budgets applied, reads routable, rollups kept."""
+    factory = sessionmaker(
+        class_=RoutingSession,
+        autocommit=False,
+        autoflush=False,
+        bind=bind,
+        replica_bind=replica_bind,
+    )
+    event.listen(factory, 'after_begin', _apply_statement_budget)
+    transaction_rollup.track(factory)
+    return factory
+
+
+def route_reads(session, writer: Optional[Hashable] = None, replica: bool = False) -> bool:
+    """Decide where the rest of *session*'s reads go; True when that is the replica.
+
+    *writer* (the user id) is remembered on the session so a commit that wrote
+    keeps that user's next reads on the primary. The replica is only used when
+    *replica* is asked for, one is configured, and neither this session nor
+    *writer* has written recently.
+    """
+    if writer is not None:
+        session.info['writer'] = writer
+    use = (replica and getattr(session, 'replica_bind', None) is not None
+           and not session.info.get('wrote')
+           and not (writer is not None and recent_writers.active(writer)))
+    session.info['db_role'] = REPLICA if use else PRIMARY
+    return use
+
+
+def _reset_routing(session) -> None:
+    for key in ('db_role', 'wrote', 'writer'):
+        session.info.pop(key, None)
+
+
 class DatabaseManager:
     _instance = None
     _engine = None
+    _replica_engine = None
     _SessionLocal = None
     
     def __new__(cls):
@@ -32,30 +302,28 @@ class DatabaseManager:
             cls._instance = super(DatabaseManager, cls).__new__(cls)
         return cls._instance
     
-    def __init__(self):
-        if self._engine is None:
-            self.setup_database()
-    
     def setup_database(self):
         """Setup database connection and session factory"""
         database_url = self._get_database_url()
         
         self._engine = create_engine(
             database_url,
-            poolclass=QueuePool,
-            pool_size=5,
-            max_overflow=10,
-            pool_pre_ping=True,
-            echo=False  # Set to True for SQL debugging
+            echo=False,  # Set to True for SQL debugging
+            **engine_options(pool_mode())
         )
-        
+        _time_statements(self._engine)
+
+        replica_url = self._get_replica_url()
+        if replica_url is not None:
+            self._replica_engine = create_engine(replica_url, echo=False, **engine_options(pool_mode()))
+            _time_statements(self._replica_engine)
+
         self._SessionLocal = scoped_session(
-            sessionmaker(
-                autocommit=False,
-                autoflush=False,
-                bind=self._engine
-            )
-        )
+            routing_session_factory(self._engine, self._replica_engine))
+
+    def _ensure_setup(self):
+        if self._engine is None:
+            self.setup_database()
     
     def _get_database_url(self):
         """Construct database URL from environment variables"""
@@ -66,43 +334,72 @@ class DatabaseManager:
         db_name = os.environ.get("DB_NAME", "gepp_platform")
         
         return f"postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
+
+    def _get_replica_url(self):
+        """Replica URL from ``DB_REPLICA_*``, or None when no replica is configured"""
+        db_host = os.environ.get("DB_REPLICA_HOST")
+        if not db_host:
+            return None
+        db_user = os.environ.get("DB_REPLICA_USER", os.environ.get("DB_USER", "postgres"))
+        db_pass = os.environ.get("DB_REPLICA_PASS", os.environ.get("DB_PASS", ""))
+        db_port = os.environ.get("DB_REPLICA_PORT", os.environ.get("DB_PORT", "5432"))
+        db_name = os.environ.get("DB_REPLICA_NAME", os.environ.get("DB_NAME", "gepp_platform"))
+
+        return f"postgresql://{db_user}:{db_pass}@{db_host}:{db_port}/{db_name}"
     
     def get_engine(self):
         """Get the SQLAlchemy engine"""
+        self._ensure_setup()
         return self._engine
     
     def get_session_factory(self):
         """Get the session factory"""
+        self._ensure_setup()
         return self._SessionLocal
     
+    def get_replica_engine(self):
+        """The replica engine, or None when reads have nowhere else to go"""
+        self._ensure_setup()
+        return self._replica_engine
+
     @contextmanager
-    def get_session(self):
-        """Get a database session with automatic cleanup"""
-        session = self._SessionLocal()
+    def get_session(self, read_only=False):
+        """Get a database session with automatic cleanup
+
+        ``read_only=True`` sends the session's reads to the replica, if any;
+        writes still go to the primary (see ``route_reads``).
+        """
+        session = self.get_session_factory()()
+        _reset_routing(session)
+        route_reads(session, replica=read_only)
         try:
             yield session
             session.commit()
+            writer = session.info.get('writer')
+            if writer is not None and session.info.get('wrote'):
+                recent_writers.note(writer)
         except Exception:
             session.rollback()
             raise
         finally:
+            _reset_routing(session)
             session.close()
     
     def create_tables(self):
         """Create all tables defined in models"""
-        Base.metadata.create_all(bind=self._engine)
+        Base.metadata.create_all(bind=self.get_engine())
     
     def drop_tables(self):
         """Drop all tables (use with caution!)"""
-        Base.metadata.drop_all(bind=self._engine)
+        Base.metadata.drop_all(bind=self.get_engine())
 
 # Global database manager instance
 db_manager = DatabaseManager()
 
 # Convenience functions
-def get_session():
+def get_session(read_only=False):
     """Get a database session context manager"""
-    return db_manager.get_session()
+    return db_manager.get_session(read_only=read_only)
 
 def get_db_session():
     """Get a plain database session (for direct use)"""
@@ -6,7 +6,113 @@ boto3, numpy and the rest of the application.
 
 import base64
 import gzip
-from typing import Any, Dict
+import json
+import logging
+import os
+from datetime import date, datetime
+from decimal import Decimal
+from enum import Enum
+from typing import Any, Callable, Dict
+from uuid import UUID
+
+from GEPPPlatform.libs import config as app_config
+
+try:
+    import orjson
+except ImportError:
+    orjson = None  # Not in every layer; the stdlib encoder below covers it
+
+logger = logging.getLogger(__name__)
+
+# ── Version response headers (deployment freshness check) ──────────────────
+# Centralised so every code path that builds a response can share them. The
+# frontend reads X-App-Version to detect stale Lambda deployments — see
+# config.py for how to bump.
+VERSION_HEADERS = {
+    "X-App-Version": app_config.VERSION,
+    "X-App-Build-Commit": app_config.BUILD_COMMIT,
+}
+# CORS Expose-Headers is required so the browser actually surfaces these to
+# JS — without it, XHR/fetch can't read them at all. Server-Timing carries the
+# per-stage breakdown from libs/request_timing.py; ETag is set by
+# libs/conditional.py.
+EXPOSED_HEADER_NAMES = ", ".join([*VERSION_HEADERS.keys(), "Server-Timing", "ETag"])
+
+
+class DateTimeEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if isinstance(obj, (datetime, date)):
+            return obj.isoformat()
+        if isinstance(obj, Decimal):
+            return float(obj)
+        if isinstance(obj, UUID):
+            return str(obj)
+        if isinstance(obj, Enum):
+            return obj.value
+        return super().default(obj)
+
+
+# ── Response body serialization ────────────────────────────────────────────
+# Report, traceability-board and transaction-list bodies run to several MB, and
+# json.dumps calls DateTimeEncoder.default back in Python for every datetime and
+# Decimal in them — on those responses serialization cost more CPU than the
+# handler's own work. orjson does the same job natively (datetime, date, UUID,
+# Enum; Decimal and numpy scalars go through _orjson_default) and writes UTF-8
+# instead of \uXXXX-escaping every Thai character.
+#
+# Its output is equivalent JSON, not the same bytes: no spaces after separators,
+# raw UTF-8, NaN/Infinity as null. GEPP_JSON_SERIALIZER=compat switches back to
+# json.dumps(..., cls=DateTimeEncoder) byte for byte, e.g. to rule the encoder
+# out while chasing a client-side parsing bug.
+
+def _dumps_compat(obj: Any) -> str:
+    return json.dumps(obj, cls=DateTimeEncoder)
+
+
+def _orjson_default(obj):
+    if isinstance(obj, Decimal):
+        return float(obj)
+    # Not OPT_SERIALIZE_NUMPY: that imports numpy on the first response, which
+    # puts it back on the cold start for every route.
+    if type(obj).__module__ == "numpy" and hasattr(obj, "item"):
+        return obj.item()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def _dumps_orjson(obj: Any) -> str:
+    try:
+        return orjson.dumps(
+            obj,
+            default=_orjson_default,
+            option=orjson.OPT_NON_STR_KEYS,
+        ).decode("utf-8")
+    except TypeError as exc:
+        # orjson.JSONEncodeError subclasses TypeError: ints past 64 bits, a type
+        # neither side knows, a cycle. The stdlib path either copes or raises
+        # the same error the handler always got.
+        logger.warning(f"[JSON] orjson could not serialize response ({exc}); using json.dumps")
+        return _dumps_compat(obj)
+
+
+SERIALIZERS: Dict[str, Callable[[Any], str]] = {"compat": _dumps_compat}
+if orjson is not None:
+    SERIALIZERS["orjson"] = _dumps_orjson
+
+
+def get_serializer(name: str = None) -> Callable[[Any], str]:
+    """Serializer for *name*, else ``GEPP_JSON_SERIALIZER``, else the fastest available."""
+    name = (name or os.environ.get("GEPP_JSON_SERIALIZER") or "").strip().lower()
+    if name in SERIALIZERS:
+        return SERIALIZERS[name]
+    return SERIALIZERS.get("orjson", _dumps_compat)
+
+
+_serialize = get_serializer()
+
+
+def dumps_response(obj: Any) -> str:
+    """Serialize a handler result into a response body string."""
+    return _serialize(obj)
 
 # Below this, gzip's header plus base64's 33% expansion make the response BIGGER.
 _GZIP_MIN_BYTES = 1400
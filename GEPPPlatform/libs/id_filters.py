@@ -0,0 +1,84 @@
+"""``column IN <ids>`` filters that bind the ids as one array parameter.
+
+Visibility scopes, active-setup filters and expanded location selections are
+sets of location ids — hundreds to tens of thousands for a large multi-branch
+org. ``column.in_(ids)`` renders one placeholder per id, so the statement
+text changes with every scope size, grows with the scope, and Postgres
+re-plans it each time; for large orgs the planning alone showed up in report
+latency. ``in_ids(column, ids)`` keeps the statement shape fixed:
+
+    fewer than ``ID_FILTER_UNNEST_MIN`` ids (default 1000)
+        column = ANY(%(ids)s)                          -- one bigint[] parameter
+    at or above it
+        column IN (SELECT unnest(%(ids)s))             -- hashed semi-join
+
+A very large ``= ANY`` is evaluated as a scan of the array per row, so past the
+threshold the array is turned into a relation the planner can hash instead.
+That relation replaces a session temp table: reads may run on the read replica
+(``libs/database.RoutingSession``), where temp tables cannot be created, and
+creating one on the primary would pin the whole request there.
+
+On other dialects (SQLite in the tests) the filter compiles to the ordinary
+``IN (...)``. Ids are coerced with ``to_node_id``; an empty set is ``false()``.
+"""
+
+import os
+from typing import Any, Iterable
+
+from sqlalchemy import BigInteger, Boolean, any_, bindparam, false, func, select
+from sqlalchemy.dialects.postgresql import ARRAY
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from .node_ids import to_node_id
+
+DEFAULT_UNNEST_MIN = 1000
+
+
+def _unnest_min() -> int:
+    return int(os.environ.get('ID_FILTER_UNNEST_MIN', DEFAULT_UNNEST_MIN))
+
+
+class IdsIn(ColumnElement):
+    """``column`` is one of a bound list of ids; rendered per dialect at compile time."""
+
+    __visit_name__ = 'ids_in'
+    inherit_cache = True
+    type = Boolean()
+
+    _traverse_internals = [
+        ('column', InternalTraversal.dp_clauseelement),
+        ('array', InternalTraversal.dp_clauseelement),
+        ('expanding', InternalTraversal.dp_clauseelement),
+        ('unnest', InternalTraversal.dp_boolean),
+    ]
+
+    def __init__(self, column, ids, unnest: bool = False):
+        self.column = column
+        # Both carry the same ids; each dialect renders exactly one of them, and
+        # because both are part of the cache key a cached statement is re-bound
+        # with the new values either way.
+        self.array = bindparam(None, ids, type_=ARRAY(BigInteger))
+        self.expanding = bindparam(None, ids, expanding=True)
+        self.unnest = unnest
+
+
+@compiles(IdsIn)
+def _compile_in(element, compiler, **kw):
+    return compiler.process(element.column.in_(element.expanding), **kw)
+
+
+@compiles(IdsIn, 'postgresql')
+def _compile_any(element, compiler, **kw):
+    if element.unnest:
+        return compiler.process(element.column.in_(select(func.unnest(element.array)).scalar_subquery()), **kw)
+    return compiler.process(element.column == any_(element.array), **kw)
+
+
+def in_ids(column, ids: Iterable[Any]):
+    """``column IN ids`` with the ids bound as a single parameter on Postgres."""
+    values = sorted({to_node_id(raw) for raw in ids} - {None})
+    if not values:
+        return false()
+    return IdsIn(column, values, unnest=len(values) >= _unnest_min())
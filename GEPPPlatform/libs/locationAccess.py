@@ -23,6 +23,8 @@ from typing import Any, Dict, Optional
 
 from sqlalchemy import and_, or_, false
 
+from .id_filters import in_ids
+
 
 def _window_end(end_date: Any) -> Any:
     """
@@ -72,7 +74,7 @@ def build_visibility_clause(
 
     assigned_ids = scope.get('assigned_ids') or set()
     if assigned_ids:
-        clauses.append(origin_col.in_(list(assigned_ids)))
+        clauses.append(in_ids(origin_col, assigned_ids))
 
     for grant in scope.get('scoped_grants') or []:
         location_ids = grant.get('location_ids') or set()
@@ -80,7 +82,7 @@ def build_visibility_clause(
             continue
 
         col = tag_col if grant.get('kind') == 'tag' else tenant_col
-        conds = [col == grant['id'], origin_col.in_(list(location_ids))]
+        conds = [col == grant['id'], in_ids(origin_col, location_ids)]
 
         if date_col is not None:
             if grant.get('start_date'):
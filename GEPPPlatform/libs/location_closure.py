@@ -0,0 +1,168 @@
+"""Ancestor/descendant closure of each org's location tree, kept in Postgres.
+
+Filtering transactions to "this location and everything under it" used to
+mean expanding the selection in Python and sending the result as an
+``origin_id IN (...)`` list: thousands of literals for a large org, re-planned
+on every statement. ``location_closure`` (migration 088) stores every
+(ancestor, descendant, depth) pair of the org's current setup tree, so the
+filter becomes a semi-join Postgres can plan once and serve from an index:
+
+    descendants_clause(db, tree, Transaction.origin_id, selected_ids)
+
+The rows are derived from :class:`org_tree.OrgTreeIndex` and rebuilt by
+``rebuild(db, org_id)`` wherever a setup is saved (new version, setup import
+and revert, in-place node removal). ``location_closure_state`` records the
+setup version they came from, and ``descendants_clause`` only joins against
+the closure when that version is the one the caller is filtering with;
+otherwise it falls back to the expanded id list. A missed or failed rebuild
+therefore costs speed, never correctness. Versions confirmed current are
+remembered per container, so the check is one small query per setup version.
+
+``LOCATION_CLOSURE=off`` always uses id lists.
+"""
+
+import logging
+import os
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional
+
+from sqlalchemy import BigInteger, DateTime, Integer, TIMESTAMP, column, false, or_, select, table
+
+from .bulk_write import bulk_insert
+from .id_filters import in_ids
+from .node_ids import to_node_id
+from .org_tree import HUB, OrgTreeIndex, invalidate, load_org_tree
+
+logger = logging.getLogger(__name__)
+
+LOCATION_CLOSURE = table(
+    'location_closure',
+    column('organization_id', BigInteger),
+    column('ancestor_id', BigInteger),
+    column('descendant_id', BigInteger),
+    column('depth', Integer),
+)
+
+LOCATION_CLOSURE_STATE = table(
+    'location_closure_state',
+    column('organization_id', BigInteger),
+    column('setup_id', BigInteger),
+    column('setup_updated_date', TIMESTAMP),
+    column('built_at', DateTime(timezone=True)),
+)
+
+# organization_id -> setup version whose closure is known to be built.
+_current: Dict[Any, Any] = {}
+_current_lock = threading.Lock()
+
+
+def enabled() -> bool:
+    return os.environ.get('LOCATION_CLOSURE', '').lower() != 'off'
+
+
+def closure_rows(tree: OrgTreeIndex) -> List[Dict[str, Any]]:
+    """Every (ancestor, descendant, depth) pair of *tree*, each node paired with itself at 0."""
+    rows = []
+    for nid in tree.order:
+        path = tree.path(nid)
+        for depth, ancestor in enumerate(reversed(path)):
+            rows.append({
+                'organization_id': tree.organization_id,
+                'ancestor_id': ancestor,
+                'descendant_id': nid,
+                'depth': depth,
+            })
+    return rows
+
+
+def rebuild(db_session, organization_id: Any) -> int:
+    """Replace *organization_id*'s closure rows with its current setup tree.
+
+    Call after a setup write is flushed, in the same transaction. Never raises:
+    the rebuild runs in a savepoint and a failure leaves the previous rows,
+    which readers then see as stale and skip. Returns the rows written.
+    """
+    invalidate(organization_id, db_session)
+    try:
+        with db_session.begin_nested():
+            bind = db_session.connection(bind_arguments={'clause': LOCATION_CLOSURE.insert()})
+            if bind.dialect.name == 'postgresql':
+                # Two saves of one org racing must not interleave their delete/insert.
+                bind.exec_driver_sql(
+                    "SELECT pg_advisory_xact_lock(hashtext('location_closure:' || %(org)s))",
+                    {'org': str(organization_id)})
+            tree = load_org_tree(db_session, organization_id, fallback_latest=True)
+            db_session.execute(LOCATION_CLOSURE.delete().where(
+                LOCATION_CLOSURE.c.organization_id == organization_id))
+            db_session.execute(LOCATION_CLOSURE_STATE.delete().where(
+                LOCATION_CLOSURE_STATE.c.organization_id == organization_id))
+            written = 0
+            if tree is not None:
+                written = bulk_insert(db_session, LOCATION_CLOSURE, closure_rows(tree))
+                db_session.execute(LOCATION_CLOSURE_STATE.insert().values(
+                    organization_id=organization_id,
+                    setup_id=tree.version[0],
+                    setup_updated_date=tree.version[1],
+                    built_at=datetime.now(timezone.utc),
+                ))
+    except Exception as exc:
+        logger.warning("location_closure.rebuild failed for org %s (non-fatal): %s", organization_id, exc)
+        return 0
+    with _current_lock:
+        _current.pop(organization_id, None)
+    return written
+
+
+def is_current(db_session, tree: OrgTreeIndex) -> bool:
+    """Whether the stored closure was built from exactly *tree*'s setup version."""
+    org = tree.organization_id
+    if _current.get(org) == tree.version:
+        return True
+    try:
+        # A savepoint, so a missing table does not abort the caller's transaction.
+        with db_session.begin_nested():
+            row = db_session.execute(
+                select(LOCATION_CLOSURE_STATE.c.setup_id, LOCATION_CLOSURE_STATE.c.setup_updated_date)
+                .where(LOCATION_CLOSURE_STATE.c.organization_id == org)
+            ).first()
+    except Exception as exc:
+        # Table not migrated yet, or a failed statement: id lists still work.
+        logger.debug("location_closure state unavailable for org %s: %s", org, exc)
+        return False
+    if row is None or (row[0], row[1]) != tuple(tree.version):
+        return False
+    with _current_lock:
+        _current[org] = tree.version
+    return True
+
+
+def descendants_clause(db_session, tree: Optional[OrgTreeIndex], column_, node_ids: Iterable[Any],
+                       include_hub: bool = False):
+    """``column_`` is one of *node_ids* or anywhere under them in *tree*.
+
+    Same rows as ``column_.in_(tree.expand(node_ids, include_hub))``; ids not in
+    the tree (and hub ids without *include_hub*) match only themselves. Uses
+    the closure table when it is current for *tree*, the expanded list otherwise.
+    """
+    ids = {to_node_id(raw) for raw in node_ids} - {None}
+    if not ids:
+        return false()
+    if tree is None:
+        return in_ids(column_, ids)
+    if not enabled() or not is_current(db_session, tree):
+        return in_ids(column_, tree.expand(ids, include_hub=include_hub))
+
+    expandable = {nid for nid in ids if nid in tree and (include_hub or tree.section(nid) != HUB)}
+    plain = ids - expandable
+    clauses = []
+    if expandable:
+        clauses.append(column_.in_(
+            select(LOCATION_CLOSURE.c.descendant_id).where(
+                LOCATION_CLOSURE.c.organization_id == tree.organization_id,
+                in_ids(LOCATION_CLOSURE.c.ancestor_id, expandable),
+            )
+        ))
+    if plain:
+        clauses.append(in_ids(column_, plain))
+    return clauses[0] if len(clauses) == 1 else or_(*clauses)
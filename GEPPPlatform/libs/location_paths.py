@@ -0,0 +1,93 @@
+"""Breadcrumb labels of each location, from the cached org tree.
+
+Location lists, transaction detail, IoT device lists and the traceability
+tables all show where a location sits — "Branch A, Building 1, Floor 2", the
+names of its ancestors from the top of the org chart down. Each call used to
+load the setup JSON, build a parent map by recursion and walk up once per row.
+The tree is now the per-container :class:`org_tree.OrgTreeIndex` (one version
+check per request), so a label costs one query for the names of the
+requested locations' ancestors:
+
+    labels(db, org_id, ids)    {id: label}, '' for a top-level node or an id
+                               outside the tree — what the endpoints send
+    lookup(db, org_id, ids)    {id: LocationPath(ids, label)} for ids in the tree
+
+Only the location tree has labels; hub (destination) nodes get ''.
+
+Names are always read fresh, so a rename shows up on the next request.
+"""
+
+from typing import Any, Dict, Iterable, NamedTuple, Optional, Tuple
+
+from .node_ids import to_node_id
+from .org_tree import ROOT, OrgTreeIndex, load_org_tree
+
+SEPARATOR = ', '
+
+
+class LocationPath(NamedTuple):
+    ids: Tuple[int, ...]    # top-level node → the location itself
+    label: str              # ancestors' names, top-level first ('' at the top)
+
+
+def _location_names(db_session, location_ids: Iterable[int]) -> Dict[int, str]:
+    from ..models.users.user_location import UserLocation
+
+    ids = sorted(set(location_ids))
+    if not ids:
+        return {}
+    rows = db_session.query(
+        UserLocation.id, UserLocation.display_name, UserLocation.name_en, UserLocation.name_th,
+    ).filter(
+        UserLocation.id.in_(ids),
+        UserLocation.is_active == True,  # noqa: E712
+        UserLocation.deleted_date.is_(None),
+    ).all()
+    return {r.id: r.display_name or r.name_en or r.name_th or f"Location {r.id}" for r in rows}
+
+
+def compute(tree: OrgTreeIndex, names: Dict[int, str],
+            location_ids: Optional[Iterable[Any]] = None) -> Dict[int, LocationPath]:
+    """Paths of *location_ids* (every location-tree node by default) from *names*."""
+    if location_ids is None:
+        targets = [nid for nid in tree.order if tree.section(nid) == ROOT]
+    else:
+        targets = [nid for nid in (to_node_id(raw) for raw in location_ids)
+                   if nid is not None and tree.section(nid) == ROOT]
+    paths = {}
+    for nid in targets:
+        ids = tree.path(nid)
+        label = SEPARATOR.join(names.get(aid, f"Location {aid}") for aid in ids[:-1])
+        paths[nid] = LocationPath(ids, label)
+    return paths
+
+
+def lookup(db_session, organization_id: Any, location_ids: Iterable[Any]) -> Dict[int, LocationPath]:
+    """Paths of those *location_ids* that are location-tree nodes of the org's active setup."""
+    ids = sorted({to_node_id(raw) for raw in location_ids} - {None})
+    tree = load_org_tree(db_session, organization_id)
+    if tree is None or not ids:
+        return {}
+    ids = [nid for nid in ids if tree.section(nid) == ROOT]
+    if not ids:
+        return {}
+
+    needed = {aid for nid in ids for aid in tree.ancestors(nid)}
+    return compute(tree, _location_names(db_session, needed), ids)
+
+
+def labels(db_session, organization_id: Any, location_ids: Iterable[Any]) -> Dict[Any, str]:
+    """{id: label} for every requested id, keyed as given; '' outside the location tree.
+
+    Empty when the org has no active setup or its location tree is empty.
+    """
+    location_ids = list(location_ids)
+    tree = load_org_tree(db_session, organization_id)
+    if tree is None or not tree.node_ids(ROOT):
+        return {}
+    paths = lookup(db_session, organization_id, location_ids)
+    result = {}
+    for raw in location_ids:
+        path = paths.get(to_node_id(raw))
+        result[raw] = path.label if path is not None else ''
+    return result
@@ -0,0 +1,289 @@
+"""Compiled, versioned index of an organization's location tree.
+
+The org chart lives in ``organization_setup.root_nodes`` (branches → buildings
+→ floors → rooms) and ``hub_node`` (destination hubs) as nested JSON. Reports,
+transaction listings, IoT membership checks, imports and the scale report each
+carried their own recursive walk over it, and one request often walked it
+several times: once to expand a location filter, again to hide orphaned
+origins, again for membership. ``OrgTreeIndex`` walks it once and keeps:
+
+    parent / children     per node id
+    descendants(id)       the node and everything under it (precomputed)
+    ancestors(id)         root → parent path
+    depth(id)             0 for a top-level node
+    section(id)           ``'root'`` (the location tree) or ``'hub'``
+    order                 pre-order of the location tree, then the hubs
+    node(id)              the node's own JSON attributes (``is_destination``…)
+
+Node ids go through :func:`node_ids.to_node_id`; a node whose id is not a real
+one (an unsaved client-side id) is skipped and its children hang off the
+nearest real ancestor.
+
+``load_org_tree(db, org_id)`` returns the index for the org's active setup.
+Indexes are cached per container, keyed by the setup row and its
+``updated_date``, so a new version or an in-place edit is picked up on the
+next request by a one-row probe without re-reading the JSON. Within one
+transaction the index is also memoized on the session, so repeated callers
+skip the probe too. Code that changes a setup calls ``invalidate(org_id, db)``.
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from .node_ids import to_node_id
+
+DEFAULT_MAX_ENTRIES = 256
+
+ROOT = 'root'
+HUB = 'hub'
+
+_SESSION_KEY = 'gepp_org_trees'
+
+
+class OrgTreeIndex:
+    """Parent/child maps, descendant sets and paths of one setup version."""
+
+    def __init__(self, root_nodes: Any = None, hub_node: Any = None,
+                 organization_id: Optional[int] = None, version: Any = None):
+        self.organization_id = organization_id
+        self.version = version
+        self.parent: Dict[int, Optional[int]] = {}
+        self.children: Dict[int, List[int]] = {}
+        self.roots: List[int] = []
+        self.order: List[int] = []
+        self._section: Dict[int, str] = {}
+        self._depth: Dict[int, int] = {}
+        self._attrs: Dict[int, Dict[str, Any]] = {}
+
+        if isinstance(root_nodes, dict):
+            root_nodes = [root_nodes]
+        self._add(root_nodes if isinstance(root_nodes, list) else [], None, ROOT, 0)
+        hub_children = hub_node.get('children') if isinstance(hub_node, dict) else None
+        self._add(hub_children if isinstance(hub_children, list) else [], None, HUB, 0)
+
+        self._descendants: Dict[int, FrozenSet[int]] = {}
+        for nid in reversed(self.order):
+            below = {nid}
+            for child in self.children.get(nid, ()):
+                below |= self._descendants[child]
+            self._descendants[nid] = frozenset(below)
+        self._position = {nid: pos for pos, nid in enumerate(self.order)}
+
+    def _add(self, nodes: List[Any], parent: Optional[int], section: str, depth: int) -> None:
+        for node in nodes:
+            if not isinstance(node, dict):
+                continue
+            nid = to_node_id(node.get('nodeId'))
+            children = node.get('children')
+            children = children if isinstance(children, list) else []
+            if nid is None:
+                self._add(children, parent, section, depth)
+                continue
+            if nid not in self._section:
+                self.parent[nid] = parent
+                self._section[nid] = section
+                self._depth[nid] = depth
+                self._attrs[nid] = {k: v for k, v in node.items() if k != 'children'}
+                self.order.append(nid)
+                self.children.setdefault(nid, [])
+                if parent is None and section == ROOT:
+                    self.roots.append(nid)
+                elif parent is not None and nid not in self.children[parent]:
+                    self.children[parent].append(nid)
+            self._add(children, nid, section, depth + 1)
+
+    # ── lookups ───────────────────────────────────────────────────────────
+
+    def __contains__(self, node_id: Any) -> bool:
+        return to_node_id(node_id) in self._section
+
+    def __len__(self) -> int:
+        return len(self.order)
+
+    def node_ids(self, section: Optional[str] = None) -> Set[int]:
+        """Every node id, or those of one *section* (``'root'`` or ``'hub'``)."""
+        if section is None:
+            return set(self._section)
+        return {nid for nid, sec in self._section.items() if sec == section}
+
+    def section(self, node_id: Any) -> Optional[str]:
+        return self._section.get(to_node_id(node_id))
+
+    def depth(self, node_id: Any) -> Optional[int]:
+        return self._depth.get(to_node_id(node_id))
+
+    def position(self, node_id: Any) -> Optional[int]:
+        """Index of the node in :attr:`order` (tree pre-order, hubs last)."""
+        return self._position.get(to_node_id(node_id))
+
+    def node(self, node_id: Any) -> Dict[str, Any]:
+        """The node's JSON attributes other than ``children`` ({} if absent)."""
+        return self._attrs.get(to_node_id(node_id), {})
+
+    def ids_where(self, attribute: str) -> Set[int]:
+        """Ids of nodes whose JSON sets *attribute* truthy (``is_destination``, ``is_shared``)."""
+        return {nid for nid, attrs in self._attrs.items() if attrs.get(attribute)}
+
+    def descendants(self, node_id: Any, include_self: bool = True) -> FrozenSet[int]:
+        nid = to_node_id(node_id)
+        below = self._descendants.get(nid)
+        if below is None:
+            return frozenset({nid}) if include_self and nid is not None else frozenset()
+        return below if include_self else below - {nid}
+
+    def ancestors(self, node_id: Any) -> Tuple[int, ...]:
+        """Ids from the top-level node down to the node's parent."""
+        path = []
+        current = self.parent.get(to_node_id(node_id))
+        while current is not None:
+            path.append(current)
+            current = self.parent.get(current)
+        return tuple(reversed(path))
+
+    def path(self, node_id: Any) -> Tuple[int, ...]:
+        """Ids from the top-level node down to the node itself (empty if absent)."""
+        nid = to_node_id(node_id)
+        return self.ancestors(nid) + (nid,) if nid in self._section else ()
+
+    def expand(self, node_ids: Iterable[Any], include_hub: bool = False) -> Set[int]:
+        """*node_ids* plus every descendant of each.
+
+        Ids missing from the tree are kept as given. Hub nodes are only expanded
+        with *include_hub*, matching the location-tree walks this replaces.
+        """
+        expanded: Set[int] = set()
+        for raw in node_ids:
+            nid = to_node_id(raw)
+            if nid is None:
+                continue
+            if include_hub or self._section.get(nid) != HUB:
+                expanded |= self.descendants(nid)
+            else:
+                expanded.add(nid)
+        return expanded
+
+    def path_ancestors(self, node_ids: Iterable[Any]) -> Set[int]:
+        """Every node above any of *node_ids*, excluding the targets themselves."""
+        targets = {to_node_id(raw) for raw in node_ids} - {None}
+        above: Set[int] = set()
+        for nid in targets:
+            above.update(self.ancestors(nid))
+        return above - targets
+
+
+class OrgTreeCache:
+    """Bounded LRU of compiled trees, one per organization, tagged with their setup version."""
+
+    def __init__(self, max_entries: Optional[int] = None):
+        self.max_entries = max_entries or int(os.environ.get('ORG_TREE_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+        self._entries: 'OrderedDict[Any, OrgTreeIndex]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, organization_id: Any, version: Any) -> Optional[OrgTreeIndex]:
+        with self._lock:
+            tree = self._entries.get(organization_id)
+            if tree is None or tree.version != version:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(organization_id)
+            self.hits += 1
+            return tree
+
+    def put(self, tree: OrgTreeIndex) -> None:
+        with self._lock:
+            self._entries[tree.organization_id] = tree
+            self._entries.move_to_end(tree.organization_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, organization_id: Any) -> None:
+        with self._lock:
+            self._entries.pop(organization_id, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+org_trees = OrgTreeCache()
+
+
+def _setup_query(db_session, organization_id: int, active_only: bool, *columns):
+    from ..models.subscriptions.organizations import OrganizationSetup
+
+    query = db_session.query(*columns).filter(
+        OrganizationSetup.organization_id == organization_id,
+        OrganizationSetup.deleted_date.is_(None),
+    )
+    if active_only:
+        query = query.filter(OrganizationSetup.is_active == True)  # noqa: E712
+    return query.order_by(OrganizationSetup.created_date.desc(), OrganizationSetup.id.desc())
+
+
+def load_org_tree(db_session, organization_id: Any, fallback_latest: bool = False) -> Optional[OrgTreeIndex]:
+    """The index of *organization_id*'s active setup, or None when it has no setup.
+
+    With *fallback_latest*, an org without an active setup gets its newest one.
+    """
+    from ..models.subscriptions.organizations import OrganizationSetup
+
+    if organization_id is None:
+        return None
+    memo_key = (organization_id, fallback_latest)
+    memo = _memo(db_session)
+    if memo is not None and memo_key in memo:
+        return memo[memo_key]
+
+    probe = _setup_query(db_session, organization_id, True,
+                         OrganizationSetup.id, OrganizationSetup.updated_date).first()
+    if probe is None and fallback_latest:
+        probe = _setup_query(db_session, organization_id, False,
+                             OrganizationSetup.id, OrganizationSetup.updated_date).first()
+    tree = None
+    if probe is not None:
+        version = (probe[0], probe[1])
+        tree = org_trees.get(organization_id, version)
+        if tree is None:
+            row = db_session.query(OrganizationSetup.root_nodes, OrganizationSetup.hub_node).filter(
+                OrganizationSetup.id == probe[0]).first()
+            tree = OrgTreeIndex(row[0] if row else None, row[1] if row else None,
+                                organization_id=organization_id, version=version)
+            org_trees.put(tree)
+    memo = _memo(db_session, create=True)
+    if memo is not None:
+        memo[memo_key] = tree
+    return tree
+
+
+def _memo(db_session, create: bool = False) -> Optional[Dict[Any, Optional[OrgTreeIndex]]]:
+    """Trees already loaded in *db_session*'s current transaction.
+
+    Scoped sessions outlive a request, so the memo is tied to the root
+    transaction: a commit or rollback ends it and the next read probes again.
+    """
+    transaction = db_session.get_transaction()
+    if transaction is None:
+        return None
+    entry = db_session.info.get(_SESSION_KEY)
+    if entry is None or entry[0] is not transaction:
+        if not create:
+            return None
+        entry = (transaction, {})
+        db_session.info[_SESSION_KEY] = entry
+    return entry[1]
+
+
+def invalidate(organization_id: Any, db_session=None) -> None:
+    """Forget *organization_id*'s tree here and in *db_session*'s memo (call after a setup change)."""
+    org_trees.invalidate(organization_id)
+    memo = _memo(db_session) if db_session is not None else None
+    if memo:
+        for key in [k for k in memo if k[0] == organization_id]:
+            del memo[key]
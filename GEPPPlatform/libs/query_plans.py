@@ -0,0 +1,289 @@
+"""Query-plan capture, regression checks and index suggestions.
+
+A migration that drops or reshapes an index, or a query change that wraps an
+indexed column in a function, does not fail anything: the hot path just
+quietly turns into a sequential scan and gets slower as the table grows.
+``scripts/query_plan_report.py`` runs a catalogue of real service calls against
+a seeded local database and uses this module to look at what they executed:
+
+    capture_statements(engine)   the statements (and bound parameters) a block
+                                 of service code ran through SQLAlchemy
+    RecordingConnection          the same for code handed a raw DBAPI
+                                 connection (the EPR duplicate finder)
+    explain(dbapi_conn, ...)     ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` of
+                                 one statement, inside a rolled-back savepoint
+    summarize(...)               the plan reduced to what is compared: each
+                                 scan (relation, node type, index, filter),
+                                 buffers touched, execution time
+    large_seq_scans(...)         sequential scans of tables above a row count
+    suggest_index(scan)          a ``CREATE INDEX`` for a filtered seq scan
+    compare(baseline, current)   plans that stopped using an index or now touch
+                                 many more buffers than the stored baseline
+
+Buffers, not milliseconds, decide a regression: on the same seed data they
+are deterministic, timings are not. Statements are keyed by catalogue entry and
+``query_stats.fingerprint``, so a changed query shows up as new rather than as
+a regression of the old one.
+"""
+
+import hashlib
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .query_stats import fingerprint
+
+INDEX_SCANS = ('Index Scan', 'Index Only Scan', 'Bitmap Heap Scan')
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE')
+
+DEFAULT_LARGE_TABLE_ROWS = 10_000
+DEFAULT_BUFFER_GROWTH = 2.0
+DEFAULT_MIN_BUFFERS = 1_000
+
+
+@dataclass
+class Scan:
+    relation: str
+    node_type: str
+    index: Optional[str] = None
+    filter: Optional[str] = None
+    rows: float = 0.0
+    removed: float = 0.0
+
+
+@dataclass
+class PlanSummary:
+    key: str
+    entry: str
+    sql: str
+    execution_ms: float = 0.0
+    planning_ms: float = 0.0
+    buffers: int = 0
+    scans: List[Scan] = field(default_factory=list)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> 'PlanSummary':
+        data = dict(data)
+        data['scans'] = [Scan(**scan) for scan in data.get('scans', [])]
+        return cls(**data)
+
+
+def statement_key(entry: str, statement: str) -> str:
+    digest = hashlib.sha1(fingerprint(statement).encode()).hexdigest()[:10]
+    return f"{entry}:{digest}"
+
+
+def _walk(node: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+    yield node
+    for child in node.get('Plans', ()):
+        yield from _walk(child)
+
+
+def summarize(entry: str, statement: str, explain_json: Any) -> PlanSummary:
+    """Reduce ``EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON)`` output to a :class:`PlanSummary`."""
+    if isinstance(explain_json, str):
+        explain_json = json.loads(explain_json)
+    top = explain_json[0] if isinstance(explain_json, list) else explain_json
+    root = top['Plan']
+    scans = []
+    for node in _walk(root):
+        relation = node.get('Relation Name')
+        if relation is None:
+            continue
+        index = node.get('Index Name')
+        if index is None and node['Node Type'] == 'Bitmap Heap Scan':
+            index = next((child.get('Index Name') for child in _walk(node)
+                          if child.get('Node Type') == 'Bitmap Index Scan'), None)
+        loops = node.get('Actual Loops', 1) or 1
+        scans.append(Scan(
+            relation=relation,
+            node_type=node['Node Type'],
+            index=index,
+            filter=node.get('Filter') or node.get('Index Cond') or node.get('Recheck Cond'),
+            rows=float(node.get('Actual Rows', node.get('Plan Rows', 0))) * loops,
+            removed=float(node.get('Rows Removed by Filter', 0)) * loops,
+        ))
+    return PlanSummary(
+        key=statement_key(entry, statement),
+        entry=entry,
+        sql=fingerprint(statement),
+        execution_ms=round(float(top.get('Execution Time', 0.0)), 2),
+        planning_ms=round(float(top.get('Planning Time', 0.0)), 2),
+        buffers=int(root.get('Shared Hit Blocks', 0)) + int(root.get('Shared Read Blocks', 0)),
+        scans=scans,
+    )
+
+
+def large_seq_scans(summary: PlanSummary, table_rows: Dict[str, float],
+                    min_rows: int = DEFAULT_LARGE_TABLE_ROWS) -> List[Scan]:
+    """Sequential scans in *summary* of tables holding at least *min_rows* rows."""
+    return [scan for scan in summary.scans
+            if scan.node_type == 'Seq Scan' and table_rows.get(scan.relation, 0) >= min_rows]
+
+
+_CONDITION = re.compile(
+    r"\(*(?:\w+\.)?\(?(?P<col>[a-z_][a-z0-9_]*)\)?(?:::[\w ]+)?\s*"
+    r"(?P<op>=\s*ANY|IS NULL|IS NOT NULL|<>|!=|>=|<=|=|<|>|~~\*?)",
+    re.IGNORECASE,
+)
+
+
+def suggest_index(scan: Scan) -> Optional[str]:
+    """A ``CREATE INDEX`` statement serving *scan*'s filter, or None if it has no usable one.
+
+    Equality columns lead, range columns follow; ``deleted_date IS NULL`` (the
+    soft-delete convention) becomes the partial-index predicate. Only offered
+    when the filter discards more rows than it keeps — an index does not help
+    a scan that returns most of the table.
+    """
+    if scan.node_type != 'Seq Scan' or not scan.filter or scan.removed <= scan.rows:
+        return None
+    equality, ranges, partial = [], [], []
+    for match in _CONDITION.finditer(scan.filter):
+        col, op = match.group('col'), re.sub(r'\s+', ' ', match.group('op').upper())
+        if op == 'IS NULL':
+            if col.endswith('deleted_date') or col.endswith('deleted_at'):
+                partial.append(f"{col} IS NULL")
+            continue
+        if op in ('IS NOT NULL', '<>', '!=', '~~', '~~*'):
+            continue
+        target = equality if op in ('=', '= ANY') else ranges
+        if col not in equality and col not in ranges:
+            target.append(col)
+    columns = equality + ranges[:1]
+    if not columns:
+        return None
+    name = f"idx_{scan.relation}_{'_'.join(columns)}"[:63]
+    where = f" WHERE {' AND '.join(dict.fromkeys(partial))}" if partial else ''
+    return f"CREATE INDEX CONCURRENTLY {name} ON {scan.relation} ({', '.join(columns)}){where};"
+
+
+def compare(baseline: Dict[str, PlanSummary], current: Dict[str, PlanSummary],
+            buffer_growth: float = DEFAULT_BUFFER_GROWTH,
+            min_buffers: int = DEFAULT_MIN_BUFFERS) -> List[str]:
+    """Regressions of *current* against *baseline*, one line each.
+
+    A relation the baseline reached through an index and the current plan
+    scans sequentially is always a regression; so is a statement touching more
+    than *buffer_growth* times its baseline buffers (once past *min_buffers*).
+    """
+    problems = []
+    for key, now in current.items():
+        before = baseline.get(key)
+        if before is None:
+            continue
+        indexed_before = {scan.relation: scan.index for scan in before.scans if scan.node_type in INDEX_SCANS}
+        seq_now = {scan.relation for scan in now.scans if scan.node_type == 'Seq Scan'}
+        for relation in sorted(seq_now & set(indexed_before)):
+            problems.append(f"{key} ({now.entry}): {relation} no longer uses "
+                            f"{indexed_before[relation] or 'an index'} — sequential scan now")
+        if now.buffers > max(before.buffers * buffer_growth, min_buffers):
+            problems.append(f"{key} ({now.entry}): {now.buffers} buffers, baseline {before.buffers}")
+    return problems
+
+
+def load_baseline(path: str) -> Dict[str, PlanSummary]:
+    with open(path, encoding='utf-8') as fh:
+        data = json.load(fh)
+    return {key: PlanSummary.from_dict(plan) for key, plan in data.items()}
+
+
+def save_baseline(path: str, plans: Dict[str, PlanSummary]) -> None:
+    with open(path, 'w', encoding='utf-8') as fh:
+        json.dump({key: plans[key].to_dict() for key in sorted(plans)}, fh, indent=2, ensure_ascii=False)
+        fh.write('\n')
+
+
+def _explainable(statement: str) -> bool:
+    return statement.lstrip().split(None, 1)[0].upper() in EXPLAINABLE if statement.strip() else False
+
+
+@contextmanager
+def capture_statements(engine):
+    """Collect the ``(statement, parameters)`` of every single execute on *engine* in the block."""
+    from sqlalchemy import event
+
+    captured: List[Tuple[str, Any]] = []
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and _explainable(statement):
+            captured.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', _before)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, 'before_cursor_execute', _before)
+
+
+class RecordingConnection:
+    """A DBAPI connection proxy whose cursors record what they execute."""
+
+    def __init__(self, connection, captured: List[Tuple[str, Any]]):
+        self._connection = connection
+        self.captured = captured
+
+    def cursor(self, *args, **kwargs):
+        return _RecordingCursor(self._connection.cursor(*args, **kwargs), self.captured)
+
+    def __getattr__(self, name):
+        return getattr(self._connection, name)
+
+
+class _RecordingCursor:
+    def __init__(self, cursor, captured):
+        self._cursor = cursor
+        self._captured = captured
+
+    def execute(self, statement, parameters=None):
+        if _explainable(statement):
+            self._captured.append((statement, parameters))
+        return self._cursor.execute(statement, parameters)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._cursor.close()
+        return False
+
+    def __iter__(self):
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def explain(dbapi_conn, statement: str, parameters: Any = None) -> Any:
+    """EXPLAIN ANALYZE *statement* in a savepoint that is rolled back, so writes are undone."""
+    with dbapi_conn.cursor() as cur:
+        cur.execute("SAVEPOINT query_plan")
+        try:
+            cur.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + statement, parameters or None)
+            return cur.fetchone()[0]
+        finally:
+            cur.execute("ROLLBACK TO SAVEPOINT query_plan")
+
+
+def table_rows(dbapi_conn) -> Dict[str, float]:
+    """Estimated rows per table in the public schema (``pg_class.reltuples``)."""
+    with dbapi_conn.cursor() as cur:
+        cur.execute(
+            "SELECT relname, reltuples FROM pg_class "
+            "WHERE relkind IN ('r', 'p') AND relnamespace = 'public'::regnamespace")
+        return {name: float(rows) for name, rows in cur.fetchall()}
+
+
+def summarize_all(dbapi_conn, entry: str, statements: Sequence[Tuple[str, Any]]) -> Dict[str, PlanSummary]:
+    """Explain each distinct statement *entry* ran; the first run of a fingerprint stands for all."""
+    plans: Dict[str, PlanSummary] = {}
+    for statement, parameters in statements:
+        key = statement_key(entry, statement)
+        if key not in plans:
+            plans[key] = summarize(entry, statement, explain(dbapi_conn, statement, parameters))
+    return plans
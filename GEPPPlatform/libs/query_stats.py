@@ -0,0 +1,183 @@
+"""Per-request SQL statistics and N+1 detection.
+
+The ``db`` stage in Server-Timing says how long a request spent in SQL, not
+why. Most slow paths in this codebase are not one bad query but one query per
+row — a BMA lookup per house, a campaign query per event, a notification
+insert per transaction record, a duplicate probe per candidate — and those
+only show up as "many similar statements". While a request runs, every
+statement is recorded here:
+
+    queries     statements executed (an executemany counts once)
+    db_ms       time inside them, summed
+    slowest     the ``SQL_STATS_SLOWEST`` (5) slowest, with their fingerprints
+    repeated    fingerprints that ran more than ``SQL_REPEAT_THRESHOLD`` (10)
+                times — the N+1 suspects
+
+A fingerprint is the statement with literals and bind parameters replaced by
+``?`` and ``IN (...)`` lists collapsed, so ``WHERE id = 5`` and ``WHERE id = 6``
+count as the same statement. Each request logs one ``[SQL]`` JSON line; it is
+logged as a warning, with ``"n_plus_one": true``, when anything repeated.
+
+The dispatcher and the cron entry points wrap their work in ``recording()``.
+Tests can bound a block's query count with the ``max_queries`` fixture
+(tests/conftest.py), which counts statements on every engine via
+``count_queries()``.
+"""
+
+import heapq
+import json
+import logging
+import os
+import re
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REPEAT_THRESHOLD = 10
+DEFAULT_SLOWEST = 5
+
+_current: ContextVar[Optional['QueryStats']] = ContextVar('gepp_query_stats', default=None)
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_PARAM = re.compile(r"%\(\w+\)s|%s|\$\d+|(?<![:\w]):\w+|\?")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_SPACE = re.compile(r"\s+")
+
+
+def fingerprint(statement: str) -> str:
+    """*statement* with its values masked, so repeats with different values match."""
+    normalized = _STRING.sub('?', statement)
+    normalized = _PARAM.sub('?', normalized)
+    normalized = _NUMBER.sub('?', normalized)
+    normalized = _LIST.sub('(...)', normalized)
+    return _SPACE.sub(' ', normalized).strip()
+
+
+class QueryStats:
+    """Statements executed during one request or job."""
+
+    def __init__(self, label: Optional[str] = None, repeat_threshold: Optional[int] = None,
+                 slowest: Optional[int] = None, keep_statements: bool = False):
+        self.label = label
+        self.repeat_threshold = repeat_threshold if repeat_threshold is not None else int(
+            os.environ.get('SQL_REPEAT_THRESHOLD', DEFAULT_REPEAT_THRESHOLD))
+        self.keep_slowest = slowest if slowest is not None else int(
+            os.environ.get('SQL_STATS_SLOWEST', DEFAULT_SLOWEST))
+        self.queries = 0
+        self.total_ms = 0.0
+        self.counts: Dict[str, int] = {}
+        # Full statement text only when asked for (tests); a cron run can issue thousands.
+        self.statements: Optional[List[str]] = [] if keep_statements else None
+        self._slowest: List[Tuple[float, int, str]] = []
+
+    def record(self, statement: str, elapsed_ms: float) -> None:
+        key = fingerprint(statement)
+        self.queries += 1
+        self.total_ms += elapsed_ms
+        self.counts[key] = self.counts.get(key, 0) + 1
+        if self.statements is not None:
+            self.statements.append(statement)
+        # The sequence number breaks ties so equal durations never compare strings.
+        entry = (elapsed_ms, self.queries, key)
+        if len(self._slowest) < self.keep_slowest:
+            heapq.heappush(self._slowest, entry)
+        elif self._slowest and entry > self._slowest[0]:
+            heapq.heapreplace(self._slowest, entry)
+
+    def slowest(self) -> List[Dict[str, object]]:
+        return [{'ms': round(ms, 1), 'sql': key}
+                for ms, _, key in sorted(self._slowest, reverse=True)]
+
+    def repeated(self) -> Dict[str, int]:
+        """Fingerprints run more than ``repeat_threshold`` times, most frequent first."""
+        hits = [(n, key) for key, n in self.counts.items() if n > self.repeat_threshold]
+        return {key: n for n, key in sorted(hits, reverse=True)}
+
+    def summary(self) -> Dict[str, object]:
+        repeated = self.repeated()
+        return {
+            'event': 'sql_stats',
+            'route': self.label,
+            'queries': self.queries,
+            'db_ms': round(self.total_ms, 1),
+            'distinct': len(self.counts),
+            'n_plus_one': bool(repeated),
+            'repeated': repeated,
+            'slowest': self.slowest(),
+        }
+
+
+def start(label: Optional[str] = None) -> QueryStats:
+    """Begin recording; statements executed in this context are counted into it."""
+    stats = QueryStats(label)
+    _current.set(stats)
+    return stats
+
+
+def current() -> Optional[QueryStats]:
+    return _current.get()
+
+
+def record(statement: str, elapsed_ms: float) -> None:
+    """Count a statement against the active recording, if there is one."""
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed_ms)
+
+
+def finish(stats: QueryStats) -> QueryStats:
+    """Log *stats* and stop recording. Never raises."""
+    try:
+        if stats.queries:
+            summary = stats.summary()
+            level = logging.WARNING if summary['n_plus_one'] else logging.INFO
+            logger.log(level, "[SQL] " + json.dumps(summary))
+    except Exception:  # noqa: BLE001 — reporting must not fail the request
+        logger.exception("[SQL] failed to report query stats")
+    finally:
+        _current.set(None)
+    return stats
+
+
+@contextmanager
+def recording(label: Optional[str] = None):
+    """Record and log the statements of the enclosed block (a cron run, a script)."""
+    stats = start(label)
+    try:
+        yield stats
+    finally:
+        finish(stats)
+
+
+@contextmanager
+def count_queries(engine=None):
+    """Count statements on *engine* (default: every engine) inside the block.
+
+    Independent of the request recording, so a test can bound a block without a
+    dispatcher around it.
+    """
+    from sqlalchemy import event
+    from sqlalchemy.engine import Engine
+
+    target = engine if engine is not None else Engine
+    stats = QueryStats('count_queries', keep_statements=True)
+
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault('gepp_count_started', []).append(time.perf_counter())
+
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        started = conn.info.get('gepp_count_started')
+        elapsed = (time.perf_counter() - started.pop()) * 1000 if started else 0.0
+        stats.record(statement, elapsed)
+
+    event.listen(target, 'before_cursor_execute', _before)
+    event.listen(target, 'after_cursor_execute', _after)
+    try:
+        yield stats
+    finally:
+        event.remove(target, 'before_cursor_execute', _before)
+        event.remove(target, 'after_cursor_execute', _after)
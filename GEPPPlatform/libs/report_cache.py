@@ -0,0 +1,201 @@
+"""Report responses cached per organization, filter set and access scope.
+
+The report dashboards (overview, performance, diversion, comparison,
+materials and the filter pickers) are opened over and over by many users of
+the same organization, and each open recomputed the same aggregates from
+the transaction records. A report is a pure function of
+
+  • the endpoint and its normalized filters (plus the client time zone the
+    comparison periods are cut in),
+  • what the user may see — the resolved access scope, hashed, so every
+    owner of an org, or every member with the same grants, shares one entry;
+    plus whether the reports narrow to the user's own locations and tags
+    (``filter_by_member``, from the user's org role), which the pickers
+    branch on independently of the grants,
+  • and the org's data,
+
+so responses are kept in ``shared_result_cache`` (``libs/shared_cache.py``,
+shared by every warm container, with single flight on a miss) under a key
+built from the first two and a *version tag* built from the last: the data
+watermark. The watermark is one aggregate query — row count and newest
+``updated_date`` of the org's transactions and their records, users and
+locations (``user_locations``: names, roles), location tags and tenants
+(each also for the orgs sharing data into it, whose names the pickers
+show), traceability groups, transport legs and consolidations, the shares
+placed into the org (with how many are live now, so an expiry shows up),
+the org's owner, and the material catalogue — plus the setup version of
+the org tree. Creating, editing, approving, renaming or deleting anything a
+report reads moves it, a cached entry whose tag no longer matches is never
+served, and nothing has to be recomputed to find that out. The same
+watermark versions the reports' ETags (``entry_points/version_probes.py``);
+``request_watermark`` computes it once per request for both.
+
+Writes that bypass ``updated_date`` (raw SQL) are not seen by the
+watermark; entries also expire after ``REPORT_CACHE_TTL`` seconds (default
+900) to bound that. Any failure to build the key or watermark just computes
+the report, as does a disabled cache.
+
+Configuration (environment):
+    REPORT_CACHE      ``off`` always computes
+    REPORT_CACHE_TTL  seconds an entry may be served (default 900)
+"""
+
+import hashlib
+import json
+import logging
+import os
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, Optional
+
+from sqlalchemy import func, or_, select
+
+from GEPPPlatform.libs.org_tree import load_org_tree
+from GEPPPlatform.libs.shared_cache import shared_cache
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TTL_SECONDS = 900
+
+KEY_PREFIX = 'reports:org:'
+
+# session.info key: (transaction, organization_id, watermark) of the last request_watermark.
+_WATERMARK = 'report_cache_watermark'
+
+
+def enabled() -> bool:
+    return os.environ.get('REPORT_CACHE', '').strip().lower() not in ('off', '0', 'false', 'no')
+
+
+def ttl_seconds() -> float:
+    return float(os.environ.get('REPORT_CACHE_TTL', DEFAULT_TTL_SECONDS))
+
+
+def _canonical(value: Any) -> Any:
+    """*value* with dict keys sorted and id lists in a fixed order, for hashing."""
+    if isinstance(value, dict):
+        return {str(k): _canonical(v) for k, v in sorted(value.items(), key=lambda kv: str(kv[0]))}
+    if isinstance(value, (list, tuple, set, frozenset)):
+        items = [_canonical(v) for v in value]
+        # Selections are sets in all but type: [2, 1] and [1, 2] filter the same rows.
+        return sorted(items, key=lambda v: json.dumps(v, sort_keys=True, default=str))
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+def _digest(value: Any) -> str:
+    encoded = json.dumps(_canonical(value), sort_keys=True, default=str, separators=(',', ':'))
+    return hashlib.sha256(encoded.encode('utf-8')).hexdigest()
+
+
+def scope_fingerprint(scope: Optional[Dict[str, Any]]) -> str:
+    """Hash of what a resolved access scope lets its user see (None: everything)."""
+    if scope is None:
+        return 'all'
+    member = ':member' if scope.get('filter_by_member') else ''
+    if scope.get('is_owner'):
+        return 'all' + member
+    return _digest({
+        'assigned_ids': scope.get('assigned_ids') or (),
+        'grants': [
+            {key: grant.get(key) for key in ('kind', 'id', 'location_ids', 'start_date', 'end_date')}
+            for grant in scope.get('scoped_grants') or []
+        ],
+    }) + member
+
+
+def cache_key(endpoint: str, organization_id: Any, filters: Optional[Dict[str, Any]],
+              scope: Optional[Dict[str, Any]], extra: Any = None) -> str:
+    """``reports:org:<org>:<endpoint>:<hash>`` — the org prefix lets invalidate_prefix drop an org."""
+    digest = _digest({'filters': filters or {}, 'scope': scope_fingerprint(scope), 'extra': extra})
+    return f"{KEY_PREFIX}{organization_id}:{endpoint.strip('/')}:{digest}"
+
+
+def data_watermark(db_session, organization_id: Any) -> str:
+    """Version tag that moves whenever data a report of *organization_id* reads changes."""
+    from ..models.cores.references import MainMaterial, Material, MaterialCategory
+    from ..models.shared_user_location import SharedUserLocation
+    from ..models.subscriptions.organizations import Organization
+    from ..models.transactions.traceability_consolidation import TraceabilityConsolidation
+    from ..models.transactions.traceability_transaction_group import TraceabilityTransactionGroup
+    from ..models.transactions.transaction_records import TransactionRecord
+    from ..models.transactions.transactions import Transaction
+    from ..models.transactions.transport_transaction import TransportTransaction
+    from ..models.users.user_location import UserLocation
+    from ..models.users.user_related import UserLocationTag, UserTenant
+
+    now = datetime.now(timezone.utc)
+    sources = select(SharedUserLocation.source_organization_id).where(
+        SharedUserLocation.target_organization_id == organization_id)
+    in_scope = or_(Transaction.organization_id == organization_id, Transaction.organization_id.in_(sources))
+    transaction_ids = select(Transaction.id).where(in_scope)
+
+    def org_or_sources(model):
+        return or_(model.organization_id == organization_id, model.organization_id.in_(sources))
+
+    def count_and_newest(model, *where):
+        return [
+            select(func.count()).select_from(model).where(*where).scalar_subquery(),
+            select(func.max(model.updated_date)).where(*where).scalar_subquery(),
+        ]
+
+    columns = (
+        count_and_newest(Transaction, in_scope)
+        + count_and_newest(TransactionRecord, TransactionRecord.created_transaction_id.in_(transaction_ids))
+        + count_and_newest(TraceabilityTransactionGroup, TraceabilityTransactionGroup.organization_id == organization_id)
+        + count_and_newest(TransportTransaction, TransportTransaction.organization_id == organization_id)
+        + count_and_newest(TraceabilityConsolidation, TraceabilityConsolidation.organization_id == organization_id)
+        + count_and_newest(SharedUserLocation, SharedUserLocation.target_organization_id == organization_id)
+        + [select(func.count()).select_from(SharedUserLocation).where(
+            SharedUserLocation.target_organization_id == organization_id,
+            or_(SharedUserLocation.expired_date.is_(None), SharedUserLocation.expired_date > now),
+        ).scalar_subquery()]
+        + count_and_newest(UserLocation, org_or_sources(UserLocation))
+        + count_and_newest(UserLocationTag, org_or_sources(UserLocationTag))
+        + count_and_newest(UserTenant, org_or_sources(UserTenant))
+        + [select(Organization.owner_id).where(Organization.id == organization_id).scalar_subquery()]
+        + count_and_newest(Material) + count_and_newest(MainMaterial) + count_and_newest(MaterialCategory)
+    )
+    data = tuple(db_session.execute(select(*columns)).one())
+    tree = load_org_tree(db_session, organization_id)
+    return _digest([data, tree.version if tree is not None else None])
+
+
+def request_watermark(db_session, organization_id: Any) -> str:
+    """data_watermark, computed once per transaction of *db_session*.
+
+    A report GET asks twice: for its ETag (entry_points/version_probes.py) and
+    for the cache lookup. Raises like data_watermark, having rolled back only
+    its own savepoint.
+    """
+    memo = db_session.info.get(_WATERMARK)
+    if memo is not None and memo[0] is db_session.get_transaction() and memo[1] == organization_id:
+        return memo[2]
+    # A savepoint, so a failed watermark query does not abort the report's transaction.
+    with db_session.begin_nested():
+        version = data_watermark(db_session, organization_id)
+    db_session.info[_WATERMARK] = (db_session.get_transaction(), organization_id, version)
+    return version
+
+
+def cached(db_session, endpoint: str, organization_id: Any, filters: Optional[Dict[str, Any]],
+           scope: Optional[Dict[str, Any]], compute: Callable[[], Any], extra: Any = None) -> Any:
+    """The report ``compute()`` returns, served from the cache while the org's data is unchanged.
+
+    Hits come back as plain JSON types, exactly as the response would have been
+    serialised. Exceptions from ``compute`` propagate unchanged.
+    """
+    if not enabled():
+        return compute()
+    try:
+        key = cache_key(endpoint, organization_id, filters, scope, extra)
+        version = request_watermark(db_session, organization_id)
+    except Exception as exc:  # noqa: BLE001 — an uncacheable request is still a valid one
+        logger.warning(f"[REPORT_CACHE] computing {endpoint} for org {organization_id} uncached: {exc}")
+        return compute()
+    return shared_cache.get_or_compute(key, compute, ttl_seconds(), version=version)
+
+
+def invalidate(organization_id: Any) -> None:
+    """Drop every cached report of *organization_id* (the watermark already retires them lazily)."""
+    shared_cache.invalidate_prefix(f"{KEY_PREFIX}{organization_id}:")
@@ -0,0 +1,149 @@
+"""Per-request stage timing, reported as a ``Server-Timing`` header and a log line.
+
+A slow ``/api/reports`` call used to look the same in CloudWatch whether it spent
+its time in SQL, in Python aggregation over the rows, in ``json.dumps`` or in
+gzip — only the Lambda's total duration was visible. The dispatcher now times
+the request as named stages:
+
+    cors          OPTIONS preflight (the whole request, for a preflight)
+    auth          ``AuthHandlers.verify_jwt_token``
+    access_scope  ``UserService.resolve_access_scope`` (summed, it can run twice)
+    handler       the route's handler, end to end
+    db            time inside SQL statements, summed — overlaps ``handler``
+    serialize     ``json.dumps`` of the handler result
+    gzip          ``maybe_gzip``
+    offload       writing an oversized response to S3 (rare; see response_offload)
+
+so ``handler - db`` is the Python share of the work. The numbers go out as a
+``Server-Timing`` header (browser devtools draw it in the Timing tab) and as one
+``[TIMING]`` JSON log line per request for CloudWatch Insights.
+
+Code anywhere below the dispatcher times a stage with ``with stage('name'):`` or
+the ``@timed('name')`` decorator; outside a request (scripts, tests, the async
+worker) both are no-ops. The active timer is held in a ContextVar, so threads
+started by a handler do not write into the request's timer by accident.
+"""
+
+import json
+import logging
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from functools import wraps
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+_current: ContextVar[Optional['RequestTimer']] = ContextVar('gepp_request_timer', default=None)
+
+
+class RequestTimer:
+    """Accumulates milliseconds per stage name for one request."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.route: Optional[str] = None
+        self.durations: Dict[str, float] = {}
+        self.counts: Dict[str, int] = {}
+
+    def add(self, name: str, elapsed_ms: float) -> None:
+        self.durations[name] = self.durations.get(name, 0.0) + elapsed_ms
+        self.counts[name] = self.counts.get(name, 0) + 1
+
+    @contextmanager
+    def stage(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield self
+        finally:
+            self.add(name, (time.perf_counter() - started) * 1000)
+
+    def total_ms(self) -> float:
+        return (time.perf_counter() - self.started) * 1000
+
+    def server_timing(self) -> str:
+        """Header value, e.g. ``auth;dur=3.1, db;dur=40.2;desc="12 calls", total;dur=88.0``."""
+        parts = []
+        for name, ms in self.durations.items():
+            part = f"{name};dur={ms:.1f}"
+            if self.counts.get(name, 1) > 1:
+                part += f';desc="{self.counts[name]} calls"'
+            parts.append(part)
+        parts.append(f"total;dur={self.total_ms():.1f}")
+        return ", ".join(parts)
+
+
+def start() -> RequestTimer:
+    """Begin timing a request; later ``stage()`` calls in this context record into it."""
+    timer = RequestTimer()
+    _current.set(timer)
+    return timer
+
+
+def current() -> Optional[RequestTimer]:
+    return _current.get()
+
+
+def set_route(route_key: Optional[str]) -> None:
+    """Label the active request with its route key for the log line."""
+    timer = _current.get()
+    if timer is not None:
+        timer.route = route_key
+
+
+def add(name: str, elapsed_ms: float) -> None:
+    """Record a measured duration against the active request, if there is one."""
+    timer = _current.get()
+    if timer is not None:
+        timer.add(name, elapsed_ms)
+
+
+@contextmanager
+def stage(name: str):
+    """Time the enclosed block as stage *name* of the active request (no-op outside one)."""
+    timer = _current.get()
+    if timer is None:
+        yield None
+        return
+    with timer.stage(name):
+        yield timer
+
+
+def timed(name: str) -> Callable:
+    """Decorator form of :func:`stage` for functions called from many handlers."""
+    def decorate(fn):
+        @wraps(fn)
+        def wrapper(*args, **kwargs):
+            with stage(name):
+                return fn(*args, **kwargs)
+        return wrapper
+    return decorate
+
+
+def finish(timer: RequestTimer, response: Any) -> Any:
+    """Stamp ``Server-Timing`` on *response*, log the breakdown and end the request.
+
+    A response that is not a proxy dict is returned untouched. Never raises: a
+    timing failure must not turn a good response into a 500.
+    """
+    try:
+        status = None
+        if isinstance(response, dict):
+            status = response.get("statusCode")
+            response["headers"] = {
+                **(response.get("headers") or {}),
+                "Server-Timing": timer.server_timing(),
+            }
+        logger.info("[TIMING] " + json.dumps({
+            "event": "request_timing",
+            "route": timer.route,
+            "status": status,
+            "total_ms": round(timer.total_ms(), 1),
+            "stages_ms": {name: round(ms, 1) for name, ms in timer.durations.items()},
+            "stage_counts": {name: n for name, n in timer.counts.items() if n > 1},
+        }))
+    except Exception:  # noqa: BLE001 — see docstring
+        logger.exception("[TIMING] failed to report request timing")
+    finally:
+        _current.set(None)
+    return response
@@ -0,0 +1,192 @@
+"""Hand responses too big for Lambda to object storage instead of failing.
+
+Lambda refuses a synchronous response over 6 MB outright — the client gets an
+error, not a truncated body. ``maybe_gzip`` buys a lot of headroom, but a large
+organisation's traceability board or a year of transactions can still cross the
+line after compression, and the only answer until now was for each handler to
+truncate or over-paginate.
+
+``offload_large_response`` runs last on the way out. A successful response that
+is still over the threshold is written to S3 and replaced by a ``303 See Other``
+whose ``Location`` is a short-lived presigned GET for the stored body; the body
+of the 303 is a small JSON envelope carrying the same URL, for clients that do
+not follow redirects. The stored object keeps the response's Content-Type and
+Content-Encoding, so a browser following the redirect sees the same payload it
+would have got inline. Anything under the threshold is untouched.
+
+Configuration (environment):
+    RESPONSE_OFFLOAD                  ``off`` disables offloading
+    RESPONSE_OFFLOAD_THRESHOLD_BYTES  default 5_500_000 (room for headers)
+    RESPONSE_OFFLOAD_URL_TTL          presigned URL lifetime, default 300 s
+    RESPONSE_OFFLOAD_BUCKET           default ``S3_BUCKET_NAME``
+    RESPONSE_OFFLOAD_PREFIX           default ``tmp/api-responses/`` (expire it
+                                      with a bucket lifecycle rule)
+    RESPONSE_OFFLOAD_DIR              write to this directory instead of S3 —
+                                      the local/offline stand-in
+"""
+
+import base64
+import json
+import logging
+import os
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+from GEPPPlatform.libs import request_timing
+from GEPPPlatform.libs.startup import lazy_module
+
+# Only needed on the rare response that is actually offloaded.
+boto3 = lazy_module('boto3')
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_THRESHOLD_BYTES = 5_500_000
+DEFAULT_URL_TTL_SECONDS = 300
+DEFAULT_PREFIX = 'tmp/api-responses/'
+
+# Headers describing the inline body; they must not be copied onto the 303.
+_BODY_HEADERS = {'content-encoding', 'content-length', 'content-type', 'content-disposition'}
+
+
+class S3ResponseStore:
+    """Stores offloaded bodies in S3 and hands out presigned GET URLs."""
+
+    def __init__(self, bucket: str, prefix: str = DEFAULT_PREFIX, region: Optional[str] = None):
+        self.bucket = bucket
+        self.prefix = prefix
+        self.region = region or os.getenv('AWS_REGION', 'ap-southeast-1')
+        self._client = None
+
+    @property
+    def client(self):
+        if self._client is None:
+            # Path-style addressing if the bucket name contains dots (SSL certs).
+            config = boto3.session.Config(
+                signature_version='s3v4',
+                s3={'addressing_style': 'path'} if '.' in self.bucket else {},
+            )
+            self._client = boto3.client('s3', region_name=self.region, config=config)
+        return self._client
+
+    def put(self, key: str, body: bytes, content_type: str, content_encoding: Optional[str] = None) -> str:
+        extra = {'ContentEncoding': content_encoding} if content_encoding else {}
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=body,
+            ContentType=content_type,
+            CacheControl='private, no-store',
+            **extra,
+        )
+        return self.prefix + key
+
+    def url(self, stored_key: str, expires_in: int) -> str:
+        return self.client.generate_presigned_url(
+            'get_object',
+            Params={'Bucket': self.bucket, 'Key': stored_key},
+            ExpiresIn=expires_in,
+        )
+
+
+class LocalResponseStore:
+    """Filesystem stand-in for S3: same interface, ``file://`` URLs, no expiry."""
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def put(self, key: str, body: bytes, content_type: str, content_encoding: Optional[str] = None) -> str:
+        path = self.root / key
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(body)
+        return key
+
+    def url(self, stored_key: str, expires_in: int) -> str:
+        return (self.root / stored_key).resolve().as_uri()
+
+
+def _enabled() -> bool:
+    return os.environ.get('RESPONSE_OFFLOAD', '').strip().lower() not in ('off', '0', 'false', 'no')
+
+
+def default_store():
+    """The store selected by the environment (see module docstring)."""
+    local_dir = os.environ.get('RESPONSE_OFFLOAD_DIR')
+    if local_dir:
+        return LocalResponseStore(local_dir)
+    bucket = (os.environ.get('RESPONSE_OFFLOAD_BUCKET')
+              or os.environ.get('S3_BUCKET_NAME', 'prod-gepp-platform-assets'))
+    return S3ResponseStore(bucket, os.environ.get('RESPONSE_OFFLOAD_PREFIX', DEFAULT_PREFIX))
+
+
+def response_size(response: Dict[str, Any]) -> int:
+    """Approximate size of the proxy response as Lambda serializes it.
+
+    The runtime JSON-encodes the whole response with ASCII escapes, so a Thai
+    character in a plain-text body costs six bytes, not three.
+    """
+    body = response.get('body')
+    if isinstance(body, str):
+        size = len(body) if body.isascii() else len(json.dumps(body))
+    else:
+        size = len(json.dumps(body, default=str))
+    headers = response.get('headers') or {}
+    return size + sum(len(str(k)) + len(str(v)) + 6 for k, v in headers.items()) + 100
+
+
+def offload_large_response(response: Any, store=None, threshold: Optional[int] = None) -> Any:
+    """Return *response*, or a 303 to a stored copy of it if it is too large.
+
+    Only 200 responses with a string body are considered. If storing fails the
+    original response is returned, which is no worse than before this existed.
+    """
+    if not isinstance(response, dict) or response.get('statusCode') != 200:
+        return response
+    body = response.get('body')
+    if not isinstance(body, str) or not _enabled():
+        return response
+    if threshold is None:
+        threshold = int(os.environ.get('RESPONSE_OFFLOAD_THRESHOLD_BYTES', DEFAULT_THRESHOLD_BYTES))
+    size = response_size(response)
+    if size <= threshold:
+        return response
+
+    headers = response.get('headers') or {}
+    lowered = {str(k).lower(): v for k, v in headers.items()}
+    content_type = lowered.get('content-type', 'application/json')
+    content_encoding = lowered.get('content-encoding')
+    try:
+        with request_timing.stage('offload'):
+            payload = base64.b64decode(body) if response.get('isBase64Encoded') else body.encode('utf-8')
+            suffix = '.json' if 'json' in content_type else '.bin'
+            if content_encoding == 'gzip':
+                suffix += '.gz'
+            key = f"{datetime.now(timezone.utc):%Y/%m/%d}/{uuid.uuid4().hex}{suffix}"
+            store = store or default_store()
+            ttl = int(os.environ.get('RESPONSE_OFFLOAD_URL_TTL', DEFAULT_URL_TTL_SECONDS))
+            stored_key = store.put(key, payload, content_type, content_encoding)
+            url = store.url(stored_key, ttl)
+    except Exception as exc:  # noqa: BLE001 — see docstring
+        logger.error(f"[OFFLOAD] could not store a {size}-byte response: {exc}")
+        return response
+
+    logger.info(f"[OFFLOAD] {size}-byte response stored as {stored_key}")
+    return {
+        'statusCode': 303,
+        'headers': {
+            **{k: v for k, v in headers.items() if str(k).lower() not in _BODY_HEADERS},
+            'Location': url,
+            'Content-Type': 'application/json',
+            'Cache-Control': 'no-store',
+        },
+        'body': json.dumps({
+            'success': True,
+            'offloaded': True,
+            'url': url,
+            'expires_in': ttl,
+            'size_bytes': len(payload),
+            'content_type': content_type,
+            'content_encoding': content_encoding,
+        }),
+    }
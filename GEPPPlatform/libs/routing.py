@@ -0,0 +1,171 @@
+"""Route table for the main Lambda dispatcher.
+
+The entry point used to pick a handler with a chain of `"/api/x" in path`
+checks. Every request paid for the whole scan up to its branch, and substring
+matching routed on text that merely appeared somewhere in the path — the order
+of the elifs was the only thing keeping `/api/audit-settings` out of the
+`/api/audit` branch, and `"/health" in path` answered any URL that happened to
+end in a health segment.
+
+Routes are registered against path *segments* instead and compiled once per
+container into a trie, so a lookup costs one dict hit per segment regardless of
+how many routes exist, and `/api/audit` can never match `/api/audit-settings`.
+
+Patterns are prefixes unless registered with ``exact=True``. A `{name}` segment
+matches any single segment and is captured into ``RouteMatch.params`` — which
+also means a pattern like `/api/scale-report/{token}` does not match a bare
+`/api/scale-report`, the case the old `split(...)[1]` lookups crashed on.
+
+The pattern string doubles as the route's stable key for logs and metrics:
+`GET /api/reports` is one key no matter which report id is in the URL.
+"""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Tuple
+
+
+def _segments(path: str) -> List[str]:
+    return [p for p in (path or '').split('?')[0].split('/') if p]
+
+
+@dataclass(frozen=True)
+class Route:
+    """One registered pattern and the function that serves it."""
+    pattern: str
+    handler: Callable[..., Any]
+    methods: Optional[FrozenSet[str]] = None   # None = any method
+    exact: bool = False
+    options: Dict[str, Any] = field(default_factory=dict, compare=False, hash=False)
+
+    @property
+    def key(self) -> str:
+        """Stable identifier for logs and metrics, e.g. ``POST /api/auth``."""
+        methods = ','.join(sorted(self.methods)) if self.methods else '*'
+        return f"{methods} {self.pattern}"
+
+    def allows(self, method: str) -> bool:
+        return self.methods is None or (method or '').upper() in self.methods
+
+
+@dataclass(frozen=True)
+class RouteMatch:
+    route: Route
+    params: Dict[str, str]
+
+    @property
+    def key(self) -> str:
+        return self.route.key
+
+
+class _Node:
+    __slots__ = ('children', 'param', 'param_name', 'routes')
+
+    def __init__(self):
+        self.children: Dict[str, '_Node'] = {}
+        self.param: Optional['_Node'] = None
+        self.param_name: Optional[str] = None
+        self.routes: List[Route] = []
+
+
+class RouteTable:
+    """Segment trie of routes, compiled lazily on first lookup.
+
+    Register with :meth:`add` or the :meth:`route` decorator; look up with
+    :meth:`match`. Registration after the first lookup recompiles on the next
+    one, so import order of the registering modules does not matter.
+    """
+
+    def __init__(self, name: str = ''):
+        self.name = name
+        self._routes: List[Route] = []
+        self._root: Optional[_Node] = None
+
+    # ── registration ──────────────────────────────────────────────────────
+
+    def add(self, pattern: str, handler: Callable[..., Any], methods=None,
+            exact: bool = False, **options) -> Route:
+        if methods is not None:
+            if isinstance(methods, str):
+                methods = [methods]
+            methods = frozenset(m.upper() for m in methods)
+        route = Route('/' + '/'.join(_segments(pattern)), handler, methods, exact, options)
+        for existing in self._routes:
+            if existing.pattern == route.pattern and existing.methods == route.methods:
+                raise ValueError(f"Duplicate route registered: {route.key}")
+        self._routes.append(route)
+        self._root = None
+        return route
+
+    def route(self, *patterns: str, methods=None, exact: bool = False, **options):
+        """Decorator form of :meth:`add`; several patterns may share one handler."""
+        def register(fn):
+            for pattern in patterns:
+                self.add(pattern, fn, methods=methods, exact=exact, **options)
+            return fn
+        return register
+
+    def routes(self) -> List[Route]:
+        """Every registered route, in registration order."""
+        return list(self._routes)
+
+    # ── lookup ────────────────────────────────────────────────────────────
+
+    def compile(self) -> None:
+        root = _Node()
+        for route in self._routes:
+            node = root
+            for seg in _segments(route.pattern):
+                if seg.startswith('{') and seg.endswith('}'):
+                    if node.param is None:
+                        node.param = _Node()
+                        node.param_name = seg[1:-1]
+                    elif node.param_name != seg[1:-1]:
+                        raise ValueError(
+                            f"Conflicting parameter names at {route.pattern}: "
+                            f"{{{node.param_name}}} vs {seg}"
+                        )
+                    node = node.param
+                else:
+                    node = node.children.setdefault(seg, _Node())
+            node.routes.append(route)
+        self._root = root
+
+    def match(self, path: str, method: str) -> Optional[RouteMatch]:
+        """Return the most specific route for *path* that allows *method*.
+
+        Most specific means deepest: `/api/webhooks/mailchimp/inbound` wins
+        over `/api/webhooks/mailchimp`. At equal depth a literal segment wins
+        over a `{param}` one, and a method-restricted route wins over a
+        catch-all one.
+        """
+        if self._root is None:
+            self.compile()
+        segs = _segments(path)
+        found = self._walk(self._root, segs, 0, {}, (method or '').upper())
+        if found is None:
+            return None
+        return RouteMatch(found[1], found[2])
+
+    def _walk(self, node: _Node, segs: List[str], depth: int,
+              params: Dict[str, str], method: str) -> Optional[Tuple[int, Route, Dict[str, str]]]:
+        best = None
+        for route in node.routes:
+            if route.exact and depth != len(segs):
+                continue
+            if not route.allows(method):
+                continue
+            if best is None or (best[1].methods is None and route.methods is not None):
+                best = (depth, route, dict(params))
+        if depth == len(segs):
+            return best
+
+        deeper = None
+        child = node.children.get(segs[depth])
+        if child is not None:
+            deeper = self._walk(child, segs, depth + 1, params, method)
+        if deeper is None and node.param is not None:
+            deeper = self._walk(node.param, segs, depth + 1,
+                                {**params, node.param_name: segs[depth]}, method)
+        if deeper is not None and (best is None or deeper[0] > best[0]):
+            return deeper
+        return best
@@ -0,0 +1,257 @@
+"""Result cache shared by every warm container, kept in Postgres.
+
+In-process caches (the token cache, the custom API index, the docs pages) stop
+helping the moment Lambda scales out: each new container starts empty, and a
+burst of traffic makes every one of them recompute the same report aggregates,
+organisation trees and permission sets at the same time. This cache lives in
+the database all containers already share, so the first container to compute a
+result saves the rest the work.
+
+Entries live in ``shared_result_cache`` (see migrations/…_087_create_shared_result_cache.sql),
+an UNLOGGED table: writes skip the WAL, and a crash empties it, which is exactly
+the durability a cache needs. Each row holds the key, the caller's version tag,
+the JSON-encoded value and an expiry. A read only hits when the key, the version
+tag and the expiry all agree, so callers make stale data unreachable by deriving
+the version tag from whatever the result depends on (``MAX(updated_date)``, a
+settings revision, ...) rather than by deleting rows.
+
+``get_or_compute`` adds single flight: on a miss it claims the key by writing
+a ``computing:<version>`` marker row that expires after
+``SHARED_CACHE_LOCK_WAIT_MS`` (default 10 s), in one short statement, and only
+the caller whose claim landed computes; N containers missing together run the
+computation once and the other N-1 poll for its result. No connection,
+transaction or lock is held while the value is computed — every cache
+statement checks a pooled connection out and straight back in — so a slow
+report cannot pin a second connection per request, or one per waiter, on
+Lambda's one-connection pools. A waiter that sees no result by the time the
+marker expires, or hits any database error, simply computes for itself; a
+claimant whose computation fails drops its marker so the next caller can try.
+The cache can make a request faster, never fail it.
+
+Values go through the response JSON encoder, so they come back as plain JSON
+types (``Decimal`` → float, dates → ISO strings), exactly as the API would have
+serialised them anyway.
+
+Configuration (environment):
+    SHARED_CACHE              ``off`` bypasses the cache (always compute)
+    SHARED_CACHE_LOCK_WAIT_MS longest wait for another container's result
+                              (also how long a claim stays valid)
+"""
+
+import json
+import logging
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Optional
+
+from sqlalchemy.sql import text
+
+from GEPPPlatform.libs import request_timing
+from GEPPPlatform.libs.http_response import dumps_response
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - orjson ships in the platform layer
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LOCK_WAIT_MS = 10_000
+
+# Waiters re-read at this interval, doubling up to the cap.
+POLL_INTERVAL_MS = 25
+MAX_POLL_INTERVAL_MS = 400
+
+# version_tag of a marker row: no reader asks for it, so it never hits.
+CLAIM_PREFIX = 'computing:'
+
+_MISSING = object()
+
+_READ = text("""
+    SELECT value FROM shared_result_cache
+     WHERE cache_key = :key AND version_tag = :version AND expires_at > :now
+""")
+
+_WRITE = text("""
+    INSERT INTO shared_result_cache (cache_key, version_tag, value, expires_at)
+    VALUES (:key, :version, :value, :expires_at)
+    ON CONFLICT (cache_key) DO UPDATE
+       SET version_tag = EXCLUDED.version_tag,
+           value = EXCLUDED.value,
+           expires_at = EXCLUDED.expires_at
+""")
+
+_DELETE_KEY = text("DELETE FROM shared_result_cache WHERE cache_key = :key")
+_DELETE_PREFIX = text("DELETE FROM shared_result_cache WHERE cache_key LIKE :prefix ESCAPE '\\'")
+_PURGE = text("DELETE FROM shared_result_cache WHERE expires_at <= :now")
+
+# Takes the key unless it holds this version's value or a live claim on it.
+_CLAIM = text("""
+    INSERT INTO shared_result_cache (cache_key, version_tag, value, expires_at)
+    VALUES (:key, :marker, :empty, :expires_at)
+    ON CONFLICT (cache_key) DO UPDATE
+       SET version_tag = EXCLUDED.version_tag,
+           value = EXCLUDED.value,
+           expires_at = EXCLUDED.expires_at
+     WHERE shared_result_cache.expires_at <= :now
+        OR shared_result_cache.version_tag NOT IN (:version, :marker)
+    RETURNING cache_key
+""")
+
+_RELEASE = text("DELETE FROM shared_result_cache WHERE cache_key = :key AND version_tag = :marker")
+
+
+def _encode(value: Any) -> bytes:
+    return dumps_response(value).encode('utf-8')
+
+
+def _decode(raw: Any) -> Any:
+    raw = bytes(raw)
+    return orjson.loads(raw) if orjson is not None else json.loads(raw)
+
+
+def _enabled() -> bool:
+    return os.environ.get('SHARED_CACHE', '').strip().lower() not in ('off', '0', 'false', 'no')
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+class SharedResultCache:
+    """Get-or-compute over ``shared_result_cache`` (see module docstring)."""
+
+    def __init__(self, bind=None, lock_wait_ms: Optional[int] = None):
+        self._bind = bind
+        self.lock_wait_ms = lock_wait_ms if lock_wait_ms is not None else int(
+            os.environ.get('SHARED_CACHE_LOCK_WAIT_MS', DEFAULT_LOCK_WAIT_MS))
+
+    @property
+    def bind(self):
+        # Resolved on first use: importing libs.database loads every model.
+        if self._bind is None:
+            from GEPPPlatform.libs.database import get_engine
+            self._bind = get_engine()
+        return self._bind
+
+    # ── plain get / set ───────────────────────────────────────────────────
+
+    def get(self, key: str, version: str = '', default: Any = None) -> Any:
+        """The cached value for *key* at *version*, or *default*."""
+        if not _enabled():
+            return default
+        try:
+            with request_timing.stage('shared_cache'), self.bind.connect() as conn:
+                value = self._read(conn, key, version)
+        except Exception as exc:  # noqa: BLE001 — a cache read must not fail the request
+            logger.warning(f"[SHARED_CACHE] read failed for {key}: {exc}")
+            return default
+        return default if value is _MISSING else value
+
+    def set(self, key: str, value: Any, ttl_seconds: float, version: str = '') -> None:
+        if not _enabled():
+            return
+        try:
+            with self.bind.begin() as conn:
+                self._write(conn, key, value, ttl_seconds, version)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"[SHARED_CACHE] write failed for {key}: {exc}")
+
+    def invalidate(self, key: str) -> None:
+        self._delete(_DELETE_KEY, {'key': key})
+
+    def invalidate_prefix(self, prefix: str) -> None:
+        """Drop every key starting with *prefix* (e.g. ``'reports:org:42:'``)."""
+        escaped = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        self._delete(_DELETE_PREFIX, {'prefix': escaped + '%'})
+
+    def purge_expired(self) -> None:
+        """Delete expired rows; reads ignore them already, this only reclaims space."""
+        self._delete(_PURGE, {'now': _now()})
+
+    # ── get or compute ────────────────────────────────────────────────────
+
+    def get_or_compute(self, key: str, compute: Callable[[], Any], ttl_seconds: float,
+                       version: str = '') -> Any:
+        """The cached value for *key* at *version*; on a miss, ``compute()`` it once.
+
+        Concurrent misses for the same key across containers wait for the first
+        one's result instead of recomputing it. ``compute`` runs at most once per
+        call, whatever happens to the cache.
+        """
+        if not _enabled():
+            return compute()
+
+        value = self.get(key, version, default=_MISSING)
+        if value is not _MISSING:
+            return value
+
+        deadline = time.monotonic() + self.lock_wait_ms / 1000.0
+        interval = POLL_INTERVAL_MS / 1000.0
+        while True:
+            claimed = self._claim(key, version)
+            if claimed is None:
+                # The database is unavailable.
+                return compute()
+            if claimed:
+                try:
+                    value = compute()
+                except Exception:
+                    self._delete(_RELEASE, {'key': key, 'marker': CLAIM_PREFIX + version})
+                    raise
+                self.set(key, value, ttl_seconds, version)
+                return value
+            # Someone else holds the claim, or stored the value just now.
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                logger.info(f"[SHARED_CACHE] gave up waiting for {key} after {self.lock_wait_ms} ms")
+                return compute()
+            with request_timing.stage('shared_cache'):
+                time.sleep(min(interval, remaining))
+            interval = min(interval * 2, MAX_POLL_INTERVAL_MS / 1000.0)
+            value = self.get(key, version, default=_MISSING)
+            if value is not _MISSING:
+                return value
+
+    # ── statements ────────────────────────────────────────────────────────
+
+    def _read(self, conn, key: str, version: str) -> Any:
+        row = conn.execute(_READ, {'key': key, 'version': version, 'now': _now()}).fetchone()
+        return _MISSING if row is None else _decode(row[0])
+
+    def _write(self, conn, key: str, value: Any, ttl_seconds: float, version: str) -> None:
+        conn.execute(_WRITE, {
+            'key': key,
+            'version': version,
+            'value': _encode(value),
+            'expires_at': _now() + timedelta(seconds=ttl_seconds),
+        })
+
+    def _claim(self, key: str, version: str) -> Optional[bool]:
+        """Write this caller's marker on *key*: True if it landed, None on a database error."""
+        now = _now()
+        try:
+            with request_timing.stage('shared_cache'), self.bind.begin() as conn:
+                row = conn.execute(_CLAIM, {
+                    'key': key,
+                    'version': version,
+                    'marker': CLAIM_PREFIX + version,
+                    'empty': b'',
+                    'now': now,
+                    'expires_at': now + timedelta(milliseconds=self.lock_wait_ms),
+                }).fetchone()
+        except Exception as exc:  # noqa: BLE001 — fall back to computing locally
+            logger.warning(f"[SHARED_CACHE] single flight failed for {key}: {exc}")
+            return None
+        return row is not None
+
+    def _delete(self, statement, params) -> None:
+        try:
+            with self.bind.begin() as conn:
+                conn.execute(statement, params)
+        except Exception as exc:  # noqa: BLE001
+            logger.warning(f"[SHARED_CACHE] delete failed: {exc}")
+
+
+shared_cache = SharedResultCache()
@@ -0,0 +1,276 @@
+"""Cold-start accounting and deferred loading of heavy dependencies.
+
+A Lambda cold start runs every module-level import before the first request is
+served, and a burst of traffic means a burst of cold starts. The main API used
+to import boto3, numpy, bcrypt, pgvector, psycopg2 and jwt at the top of the
+entry point whether or not the request needed them, and handler modules pulled
+in openpyxl and ReportLab the same way.
+
+Three pieces live here:
+
+  • ``lazy_module`` — a stand-in for ``import x`` that imports on first
+    attribute access. Use it for a dependency a module needs on some code paths
+    only (boto3 for an async Lambda invoke, openpyxl for an export).
+  • ``ImportProfiler`` — opt-in (``GEPP_IMPORT_PROFILE=1``) recorder of what
+    each first-time import cost inside the running container, attributed to the
+    route that triggered it, so the cold-start log line says where the time went.
+  • ``parse_importtime`` / ``handler_imports`` — the offline half, used by
+    ``scripts/cold_start_report.py`` to run ``python -X importtime`` per route
+    and show which routes pay for which dependencies.
+"""
+
+import ast
+import builtins
+import importlib
+import importlib.util
+import inspect
+import logging
+import os
+import re
+import sys
+import textwrap
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Route key of the request being served; deferred imports are charged to it.
+_COLD_START = '<cold-start>'
+_active_route = _COLD_START
+
+
+def set_active_route(route_key: Optional[str]) -> None:
+    global _active_route
+    _active_route = route_key or _COLD_START
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Deferred imports
+# ──────────────────────────────────────────────────────────────────────────────
+
+class LazyModule:
+    """Module proxy that performs the real import on first attribute access.
+
+    Attribute reads, writes and deletes are forwarded, so ``mock.patch.object``
+    and ``module.client(...)`` both behave as they would on the real module.
+    """
+
+    def __init__(self, name: str):
+        object.__setattr__(self, '_lazy_name', name)
+        object.__setattr__(self, '_lazy_module', None)
+        object.__setattr__(self, '_lazy_lock', threading.Lock())
+
+    def _load(self):
+        module = object.__getattribute__(self, '_lazy_module')
+        if module is not None:
+            return module
+        with object.__getattribute__(self, '_lazy_lock'):
+            module = object.__getattribute__(self, '_lazy_module')
+            if module is None:
+                name = object.__getattribute__(self, '_lazy_name')
+                started = time.perf_counter()
+                module = importlib.import_module(name)
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                object.__setattr__(self, '_lazy_module', module)
+                if elapsed_ms >= 1:
+                    logger.info(f"[STARTUP] deferred import {name} took {elapsed_ms:.1f}ms (route={_active_route})")
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __delattr__(self, attr):
+        delattr(self._load(), attr)
+
+    def __repr__(self):
+        name = object.__getattribute__(self, '_lazy_name')
+        loaded = object.__getattribute__(self, '_lazy_module') is not None
+        return f"<lazy module {name!r} ({'loaded' if loaded else 'not loaded'})>"
+
+
+def lazy_module(name: str):
+    """Return *name* if it is already imported, else a proxy that imports it on use.
+
+    Meant for heavy modules that only an occasional code path touches. boto3,
+    for instance, costs hundreds of milliseconds to import, yet the services
+    only call it to fire an async Lambda invoke. A module-level
+    ``boto3 = lazy_module('boto3')`` keeps that import off the cold start while
+    call sites keep reading ``boto3.client(...)``.
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# In-container import profiling
+# ──────────────────────────────────────────────────────────────────────────────
+
+@dataclass
+class ImportRecord:
+    name: str
+    self_us: int
+    cumulative_us: int
+    depth: int
+    route: str = _COLD_START
+
+
+class ImportProfiler:
+    """Times first-time imports by wrapping ``builtins.__import__``.
+
+    Only imports that actually load a new module are recorded; the fast path
+    for an already-loaded module costs one dict lookup on top of the builtin.
+    Self time excludes nested imports, the same split ``-X importtime`` reports.
+    """
+
+    def __init__(self):
+        self.records: List[ImportRecord] = []
+        self._original: Optional[Callable] = None
+        self._stack: List[int] = []   # accumulated child time per open frame
+        self._lock = threading.RLock()
+
+    @property
+    def active(self) -> bool:
+        return self._original is not None
+
+    def install(self) -> 'ImportProfiler':
+        if self._original is None:
+            self._original = builtins.__import__
+            builtins.__import__ = self._import
+        return self
+
+    def uninstall(self) -> None:
+        if self._original is not None:
+            builtins.__import__ = self._original
+            self._original = None
+
+    def _import(self, name, globals=None, locals=None, fromlist=(), level=0):
+        original = self._original
+        if level == 0 and name in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+        if level:
+            package = (globals or {}).get('__package__') or ''
+            try:
+                resolved = importlib.util.resolve_name('.' * level + name, package)
+            except (ImportError, ValueError):
+                resolved = name
+        else:
+            resolved = name
+        if resolved in sys.modules:
+            return original(name, globals, locals, fromlist, level)
+
+        with self._lock:
+            self._stack.append(0)
+            started = time.perf_counter_ns()
+            try:
+                return original(name, globals, locals, fromlist, level)
+            finally:
+                cumulative = (time.perf_counter_ns() - started) // 1000
+                children = self._stack.pop()
+                if self._stack:
+                    self._stack[-1] += cumulative
+                if resolved in sys.modules:
+                    self.records.append(ImportRecord(
+                        resolved, cumulative - children, cumulative,
+                        len(self._stack), _active_route,
+                    ))
+
+    def slowest(self, limit: int = 15) -> List[ImportRecord]:
+        return sorted(self.records, key=lambda r: r.cumulative_us, reverse=True)[:limit]
+
+    def by_route(self) -> Dict[str, int]:
+        """Top-level import time (µs) charged to each route, cold start included."""
+        totals: Dict[str, int] = {}
+        for record in self.records:
+            if record.depth == 0:
+                totals[record.route] = totals.get(record.route, 0) + record.cumulative_us
+        return totals
+
+
+profiler = ImportProfiler()
+_process_started = time.perf_counter()
+_init_ms: Optional[float] = None
+
+
+def begin() -> None:
+    """Call first thing in an entry module. Starts the profiler when enabled."""
+    if os.environ.get('GEPP_IMPORT_PROFILE', '').lower() in ('1', 'true', 'yes'):
+        profiler.install()
+
+
+def end() -> None:
+    """Call after an entry module's imports; fixes the cold-start init time."""
+    global _init_ms
+    if _init_ms is None:
+        _init_ms = (time.perf_counter() - _process_started) * 1000
+
+
+_reported = False
+
+
+def log_cold_start(limit: int = 15) -> None:
+    """Emit the cold-start summary once per container, after the first request."""
+    global _reported
+    if _reported:
+        return
+    _reported = True
+    line = {"event": "cold_start", "init_ms": round(_init_ms or 0.0, 1)}
+    if profiler.active:
+        line["slowest_imports"] = [
+            {"module": r.name, "cumulative_ms": round(r.cumulative_us / 1000, 1),
+             "self_ms": round(r.self_us / 1000, 1), "route": r.route}
+            for r in profiler.slowest(limit)
+        ]
+        line["import_ms_by_route"] = {
+            route: round(us / 1000, 1) for route, us in profiler.by_route().items()
+        }
+    logger.info(f"[STARTUP] {line}")
+
+
+# ──────────────────────────────────────────────────────────────────────────────
+# Offline report helpers (scripts/cold_start_report.py)
+# ──────────────────────────────────────────────────────────────────────────────
+
+_IMPORTTIME_LINE = re.compile(r'^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$')
+
+
+def parse_importtime(stderr: str) -> List[ImportRecord]:
+    """Parse ``python -X importtime`` output into records (header line skipped)."""
+    records = []
+    for line in stderr.splitlines():
+        m = _IMPORTTIME_LINE.match(line)
+        if m:
+            depth = max(0, (len(m.group(3)) - 1) // 2)
+            records.append(ImportRecord(m.group(4), int(m.group(1)), int(m.group(2)), depth))
+    return records
+
+
+def handler_imports(fn: Callable[..., Any]) -> List[str]:
+    """Absolute module names imported inside *fn*'s body, in source order.
+
+    Route adapters import their service modules lazily, so reading the imports
+    out of the function is how the report learns what a route will load.
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(fn))
+    except (OSError, TypeError):
+        return []
+    modules = []
+    for node in ast.walk(ast.parse(source)):
+        if isinstance(node, ast.Import):
+            modules.extend(alias.name for alias in node.names)
+        elif isinstance(node, ast.ImportFrom) and node.module and not node.level:
+            modules.append(node.module)
+    return list(dict.fromkeys(modules))
+
+
+def top_level_packages(records: Iterable[ImportRecord]) -> Dict[str, int]:
+    """Self time (µs) summed per top-level package, e.g. all of ``botocore.*``."""
+    totals: Dict[str, int] = {}
+    for record in records:
+        root = record.name.split('.')[0]
+        totals[root] = totals.get(root, 0) + record.self_us
+    return totals
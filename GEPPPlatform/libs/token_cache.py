@@ -0,0 +1,147 @@
+"""In-process cache of verified bearer tokens and integration secrets.
+
+Every authenticated request used to re-verify its JWT from scratch, and an
+integration token additionally cost a ``UserLocation`` lookup for the user's
+signing secret before any business logic ran. Integration clients send bursts
+of calls with the same token, so a warm container was repeating identical work
+on every one of them.
+
+``VerifiedTokenCache`` remembers, per token (keyed by its SHA-256, never the
+token itself), the claims a successful verification produced and when they stop
+being valid:
+
+  • a regular token — at its own ``exp``; nothing on the server can revoke it
+    earlier, so caching it until then changes nothing;
+  • an integration token — at ``exp`` or after ``AUTH_TOKEN_CACHE_TTL`` seconds
+    (default 60), whichever is first, because its validity also depends on the
+    user's secret and ``is_active`` flag in the database.
+
+The per-user integration secret is cached under the same TTL, so a fresh token
+for a known user skips the lookup too. Rotating a secret, deactivating or
+deleting a user drops that user's entries in this container straight away;
+other warm containers catch up within the TTL. Logging out only forgets the
+token presented: JWTs are stateless, so it would verify again anyway. Only
+successful verifications are cached — a bad token is re-checked (and
+rejected) every time.
+"""
+
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+DEFAULT_MAX_ENTRIES = 2048
+DEFAULT_TTL_SECONDS = 60
+
+
+def token_key(token: str) -> str:
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+
+def secret_digest(secret: str) -> str:
+    return hashlib.sha256(secret.encode('utf-8')).hexdigest()
+
+
+class VerifiedTokenCache:
+    """Bounded LRU of verified claims, plus a TTL cache of integration secrets."""
+
+    def __init__(self, max_entries: Optional[int] = None, ttl_seconds: Optional[float] = None):
+        self.max_entries = max_entries or int(os.environ.get('AUTH_TOKEN_CACHE_SIZE', DEFAULT_MAX_ENTRIES))
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.environ.get('AUTH_TOKEN_CACHE_TTL', DEFAULT_TTL_SECONDS))
+        # token key -> (claims, valid_until, user_id, secret digest, integration)
+        self._tokens: 'OrderedDict[str, Tuple[Dict[str, Any], float, Any, str, bool]]' = OrderedDict()
+        # str(user id) -> (secret, valid_until)
+        self._secrets: Dict[Any, Tuple[str, float]] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    # ── verified tokens ───────────────────────────────────────────────────
+
+    def get(self, token: str, jwt_secret: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """Claims for *token* if a verification is cached and still valid.
+
+        A regular token only counts if it was verified against *jwt_secret* —
+        the global key may differ between the caller and the cached entry.
+        """
+        key = token_key(token)
+        now = time.time()
+        with self._lock:
+            entry = self._tokens.get(key)
+            if entry is not None:
+                claims, valid_until, _, digest, integration = entry
+                wrong_key = (not integration and jwt_secret is not None
+                             and digest != secret_digest(jwt_secret))
+                if now >= valid_until or wrong_key:
+                    del self._tokens[key]
+                    entry = None
+                else:
+                    self._tokens.move_to_end(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        return dict(claims)
+
+    def put(self, token: str, claims: Dict[str, Any], secret: str, integration: bool = False) -> None:
+        now = time.time()
+        exp = claims.get('exp')
+        valid_until = float(exp) if exp else now + self.ttl_seconds
+        if integration:
+            valid_until = min(valid_until, now + self.ttl_seconds)
+        if valid_until <= now:
+            return
+        with self._lock:
+            key = token_key(token)
+            self._tokens[key] = (dict(claims), valid_until, claims.get('user_id'),
+                                 secret_digest(secret), integration)
+            self._tokens.move_to_end(key)
+            while len(self._tokens) > self.max_entries:
+                self._tokens.popitem(last=False)
+
+    def discard(self, token: str) -> None:
+        with self._lock:
+            self._tokens.pop(token_key(token), None)
+
+    # ── integration secrets ───────────────────────────────────────────────
+
+    def get_secret(self, user_id: Any) -> Optional[str]:
+        with self._lock:
+            entry = self._secrets.get(str(user_id))
+            if entry is None:
+                return None
+            if time.time() >= entry[1]:
+                del self._secrets[str(user_id)]
+                return None
+            return entry[0]
+
+    def put_secret(self, user_id: Any, secret: str) -> None:
+        with self._lock:
+            self._secrets.pop(str(user_id), None)
+            self._secrets[str(user_id)] = (secret, time.time() + self.ttl_seconds)
+            while len(self._secrets) > self.max_entries:
+                # Insertion order is expiry order: every entry gets the same TTL.
+                del self._secrets[next(iter(self._secrets))]
+
+    # ── invalidation ──────────────────────────────────────────────────────
+
+    def invalidate_user(self, user_id: Any) -> None:
+        """Forget the secret and every cached token of *user_id*."""
+        with self._lock:
+            self._secrets.pop(str(user_id), None)
+            for key in [k for k, entry in self._tokens.items() if str(entry[2]) == str(user_id)]:
+                del self._tokens[key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._tokens.clear()
+            self._secrets.clear()
+
+    def __len__(self) -> int:
+        return len(self._tokens)
+
+
+verified_tokens = VerifiedTokenCache()
@@ -0,0 +1,546 @@
+"""Daily rollup of transaction records, kept in Postgres.
+
+Report dashboards (material and origin pickers, the materials report and the
+comparison report's months) used to rescan every transaction record of the
+org on each load, only to end up with a few distinct ids or sums.
+``transaction_daily_rollup`` (migrations 089, 090) holds one row per org,
+local day and every attribute the report filters and breakdowns look at:
+
+    origin_id, location_tag_id, tenant_id   visibility and origin filters
+    destination_id                          active-setup and destination filters
+    material_id, category_id,               material filters and breakdowns
+    main_material_id
+    transaction_status, record_status       rejected rows are kept, not dropped
+    is_internal_transfer                    movement legs are kept, not dropped
+
+with ``record_count`` and the sums of ``origin_weight_kg`` (``weight_kg``),
+``origin_quantity`` and ``total_amount``. Deleted records and transactions are
+left out. GHG is not stored: it is ``weight_kg * materials.calc_ghg``, joined
+at read time like every other GHG figure, so an edited factor never leaves a
+stale sum behind.
+
+Days are calendar days in ``ROLLUP_TIMEZONE`` (default Asia/Bangkok, the zone
+the report handlers turn date-only filters into). A query can be answered from
+the rollup only when its date bounds are whole days in that zone —
+``day_bounds`` returns them, or None when a bound falls inside a day and the
+caller must read the raw records.
+
+Maintenance. ``track(factory)`` (done for every app session in
+``libs/database``) watches the unit of work: any flushed insert, edit or
+delete of a ``Transaction`` or ``TransactionRecord`` that touches a rolled-up
+column, and any ORM bulk ``query(...).update()``/``delete()`` on them, marks
+the (org, day) buckets it affects. Just before the outermost commit those
+buckets are recomputed from the base tables, in the same transaction, under a
+per-org advisory lock so concurrent writers cannot interleave. Writes that
+bypass the ORM (raw SQL) must call ``touch(db, transaction_ids)`` before
+committing. ``rebuild(db, org_id)`` recomputes a whole org; the backfill
+command is ``scripts/rebuild_transaction_rollup.py``.
+
+``transaction_rollup_state`` marks the orgs whose rollup is complete and the
+zone it was built in; readers use the table only for those, and a failed
+refresh drops the org's state row, so it is read from the raw records until
+rebuilt — never wrong, only slower. ``TRANSACTION_ROLLUP=off`` disables reads.
+"""
+
+import logging
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import (
+    BigInteger, Boolean, Date, DateTime, Integer, Numeric, String, Text,
+    and_, cast, column, false, func, inspect as sa_inspect, or_, select, table,
+)
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import ColumnElement
+from sqlalchemy.sql.visitors import InternalTraversal
+
+from .id_filters import in_ids
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIMEZONE = 'Asia/Bangkok'
+
+TRANSACTION_DAILY_ROLLUP = table(
+    'transaction_daily_rollup',
+    column('organization_id', BigInteger),
+    column('day', Date),
+    column('origin_id', BigInteger),
+    column('location_tag_id', BigInteger),
+    column('tenant_id', BigInteger),
+    column('destination_id', BigInteger),
+    column('material_id', BigInteger),
+    column('category_id', BigInteger),
+    column('main_material_id', BigInteger),
+    column('transaction_status', String),
+    column('record_status', String),
+    column('is_internal_transfer', Boolean),
+    column('record_count', Integer),
+    column('weight_kg', Numeric),
+    column('quantity', Numeric),
+    column('amount', Numeric),
+)
+
+TRANSACTION_ROLLUP_STATE = table(
+    'transaction_rollup_state',
+    column('organization_id', BigInteger),
+    column('timezone', Text),
+    column('built_at', DateTime(timezone=True)),
+)
+
+# Columns whose change moves a record between buckets or changes its sums.
+RECORD_FIELDS = frozenset({
+    'created_transaction_id', 'transaction_date', 'deleted_date', 'status', 'material_id',
+    'category_id', 'main_material_id', 'destination_id', 'origin_weight_kg', 'origin_quantity',
+    'total_amount',
+})
+TRANSACTION_FIELDS = frozenset({
+    'organization_id', 'origin_id', 'location_tag_id', 'tenant_id', 'status', 'deleted_date',
+    'is_internal_transfer',
+})
+
+_PENDING = 'transaction_rollup_pending'
+_LAST_MICROSECOND = time(23, 59, 59, 999999)
+
+
+def enabled() -> bool:
+    return os.environ.get('TRANSACTION_ROLLUP', '').lower() != 'off'
+
+
+def timezone_name() -> str:
+    return os.environ.get('ROLLUP_TIMEZONE', DEFAULT_TIMEZONE)
+
+
+def _zone() -> ZoneInfo:
+    return ZoneInfo(timezone_name())
+
+
+# ── Days ──────────────────────────────────────────────────────────────────────
+
+class LocalDay(ColumnElement):
+    """The calendar day in *zone* of a timestamp column.
+
+    ``transaction_records.transaction_date`` is ``TIMESTAMP WITH TIME ZONE``
+    in the database (migration 052) although the model declares a plain
+    ``DateTime``: Postgres converts the stored instant with a single
+    ``AT TIME ZONE``. Converting it from 'UTC' first, as for a naive column,
+    would shift every row by twice the offset.
+    """
+
+    __visit_name__ = 'rollup_local_day'
+    inherit_cache = True
+    type = Date()
+
+    _traverse_internals = [
+        ('column', InternalTraversal.dp_clauseelement),
+        ('zone', InternalTraversal.dp_string),
+    ]
+
+    def __init__(self, column_, zone: str):
+        self.column = column_
+        self.zone = zone
+
+
+@compiles(LocalDay, 'postgresql')
+def _compile_local_day_pg(element, compiler, **kw):
+    return "CAST(timezone(%s, %s) AS DATE)" % (
+        compiler.render_literal_value(element.zone, String()), compiler.process(element.column, **kw))
+
+
+@compiles(LocalDay)
+def _compile_local_day(element, compiler, **kw):
+    # SQLite (tests): the zone's offset at a fixed instant, so exact only for
+    # zones without daylight saving — the default one has none.
+    offset = ZoneInfo(element.zone).utcoffset(datetime(2000, 1, 1))
+    minutes = int(offset.total_seconds() // 60)
+    return "date(%s, '%+d minutes')" % (compiler.process(element.column, **kw), minutes)
+
+
+def local_day(value: Optional[datetime]) -> Optional[date]:
+    """Python twin of :class:`LocalDay` (a naive *value* is taken as UTC)."""
+    if value is None:
+        return None
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.astimezone(_zone()).date()
+
+
+def _day_start(day: date) -> datetime:
+    """UTC instant (aware, so it binds as ``timestamptz``) at which *day* starts in ``ROLLUP_TIMEZONE``."""
+    return datetime.combine(day, time(0), tzinfo=_zone()).astimezone(timezone.utc)
+
+
+def _filter_instant(value: Any) -> Optional[datetime]:
+    """A report date filter as the naive UTC instant Postgres compares it as.
+
+    The column is ``timestamptz``, so an offset in a string or an aware
+    datetime is honoured; values without one are read as UTC, the session
+    time zone.
+    """
+    if isinstance(value, datetime):
+        parsed = value
+    elif isinstance(value, date):
+        parsed = datetime.combine(value, time(0))
+    else:
+        try:
+            parsed = datetime.fromisoformat(str(value).strip().replace('Z', '+00:00'))
+        except ValueError:
+            return None
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def day_bounds(date_from: Any = None, date_to: Any = None) -> Optional[Tuple[Optional[date], Optional[date]]]:
+    """(first day, last day) selecting exactly ``date_from <= transaction_date <= date_to``.
+
+    None when a bound is not a whole-day boundary in ``ROLLUP_TIMEZONE`` (or
+    cannot be parsed): only the raw records can answer that query. A missing
+    bound stays None.
+    """
+    zone = _zone()
+    bounds = []
+    for value, boundary in ((date_from, time(0)), (date_to, _LAST_MICROSECOND)):
+        if value is None or value == '':
+            bounds.append(None)
+            continue
+        instant = _filter_instant(value)
+        if instant is None:
+            return None
+        local = instant.replace(tzinfo=timezone.utc).astimezone(zone)
+        if local.time() != boundary:
+            return None
+        bounds.append(local.date())
+    return bounds[0], bounds[1]
+
+
+def day_clause(column_, day_from: Optional[date], day_to: Optional[date]):
+    """Rollup ``day`` column between two :func:`day_bounds` days (open ends allowed)."""
+    conds = []
+    if day_from is not None:
+        conds.append(column_ >= day_from)
+    if day_to is not None:
+        conds.append(column_ <= day_to)
+    return and_(*conds) if conds else None
+
+
+def _ranges(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Consecutive runs of *days* as (first, last) pairs."""
+    runs: List[Tuple[date, date]] = []
+    for day in sorted(days):
+        if runs and day == runs[-1][1] + timedelta(days=1):
+            runs[-1] = (runs[-1][0], day)
+        else:
+            runs.append((day, day))
+    return runs
+
+
+# ── Building ──────────────────────────────────────────────────────────────────
+
+def aggregate(organization_id: Any, days: Optional[Iterable[Optional[date]]] = None):
+    """The rollup rows of *organization_id* (only *days*, if given) computed from the base tables."""
+    from ..models.transactions.transactions import Transaction
+    from ..models.transactions.transaction_records import TransactionRecord
+
+    keys = [
+        ('day', LocalDay(TransactionRecord.transaction_date, timezone_name())),
+        ('origin_id', Transaction.origin_id),
+        ('location_tag_id', Transaction.location_tag_id),
+        ('tenant_id', Transaction.tenant_id),
+        ('destination_id', TransactionRecord.destination_id),
+        ('material_id', TransactionRecord.material_id),
+        ('category_id', TransactionRecord.category_id),
+        ('main_material_id', TransactionRecord.main_material_id),
+        ('transaction_status', cast(Transaction.status, String)),
+        ('record_status', TransactionRecord.status),
+        ('is_internal_transfer', func.coalesce(Transaction.is_internal_transfer, false())),
+    ]
+    query = select(
+        Transaction.organization_id.label('organization_id'),
+        *(expr.label(name) for name, expr in keys),
+        func.count().label('record_count'),
+        func.coalesce(func.sum(TransactionRecord.origin_weight_kg), 0).label('weight_kg'),
+        func.coalesce(func.sum(TransactionRecord.origin_quantity), 0).label('quantity'),
+        func.coalesce(func.sum(TransactionRecord.total_amount), 0).label('amount'),
+    ).select_from(TransactionRecord).join(
+        Transaction, TransactionRecord.created_transaction_id == Transaction.id,
+    ).where(
+        Transaction.organization_id == organization_id,
+        Transaction.deleted_date.is_(None),
+        TransactionRecord.deleted_date.is_(None),
+    )
+    if days is not None:
+        days = set(days)
+        conds = [and_(TransactionRecord.transaction_date >= _day_start(first),
+                      TransactionRecord.transaction_date < _day_start(last + timedelta(days=1)))
+                 for first, last in _ranges(d for d in days if d is not None)]
+        if None in days:
+            conds.append(TransactionRecord.transaction_date.is_(None))
+        query = query.where(or_(*conds) if conds else false())
+    return query.group_by(Transaction.organization_id, *(expr for _, expr in keys))
+
+
+def _lock(db_session, organization_id: Any) -> None:
+    bind = db_session.connection(bind_arguments={'clause': TRANSACTION_DAILY_ROLLUP.insert()})
+    if bind.dialect.name == 'postgresql':
+        # Rebuilds and commit-time refreshes of one org must not interleave.
+        bind.exec_driver_sql(
+            "SELECT pg_advisory_xact_lock(hashtext('transaction_rollup:' || %(org)s))",
+            {'org': str(organization_id)})
+
+
+def _insert(db_session, query) -> int:
+    names = [c.name for c in query.selected_columns]
+    result = db_session.execute(TRANSACTION_DAILY_ROLLUP.insert().from_select(names, query))
+    return max(result.rowcount or 0, 0)
+
+
+def _bucket_clause(days: Iterable[Optional[date]]):
+    days = set(days)
+    dated = sorted(d for d in days if d is not None)
+    conds = [TRANSACTION_DAILY_ROLLUP.c.day.in_(dated)] if dated else []
+    if None in days:
+        conds.append(TRANSACTION_DAILY_ROLLUP.c.day.is_(None))
+    return or_(*conds) if conds else false()
+
+
+def rebuild(db_session, organization_id: Any) -> int:
+    """Replace *organization_id*'s rollup with one computed from its records.
+
+    Never raises: the rebuild runs in a savepoint and a failure leaves the
+    previous rows and state. Returns the rows written.
+    """
+    try:
+        with db_session.begin_nested():
+            _lock(db_session, organization_id)
+            db_session.execute(TRANSACTION_DAILY_ROLLUP.delete().where(
+                TRANSACTION_DAILY_ROLLUP.c.organization_id == organization_id))
+            db_session.execute(TRANSACTION_ROLLUP_STATE.delete().where(
+                TRANSACTION_ROLLUP_STATE.c.organization_id == organization_id))
+            written = _insert(db_session, aggregate(organization_id))
+            db_session.execute(TRANSACTION_ROLLUP_STATE.insert().values(
+                organization_id=organization_id,
+                timezone=timezone_name(),
+                built_at=datetime.now(timezone.utc),
+            ))
+    except Exception as exc:
+        logger.warning("transaction_rollup.rebuild failed for org %s (non-fatal): %s", organization_id, exc)
+        return 0
+    return written
+
+
+def refresh(db_session, organization_id: Any, days: Iterable[Optional[date]]) -> int:
+    """Recompute *organization_id*'s buckets for *days* (None: records without a date).
+
+    Orgs that were never built are skipped — readers do not use them yet. On
+    failure the org's state row is dropped so readers fall back to the raw
+    records until the next rebuild. Returns the rows written.
+    """
+    days = set(days)
+    if not days:
+        return 0
+    try:
+        with db_session.begin_nested():
+            _lock(db_session, organization_id)
+            built = db_session.execute(
+                select(TRANSACTION_ROLLUP_STATE.c.timezone)
+                .where(TRANSACTION_ROLLUP_STATE.c.organization_id == organization_id)
+            ).first()
+            if built is None:
+                return 0
+            db_session.execute(TRANSACTION_DAILY_ROLLUP.delete().where(
+                TRANSACTION_DAILY_ROLLUP.c.organization_id == organization_id, _bucket_clause(days)))
+            return _insert(db_session, aggregate(organization_id, days))
+    except Exception as exc:
+        logger.warning("transaction_rollup.refresh failed for org %s, marking it stale: %s", organization_id, exc)
+    try:
+        with db_session.begin_nested():
+            db_session.execute(TRANSACTION_ROLLUP_STATE.delete().where(
+                TRANSACTION_ROLLUP_STATE.c.organization_id == organization_id))
+    except Exception as exc:
+        logger.debug("transaction_rollup state not dropped for org %s: %s", organization_id, exc)
+    return 0
+
+
+def is_current(db_session, organization_id: Any) -> bool:
+    """Whether *organization_id*'s rollup is complete and bucketed in the configured zone.
+
+    Checked on every read (one primary-key lookup): another container may
+    have dropped the state after a failed refresh.
+    """
+    try:
+        # A savepoint, so a missing table does not abort the caller's transaction.
+        with db_session.begin_nested():
+            row = db_session.execute(
+                select(TRANSACTION_ROLLUP_STATE.c.timezone)
+                .where(TRANSACTION_ROLLUP_STATE.c.organization_id == organization_id)
+            ).first()
+    except Exception as exc:
+        logger.debug("transaction_rollup state unavailable for org %s: %s", organization_id, exc)
+        return False
+    return row is not None and row[0] == timezone_name()
+
+
+# ── Maintenance ───────────────────────────────────────────────────────────────
+
+def _pending(session) -> Dict[str, Any]:
+    pending = session.info.get(_PENDING)
+    if pending is None:
+        pending = session.info[_PENDING] = {
+            'objects': [],          # flushed instances whose transaction id is read at commit
+            'transactions': set(),  # transaction ids whose records' buckets are refreshed
+            'dates': set(),         # (transaction id, timestamp) a record was in before the change
+            'orgs': {},             # transaction id -> organizations it belonged to before
+        }
+    return pending
+
+
+def touch(session, transaction_ids: Iterable[Any]) -> None:
+    """Refresh the buckets of these transactions' records at the next commit.
+
+    For writes the ORM does not see. Call before the change when it moves
+    records to another day or org, so their old buckets are refreshed too.
+    """
+    from ..models.transactions.transactions import Transaction
+    from ..models.transactions.transaction_records import TransactionRecord
+
+    ids = {int(tid) for tid in transaction_ids if tid is not None}
+    if not ids:
+        return
+    pending = _pending(session)
+    pending['transactions'] |= ids
+    for tid, org, when in session.execute(
+        select(Transaction.id, Transaction.organization_id, TransactionRecord.transaction_date)
+        .select_from(Transaction)
+        .outerjoin(TransactionRecord, TransactionRecord.created_transaction_id == Transaction.id)
+        .where(in_ids(Transaction.id, ids))
+    ):
+        pending['orgs'].setdefault(tid, set()).add(org)
+        pending['dates'].add((tid, when))
+
+
+def _changed(state, fields) -> bool:
+    return any(state.attrs[name].history.has_changes() for name in fields)
+
+
+def _before_flush(session, flush_context, instances) -> None:
+    from ..models.transactions.transactions import Transaction
+    from ..models.transactions.transaction_records import TransactionRecord
+
+    pending = None
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, (Transaction, TransactionRecord)):
+            continue
+        state = sa_inspect(obj)
+        fields = RECORD_FIELDS if isinstance(obj, TransactionRecord) else TRANSACTION_FIELDS
+        if state.persistent and obj not in session.deleted and not _changed(state, fields):
+            continue
+        pending = pending or _pending(session)
+        pending['objects'].append(obj)
+        if isinstance(obj, Transaction):
+            history = state.attrs.organization_id.history
+            if obj.id is not None:
+                pending['orgs'].setdefault(obj.id, set()).update(
+                    {obj.organization_id, *(history.deleted or ())})
+            continue
+        owner = state.attrs.created_transaction_id.history
+        when = state.attrs.transaction_date.history
+        for tid in {obj.created_transaction_id, *(owner.deleted or ())}:
+            if tid is None:
+                continue
+            for old in {obj.transaction_date, *(when.deleted or ())}:
+                pending['dates'].add((tid, old))
+
+
+def _before_bulk(orm_execute_state) -> None:
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    if mapper is None:
+        return
+    from ..models.transactions.transactions import Transaction
+    from ..models.transactions.transaction_records import TransactionRecord
+
+    model = mapper.class_
+    if model is not Transaction and model is not TransactionRecord:
+        return
+    statement = orm_execute_state.statement
+    values = getattr(statement, '_values', None)
+    fields = RECORD_FIELDS if model is TransactionRecord else TRANSACTION_FIELDS
+    if orm_execute_state.is_update and values and not (
+            {str(getattr(key, 'key', key)) for key in values} & fields):
+        return
+    owner = TransactionRecord.created_transaction_id if model is TransactionRecord else Transaction.id
+    query = select(owner).select_from(model)
+    if statement.whereclause is not None:
+        query = query.where(statement.whereclause)
+    # touch() records where the rows are now, before the statement moves them.
+    touch(orm_execute_state.session, orm_execute_state.session.execute(query).scalars())
+
+
+def _buckets(session, pending) -> Dict[Any, Set[Optional[date]]]:
+    from ..models.transactions.transactions import Transaction
+    from ..models.transactions.transaction_records import TransactionRecord
+
+    tx_ids = set(pending['transactions'])
+    tx_ids.update(tid for tid, _ in pending['dates'])
+    for obj in pending['objects']:
+        state = sa_inspect(obj)
+        if state.deleted or state.was_deleted or state.key is None:
+            continue
+        tid = state.identity[0] if isinstance(obj, Transaction) else obj.created_transaction_id
+        if tid is not None:
+            tx_ids.add(tid)
+    if not tx_ids:
+        return {}
+
+    orgs: Dict[int, Set[Any]] = {tid: set(found) for tid, found in pending['orgs'].items()}
+    days: Dict[int, Set[Optional[date]]] = {}
+    for tid, when in pending['dates']:
+        days.setdefault(tid, set()).add(local_day(when))
+    for tid, org, record_id, when in session.execute(
+        select(Transaction.id, Transaction.organization_id, TransactionRecord.id,
+               TransactionRecord.transaction_date)
+        .select_from(Transaction)
+        .outerjoin(TransactionRecord, TransactionRecord.created_transaction_id == Transaction.id)
+        .where(in_ids(Transaction.id, tx_ids))
+    ):
+        orgs.setdefault(tid, set()).add(org)
+        if record_id is not None:
+            days.setdefault(tid, set()).add(local_day(when))
+
+    buckets: Dict[Any, Set[Optional[date]]] = {}
+    for tid, tx_days in days.items():
+        for org in orgs.get(tid, ()):
+            if org is not None:
+                buckets.setdefault(org, set()).update(tx_days)
+    return buckets
+
+
+def _before_commit(session) -> None:
+    if session.in_nested_transaction():
+        return
+    # Flush first: the commit's own flush would come after this hook.
+    session.flush()
+    pending = session.info.pop(_PENDING, None)
+    if not pending:
+        return
+    for org, days in _buckets(session, pending).items():
+        refresh(session, org, days)
+
+
+def _discard(session, previous_transaction) -> None:
+    # Only a rollback of the whole transaction; savepoint rollbacks keep the marks.
+    if previous_transaction.parent is None:
+        session.info.pop(_PENDING, None)
+
+
+def track(target) -> None:
+    """Keep the rollup current for sessions of *target* (a sessionmaker or Session)."""
+    from sqlalchemy import event
+
+    event.listen(target, 'before_flush', _before_flush)
+    event.listen(target, 'do_orm_execute', _before_bulk)
+    event.listen(target, 'before_commit', _before_commit)
+    event.listen(target, 'after_soft_rollback', _discard)
@@ -7,7 +7,7 @@ import string
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional, List
 from sqlalchemy.orm import Session, joinedload
-from sqlalchemy import func, or_
+from sqlalchemy import BigInteger, DateTime, String, Text, column, func, or_, table
 import bcrypt
 
 from GEPPPlatform.models.users.user_location import UserLocation
@@ -30,6 +30,17 @@ from GEPPPlatform.exceptions import (
     ValidationException,
     ConflictException,
 )
+from GEPPPlatform.libs.bulk_write import bulk_insert
+
+# iot_debug_logs has no ORM model; the columns the device ingest writes.
+_IOT_DEBUG_LOGS = table(
+    'iot_debug_logs',
+    column('iot_device_id', BigInteger),
+    column('captured_at', DateTime(timezone=True)),
+    column('level', String),
+    column('tag', String),
+    column('message', Text),
+)
 
 
 class AdminService:
@@ -1476,7 +1487,8 @@ class AdminService:
         if not until_raw:
             return {'accepted': 0, 'reason': 'mode_off'}
 
-        accepted = 0
+        rows = []
+        received_at = datetime.now(timezone.utc)
         for e in entries[:500]:  # hard cap per batch
             if not isinstance(e, dict):
                 continue
@@ -1486,20 +1498,15 @@ class AdminService:
             msg = (e.get('msg') or '')
             if not msg:
                 continue
-            ts = e.get('ts')
-            tag = e.get('tag')
-            self.db_session.execute(_t(
-                "INSERT INTO iot_debug_logs "
-                "(iot_device_id, captured_at, level, tag, message) "
-                "VALUES (:device_id, COALESCE(CAST(:ts AS timestamptz), NOW()), :level, :tag, :msg)"
-            ), {
-                'device_id': device_id,
-                'ts': ts,
+            rows.append({
+                'iot_device_id': device_id,
+                # Postgres parses the device's ISO timestamp on the way in.
+                'captured_at': e.get('ts') or received_at,
                 'level': level,
-                'tag': tag,
-                'msg': msg,
+                'tag': e.get('tag'),
+                'message': msg,
             })
-            accepted += 1
+        accepted = bulk_insert(self.db_session, _IOT_DEBUG_LOGS, rows)
         self.db_session.commit()
         return {'accepted': accepted}
 
@@ -1668,7 +1675,7 @@ class AdminService:
         to override status/headers (e.g. 304).
         """
         from sqlalchemy import text as _t
-        import hashlib as _hashlib
+        from ...libs.conditional import etag_matches, if_none_match, make_etag
 
         org_id = (query_params.get('organizationId') or '').strip() if query_params else ''
         status = (query_params.get('status') or '').strip().lower() if query_params else ''
@@ -1708,16 +1715,9 @@ class AdminService:
         )).fetchone()
         watermark = etag_row[0].isoformat() if (etag_row and etag_row[0]) else 'none'
         count = int(etag_row[1] if etag_row else 0)
-        etag = '"' + _hashlib.md5(f'{watermark}|{count}|{where_sql}|{params}'.encode('utf-8')).hexdigest() + '"'
-
-        if_none_match = None
-        if headers:
-            for k, v in headers.items():
-                if k.lower() == 'if-none-match':
-                    if_none_match = v
-                    break
+        etag = make_etag(watermark, count, where_sql, params)
 
-        if if_none_match and if_none_match == etag:
+        if etag_matches(if_none_match(headers), etag):
             return {
                 '__http__': {
                     'statusCode': 304,
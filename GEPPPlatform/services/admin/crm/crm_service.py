@@ -15,12 +15,14 @@ import logging
 from typing import Any, Dict, List, Optional
 from datetime import datetime, timezone, timedelta
 
-import boto3
+from ....libs.startup import lazy_module
 from sqlalchemy import bindparam, text
 from sqlalchemy.orm import Session
 
 from ....models.crm import CrmEvent
 
+boto3 = lazy_module('boto3')
+
 logger = logging.getLogger(__name__)
 
 MARKETING_EVENT_TYPES = [
@@ -90,6 +92,43 @@ def emit_event(
         return None
 
 
+def emit_events(db_session: Session, events: List[Dict[str, Any]]) -> int:
+    """
+    Insert several crm_events rows in one set-based write.
+
+    Each entry takes emit_event()'s keyword arguments (minus commit). For callers that
+    emit a batch — a reward claim's reward_claimed/points_earned/campaign_joined — where
+    emit_event() would cost a statement per row. No CrmEvent instances come back.
+
+    Never raises: the write runs in a savepoint, so a failure (e.g. an FK violation)
+    loses the events, not the caller's transaction. Returns the rows written.
+    """
+    from ....libs.bulk_write import bulk_insert
+
+    rows = [
+        {
+            'organization_id': e.get('organization_id'),
+            'user_location_id': e.get('user_location_id'),
+            'event_type': e['event_type'],
+            'event_category': e['event_category'],
+            'event_source': e.get('event_source') or 'server',
+            'properties': e.get('properties') or {},
+            'session_id': e.get('session_id'),
+            'ip_address': e.get('ip_address'),
+            'user_agent': e.get('user_agent'),
+        }
+        for e in events
+    ]
+    if not rows:
+        return 0
+    try:
+        with db_session.begin_nested():
+            return bulk_insert(db_session, CrmEvent, rows)
+    except Exception as e:
+        logger.warning("crm_service.emit_events failed (non-fatal, %d events): %s", len(rows), e)
+        return 0
+
+
 # ───────────────────────────────────────────────────────────────
 # Email delivery — single path through PROD-GEPPEmailNotification Lambda (Mailchimp wrapper)
 # ───────────────────────────────────────────────────────────────
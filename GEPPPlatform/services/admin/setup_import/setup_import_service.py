@@ -32,6 +32,7 @@ import string
 from datetime import datetime
 from typing import Any, Dict, List, Optional, Tuple
 
+from ....libs import location_closure
 from ....models.organization_setup_import import OrganizationSetupImport
 from ....models.subscriptions.organizations import OrganizationSetup, Organization
 from ....models.users.user_location import UserLocation
@@ -392,10 +393,12 @@ class SetupImportService:
         trailing **ID** column per tab (the real record id). Re-importing a file with IDs upserts
         (reuse/update) those records instead of creating duplicates. References (Members/Tag/
         Tenant/Materials) are emitted as NAMES, same as the import format.
+
+        Locations are read as plain column rows rather than ORM objects, and the
+        sheets are written through a write-only workbook (libs/streaming.py).
         """
-        import io
         import base64
-        from openpyxl import Workbook
+        from ....libs.streaming import XlsxStreamWriter, stream_query
 
         # Owner is excluded from the export — every other user is exported, never the owner.
         owner_id, _owner_email = self._owner_info(organization_id)
@@ -411,10 +414,16 @@ class SetupImportService:
         root_nodes = (setup.root_nodes if setup and isinstance(setup.root_nodes, list) else []) or []
         hub_node = (setup.hub_node if setup and isinstance(setup.hub_node, dict) else {}) or {}
 
-        locs = self.db.query(UserLocation).filter(
+        locs = list(stream_query(self.db.query(
+            UserLocation.id, UserLocation.is_user, UserLocation.display_name, UserLocation.name_en,
+            UserLocation.name_th, UserLocation.email, UserLocation.first_name, UserLocation.last_name,
+            UserLocation.qr_name, UserLocation.organization_role_id, UserLocation.address,
+            UserLocation.business_type, UserLocation.members, UserLocation.tags, UserLocation.tenants,
+            UserLocation.materials,
+        ).filter(
             UserLocation.organization_id == organization_id,
             UserLocation.is_active == True, UserLocation.deleted_date.is_(None),  # noqa: E712
-        ).all()
+        ).order_by(UserLocation.id)))
         loc_by_id = {int(l.id): l for l in locs}
         user_name_by_id = {int(l.id): (l.display_name or l.name_en or l.name_th or str(l.id))
                            for l in locs if l.is_user}
@@ -474,11 +483,10 @@ class SetupImportService:
 
         from openpyxl.worksheet.datavalidation import DataValidation
 
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Users'
-        ws.append(['Display Name', 'Email', 'Password', 'Role', 'First Name', 'Last Name', 'QR Name', 'ID'])
-        for l in sorted((x for x in locs if x.is_user), key=lambda x: int(x.id)):
+        wb = XlsxStreamWriter()
+        ws = wb.add_sheet('Users', auto_width=False, headers=[
+            'Display Name', 'Email', 'Password', 'Role', 'First Name', 'Last Name', 'QR Name', 'ID'])
+        for l in (x for x in locs if x.is_user):
             if owner_id is not None and int(l.id) == owner_id:
                 continue  # never export the owner
             role_label = _ROLE_LABEL.get(role_key_by_id.get(int(l.organization_role_id) if l.organization_role_id else None), '')
@@ -489,22 +497,22 @@ class SetupImportService:
             type='list', formula1='"' + ','.join(_ROLE_LABEL.values()) + '"', allow_blank=True,
             showDropDown=False,
         )
-        ws.add_data_validation(role_dv)
+        ws.worksheet.data_validations.append(role_dv)
         role_dv.add('D2:D1000')
 
         for sheet_name, name_col, rows in (
             ('Tags', 'Tag', tag_rows), ('Tenants', 'Tenant', tenant_rows),
         ):
-            s = wb.create_sheet(sheet_name)
-            s.append([name_col, 'Description', 'Start', 'End', 'Members', 'ID'])
+            s = wb.add_sheet(sheet_name, auto_width=False, headers=[
+                name_col, 'Description', 'Start', 'End', 'Members', 'ID'])
             for t in sorted(rows, key=lambda x: int(x.id)):
                 s.append([t.name, t.note, fmt_date(t.start_date), fmt_date(t.end_date),
                           id_names(t.members, user_name_by_id), int(t.id)])
 
         # Origins — walk root_nodes, one row per node, level path from ancestor names.
-        s = wb.create_sheet('Origins')
-        s.append(['Level 1\n(Branch)', 'Level 2\n(Building)', 'Level 3\n(Floor)', 'Level 4\n(Room)',
-                  'Is Destination', 'Tag\n(Event)', 'Tenant\n(Company)', 'Members', 'Address', 'Materials', 'ID'])
+        s = wb.add_sheet('Origins', auto_width=False, headers=[
+            'Level 1\n(Branch)', 'Level 2\n(Building)', 'Level 3\n(Floor)', 'Level 4\n(Room)',
+            'Is Destination', 'Tag\n(Event)', 'Tenant\n(Company)', 'Members', 'Address', 'Materials', 'ID'])
 
         def _walk_origins(nodes, name_path):
             for node in nodes if isinstance(nodes, list) else []:
@@ -531,8 +539,8 @@ class SetupImportService:
         _walk_origins(root_nodes, [])
 
         # Destinations — hub_node children.
-        s = wb.create_sheet('Destination')
-        s.append(['Destinations', 'Members', 'Address', 'Business Type', 'Materials', 'ID'])
+        s = wb.add_sheet('Destination', auto_width=False, headers=[
+            'Destinations', 'Members', 'Address', 'Business Type', 'Materials', 'ID'])
         for node in (hub_node.get('children') or []):
             try:
                 nid = int(node.get('nodeId'))
@@ -547,14 +555,12 @@ class SetupImportService:
                 id_names(loc.materials, mat_name_by_id), nid,
             ])
 
-        buf = io.BytesIO()
-        wb.save(buf)
         return {
             'success': True,
             'data': {
                 'filename': f'organization_setup_{organization_id}.xlsx',
-                'content_base64': base64.b64encode(buf.getvalue()).decode('ascii'),
-                'mime_type': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+                'content_base64': base64.b64encode(wb.to_bytes()).decode('ascii'),
+                'mime_type': XlsxStreamWriter.content_type,
             },
         }
 
@@ -809,6 +815,7 @@ class SetupImportService:
             )
             self.db.add(new_setup)
             self.db.flush()
+            location_closure.rebuild(self.db, organization_id)
 
             row.created_user_ids = created['users']
             row.created_tag_ids = created['tags']
@@ -870,6 +877,7 @@ class SetupImportService:
                 )
                 self.db.add(new_setup)
                 self.db.flush()
+                location_closure.rebuild(self.db, organization_id)
             row.status = 'reverted'
             row.reverted_date = datetime.now()
             self.db.commit()
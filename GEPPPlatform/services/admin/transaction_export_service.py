@@ -9,20 +9,23 @@ Status is derived from the records (mirrors ManualAuditService):
   - all records 'approved' → 'approved'
   - any record 'rejected'  → 'rejected'
   - else                   → 'pending'
+
+Transactions are read through a server-side cursor a batch at a time and each
+batch's rows go straight into a write-only workbook (libs/streaming.py), so
+memory tracks the batch size rather than the organization's size.
 """
 
 import base64
-import io
 from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional
 from zoneinfo import ZoneInfo
 
-from openpyxl import Workbook
 from openpyxl.styles import Alignment, Font, PatternFill
 from sqlalchemy import and_, or_
 from sqlalchemy.orm import Session, joinedload
 
 from GEPPPlatform.exceptions import BadRequestException, NotFoundException
+from GEPPPlatform.libs.streaming import XlsxStreamWriter, stream_batches
 from GEPPPlatform.models.subscriptions.organizations import (
     Organization,
     OrganizationSetup,
@@ -172,7 +175,7 @@ class AdminTransactionExportService:
 
         level_labels, path_by_node_id = self._resolve_org_setup(organization_id)
 
-        rows = self._collect_rows(
+        rows = self._iter_rows(
             organization_id=organization_id,
             origin_id=int(origin_id) if origin_id else None,
             date_from=date_from,
@@ -183,19 +186,16 @@ class AdminTransactionExportService:
             path_by_node_id=path_by_node_id,
         )
 
-        wb = self._build_workbook(rows, level_labels)
-        buf = io.BytesIO()
-        wb.save(buf)
-        buf.seek(0)
-        b64 = base64.b64encode(buf.read()).decode('utf-8')
+        content, row_count = self._write_workbook(rows, level_labels)
+        b64 = base64.b64encode(content).decode('utf-8')
 
         ts = datetime.now().strftime('%Y-%m-%d %H_%M_%S')
         filename = f'Export_GEPP_Business_Transaction_{ts}.xlsx'
 
         return {
             'filename': filename,
-            'rowCount': sum(1 for _ in rows),
-            'contentType': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+            'rowCount': row_count,
+            'contentType': XlsxStreamWriter.content_type,
             'base64': b64,
         }
 
@@ -302,7 +302,7 @@ class AdminTransactionExportService:
         return out
 
     # ── Query ─────────────────────────────────────────────────────────
-    def _collect_rows(
+    def _iter_rows(
         self,
         organization_id: int,
         origin_id: Optional[int],
@@ -312,7 +312,11 @@ class AdminTransactionExportService:
         sort_field: str,
         sort_dir: str,
         path_by_node_id: Dict[int, List[int]],
-    ) -> list:
+    ) -> Iterator[tuple]:
+        """Yield ``(tx, tx_records, derived, tag_label, level_columns)`` in
+        export order. Transactions are streamed in batches; tags, records and
+        location labels are resolved once per batch, and the tag / location
+        names are kept across batches."""
         q = (
             self.db.query(Transaction)
             .options(joinedload(Transaction.origin))
@@ -377,105 +381,100 @@ class AdminTransactionExportService:
         # Stable secondary order on id so paged exports / tied dates are
         # deterministic — matches v2 behaviour.
         secondary = Transaction.id.asc() if sort_dir == 'asc' else Transaction.id.desc()
-        transactions: List[Transaction] = (
-            q.order_by(order_clause, secondary).all()
-        )
-        if not transactions:
-            return []
 
-        # Resolve location-tag names in one shot.
-        tag_ids = {t.location_tag_id for t in transactions if t.location_tag_id}
         tag_name_by_id: Dict[int, str] = {}
-        if tag_ids:
-            for row in (
-                self.db.query(UserLocationTag.id, UserLocationTag.name)
-                .filter(UserLocationTag.id.in_(tag_ids))
-                .all()
-            ):
-                tag_name_by_id[row.id] = row.name
-
-        # Pull all candidate records.
-        all_record_ids: List[int] = []
-        for t in transactions:
-            for rid in (t.transaction_records or []):
-                all_record_ids.append(rid)
-
-        records_by_id: Dict[int, TransactionRecord] = {}
-        if all_record_ids:
-            recs = (
-                self.db.query(TransactionRecord)
-                .options(
-                    joinedload(TransactionRecord.material),
-                    joinedload(TransactionRecord.main_material),
-                    joinedload(TransactionRecord.destination),
-                    # Currency intentionally NOT eager-loaded — prod schema
-                    # is missing the model's `name` column.
-                )
-                .filter(TransactionRecord.id.in_(all_record_ids))
-                .filter(TransactionRecord.is_active == True)  # noqa: E712
-                .filter(TransactionRecord.deleted_date.is_(None))
-                .all()
+        location_lookup: Dict[int, str] = {}
+        for transactions in stream_batches(q.order_by(order_clause, secondary)):
+            # Resolve this batch's location-tag names not seen in earlier batches.
+            tag_ids = {
+                t.location_tag_id for t in transactions
+                if t.location_tag_id and t.location_tag_id not in tag_name_by_id
+            }
+            if tag_ids:
+                for row in (
+                    self.db.query(UserLocationTag.id, UserLocationTag.name)
+                    .filter(UserLocationTag.id.in_(tag_ids))
+                    .all()
+                ):
+                    tag_name_by_id[row.id] = row.name
+
+            records_by_id = self._load_records(
+                [rid for t in transactions for rid in (t.transaction_records or [])]
             )
-            for r in recs:
-                records_by_id[r.id] = r
-
-        # Resolve every origin's hierarchical path through the org chart
-        # by looking up its ancestor chain in `path_by_node_id` — built
-        # from `root_nodes` JSON nesting. The position of each node in
-        # that chain (0..3) selects the column (Branch/Building/Floor/Room).
-        # Origins missing from the tree (orphan / hub-only / legacy) just
-        # land in the Branch column as a best-effort label.
-        all_lookup_ids: set = set()
-        for tx in transactions:
-            # Shared (cross-org) rows are labelled from the share meta, not this org's tree.
-            if tx.origin_id and tx.origin_id in share_meta_by_origin:
-                continue
-            if tx.origin_id and tx.origin_id in path_by_node_id:
-                all_lookup_ids.update(path_by_node_id[tx.origin_id])
-            elif tx.origin_id:
-                all_lookup_ids.add(tx.origin_id)
-
-        location_lookup = self._build_location_lookup(list(all_lookup_ids))
-
-        out = []
-        for tx in transactions:
-            ordered_ids = list(tx.transaction_records or [])
-            tx_records = [records_by_id[rid] for rid in ordered_ids if rid in records_by_id]
-            derived = _derive_status([r.status for r in tx_records])
-            if status_filter != 'all' and derived != status_filter:
-                continue
-            tag_label = tag_name_by_id.get(tx.location_tag_id, '') if tx.location_tag_id else ''
-
-            level_columns: List[str] = ['', '', '', '']
-            shared_meta = share_meta_by_origin.get(tx.origin_id) if tx.origin_id else None
-            if shared_meta:
-                # Cross-org shared row: roll up under the shared location's name and hide the
-                # source org's internal hierarchy (same contract as the business platform — the
-                # children collapse under the shared node). Add the source org for context.
-                label = shared_meta.get('label') or _loc_label(tx.origin) or ''
-                src_org = shared_meta.get('source_org_name')
-                level_columns[0] = f'{label} ({src_org})' if src_org else label
-            elif tx.origin_id:
-                ancestor_ids = path_by_node_id.get(tx.origin_id)
-                if ancestor_ids:
-                    for col_idx, pid in enumerate(ancestor_ids[:4]):
-                        level_columns[col_idx] = location_lookup.get(pid, f'#{pid}')
-                else:
-                    # Origin not in the tree — show the location's own
-                    # name in Branch as a fallback so the row isn't blank.
-                    level_columns[0] = location_lookup.get(
-                        tx.origin_id, _loc_label(tx.origin)
-                    )
-
-            out.append((tx, tx_records, derived, tag_label, level_columns))
-        return out
 
-    # ── Workbook ──────────────────────────────────────────────────────
-    def _build_workbook(self, rows: list, level_labels: List[str]) -> Workbook:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'Sheet1'
+            # Resolve every origin's hierarchical path through the org chart
+            # by looking up its ancestor chain in `path_by_node_id` — built
+            # from `root_nodes` JSON nesting. The position of each node in
+            # that chain (0..3) selects the column (Branch/Building/Floor/Room).
+            # Origins missing from the tree (orphan / hub-only / legacy) just
+            # land in the Branch column as a best-effort label.
+            lookup_ids: set = set()
+            for tx in transactions:
+                # Shared (cross-org) rows are labelled from the share meta, not this org's tree.
+                if tx.origin_id and tx.origin_id in share_meta_by_origin:
+                    continue
+                if tx.origin_id and tx.origin_id in path_by_node_id:
+                    lookup_ids.update(path_by_node_id[tx.origin_id])
+                elif tx.origin_id:
+                    lookup_ids.add(tx.origin_id)
+            location_lookup.update(
+                self._build_location_lookup(list(lookup_ids - location_lookup.keys()))
+            )
 
+            for tx in transactions:
+                ordered_ids = list(tx.transaction_records or [])
+                tx_records = [records_by_id[rid] for rid in ordered_ids if rid in records_by_id]
+                derived = _derive_status([r.status for r in tx_records])
+                if status_filter != 'all' and derived != status_filter:
+                    continue
+                tag_label = tag_name_by_id.get(tx.location_tag_id, '') if tx.location_tag_id else ''
+
+                level_columns: List[str] = ['', '', '', '']
+                shared_meta = share_meta_by_origin.get(tx.origin_id) if tx.origin_id else None
+                if shared_meta:
+                    # Cross-org shared row: roll up under the shared location's name and hide the
+                    # source org's internal hierarchy (same contract as the business platform — the
+                    # children collapse under the shared node). Add the source org for context.
+                    label = shared_meta.get('label') or _loc_label(tx.origin) or ''
+                    src_org = shared_meta.get('source_org_name')
+                    level_columns[0] = f'{label} ({src_org})' if src_org else label
+                elif tx.origin_id:
+                    ancestor_ids = path_by_node_id.get(tx.origin_id)
+                    if ancestor_ids:
+                        for col_idx, pid in enumerate(ancestor_ids[:4]):
+                            level_columns[col_idx] = location_lookup.get(pid, f'#{pid}')
+                    else:
+                        # Origin not in the tree — show the location's own
+                        # name in Branch as a fallback so the row isn't blank.
+                        level_columns[0] = location_lookup.get(
+                            tx.origin_id, _loc_label(tx.origin)
+                        )
+
+                yield tx, tx_records, derived, tag_label, level_columns
+
+    def _load_records(self, record_ids: List[int]) -> Dict[int, TransactionRecord]:
+        """Active records among *record_ids*, keyed by id."""
+        if not record_ids:
+            return {}
+        recs = (
+            self.db.query(TransactionRecord)
+            .options(
+                joinedload(TransactionRecord.material),
+                joinedload(TransactionRecord.main_material),
+                joinedload(TransactionRecord.destination),
+                # Currency intentionally NOT eager-loaded — prod schema
+                # is missing the model's `name` column.
+            )
+            .filter(TransactionRecord.id.in_(record_ids))
+            .filter(TransactionRecord.is_active == True)  # noqa: E712
+            .filter(TransactionRecord.deleted_date.is_(None))
+            .all()
+        )
+        return {r.id: r for r in recs}
+
+    # ── Workbook ──────────────────────────────────────────────────────
+    def _write_workbook(self, rows: Iterable[tuple], level_labels: List[str]) -> 'tuple[bytes, int]':
+        """Write *rows* into a write-only workbook; returns (xlsx bytes, transactions written)."""
         # Dynamic header: the 4 hierarchical Location columns sit between
         # "Transaction ID" and "Location Tag", using the org's substitution
         # labels (e.g. "สาขา / อาคาร / ชั้น / ห้อง"). No combined "Location"
@@ -486,17 +485,23 @@ class AdminTransactionExportService:
             + list(self.HEADERS_AFTER_LOCATION)
         )
 
-        header_font = Font(bold=True, color='FFFFFF', size=11)
-        header_fill = PatternFill(start_color='2F855A', end_color='2F855A', fill_type='solid')
-        for col_idx, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_idx, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal='center', vertical='center')
+        writer = XlsxStreamWriter()
+        # Column widths come from the header and the first rows (cap at 50).
+        ws = writer.add_sheet(
+            'Sheet1',
+            headers=headers,
+            header_style={
+                'font': Font(bold=True, color='FFFFFF', size=11),
+                'fill': PatternFill(start_color='2F855A', end_color='2F855A', fill_type='solid'),
+                'alignment': Alignment(horizontal='center', vertical='center'),
+            },
+            freeze_header=True,
+        )
 
-        row_idx = 2
+        tx_count = 0
         seq = 0
         for tx, tx_records, derived, tag_label, level_columns in rows:
+            tx_count += 1
             tx_date_str = _fmt_bkk_date(tx.transaction_date)
 
             # `level_columns` is already in [branch, building, floor, room]
@@ -519,7 +524,7 @@ class AdminTransactionExportService:
                 price_per_kg = float(rec.origin_price_per_unit or 0)
                 total_price = float(rec.total_amount or 0)
 
-                values = (
+                ws.append(
                     [seq, tx_date_str, tx_id_label]
                     + level_values
                     + [
@@ -534,19 +539,5 @@ class AdminTransactionExportService:
                         rec.notes or tx.notes or '',
                     ]
                 )
-                for col_idx, val in enumerate(values, 1):
-                    ws.cell(row=row_idx, column=col_idx, value=val)
-                row_idx += 1
-
-        # Auto-size columns (cap at 50)
-        for col in ws.columns:
-            letter = col[0].column_letter
-            max_len = 8
-            for cell in col:
-                v = '' if cell.value is None else str(cell.value)
-                if len(v) > max_len:
-                    max_len = len(v)
-            ws.column_dimensions[letter].width = min(max_len + 2, 50)
-
-        ws.freeze_panes = 'A2'
-        return wb
+
+        return writer.to_bytes(), tx_count
@@ -7,7 +7,8 @@ import jwt
 import bcrypt
 import json
 import secrets
-import boto3
+from GEPPPlatform.libs.startup import lazy_module
+from GEPPPlatform.libs.token_cache import verified_tokens
 from datetime import datetime, timedelta, timezone
 from typing import Dict, Any, Optional
 
@@ -33,6 +34,8 @@ from ...exceptions import (
     ValidationException
 )
 
+boto3 = lazy_module('boto3')
+
 
 def _normalize_identity(value: Any) -> str:
     """Normalize login identifiers for case-insensitive email/username matching."""
@@ -247,7 +250,15 @@ class AuthHandlers:
         return token
 
     def verify_jwt_token(self, token: str, path: str = None) -> Optional[Dict[str, Any]]:
-        """Verify and decode a JWT token. For integration tokens, verifies with user-specific secret."""
+        """Verify and decode a JWT token. For integration tokens, verifies with user-specific secret.
+
+        Successful verifications are cached per token (see libs/token_cache.py);
+        the route rules below are re-applied on every call, cached or not.
+        """
+        cached = verified_tokens.get(token, self.jwt_secret)
+        if cached is not None:
+            return cached if self._token_allowed_on_path(cached, path) else None
+
         try:
             # First decode without verification to check token type
             unverified_payload = jwt.decode(token, options={"verify_signature": False})
@@ -260,44 +271,39 @@ class AuthHandlers:
 
             # Check if this is an integration token
             if unverified_payload.get('type') == 'integration':
-                # Integration tokens must be used on /api/integration/* routes only
-                if path and not path.startswith('/api/integration'):
-                    print(f"Integration token used on non-integration route: {path}")
-                    if path and "/api/userapi/" in path:
-                        print(f"[CUSTOM_API_AUTH] REJECTION: Integration token cannot be used on custom API routes")
+                if not self._token_allowed_on_path(unverified_payload, path):
                     return None
 
-                # Get user's secret key from database
+                # Get user's secret key from database (or the short-lived cache)
                 user_id = unverified_payload.get('user_id')
                 if not user_id:
                     return None
 
-                session = self.db_session
-                user = session.query(UserLocation).filter_by(id=user_id, is_active=True).first()
+                secret = verified_tokens.get_secret(user_id)
+                if secret is None:
+                    session = self.db_session
+                    user = session.query(UserLocation).filter_by(id=user_id, is_active=True).first()
 
-                if not user or not user.secret:
-                    print(f"User not found or no secret key for user_id: {user_id}")
-                    return None
+                    if not user or not user.secret:
+                        print(f"User not found or no secret key for user_id: {user_id}")
+                        return None
+                    secret = user.secret
+                    verified_tokens.put_secret(user_id, secret)
 
                 # Verify token with user's secret key
-                payload = jwt.decode(token, user.secret, algorithms=['HS256'])
+                payload = jwt.decode(token, secret, algorithms=['HS256'])
+                verified_tokens.put(token, payload, secret, integration=True)
                 return payload
             else:
                 # Regular tokens - verify with global secret
                 payload = jwt.decode(token, self.jwt_secret, algorithms=['HS256'])
+                verified_tokens.put(token, payload, self.jwt_secret)
                 
                 if path and "/api/userapi/" in path:
                     print(f"[CUSTOM_API_AUTH] Token verified successfully!")
                     print(f"[CUSTOM_API_AUTH] Verified payload: {payload}")
 
-                # Regular tokens cannot access /api/integration/* routes
-                if path and path.startswith('/api/integration'):
-                    print(f"Regular token used on integration route: {path}")
-                    if path and "/api/userapi/" in path:
-                        print(f"[CUSTOM_API_AUTH] REJECTION: Should not reach here for userapi")
-                    return None
-
-                return payload
+                return payload if self._token_allowed_on_path(payload, path) else None
 
         except jwt.ExpiredSignatureError:
             print("Token expired")
@@ -310,6 +316,21 @@ class AuthHandlers:
                 print(f"[CUSTOM_API_AUTH] REJECTION: Invalid token - {e}")
             return None
 
+    @staticmethod
+    def _token_allowed_on_path(payload: Dict[str, Any], path: Optional[str]) -> bool:
+        """Integration tokens are for /api/integration/* only, and only they are."""
+        if payload.get('type') == 'integration':
+            if path and not path.startswith('/api/integration'):
+                print(f"Integration token used on non-integration route: {path}")
+                if "/api/userapi/" in path:
+                    print(f"[CUSTOM_API_AUTH] REJECTION: Integration token cannot be used on custom API routes")
+                return False
+            return True
+        if path and path.startswith('/api/integration'):
+            print(f"Regular token used on integration route: {path}")
+            return False
+        return True
+
     def register(self, data: Dict[str, Any], **kwargs) -> Dict[str, Any]:
         """Register a new user with organization and free subscription using SQLAlchemy"""
         try:
@@ -730,6 +751,8 @@ class AuthHandlers:
             new_secret = self.generate_secret_key()
             user.secret = new_secret
             session.commit()
+            # Tokens signed with the old secret must stop working here now.
+            verified_tokens.invalidate_user(user.id)
 
             return {
                 'success': True,
@@ -994,6 +1017,7 @@ class AuthHandlers:
                         organization_id=org_id,
                         properties={'user_id': user_id},
                     )
+                verified_tokens.discard(token)
             # Stateless JWTs: no server-side invalidation; client must discard tokens.
             return {'success': True, 'message': 'Logged out successfully'}
         except Exception as e:
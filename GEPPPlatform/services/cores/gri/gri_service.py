@@ -387,9 +387,10 @@ class GriService:
         
         # Manually enrich records with material/category names
         gri_data = []
+        names = self._gri_1_names(gri_records)
         for record in gri_records:
             serialized = self._serialize_gri306_1(record)
-            self._enrich_gri_1_names(record, serialized)
+            self._enrich_gri_1_names(record, serialized, names)
             gri_data.append(serialized)
 
         # Return both sets of data
@@ -451,18 +452,21 @@ class GriService:
         # 3. Serialize and return combined data
         
         # Process GRI 2 records
+        # Material/category names for every GRI 1 record below, looked up once
+        names = self._gri_1_names(
+            [r.approached_item for r in records_2 if r.approached_item] + list(records_1_unused))
         gri_2_data = []
         for record in records_2:
             serialized = self._serialize_gri306_2(record)
             if record.approached_item:
-                self._enrich_gri_1_names(record.approached_item, serialized['approached_item'])
+                self._enrich_gri_1_names(record.approached_item, serialized['approached_item'], names)
             gri_2_data.append(serialized)
             
         # Process Unused GRI 1 records
         gri_1_unused_data = []
         for record in records_1_unused:
             serialized = self._serialize_gri306_1(record)
-            self._enrich_gri_1_names(record, serialized)
+            self._enrich_gri_1_names(record, serialized, names)
             gri_1_unused_data.append(serialized)
             
         return {
@@ -822,10 +826,27 @@ class GriService:
             }
         }
 
-    def _enrich_gri_1_names(self, record, serialized_data):
-        """Helper to enrich output material/category with name: { nameTH, nameEN } in serialized data"""
+    def _gri_1_names(self, records):
+        """Materials and categories named by *records*' outputs, one query each: ({id: Material}, {id: MaterialCategory})"""
+        material_ids = {r.output_material for r in records if r.output_material}
+        category_ids = {r.output_category for r in records if r.output_category}
+        materials = {
+            m.id: m for m in self.db.query(Material).filter(Material.id.in_(material_ids)).all()
+        } if material_ids else {}
+        categories = {
+            c.id: c for c in self.db.query(MaterialCategory).filter(MaterialCategory.id.in_(category_ids)).all()
+        } if category_ids else {}
+        return materials, categories
+
+    def _enrich_gri_1_names(self, record, serialized_data, names=None):
+        """Helper to enrich output material/category with name: { nameTH, nameEN } in serialized data
+
+        Pass *names* from _gri_1_names when enriching many records, so the
+        lookups are not repeated per record.
+        """
+        materials, categories = names if names is not None else self._gri_1_names([record])
         if record.output_material:
-            material = self.db.query(Material).filter(Material.id == record.output_material).first()
+            material = materials.get(record.output_material)
             if material:
                 serialized_data['output_material'] = {
                     "id": material.id,
@@ -836,7 +857,7 @@ class GriService:
                 }
         
         if record.output_category:
-            category = self.db.query(MaterialCategory).filter(MaterialCategory.id == record.output_category).first()
+            category = categories.get(record.output_category)
             if category:
                 serialized_data['output_category'] = {
                     "id": category.id,
@@ -25,8 +25,8 @@ from typing import Any, Dict, List, Optional, Tuple
 
 from sqlalchemy.exc import SQLAlchemyError
 
+from ....libs.org_tree import ROOT, OrgTreeIndex, load_org_tree
 from ....models.import_file import ImportFile
-from ....models.subscriptions.organizations import OrganizationSetup
 from ....models.users.user_location import UserLocation
 from ....models.users.user_related import UserLocationTag, UserTenant
 from ....models.cores.references import Material
@@ -471,11 +471,7 @@ class ImportService:
         with the same ``_resolve_location_tiers`` used by the org-setup filter. Owners (and
         an unset user) see every origin.
         """
-        setup = self.db.query(OrganizationSetup).filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True,  # noqa: E712
-        ).order_by(OrganizationSetup.id.desc()).first()
-        root_nodes = (setup.root_nodes if setup else None) or []
+        tree = load_org_tree(self.db, organization_id) or OrgTreeIndex()
 
         locations = self.db.query(UserLocation).filter(
             UserLocation.organization_id == organization_id,
@@ -541,21 +537,15 @@ class ImportService:
         depth_by_id: Dict[int, int] = {}      # 0-based level
         tree_order: List[int] = []            # pre-order so the option list reads top-down
 
-        def _walk(nodes, prefix_labels, depth):
-            for node in nodes or []:
-                try:
-                    nid = int(node.get('nodeId'))
-                except (TypeError, ValueError):
-                    continue
-                disp = loc_by_id.get(nid, {}).get('display', str(nid))
-                full = prefix_labels + [disp]
-                path_labels[nid] = ' › '.join(full)
-                ancestor_labels[nid] = ' › '.join(prefix_labels)
-                depth_by_id[nid] = depth
-                tree_order.append(nid)
-                _walk(node.get('children'), full, depth + 1)
-
-        _walk(root_nodes, [], 0)
+        for nid in tree.order:
+            if tree.section(nid) != ROOT:
+                continue
+            parent = tree.parent[nid]
+            disp = loc_by_id.get(nid, {}).get('display', str(nid))
+            ancestor_labels[nid] = path_labels[parent] if parent is not None else ''
+            path_labels[nid] = f"{ancestor_labels[nid]} › {disp}" if parent is not None else disp
+            depth_by_id[nid] = tree.depth(nid)
+            tree_order.append(nid)
 
         # Destination candidates = the same universe as the app's destination picker:
         #   (1) hub-type locations, and (2) origin nodes flagged is_destination in root_nodes.
@@ -564,16 +554,7 @@ class ImportService:
         for lid, info in loc_by_id.items():
             if info.get('type') == 'hub':
                 dest_ids.add(lid)
-
-        def _collect_dest(nodes):
-            for node in nodes or []:
-                if node.get('is_destination'):
-                    try:
-                        dest_ids.add(int(node.get('nodeId')))
-                    except (TypeError, ValueError):
-                        pass
-                _collect_dest(node.get('children'))
-        _collect_dest(root_nodes)
+        dest_ids |= tree.ids_where('is_destination') & tree.node_ids(ROOT)
 
         destinations: List[Dict[str, Any]] = []
         for lid in dest_ids:
@@ -587,7 +568,7 @@ class ImportService:
                 'path': ancestor_labels.get(lid, ''),  # hubs live outside root_nodes → ''
             })
         # Origins (in the tree) first in pre-order; hubs (not in tree) after.
-        destinations.sort(key=lambda d: tree_order.index(d['id']) if d['id'] in tree_order else 10**9)
+        destinations.sort(key=lambda d: tree.position(d['id']) if d['id'] in depth_by_id else 10**9)
 
         # Order locations in tree pre-order (parents before children); any not in the tree last.
         ordered_ids = [lid for lid in tree_order if lid in loc_by_id]
@@ -621,7 +602,7 @@ class ImportService:
         }
 
         return {
-            'root_nodes': root_nodes,
+            'tree': tree,
             'loc_by_id': loc_by_id,
             'tag_by_id': tag_by_id,
             'tenant_by_id': tenant_by_id,
@@ -639,7 +620,8 @@ class ImportService:
         the tree runs out of children. Returns (origin_id, path_label, matched_level_labels).
         """
         loc_by_id = ctx['loc_by_id']
-        current_nodes = ctx['root_nodes'] or []
+        tree = ctx['tree']
+        current_nodes = tree.roots
         origin_id: Optional[int] = None
         labels: List[str] = []
         for level_key in ('level1', 'level2', 'level3', 'level4'):
@@ -647,15 +629,10 @@ class ImportService:
             if M.is_blank(value):
                 break  # this level ends the path
             candidates = []
-            for node in current_nodes:
-                try:
-                    nid = int(node.get('nodeId'))
-                except (TypeError, ValueError):
-                    continue
+            for nid in current_nodes:
                 names = loc_by_id.get(nid, {}).get('names', [])
                 if names:
                     candidates.append((nid, names))
-                # remember children keyed by nid for the descend step
             if not candidates:
                 break  # nothing to match at this level
             matched, _score = M.best_candidate(str(value), candidates)
@@ -664,15 +641,7 @@ class ImportService:
             origin_id = matched
             labels.append(loc_by_id.get(matched, {}).get('display', str(matched)))
             # descend into the matched node's children for the next level
-            children = []
-            for node in current_nodes:
-                try:
-                    if int(node.get('nodeId')) == matched:
-                        children = node.get('children') or []
-                        break
-                except (TypeError, ValueError):
-                    continue
-            current_nodes = children
+            current_nodes = tree.children.get(matched, [])
             if not current_nodes:
                 break  # cannot go deeper
         path_label = ' › '.join(labels)
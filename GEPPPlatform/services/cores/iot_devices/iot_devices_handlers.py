@@ -33,9 +33,11 @@ from GEPPPlatform.services.cores.iot_devices.sorter import (
 )
 from GEPPPlatform.models.users.user_location import UserLocation
 from GEPPPlatform.models.users.user_related import UserLocationTag, UserTenant
-from GEPPPlatform.models.subscriptions.organizations import OrganizationSetup
 from GEPPPlatform.models.cores.iot_devices import IoTDevice
+from GEPPPlatform.models.cores.device_events import DeviceEvent
 from GEPPPlatform.libs.locationAccess import active_scope, is_window_active
+from GEPPPlatform.libs.bulk_write import bulk_insert
+from GEPPPlatform.libs.org_tree import load_org_tree
 
 from ....exceptions import APIException, UnauthorizedException, ValidationException, NotFoundException
 
@@ -296,56 +298,10 @@ def member_origin_ids(db_session, user_id: Any, organization_id: Any) -> Set[int
         if loc.get('origin_id') is not None
     }
 
-    setup = (
-        db_session.query(OrganizationSetup)
-        .filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True,
-            OrganizationSetup.deleted_date.is_(None),
-        )
-        .order_by(OrganizationSetup.created_date.desc())
-        .first()
-    )
-    if not setup or not setup.root_nodes:
-        return origin_ids
-
-    roots = setup.root_nodes
-    if isinstance(roots, dict):
-        roots = [roots]
-    if not isinstance(roots, list):
+    tree = load_org_tree(db_session, organization_id)
+    if tree is None:
         return origin_ids
-
-    def _to_int(v) -> Optional[int]:
-        if v is None:
-            return None
-        if isinstance(v, int):
-            return v
-        if isinstance(v, str) and v.isdigit():
-            return int(v)
-        return None
-
-    def _collect_all(node: Dict[str, Any], ids: Set[int]) -> None:
-        nid = _to_int(node.get('nodeId'))
-        if nid is not None:
-            ids.add(nid)
-        for ch in (node.get('children') or []):
-            if isinstance(ch, dict):
-                _collect_all(ch, ids)
-
-    def _walk(nodes: List[Dict[str, Any]], seed: Set[int], out: Set[int]) -> None:
-        for node in nodes:
-            if not isinstance(node, dict):
-                continue
-            nid = _to_int(node.get('nodeId'))
-            children = node.get('children') or []
-            if nid is not None and nid in seed:
-                _collect_all(node, out)
-            elif isinstance(children, list) and children:
-                _walk([ch for ch in children if isinstance(ch, dict)], seed, out)
-
-    expanded: Set[int] = set(origin_ids)
-    _walk([n for n in roots if isinstance(n, dict)], origin_ids, expanded)
-    return expanded
+    return tree.expand(origin_ids)
 
 
 def can_input_at_location(db_session, user_id: Any, organization_id: Any, location_id: Any) -> bool:
@@ -642,70 +598,8 @@ def handle_get_locations_by_membership(user_service: UserService, query_params:
         ]
 
         # Expand to include all descendants of member locations (based on org setup tree)
-        def _expand_descendants_from_setup(
-            setup_root_nodes,
-            seed_ids: Set[int],
-        ) -> Set[int]:
-            if not setup_root_nodes or not seed_ids:
-                return set(seed_ids)
-
-            roots = setup_root_nodes
-            if isinstance(roots, dict):
-                roots = [roots]
-            if not isinstance(roots, list):
-                return set(seed_ids)
-
-            expanded: Set[int] = set(seed_ids)
-
-            def to_int(v) -> Optional[int]:
-                if v is None:
-                    return None
-                if isinstance(v, int):
-                    return v
-                if isinstance(v, str) and v.isdigit():
-                    return int(v)
-                return None
-
-            def collect_all(node: Dict[str, Any]) -> None:
-                nid = to_int(node.get('nodeId'))
-                if nid is not None:
-                    expanded.add(nid)
-                children = node.get('children') or []
-                if isinstance(children, list):
-                    for ch in children:
-                        if isinstance(ch, dict):
-                            collect_all(ch)
-
-            def walk(nodes: List[Dict[str, Any]]) -> None:
-                for node in nodes:
-                    if not isinstance(node, dict):
-                        continue
-                    nid = to_int(node.get('nodeId'))
-                    children = node.get('children') or []
-                    if nid is not None and nid in seed_ids:
-                        collect_all(node)
-                    else:
-                        if isinstance(children, list) and children:
-                            walk([ch for ch in children if isinstance(ch, dict)])
-
-            walk([n for n in roots if isinstance(n, dict)])
-            return expanded
-
-        setup = (
-            db_session.query(OrganizationSetup)
-            .filter(
-                OrganizationSetup.organization_id == organization_id,
-                OrganizationSetup.is_active == True,
-                OrganizationSetup.deleted_date.is_(None),
-            )
-            .order_by(OrganizationSetup.created_date.desc())
-            .first()
-        )
-
-        expanded_ids = _expand_descendants_from_setup(
-            setup.root_nodes if setup else None,
-            set(member_origin_ids),
-        )
+        tree = load_org_tree(db_session, organization_id)
+        expanded_ids = tree.expand(member_origin_ids) if tree is not None else set(member_origin_ids)
 
         # ── Tag/tenant access, same rules as the web ─────────────────────────
         # Location membership is no longer the only way in: a user who belongs to a
@@ -1342,35 +1236,29 @@ def handle_iot_sync(db_session, current_device: Dict[str, Any], data: Dict[str,
             cache_after = {}
 
     # ── 2. Bulk-INSERT iot_device_events ─────────────────────────────────────
-    if events_in:
-        ev_sql = text(
-            "INSERT INTO iot_device_events "
-            "(device_id, occurred_at, event_type, route, payload, user_id, session_id) "
-            "VALUES (:device_id, :occurred_at, :event_type, :route, CAST(:payload AS jsonb), :user_id, :session_id)"
-        )
-        for ev in events_in:
-            if not isinstance(ev, dict):
-                continue
-            occurred = _coerce_dt(ev.get('occurred_at')) or datetime.now(timezone.utc)
-            etype = (ev.get('event_type') or 'unknown').strip()[:48]
-            db_session.execute(ev_sql, {
-                'device_id': device_id,
-                'occurred_at': occurred,
-                'event_type': etype,
-                'route': (ev.get('route') or None),
-                'payload': _json.dumps(ev.get('payload') or {}),
-                'user_id': ev.get('user_id'),
-                'session_id': (ev.get('session_id') or None),
-            })
-
+    # One set-based write for the whole batch (and the overflow marker), not a
+    # statement per event.
+    event_rows = []
+    for ev in events_in:
+        if not isinstance(ev, dict):
+            continue
+        event_rows.append({
+            'device_id': device_id,
+            'occurred_at': _coerce_dt(ev.get('occurred_at')) or datetime.now(timezone.utc),
+            'event_type': (ev.get('event_type') or 'unknown').strip()[:48],
+            'route': (ev.get('route') or None),
+            'payload': ev.get('payload') or {},
+            'user_id': ev.get('user_id'),
+            'session_id': (ev.get('session_id') or None),
+        })
     if rejected_count > 0:
-        db_session.execute(text(
-            "INSERT INTO iot_device_events (device_id, occurred_at, event_type, payload) "
-            "VALUES (:device_id, NOW(), 'event_batch_overflow', CAST(:payload AS jsonb))"
-        ), {
+        event_rows.append({
             'device_id': device_id,
-            'payload': _json.dumps({'rejected_count': rejected_count}),
+            'occurred_at': datetime.now(timezone.utc),
+            'event_type': 'event_batch_overflow',
+            'payload': {'rejected_count': rejected_count},
         })
+    bulk_insert(db_session, DeviceEvent, event_rows)
 
     # ── 3. Atomically claim pending commands (limit 10) ─────────────────
     claim_sql = text(
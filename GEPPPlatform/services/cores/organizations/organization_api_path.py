@@ -61,6 +61,9 @@ def set_organization_api_path(db_session: Session, organization_id: int) -> str:
         if not existing:
             org.api_path = api_path
             db_session.commit()
+            # Make the new path resolvable in this container right away.
+            from GEPPPlatform.services.custom.custom_api_service import custom_api_index
+            custom_api_index.invalidate()
             return api_path
     
     raise ValueError("Failed to generate unique api_path after multiple attempts")
@@ -14,6 +14,7 @@ from ....models.users.user_locations_settings import UserLocationSettings
 from ....exceptions import ValidationException
 from .organization_role_presets import OrganizationRolePresets
 from ....libs.node_ids import to_node_id
+from ....libs import location_closure
 
 logger = logging.getLogger(__name__)
 
@@ -333,27 +334,13 @@ class OrganizationService:
 
         # Get tiers from user_service
         from ..users.user_service import UserService
-        from types import SimpleNamespace
 
         user_service = UserService(self.db)
 
-        # _resolve_location_tiers reads only `id` and `members` per location,
-        # so a 2-column projection is enough. This is the same pattern used by
-        # user_service.get_locations() to keep large orgs responsive.
-        light_rows = self.db.query(UserLocation.id, UserLocation.members).filter(
-            UserLocation.is_location == True,
-            UserLocation.is_active == True,
-            UserLocation.deleted_date.is_(None),  # skip soft-deleted rows
-            UserLocation.organization_id == organization_id,
-        ).all()
-        light_locs = [SimpleNamespace(id=r.id, members=r.members) for r in light_rows]
-
         # Full scope, not just location membership: a user who reaches a location only
         # through a tag/tenant they belong to still needs that node in the tree, or the
         # org chart renders nothing at all for them and every downstream picker is empty.
-        scope = user_service.resolve_access_scope(
-            organization_id, current_user_id, locations=light_locs
-        )
+        scope = user_service.resolve_access_scope(organization_id, current_user_id)
 
         if scope['is_owner']:
             return setup
@@ -759,6 +746,7 @@ class OrganizationService:
         # Note: The database trigger will automatically deactivate other versions
         self.db.add(new_setup)
         self.db.flush()  # Get the ID
+        location_closure.rebuild(self.db, organization_id)
 
         return {
             'id': new_setup.id,
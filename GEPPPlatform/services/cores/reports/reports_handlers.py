@@ -12,10 +12,14 @@ import logging
 import math
 from datetime import datetime, timedelta, timezone
 from zoneinfo import ZoneInfo
-import boto3
+from GEPPPlatform.libs import report_cache
+from GEPPPlatform.libs.local_periods import local_times
+from GEPPPlatform.libs.startup import lazy_module
 
 from .reports_service import ReportsService
 
+boto3 = lazy_module('boto3')
+
 logger = logging.getLogger(__name__)
 from .ghg_equivalents import kg_co2_to_trees, kg_co2_to_forest_rai
 from ..transactions.presigned_url_service import TransactionPresignedUrlService
@@ -581,9 +585,16 @@ def _handle_overview_report(
 
     group_ids = set()
 
-    for row in rows:
+    # Monthly aggregation — bucket by the user's local timezone (Bangkok),
+    # not UTC. Without this, a tx stored as e.g. 2025-10-31 18:00 UTC
+    # (= 2025-11-01 01:00 Bangkok) lands in October here while the SQL
+    # date-range filter (converted to Bangkok) includes it in November,
+    # causing an Oct/Nov split on the chart. Converted for all rows at once:
+    # one offset for the span instead of a zone lookup per record.
+    local_dates = local_times([row[1] for row in rows], 'Asia/Bangkok')
+
+    for row, dt_local in zip(rows, local_dates):
         origin_qty = float(row[0] or 0)
-        tx_date = row[1]
         tx_id = row[2]
         origin_id = row[3]
         status = row[4]
@@ -608,23 +619,11 @@ def _handle_overview_report(
         total_waste += weight
         ghg_reduction += record_ghg
 
-        # Monthly aggregation — bucket by the user's local timezone (Bangkok),
-        # not UTC. Without this, a tx stored as e.g. 2025-10-31 18:00 UTC
-        # (= 2025-11-01 01:00 Bangkok) lands in October here while the SQL
-        # date-range filter (converted to Bangkok) includes it in November,
-        # causing an Oct/Nov split on the chart.
-        if tx_date:
-            try:
-                dt = tx_date if isinstance(tx_date, datetime) else datetime.fromisoformat(str(tx_date))
-                if dt.tzinfo is None:
-                    dt = dt.replace(tzinfo=timezone.utc)
-                dt_local = dt.astimezone(ZoneInfo('Asia/Bangkok'))
-                y, m = dt_local.year, dt_local.month
-                if y not in month_totals_by_year:
-                    month_totals_by_year[y] = {}
-                month_totals_by_year[y][m] = month_totals_by_year[y].get(m, 0.0) + weight
-            except Exception:
-                pass
+        if dt_local is not None:
+            y, m = dt_local.year, dt_local.month
+            if y not in month_totals_by_year:
+                month_totals_by_year[y] = {}
+            month_totals_by_year[y][m] = month_totals_by_year[y].get(m, 0.0) + weight
 
         # Plastic saved (main_material_id=1 AND category_id=1)
         if main_mat_id == 1 and cat_id == 1:
@@ -970,25 +969,18 @@ def _handle_materials_report(
     filters: Dict[str, Any],
     current_user: Optional[Dict[str, Any]] = None
 ) -> Dict[str, Any]:
-    """Handle /api/reports/materials endpoint — optimized lightweight query path"""
+    """Handle /api/reports/materials endpoint — totals summed in SQL per material"""
     current_user_id = (current_user or {}).get('user_id') or (current_user or {}).get('id')
 
-    # Use optimized single-query path (returns lightweight tuples)
-    result = reports_service.get_overview_data(
+    # One row per status + material attribute combination, quantities summed
+    # (get_overview_totals) — the report never looks at a single record.
+    result = reports_service.get_overview_totals(
         organization_id=organization_id,
         filters=filters if filters else None,
         current_user_id=current_user_id
     )
     rows = result.get('rows', [])
 
-    # Tuple indices from get_overview_data query:
-    # 0: origin_quantity, 1: transaction_date, 2: created_transaction_id,
-    # 3: origin_id, 4: status, 5: unit_weight, 6: calc_ghg,
-    # 7: mat_category_id, 8: mat_main_material_id, 9: material_tags,
-    # 10: origin_weight_kg, 11: record_category_id, 12: record_main_material_id,
-    # 13: material_id, 14: material_name_en, 15: material_name_th,
-    # 16: disposal_method, 17: record_status
-
     # Single pass: aggregate by main material AND sub material.
     # Group keys are EITHER an int main_material_id OR the sentinel string
     # WTE_KEY for waste-to-energy items. WTE items share main_material_id
@@ -1004,15 +996,15 @@ def _handle_materials_report(
     sub_total_waste = 0.0
 
     for row in rows:
-        origin_qty = float(row[0] or 0)
-        status = row[4]
-        unit_weight = float(row[5] or 0)
-        calc_ghg = float(row[6] or 0)
-        cat_id = row[7] or row[11]   # mat_category_id || record_category_id
-        main_id = row[8] or row[12]  # mat_main_material_id || record_main_material_id
-        material_id = row[13]
-        mat_name_en = row[14]
-        mat_name_th = row[15]
+        origin_qty = float(row.origin_quantity or 0)
+        status = row.status
+        unit_weight = float(row.unit_weight or 0)
+        calc_ghg = float(row.calc_ghg or 0)
+        cat_id = row.category_id or row.record_category_id
+        main_id = row.main_material_id or row.record_main_material_id
+        material_id = row.material_id
+        mat_name_en = row.material_name_en
+        mat_name_th = row.material_name_th
 
         if status == TransactionStatus.rejected:
             continue
@@ -1882,7 +1874,7 @@ def _handle_comparison_report(
     _comparison_user_id = (current_user or {}).get('user_id') or (current_user or {}).get('id')
 
     def fetch_side_fast(side_date_from: str, side_date_to: str) -> Dict[str, Any]:
-        """Fetch one side using the lightweight get_overview_data query."""
+        """Fetch one side's per-day material totals (get_overview_totals)."""
         side_filters: Dict[str, Any] = {
             'date_from': side_date_from,
             'date_to': side_date_to,
@@ -1905,11 +1897,12 @@ def _handle_comparison_report(
             if filters.get('tenant_id') is not None:
                 side_filters['tenant_id'] = filters['tenant_id']
 
-        return reports_service.get_overview_data(
+        return reports_service.get_overview_totals(
             organization_id=organization_id,
             filters=side_filters,
             current_user_id=_comparison_user_id,
-            report_type='comparison'
+            report_type='comparison',
+            by_day=True,
         )
 
     left_result = fetch_side_fast(left_from, left_to)
@@ -1942,7 +1935,7 @@ def _handle_comparison_report(
         return labels
 
     def build_grouped_fast(result: Dict[str, Any], start_iso: Optional[str], end_iso: Optional[str]) -> Dict[str, Any]:
-        """Aggregate lightweight tuples from get_overview_data into comparison grouped data."""
+        """Aggregate get_overview_totals day rows into comparison grouped data."""
         rows = result.get('rows', [])
 
         material_map: Dict[str, float] = {}
@@ -1953,36 +1946,24 @@ def _handle_comparison_report(
 
         # Single pass: aggregate weights and collect category IDs
         for row in rows:
-            # Tuple: (origin_qty, txn_date, txn_id, origin_id, status,
-            #         unit_weight, calc_ghg, mat_cat_id, mat_mm_id, material_tags,
-            #         origin_weight_kg, rec_cat_id, rec_mm_id, material_id,
-            #         material_name_en, material_name_th, disposal_method, record_status)
-            origin_qty = float(row[0] or 0)
-            txn_date = row[1]
-            status = row[4]
-            unit_weight = float(row[5] or 0)
-            origin_weight_kg = float(row[10] or 0)
-            cat_id = row[7] or row[11]
-            mm_id = row[8] or row[12]
+            # Sums over one status + material + Bangkok day (get_overview_totals).
+            origin_qty = float(row.origin_quantity or 0)
+            status = row.status
+            unit_weight = float(row.unit_weight or 0)
+            origin_weight_kg = float(row.origin_weight_kg or 0)
+            cat_id = row.category_id or row.record_category_id
+            mm_id = row.main_material_id or row.record_main_material_id
 
             if status == TransactionStatus.rejected:
                 continue
 
             weight = origin_qty * unit_weight if unit_weight > 0 else origin_weight_kg
-            if not txn_date:
+            # Days are Bangkok days, matching the SQL date-range filter
+            # (a UTC month would split data across adjacent months).
+            dt_local = row.day
+            if not dt_local:
                 continue
 
-            dt = txn_date if isinstance(txn_date, datetime) else _parse_datetime(str(txn_date))
-            if not dt:
-                continue
-
-            # Bucket by Bangkok month to match the SQL date-range filter
-            # (otherwise UTC month can split data across adjacent months).
-            if dt.tzinfo is None:
-                dt_local = dt.replace(tzinfo=timezone.utc).astimezone(ZoneInfo('Asia/Bangkok'))
-            else:
-                dt_local = dt.astimezone(ZoneInfo('Asia/Bangkok'))
-
             if cat_id is not None:
                 try:
                     cat_id_int = int(cat_id)
@@ -2531,6 +2512,34 @@ def _handle_comparison_report(
 
 # ========== MAIN ROUTE HANDLER ==========
 
+def _cached_report(
+    reports_service: ReportsService,
+    organization_id: int,
+    path: str,
+    filters: Dict[str, Any],
+    current_user: Optional[Dict[str, Any]],
+    compute,
+    extra: Any = None,
+) -> Dict[str, Any]:
+    """Run *compute* through the report cache, keyed by the caller's access scope and role.
+
+    Users who see the same rows share entries; see libs/report_cache.py.
+    """
+    current_user_id = (current_user or {}).get('user_id') or (current_user or {}).get('id')
+    scope = None
+    if current_user_id is not None:
+        try:
+            from ..users.user_service import UserService
+            scope = UserService(reports_service.db).resolve_access_scope(int(organization_id), int(current_user_id))
+            # The pickers also narrow by the user's role, not only by the grants.
+            if reports_service._should_filter_reports_by_member(current_user_id):
+                scope = dict(scope, filter_by_member=True)
+        except Exception as e:  # noqa: BLE001 — no scope, no shared entry
+            logger.warning(f"[REPORTS] access scope unavailable, not caching {path}: {e}")
+            return compute()
+    return report_cache.cached(reports_service.db, path, organization_id, filters, scope, compute, extra=extra)
+
+
 def handle_reports_routes(event: Dict[str, Any], **common_params) -> Dict[str, Any]:
     """
     Route handler for all reports-related endpoints
@@ -2570,15 +2579,18 @@ def handle_reports_routes(event: Dict[str, Any], **common_params) -> Dict[str, A
 
         if path == '/api/reports/overview':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
-            return _handle_overview_report(reports_service, organization_id, filters, current_user)
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                _handle_overview_report(reports_service, organization_id, filters, current_user)))
 
         elif path == '/api/reports/performance':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
-            return _handle_performance_report(reports_service, organization_id, filters, current_user)
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                _handle_performance_report(reports_service, organization_id, filters, current_user)))
         
         elif path == '/api/reports/diversion':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
-            return _handle_diversion_report(reports_service, organization_id, filters, current_user)
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                _handle_diversion_report(reports_service, organization_id, filters, current_user)))
         
         elif path == '/api/reports/filter/origins':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
@@ -2594,7 +2606,8 @@ def handle_reports_routes(event: Dict[str, Any], **common_params) -> Dict[str, A
                 filters.pop('date_from', None)
                 filters.pop('date_to', None)
             current_user_id = current_user.get('user_id') or current_user.get('id')
-            return reports_service.get_origin_by_organization(organization_id=organization_id, filters=filters, current_user_id=current_user_id)
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                reports_service.get_origin_by_organization(organization_id=organization_id, filters=filters, current_user_id=current_user_id)))
 
         elif path == '/api/reports/filter/materials':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
@@ -2606,15 +2619,20 @@ def handle_reports_routes(event: Dict[str, Any], **common_params) -> Dict[str, A
                 filters.pop('date_from', None)
                 filters.pop('date_to', None)
             current_user_id = current_user.get('user_id') or current_user.get('id')
-            return reports_service.get_material_by_organization(organization_id=organization_id, filters=filters, current_user_id=current_user_id)
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                reports_service.get_material_by_organization(organization_id=organization_id, filters=filters, current_user_id=current_user_id)))
         
         elif path == '/api/reports/comparison':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
-            return _handle_comparison_report(reports_service, organization_id, filters, current_user=current_user, client_timezone=tz_name)
+            # The previous-year period is cut in the client's zone, so it is part of the key.
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                _handle_comparison_report(reports_service, organization_id, filters, current_user=current_user, client_timezone=tz_name)),
+                extra=tz_name)
 
         elif path == '/api/reports/materials':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
-            return _handle_materials_report(reports_service, organization_id, filters, current_user)
+            return _cached_report(reports_service, organization_id, path, filters, current_user, lambda: (
+                _handle_materials_report(reports_service, organization_id, filters, current_user)))
 
         elif path == '/api/reports/export/pdf':
             filters = _build_filters_from_query_params(query_params, timezone_name=tz_name)
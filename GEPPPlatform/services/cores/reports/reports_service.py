@@ -3,7 +3,7 @@ Reports Service - Business logic for reports and analytics
 Handles data retrieval and processing for various reports
 """
 
-from typing import List, Optional, Dict, Any
+from typing import Any, Dict, List, NamedTuple, Optional
 from GEPPPlatform.models.cores.references import Material, MaterialTag
 from GEPPPlatform.models.users.user_location import UserLocation
 from GEPPPlatform.models.users.user_related import UserLocationTag, UserTenant
@@ -19,10 +19,48 @@ from ....models.transactions.transactions import Transaction, TransactionStatus
 from ....models.transactions.transaction_records import TransactionRecord
 from ....models.subscriptions.subscription_models import OrganizationRole
 from ....exceptions import ValidationException, NotFoundException
+from ....libs import transaction_rollup
+from ....libs.id_filters import in_ids
+from ....libs.location_closure import descendants_clause
+from ....libs.org_tree import load_org_tree
 
 logger = logging.getLogger(__name__)
 
 
+class _FilterColumns(NamedTuple):
+    """The columns the report filters apply to, on the raw tables or on the daily rollup."""
+    origin_id: Any
+    location_tag_id: Any
+    tenant_id: Any
+    destination_id: Any
+    material_id: Any
+
+
+_RAW = _FilterColumns(Transaction.origin_id, Transaction.location_tag_id, Transaction.tenant_id,
+                      TransactionRecord.destination_id, TransactionRecord.material_id)
+_ROLLUP = transaction_rollup.TRANSACTION_DAILY_ROLLUP.c
+_ROLLUP_COLUMNS = _FilterColumns(_ROLLUP.origin_id, _ROLLUP.location_tag_id, _ROLLUP.tenant_id,
+                                 _ROLLUP.destination_id, _ROLLUP.material_id)
+
+
+class _OverviewTotal(NamedTuple):
+    """A get_overview_totals row summed from the daily rollup, shaped like the raw rows."""
+    status: Any
+    unit_weight: Any
+    calc_ghg: Any
+    category_id: Any
+    main_material_id: Any
+    record_category_id: Any
+    record_main_material_id: Any
+    material_id: Any
+    material_name_en: Any
+    material_name_th: Any
+    day: Any
+    record_count: int
+    origin_quantity: Any
+    origin_weight_kg: Any
+
+
 class ReportsService:
     """
     High-level reports service with business logic
@@ -176,12 +214,9 @@ class ReportsService:
                     if filters.get('origin_combos'):
                         combos = filters['origin_combos']
                         origin_only_origin_ids = {oid for (oid, tag_id, tenant_id) in combos if tag_id is None and tenant_id is None}
-                        expanded_origin_only = set()
-                        for oid in origin_only_origin_ids:
-                            expanded_origin_only.update(self._resolve_descendant_ids(organization_id, [oid]))
                         conditions = []
-                        if expanded_origin_only:
-                            conditions.append(Transaction.origin_id.in_(list(expanded_origin_only)))
+                        if origin_only_origin_ids:
+                            conditions.append(self._origin_under(organization_id, origin_only_origin_ids))
                         for oid, tag_id, tenant_id in combos:
                             if oid in origin_only_origin_ids:
                                 continue
@@ -201,7 +236,7 @@ class ReportsService:
                     else:
                         if filters.get('origin_ids'):
                             expanded_ids = self._resolve_descendant_ids(organization_id, filters['origin_ids'])
-                            query = query.filter(Transaction.origin_id.in_(expanded_ids))
+                            query = query.filter(self._origin_under(organization_id, filters['origin_ids']))
                             applied_filters['origin_ids'] = expanded_ids
                         if filters.get('location_tag_id') is not None:
                             query = query.filter(Transaction.location_tag_id == filters['location_tag_id'])
@@ -445,8 +480,41 @@ class ReportsService:
         origin_id replaced by the virtual shared-node id (so a shared location acts as a node at its
         placement level). Branches are disjoint (deepest share wins) → never double-counted.
         Returns (rows, node_meta)."""
-        from ..transactions.transaction_service import TransactionService, shared_node_id_for
         from sqlalchemy import literal
+        rows = []
+        queries, node_meta = self._shared_overview_queries(
+            organization_id, filters, current_user_id,
+            lambda vid: (
+                TransactionRecord.origin_quantity,          # 0
+                TransactionRecord.transaction_date,         # 1
+                TransactionRecord.created_transaction_id,   # 2
+                literal(vid).label('origin_id'),            # 3 — virtual shared-node origin
+                Transaction.status,                         # 4
+                Material.unit_weight,                       # 5
+                Material.calc_ghg,                          # 6
+                Material.category_id,                       # 7
+                Material.main_material_id,                  # 8
+                Material.tags.label('material_tags'),       # 9
+                TransactionRecord.origin_weight_kg,         # 10
+                TransactionRecord.category_id.label('record_category_id'),          # 11
+                TransactionRecord.main_material_id.label('record_main_material_id'),# 12
+                TransactionRecord.material_id,              # 13
+                Material.name_en.label('material_name_en'), # 14
+                Material.name_th.label('material_name_th'), # 15
+                TransactionRecord.disposal_method,          # 16
+                TransactionRecord.status.label('record_status'),  # 17
+                TransactionRecord.traceability_group_id,        # 18
+                TransactionRecord.id.label('record_id'),        # 19
+            ))
+        for q in queries:
+            rows.extend(q.all())
+        return rows, node_meta
+
+    def _shared_overview_queries(self, organization_id, filters, current_user_id, entities_for):
+        """One query per cross-org share branch visible in this org's reports, selecting
+        ``entities_for(virtual_node_id)`` over the branch's records in the share window and
+        the request's date/material range. Returns (queries, node_meta)."""
+        from ..transactions.transaction_service import TransactionService, shared_node_id_for
         filters = filters or {}
         # A destination filter ("สถานที่รับขยะ") selects destinations in THIS org.
         # Cross-org shared data is received at the SOURCE org's destinations, so it can
@@ -464,7 +532,7 @@ class ReportsService:
         report_from = filters.get('date_from')
         report_to = filters.get('date_to')
         material_ids = filters.get('material_ids') or []
-        rows = []
+        queries = []
         node_meta = {}
         for b in branches:
             vid = shared_node_id_for(b['share_id'])
@@ -473,27 +541,8 @@ class ReportsService:
                 'source_org_name': b.get('source_org_name'),
                 'placed_parent_node_id': b.get('placed_parent_node_id'),
             }
-            q = self.db.query(
-                TransactionRecord.origin_quantity,          # 0
-                TransactionRecord.transaction_date,         # 1
-                TransactionRecord.created_transaction_id,   # 2
-                literal(vid).label('origin_id'),            # 3 — virtual shared-node origin
-                Transaction.status,                         # 4
-                Material.unit_weight,                       # 5
-                Material.calc_ghg,                          # 6
-                Material.category_id,                       # 7
-                Material.main_material_id,                  # 8
-                Material.tags.label('material_tags'),       # 9
-                TransactionRecord.origin_weight_kg,         # 10
-                TransactionRecord.category_id.label('record_category_id'),          # 11
-                TransactionRecord.main_material_id.label('record_main_material_id'),# 12
-                TransactionRecord.material_id,              # 13
-                Material.name_en.label('material_name_en'), # 14
-                Material.name_th.label('material_name_th'), # 15
-                TransactionRecord.disposal_method,          # 16
-                TransactionRecord.status.label('record_status'),  # 17
-                TransactionRecord.traceability_group_id,        # 18
-                TransactionRecord.id.label('record_id'),        # 19
+            q = self.db.query(*entities_for(vid)).select_from(
+                TransactionRecord
             ).join(
                 Transaction, TransactionRecord.created_transaction_id == Transaction.id
             ).outerjoin(
@@ -519,8 +568,8 @@ class ReportsService:
                     q = q.filter(TransactionRecord.material_id.in_([int(m) for m in material_ids]))
                 except (TypeError, ValueError):
                     pass
-            rows.extend(q.all())
-        return rows, node_meta
+            queries.append(q)
+        return queries, node_meta
 
     def get_overview_data(
         self,
@@ -551,7 +600,8 @@ class ReportsService:
         rate, which needs both halves of the ledger.
         """
         try:
-            query = self.db.query(
+            query = self._overview_query(
+                organization_id, filters, current_user_id, report_type,
                 TransactionRecord.origin_quantity,          # 0
                 TransactionRecord.transaction_date,         # 1
                 TransactionRecord.created_transaction_id,   # 2
@@ -572,87 +622,7 @@ class ReportsService:
                 TransactionRecord.status.label('record_status'),  # 17
                 TransactionRecord.traceability_group_id,        # 18
                 TransactionRecord.id.label('record_id'),        # 19
-            ).join(
-                Transaction,
-                TransactionRecord.created_transaction_id == Transaction.id
-            ).outerjoin(
-                Material,
-                TransactionRecord.material_id == Material.id
-            ).filter(
-                Transaction.organization_id == organization_id,
-                Transaction.deleted_date.is_(None),
-                # A ผู้คัดแยก weighing material OUT of a waste room measures kilograms
-                # the tenant already reported on the way in. Both weighings are real
-                # and both matter for traceability, but summing both reports the same
-                # material twice. This query answers "how much waste did this
-                # organization produce", so the movement leg is left out. isnot(True)
-                # also covers rows written before the column existed. Migration 083.
-                Transaction.is_internal_transfer.isnot(True),
-                TransactionRecord.deleted_date.is_(None),
-                or_(
-                    TransactionRecord.status != 'rejected',
-                    TransactionRecord.status.is_(None)
-                ),
             )
-
-            # Filter by active organization_setup locations
-            query = self._apply_active_setup_filter(query, organization_id)
-
-            # Apply filters
-            if filters:
-                # New multi-select location filters
-                query, new_filters_applied = self._apply_location_filters(query, filters, organization_id)
-
-                # Legacy origin_combos / origin_ids filters (when new filters not provided)
-                if not new_filters_applied:
-                    if filters.get('origin_combos'):
-                        combos = filters['origin_combos']
-                        origin_only = {oid for (oid, tid, tenid) in combos if tid is None and tenid is None}
-                        expanded_origin_only = set()
-                        for oid in origin_only:
-                            expanded_origin_only.update(self._resolve_descendant_ids(organization_id, [oid]))
-                        conditions = []
-                        if expanded_origin_only:
-                            conditions.append(Transaction.origin_id.in_(list(expanded_origin_only)))
-                        for oid, tag_id, tenant_id in combos:
-                            if oid in origin_only:
-                                continue
-                            c = (Transaction.origin_id == oid)
-                            c = and_(c, Transaction.location_tag_id == tag_id) if tag_id else and_(c, Transaction.location_tag_id.is_(None))
-                            c = and_(c, Transaction.tenant_id == tenant_id) if tenant_id else and_(c, Transaction.tenant_id.is_(None))
-                            conditions.append(c)
-                        if conditions:
-                            query = query.filter(or_(*conditions))
-                    else:
-                        if filters.get('origin_ids'):
-                            expanded_ids = self._resolve_descendant_ids(organization_id, filters['origin_ids'])
-                            query = query.filter(Transaction.origin_id.in_(expanded_ids))
-                        if filters.get('location_tag_id') is not None:
-                            query = query.filter(Transaction.location_tag_id == filters['location_tag_id'])
-                        if filters.get('tenant_id') is not None:
-                            query = query.filter(Transaction.tenant_id == filters['tenant_id'])
-
-                if filters.get('material_ids'):
-                    query = query.filter(TransactionRecord.material_id.in_(filters['material_ids']))
-
-                date_from = filters.get('date_from')
-                date_to = filters.get('date_to')
-                if date_from or date_to:
-                    if report_type == 'comparison':
-                        # For comparison, use provided range as-is, no clamping
-                        if date_from:
-                            query = query.filter(TransactionRecord.transaction_date >= date_from)
-                        if date_to:
-                            query = query.filter(TransactionRecord.transaction_date <= date_to)
-                    else:
-                        if date_from:
-                            query = query.filter(TransactionRecord.transaction_date >= date_from)
-                        if date_to:
-                            query = query.filter(TransactionRecord.transaction_date <= date_to)
-
-            # Apply member-based filtering (non-admin users only see their own origins + descendants)
-            query = self._apply_member_filter_to_transaction_query(query, current_user_id, organization_id)
-
             rows = query.all()
 
             # Merge cross-org shared rows (read-only). Every report tab funnels through this method,
@@ -683,6 +653,167 @@ class ReportsService:
             logger.error(f"Error in get_overview_data: {str(e)}")
             raise
 
+    def get_overview_totals(
+        self,
+        organization_id: int,
+        filters: Optional[Dict[str, Any]] = None,
+        current_user_id: Any = None,
+        report_type: str = None,
+        by_day: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        The get_overview_data records summed in SQL, for the handlers that only
+        ever add records up (materials, comparison). One row per transaction
+        status and material attribute combination — and Bangkok calendar day
+        with ``by_day`` — instead of one per record; shared-org branches are
+        summed the same way and appended.
+
+        Rows carry the per-record columns those handlers read (status,
+        unit_weight, calc_ghg, category_id, main_material_id,
+        record_category_id, record_main_material_id, material_id,
+        material_name_en, material_name_th, and ``day`` with by_day) plus
+        record_count and the group's origin_quantity and origin_weight_kg sums.
+        unit_weight is part of the key, so ``origin_quantity * unit_weight`` is
+        the group's weight just as the per-record products summed to it.
+
+        This org's groups are read from transaction_daily_rollup when it can
+        answer the request exactly (see _rollup_query); shared-org branches are
+        always summed from their records.
+        """
+        try:
+            keys = [
+                Transaction.status,
+                Material.unit_weight,
+                Material.calc_ghg,
+                Material.category_id,
+                Material.main_material_id,
+                TransactionRecord.category_id,
+                TransactionRecord.main_material_id,
+                TransactionRecord.material_id,
+                Material.name_en,
+                Material.name_th,
+            ]
+            labels = ['status', 'unit_weight', 'calc_ghg', 'category_id', 'main_material_id',
+                      'record_category_id', 'record_main_material_id', 'material_id',
+                      'material_name_en', 'material_name_th']
+            if by_day:
+                # Months in the comparison report are Bangkok months, whatever ROLLUP_TIMEZONE says.
+                keys.append(transaction_rollup.LocalDay(TransactionRecord.transaction_date, 'Asia/Bangkok'))
+                labels.append('day')
+            entities = [key.label(name) for key, name in zip(keys, labels)] + [
+                func.count(TransactionRecord.id).label('record_count'),
+                func.sum(TransactionRecord.origin_quantity).label('origin_quantity'),
+                func.sum(TransactionRecord.origin_weight_kg).label('origin_weight_kg'),
+            ]
+
+            rows = self._rollup_overview_totals(organization_id, filters, current_user_id, by_day)
+            if rows is None:
+                rows = self._overview_query(
+                    organization_id, filters, current_user_id, report_type, *entities
+                ).group_by(*keys).all()
+
+            shared_queries, _shared_node_meta = self._shared_overview_queries(
+                organization_id, filters, current_user_id, lambda vid: entities)
+            for q in shared_queries:
+                rows.extend(q.group_by(*keys).all())
+
+            return {
+                'success': True,
+                'rows': rows,
+                'total_records': sum(row.record_count for row in rows),
+            }
+
+        except Exception as e:
+            logger.error(f"Error in get_overview_totals: {str(e)}")
+            raise
+
+    def _overview_query(self, organization_id: int, filters: Optional[Dict[str, Any]], current_user_id: Any,
+                        report_type: Optional[str], *entities):
+        """
+        Query *entities* over the records get_overview_data reports: this org's
+        live, non-rejected records outside internal transfers, narrowed to the
+        active setup, the request filters and what the user may see.
+        """
+        query = self.db.query(*entities).select_from(
+            TransactionRecord
+        ).join(
+            Transaction,
+            TransactionRecord.created_transaction_id == Transaction.id
+        ).outerjoin(
+            Material,
+            TransactionRecord.material_id == Material.id
+        ).filter(
+            Transaction.organization_id == organization_id,
+            Transaction.deleted_date.is_(None),
+            # A ผู้คัดแยก weighing material OUT of a waste room measures kilograms
+            # the tenant already reported on the way in. Both weighings are real
+            # and both matter for traceability, but summing both reports the same
+            # material twice. This query answers "how much waste did this
+            # organization produce", so the movement leg is left out. isnot(True)
+            # also covers rows written before the column existed. Migration 083.
+            Transaction.is_internal_transfer.isnot(True),
+            TransactionRecord.deleted_date.is_(None),
+            or_(
+                TransactionRecord.status != 'rejected',
+                TransactionRecord.status.is_(None)
+            ),
+        )
+
+        # Filter by active organization_setup locations
+        query = self._apply_active_setup_filter(query, organization_id)
+
+        # Apply filters
+        if filters:
+            # New multi-select location filters
+            query, new_filters_applied = self._apply_location_filters(query, filters, organization_id)
+
+            # Legacy origin_combos / origin_ids filters (when new filters not provided)
+            if not new_filters_applied:
+                if filters.get('origin_combos'):
+                    combos = filters['origin_combos']
+                    origin_only = {oid for (oid, tid, tenid) in combos if tid is None and tenid is None}
+                    conditions = []
+                    if origin_only:
+                        conditions.append(self._origin_under(organization_id, origin_only))
+                    for oid, tag_id, tenant_id in combos:
+                        if oid in origin_only:
+                            continue
+                        c = (Transaction.origin_id == oid)
+                        c = and_(c, Transaction.location_tag_id == tag_id) if tag_id else and_(c, Transaction.location_tag_id.is_(None))
+                        c = and_(c, Transaction.tenant_id == tenant_id) if tenant_id else and_(c, Transaction.tenant_id.is_(None))
+                        conditions.append(c)
+                    if conditions:
+                        query = query.filter(or_(*conditions))
+                else:
+                    if filters.get('origin_ids'):
+                        query = query.filter(self._origin_under(organization_id, filters['origin_ids']))
+                    if filters.get('location_tag_id') is not None:
+                        query = query.filter(Transaction.location_tag_id == filters['location_tag_id'])
+                    if filters.get('tenant_id') is not None:
+                        query = query.filter(Transaction.tenant_id == filters['tenant_id'])
+
+            if filters.get('material_ids'):
+                query = query.filter(TransactionRecord.material_id.in_(filters['material_ids']))
+
+            date_from = filters.get('date_from')
+            date_to = filters.get('date_to')
+            if date_from or date_to:
+                if report_type == 'comparison':
+                    # For comparison, use provided range as-is, no clamping
+                    if date_from:
+                        query = query.filter(TransactionRecord.transaction_date >= date_from)
+                    if date_to:
+                        query = query.filter(TransactionRecord.transaction_date <= date_to)
+                else:
+                    if date_from:
+                        query = query.filter(TransactionRecord.transaction_date >= date_from)
+                    if date_to:
+                        query = query.filter(TransactionRecord.transaction_date <= date_to)
+
+        # Apply member-based filtering (non-admin users only see their own origins + descendants)
+        query = self._apply_member_filter_to_transaction_query(query, current_user_id, organization_id)
+        return query
+
     def _fetch_internal_transfer_rows(
         self,
         organization_id: int,
@@ -804,7 +935,7 @@ class ReportsService:
                 "  AND t.collection_location_id = t.origin_id "
                 "  AND t.status = 'approved' AND t.deleted_date IS NULL "
                 "GROUP BY t.id, t.collection_location_id, t.origin_id"
-            ), {'org_id': organization_id}).fetchall()
+            ).execution_options(replica_safe=True), {'org_id': organization_id}).fetchall()
             for tx_id, coll_id, origin_id, hopless in rows:
                 out[int(tx_id)] = {
                     'collection_location_id': int(coll_id) if coll_id is not None else None,
@@ -841,37 +972,13 @@ class ReportsService:
         Returns None if no active setup found (meaning no filtering should be applied).
         Returns a set of ints representing all nodeIds in the active setup.
         """
-        setup = self.db.query(OrganizationSetup).filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True,
-            OrganizationSetup.deleted_date.is_(None)
-        ).order_by(OrganizationSetup.created_date.desc()).first()
-
-        if not setup:
+        tree = load_org_tree(self.db, organization_id)
+        if tree is None:
             return None
-
-        ids = set()
-
-        def _collect_all_ids(nodes):
-            if not nodes:
-                return
-            for node in nodes:
-                nid = node.get('nodeId')
-                if nid is not None:
-                    ids.add(int(nid) if isinstance(nid, str) else nid)
-                if node.get('children'):
-                    _collect_all_ids(node['children'])
-
-        root_nodes = setup.root_nodes if isinstance(setup.root_nodes, list) else []
-        _collect_all_ids(root_nodes)
-
-        hub_node = setup.hub_node if isinstance(setup.hub_node, dict) else {}
-        if hub_node.get('children'):
-            _collect_all_ids(hub_node['children'])
-
+        ids = tree.node_ids()
         return ids if ids else None
 
-    def _apply_active_setup_filter(self, query, organization_id: int):
+    def _apply_active_setup_filter(self, query, organization_id: int, columns: _FilterColumns = _RAW):
         """
         Filter query to only include transactions where origin_id is in the
         active organization_setup, and destination_id (on TransactionRecord) is
@@ -881,14 +988,14 @@ class ReportsService:
         if active_ids is None:
             return query
 
-        active_list = list(active_ids)
-        logger.info(f"[REPORTS] Applying active setup filter: {len(active_list)} location IDs for org {organization_id}")
+        logger.info(f"[REPORTS] Applying active setup filter: {len(active_ids)} location IDs for org {organization_id}")
 
-        query = query.filter(Transaction.origin_id.in_(active_list))
+        # One array parameter each, not an IN list of every node in the org chart.
+        query = query.filter(in_ids(columns.origin_id, active_ids))
         query = query.filter(
             or_(
-                TransactionRecord.destination_id.is_(None),
-                TransactionRecord.destination_id.in_(active_list)
+                columns.destination_id.is_(None),
+                in_ids(columns.destination_id, active_ids)
             )
         )
         return query
@@ -898,40 +1005,19 @@ class ReportsService:
         Given a list of origin_ids, expand each to include itself + all descendants
         from organization_setup.root_nodes tree.
         """
-        setup = self.db.query(OrganizationSetup).filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True
-        ).first()
-        if not setup or not setup.root_nodes:
+        tree = load_org_tree(self.db, organization_id)
+        if tree is None:
             return origin_ids
+        return list(tree.expand(origin_ids))
 
-        root_nodes = setup.root_nodes if isinstance(setup.root_nodes, list) else []
-        target_set = set(origin_ids)
-        expanded = set(origin_ids)
-
-        def _collect_descendants(nodes):
-            ids = set()
-            for node in nodes:
-                nid = node.get('nodeId')
-                if nid is not None:
-                    nid = int(nid) if isinstance(nid, str) else nid
-                    ids.add(nid)
-                if node.get('children'):
-                    ids |= _collect_descendants(node['children'])
-            return ids
-
-        def _find_and_expand(nodes):
-            for node in nodes:
-                nid = node.get('nodeId')
-                if nid is not None:
-                    nid = int(nid) if isinstance(nid, str) else nid
-                if nid in target_set and node.get('children'):
-                    expanded.update(_collect_descendants(node['children']))
-                if node.get('children'):
-                    _find_and_expand(node['children'])
-
-        _find_and_expand(root_nodes)
-        return list(expanded)
+    def _origin_under(self, organization_id: int, origin_ids, column=None):
+        """
+        Filter clause: Transaction.origin_id (or *column*) is one of origin_ids or a
+        descendant of one. Joins location_closure when it is current for the active
+        setup instead of sending the expanded ids as an IN list.
+        """
+        tree = load_org_tree(self.db, organization_id)
+        return descendants_clause(self.db, tree, Transaction.origin_id if column is None else column, origin_ids)
 
     # ─────────────────────────────────────────────────────────────────────────
     # SHARED-LOCATION handling (cross-org data sharing) — WIRED.
@@ -943,7 +1029,8 @@ class ReportsService:
     # at its placement level), and branches are DISJOINT (deepest share wins) so nothing is
     # double-counted. `_apply_location_filters` below still operates on this org's own tree only.
     # ─────────────────────────────────────────────────────────────────────────
-    def _apply_location_filters(self, query, filters: Dict[str, Any], organization_id: int):
+    def _apply_location_filters(self, query, filters: Dict[str, Any], organization_id: int,
+                                columns: _FilterColumns = _RAW):
         """
         Apply new location_ids/filter_tag_ids/filter_tenant_ids filters to a query.
         location_ids: filter by these locations + their descendants (union).
@@ -953,21 +1040,20 @@ class ReportsService:
         """
         applied = False
         if filters.get('location_ids'):
-            expanded_ids = self._resolve_descendant_ids(organization_id, filters['location_ids'])
-            query = query.filter(Transaction.origin_id.in_(expanded_ids))
+            query = query.filter(self._origin_under(organization_id, filters['location_ids'], columns.origin_id))
             applied = True
         if filters.get('filter_tag_ids'):
-            query = query.filter(Transaction.location_tag_id.in_(filters['filter_tag_ids']))
+            query = query.filter(columns.location_tag_id.in_(filters['filter_tag_ids']))
             applied = True
         if filters.get('filter_tenant_ids'):
-            query = query.filter(Transaction.tenant_id.in_(filters['filter_tenant_ids']))
+            query = query.filter(columns.tenant_id.in_(filters['filter_tenant_ids']))
             applied = True
         # Destination filter ("สถานที่รับขยะ") — orthogonal to origin, so it ANDs with
         # whichever origin path runs (new location_ids OR the legacy origin_combos fallback).
         # Do NOT flip `applied`: that flag only governs the legacy origin fallback; a
         # destination-only selection must still let the origin fallback run (as a no-op).
         if filters.get('destination_ids'):
-            query = query.filter(TransactionRecord.destination_id.in_(filters['destination_ids']))
+            query = query.filter(columns.destination_id.in_(filters['destination_ids']))
         return query, applied
 
     def _apply_member_filter_to_transaction_query(self, query, current_user_id: Any, organization_id: Optional[int] = None):
@@ -1071,7 +1157,27 @@ class ReportsService:
                 Transaction.status != TransactionStatus.rejected,
                 Transaction.origin_id.isnot(None)
             ]
+            rollup_combos = None
             if filters and (filters.get('date_from') or filters.get('date_to') or filters.get('material_ids')):
+                rollup_combos = self._rollup_query(
+                    organization_id, filters, current_user_id,
+                    _ROLLUP.origin_id, _ROLLUP.location_tag_id, _ROLLUP.tenant_id,
+                )
+            if rollup_combos is not None:
+                rollup_combos = rollup_combos.filter(
+                    _ROLLUP.transaction_status != TransactionStatus.rejected.value,
+                    _ROLLUP.origin_id.isnot(None),
+                )
+                material_ids = (filters.get('material_ids') or [])
+                if material_ids:
+                    try:
+                        mids = [int(m) for m in material_ids]
+                        if mids:
+                            rollup_combos = rollup_combos.filter(_ROLLUP.material_id.in_(mids))
+                    except Exception:
+                        pass
+                combos_result = [tuple(row) for row in rollup_combos.distinct().all()]
+            elif filters and (filters.get('date_from') or filters.get('date_to') or filters.get('material_ids')):
                 tr_query = self.db.query(
                     Transaction.origin_id,
                     Transaction.location_tag_id,
@@ -1382,6 +1488,198 @@ class ReportsService:
             logger.error(f"Unexpected error in get_origin_by_organization: {str(e)}")
             raise
     
+    def _apply_selection_filters(self, query, filters: Dict[str, Any], organization_id: int,
+                                 columns: _FilterColumns = _RAW):
+        """
+        Apply the request's location and material selection (everything but the
+        date range) to a query over the raw tables or the daily rollup.
+        """
+        # New multi-select location filters
+        query, new_filters_applied = self._apply_location_filters(query, filters, organization_id, columns)
+
+        # Legacy origin_combos / origin_ids filters (when new filters not provided)
+        if not new_filters_applied:
+            if filters.get('origin_combos'):
+                combos = filters['origin_combos']
+                origin_only_origin_ids = {oid for (oid, tag_id, tenant_id) in combos if tag_id is None and tenant_id is None}
+                conditions = []
+                if origin_only_origin_ids:
+                    conditions.append(self._origin_under(organization_id, origin_only_origin_ids, columns.origin_id))
+                for oid, tag_id, tenant_id in combos:
+                    if oid in origin_only_origin_ids:
+                        continue
+                    c = (columns.origin_id == oid)
+                    if tag_id is None:
+                        c = and_(c, columns.location_tag_id.is_(None))
+                    else:
+                        c = and_(c, columns.location_tag_id == tag_id)
+                    if tenant_id is None:
+                        c = and_(c, columns.tenant_id.is_(None))
+                    else:
+                        c = and_(c, columns.tenant_id == tenant_id)
+                    conditions.append(c)
+                if conditions:
+                    query = query.filter(or_(*conditions))
+            else:
+                origin_ids = (filters.get('origin_ids') or [])
+                if origin_ids:
+                    try:
+                        oids = [int(o) for o in origin_ids]
+                        if oids:
+                            query = query.filter(self._origin_under(organization_id, oids, columns.origin_id))
+                    except Exception:
+                        pass
+                if filters.get('location_tag_id') is not None:
+                    query = query.filter(columns.location_tag_id == filters['location_tag_id'])
+                if filters.get('tenant_id') is not None:
+                    query = query.filter(columns.tenant_id == filters['tenant_id'])
+        # Material filter (optional intersection)
+        material_ids = (filters.get('material_ids') or [])
+        if material_ids:
+            try:
+                mids = [int(m) for m in material_ids]
+                if mids:
+                    query = query.filter(columns.material_id.in_(mids))
+            except Exception:
+                pass
+        return query
+
+    def _rollup_query(self, organization_id: int, filters: Optional[Dict[str, Any]], current_user_id: Any, *entities):
+        """
+        Query *entities* of transaction_daily_rollup for this org with the user's
+        visibility and the request's date range applied, or None when the rollup
+        cannot answer exactly: reads switched off, a date bound inside a day, a
+        visibility grant with a date window, or the org's rollup not built.
+        """
+        if not transaction_rollup.enabled():
+            return None
+        filters = filters or {}
+        bounds = transaction_rollup.day_bounds(filters.get('date_from'), filters.get('date_to'))
+        if bounds is None:
+            return None
+        visibility = None
+        if current_user_id is not None and organization_id is not None:
+            from ..users.user_service import UserService
+            from ....libs.locationAccess import build_visibility_clause
+
+            scope = UserService(self.db).resolve_access_scope(int(organization_id), int(current_user_id))
+            # Grant windows compare each transaction's own timestamp, which the rollup does not keep.
+            if any(grant.get('location_ids') and (grant.get('start_date') or grant.get('end_date'))
+                   for grant in scope.get('scoped_grants') or []):
+                return None
+            visibility = build_visibility_clause(
+                scope,
+                origin_col=_ROLLUP.origin_id,
+                tag_col=_ROLLUP.location_tag_id,
+                tenant_col=_ROLLUP.tenant_id,
+            )
+        if not transaction_rollup.is_current(self.db, organization_id):
+            return None
+
+        query = self.db.query(*entities).select_from(
+            transaction_rollup.TRANSACTION_DAILY_ROLLUP
+        ).filter(_ROLLUP.organization_id == organization_id)
+        if visibility is not None:
+            query = query.filter(visibility)
+        days = transaction_rollup.day_clause(_ROLLUP.day, *bounds)
+        if days is not None:
+            query = query.filter(days)
+        return query
+
+    def _rollup_material_ids(self, organization_id: int, filters: Optional[Dict[str, Any]], current_user_id: Any) -> Optional[set]:
+        """Distinct material ids for get_material_by_organization from the daily rollup, or None."""
+        query = self._rollup_query(organization_id, filters, current_user_id, _ROLLUP.material_id)
+        if query is None:
+            return None
+        query = query.filter(
+            _ROLLUP.is_internal_transfer.isnot(True),
+            or_(_ROLLUP.record_status != 'rejected', _ROLLUP.record_status.is_(None)),
+        )
+        query = self._apply_active_setup_filter(query, organization_id, _ROLLUP_COLUMNS)
+        if filters:
+            query = self._apply_selection_filters(query, filters, organization_id, _ROLLUP_COLUMNS)
+        return {row[0] for row in query.distinct().all() if row[0]}
+
+    def _rollup_overview_totals(self, organization_id: int, filters: Optional[Dict[str, Any]],
+                                current_user_id: Any, by_day: bool) -> Optional[List[_OverviewTotal]]:
+        """This org's get_overview_totals groups from the daily rollup, or None."""
+        # Comparison days are Bangkok days; a rollup cut in another zone cannot give them.
+        if by_day and transaction_rollup.timezone_name() != 'Asia/Bangkok':
+            return None
+        keys = [
+            _ROLLUP.transaction_status,
+            Material.unit_weight,
+            Material.calc_ghg,
+            Material.category_id,
+            Material.main_material_id,
+            _ROLLUP.category_id,
+            _ROLLUP.main_material_id,
+            _ROLLUP.material_id,
+            Material.name_en,
+            Material.name_th,
+        ]
+        if by_day:
+            keys.append(_ROLLUP.day)
+        query = self._rollup_query(
+            organization_id, filters, current_user_id, *keys,
+            func.sum(_ROLLUP.record_count),
+            func.sum(_ROLLUP.quantity),
+            func.sum(_ROLLUP.weight_kg),
+        )
+        if query is None:
+            return None
+        query = query.outerjoin(Material, _ROLLUP.material_id == Material.id).filter(
+            _ROLLUP.is_internal_transfer.isnot(True),
+            or_(_ROLLUP.record_status != 'rejected', _ROLLUP.record_status.is_(None)),
+        )
+        query = self._apply_active_setup_filter(query, organization_id, _ROLLUP_COLUMNS)
+        if filters:
+            query = self._apply_selection_filters(query, filters, organization_id, _ROLLUP_COLUMNS)
+
+        rows = []
+        for row in query.group_by(*keys).all():
+            # The rollup keeps the status enum's name as text; the handlers compare members.
+            status = TransactionStatus.__members__.get(row[0], row[0])
+            day = row[10] if by_day else None
+            count, quantity, weight = row[-3:]
+            rows.append(_OverviewTotal(status, *row[1:10], day, int(count or 0), quantity, weight))
+        return rows
+
+    def _raw_material_ids(self, organization_id: int, filters: Optional[Dict[str, Any]], current_user_id: Any) -> set:
+        """Distinct material ids for get_material_by_organization from the transaction records."""
+        query = self.db.query(TransactionRecord.material_id).join(
+            Transaction,
+            TransactionRecord.created_transaction_id == Transaction.id
+        ).filter(
+            Transaction.organization_id == organization_id,
+            Transaction.deleted_date.is_(None),
+            # A ผู้คัดแยก weighing material OUT of a waste room measures kilograms
+            # the tenant already reported on the way in. Both weighings are real
+            # and both matter for traceability, but summing both reports the same
+            # material twice. This query answers "how much waste did this
+            # organization produce", so the movement leg is left out. isnot(True)
+            # also covers rows written before the column existed. Migration 083.
+            Transaction.is_internal_transfer.isnot(True),
+            TransactionRecord.deleted_date.is_(None),
+            or_(
+                TransactionRecord.status != 'rejected',
+                TransactionRecord.status.is_(None)
+            ),
+        )
+        query = self._apply_member_filter_to_transaction_query(query, current_user_id, organization_id)
+        # Filter by active organization_setup locations
+        query = self._apply_active_setup_filter(query, organization_id)
+        if filters:
+            query = self._apply_selection_filters(query, filters, organization_id)
+            # Date range filter
+            date_from = filters.get('date_from')
+            date_to = filters.get('date_to')
+            if date_from:
+                query = query.filter(TransactionRecord.transaction_date >= date_from)
+            if date_to:
+                query = query.filter(TransactionRecord.transaction_date <= date_to)
+        return {row[0] for row in query.distinct().all() if row[0]}
+
     def get_material_by_organization(self, organization_id: int, filters: Optional[Dict[str, Any]] = None, current_user_id: Any = None) -> Dict[str, Any]:
         """
         Get all active materials for a specific organization based on transaction records.
@@ -1389,104 +1687,13 @@ class ReportsService:
         where the user is in origin/tag/tenant members.
         """
         try:
-            # Step 1: Get transaction records that belong to this organization
-            transaction_records_query = self.db.query(TransactionRecord).join(
-                Transaction,
-                TransactionRecord.created_transaction_id == Transaction.id
-            ).filter(
-                Transaction.organization_id == organization_id,
-                Transaction.deleted_date.is_(None),
-                # A ผู้คัดแยก weighing material OUT of a waste room measures kilograms
-                # the tenant already reported on the way in. Both weighings are real
-                # and both matter for traceability, but summing both reports the same
-                # material twice. This query answers "how much waste did this
-                # organization produce", so the movement leg is left out. isnot(True)
-                # also covers rows written before the column existed. Migration 083.
-                Transaction.is_internal_transfer.isnot(True),
-                TransactionRecord.deleted_date.is_(None),
-                or_(
-                    TransactionRecord.status != 'rejected',
-                    TransactionRecord.status.is_(None)
-                ),
-            )
-            transaction_records_query = self._apply_member_filter_to_transaction_query(transaction_records_query, current_user_id, organization_id)
-            # Filter by active organization_setup locations
-            transaction_records_query = self._apply_active_setup_filter(transaction_records_query, organization_id)
-            # Apply optional filters
-            if filters:
-                # New multi-select location filters
-                transaction_records_query, new_filters_applied = self._apply_location_filters(transaction_records_query, filters, organization_id)
-
-                # Legacy origin_combos / origin_ids filters (when new filters not provided)
-                if not new_filters_applied:
-                    if filters.get('origin_combos'):
-                        combos = filters['origin_combos']
-                        origin_only_origin_ids = {oid for (oid, tag_id, tenant_id) in combos if tag_id is None and tenant_id is None}
-                        expanded_origin_only = set()
-                        for oid in origin_only_origin_ids:
-                            expanded_origin_only.update(self._resolve_descendant_ids(organization_id, [oid]))
-                        conditions = []
-                        if expanded_origin_only:
-                            conditions.append(Transaction.origin_id.in_(list(expanded_origin_only)))
-                        for oid, tag_id, tenant_id in combos:
-                            if oid in origin_only_origin_ids:
-                                continue
-                            c = (Transaction.origin_id == oid)
-                            if tag_id is None:
-                                c = and_(c, Transaction.location_tag_id.is_(None))
-                            else:
-                                c = and_(c, Transaction.location_tag_id == tag_id)
-                            if tenant_id is None:
-                                c = and_(c, Transaction.tenant_id.is_(None))
-                            else:
-                                c = and_(c, Transaction.tenant_id == tenant_id)
-                            conditions.append(c)
-                        if conditions:
-                            transaction_records_query = transaction_records_query.filter(or_(*conditions))
-                    else:
-                        origin_ids = (filters.get('origin_ids') or [])
-                        if origin_ids:
-                            try:
-                                oids = [int(o) for o in origin_ids]
-                                if oids:
-                                    oids = self._resolve_descendant_ids(organization_id, oids)
-                                    transaction_records_query = transaction_records_query.filter(Transaction.origin_id.in_(oids))
-                            except Exception:
-                                pass
-                        if filters.get('location_tag_id') is not None:
-                            transaction_records_query = transaction_records_query.filter(
-                                Transaction.location_tag_id == filters['location_tag_id']
-                            )
-                        if filters.get('tenant_id') is not None:
-                            transaction_records_query = transaction_records_query.filter(
-                                Transaction.tenant_id == filters['tenant_id']
-                            )
-                # Material filter (optional intersection)
-                material_ids = (filters.get('material_ids') or [])
-                if material_ids:
-                    try:
-                        mids = [int(m) for m in material_ids]
-                        if mids:
-                            transaction_records_query = transaction_records_query.filter(TransactionRecord.material_id.in_(mids))
-                    except Exception:
-                        pass
-                # Date range filter
-                date_from = filters.get('date_from')
-                date_to = filters.get('date_to')
-                if date_from:
-                    transaction_records_query = transaction_records_query.filter(TransactionRecord.transaction_date >= date_from)
-                if date_to:
-                    transaction_records_query = transaction_records_query.filter(TransactionRecord.transaction_date <= date_to)
-            
-            transaction_records = transaction_records_query.all()
-            
-            # Step 2: Extract unique material_ids from transaction records
-            material_ids = set()
-            for record in transaction_records:
-                if record.material_id:  # Only add if material_id is not None
-                    material_ids.add(record.material_id)
+            # Step 1: Distinct materials of this organization's records, from the
+            # daily rollup when it can answer the request exactly
+            material_ids = self._rollup_material_ids(organization_id, filters, current_user_id)
+            if material_ids is None:
+                material_ids = self._raw_material_ids(organization_id, filters, current_user_id)
             
-            # Step 3: Get materials from those IDs
+            # Step 2: Get materials from those IDs
             if material_ids:
                 materials_query = self.db.query(Material).filter(
                     Material.id.in_(material_ids),
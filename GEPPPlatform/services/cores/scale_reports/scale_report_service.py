@@ -11,15 +11,16 @@ Both call :func:`get_daily_summary`; the public one passes the result through
 
 import logging
 from datetime import date, datetime, timedelta, timezone
-from typing import Any, Dict, List, Set
+from typing import Any, Dict, List
 
 from sqlalchemy import func, or_
 
 from GEPPPlatform.libs.exceptions import NotFoundException, UnauthorizedException
+from GEPPPlatform.libs.location_closure import descendants_clause
+from GEPPPlatform.libs.org_tree import load_org_tree
 from GEPPPlatform.models.cores.references import MainMaterial, Material
 from GEPPPlatform.models.transactions.transaction_records import TransactionRecord
 from GEPPPlatform.models.transactions.transactions import Transaction
-from GEPPPlatform.models.subscriptions.organizations import OrganizationSetup
 from GEPPPlatform.models.users.user_location import UserLocation
 
 from ..reports.ghg_equivalents import kg_co2_to_forest_rai, kg_co2_to_trees
@@ -40,56 +41,12 @@ def descendant_origin_ids(db_session, organization_id: int, origin_id: int) -> L
     หัวหน้าที่ดูแลระดับอาคารจึงต้องเห็นยอดรวมของชั้นข้างใต้ด้วย ไม่ใช่ 0
     เพราะไม่มีใครชั่งโดยระบุตัวอาคารตรง ๆ
 
-    หมายเหตุ: `ReportsService._resolve_descendant_ids()` ทำเรื่องเดียวกัน แต่
-    เป็น method ส่วนตัวของคลาสอื่น จึงไม่เรียกข้ามมา ถ้าวันหลังมีการรวมโค้ด
-    เดินต้นไม้ทั้งหมดเข้าด้วยกัน ควรรวมตัวนี้ไปด้วย
+    เดินต้นไม้ผ่าน `libs.org_tree` ตัวเดียวกับรายงานและรายการธุรกรรม
     """
-    setup = (
-        db_session.query(OrganizationSetup)
-        .filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True,  # noqa: E712
-            OrganizationSetup.deleted_date.is_(None),
-        )
-        .order_by(OrganizationSetup.created_date.desc())
-        .first()
-    )
-    if not setup or not setup.root_nodes:
-        return [origin_id]
-
-    roots = setup.root_nodes
-    if isinstance(roots, dict):
-        roots = [roots]
-    if not isinstance(roots, list):
+    tree = load_org_tree(db_session, organization_id)
+    if tree is None:
         return [origin_id]
-
-    def _to_int(v):
-        if isinstance(v, int):
-            return v
-        if isinstance(v, str) and v.isdigit():
-            return int(v)
-        return None
-
-    def _collect(node, out):
-        nid = _to_int(node.get('nodeId'))
-        if nid is not None:
-            out.add(nid)
-        for child in (node.get('children') or []):
-            if isinstance(child, dict):
-                _collect(child, out)
-
-    found: Set[int] = {origin_id}
-
-    def _walk(nodes):
-        for node in nodes:
-            if not isinstance(node, dict):
-                continue
-            if _to_int(node.get('nodeId')) == origin_id:
-                _collect(node, found)
-            _walk([c for c in (node.get('children') or []) if isinstance(c, dict)])
-
-    _walk([n for n in roots if isinstance(n, dict)])
-    return sorted(found)
+    return sorted(tree.expand([origin_id]))
 
 
 def _location_names(db_session, origin_ids: List[int]) -> Dict[int, str]:
@@ -192,7 +149,8 @@ def get_daily_summary(
         .outerjoin(Material, TransactionRecord.material_id == Material.id)
         .outerjoin(MainMaterial, TransactionRecord.main_material_id == MainMaterial.id)
         .filter(
-            Transaction.origin_id.in_(subtree_ids),
+            descendants_clause(db_session, load_org_tree(db_session, organization_id),
+                               Transaction.origin_id, [origin_id]),
             Transaction.organization_id == organization_id,
             Transaction.deleted_date.is_(None),
             TransactionRecord.deleted_date.is_(None),
@@ -21,7 +21,7 @@ import logging
 from datetime import datetime, timezone
 from typing import Any, Dict, List, Optional
 
-import boto3
+from ....libs.startup import lazy_module
 from sqlalchemy import func, and_, or_
 
 from ....models.shared_user_location import SharedUserLocation
@@ -34,6 +34,8 @@ from ....libs.exceptions import (
     ConflictException,
 )
 
+boto3 = lazy_module('boto3')
+
 logger = logging.getLogger(__name__)
 
 
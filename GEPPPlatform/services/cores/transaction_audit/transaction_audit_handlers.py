@@ -1150,40 +1150,11 @@ def handle_process_audit_queue(db_session: Any) -> Dict[str, Any]:
 
 def _resolve_descendant_ids(db_session: Any, organization_id: int, origin_ids: list) -> list:
     """Given a list of origin_ids, expand each to include itself + all descendants from org setup tree."""
-    from ....models.subscriptions.organizations import OrganizationSetup
-    setup = db_session.query(OrganizationSetup).filter(
-        OrganizationSetup.organization_id == organization_id,
-        OrganizationSetup.is_active == True
-    ).first()
-    if not setup or not setup.root_nodes:
+    from ....libs.org_tree import load_org_tree
+    tree = load_org_tree(db_session, organization_id)
+    if tree is None:
         return origin_ids
-    root_nodes = setup.root_nodes if isinstance(setup.root_nodes, list) else []
-    target_set = set(origin_ids)
-    expanded = set(origin_ids)
-
-    def _collect_descendants(nodes):
-        ids = set()
-        for node in nodes:
-            nid = node.get('nodeId')
-            if nid is not None:
-                nid = int(nid) if isinstance(nid, str) else nid
-                ids.add(nid)
-            if node.get('children'):
-                ids |= _collect_descendants(node['children'])
-        return ids
-
-    def _find_and_expand(nodes):
-        for node in nodes:
-            nid = node.get('nodeId')
-            if nid is not None:
-                nid = int(nid) if isinstance(nid, str) else nid
-            if nid in target_set and node.get('children'):
-                expanded.update(_collect_descendants(node['children']))
-            if node.get('children'):
-                _find_and_expand(node['children'])
-
-    _find_and_expand(root_nodes)
-    return list(expanded)
+    return list(tree.expand(origin_ids))
 
 
 def _should_filter_audit_by_member(db_session: Any, current_user_id: Any) -> bool:
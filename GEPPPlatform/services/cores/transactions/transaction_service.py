@@ -6,7 +6,7 @@ Handles CRUD operations, validation, and transaction record linking
 from typing import List, Optional, Dict, Any, Tuple
 from sqlalchemy.orm import Session, joinedload
 from sqlalchemy.exc import SQLAlchemyError
-from sqlalchemy import cast, String, exists, and_, func, or_, true, false
+from sqlalchemy import cast, String, exists, and_, func, or_, true
 from sqlalchemy.dialects.postgresql import JSONB
 import json
 import logging
@@ -20,10 +20,15 @@ TRACEABILITY_DATE_TZ = "Asia/Bangkok"
 # Decides whether a transaction's traceability piles are per weigh-in or per month.
 # auto_approve is a leaf module (logging + typing + sqlalchemy.text only), so this
 # import cannot cycle back into transactions.
+from ....libs.id_filters import in_ids
 from ....libs.node_ids import to_node_id
+from ....libs.location_closure import descendants_clause
+from ....libs.org_tree import load_org_tree
 from ..iot_devices.auto_approve import SCALE_TRANSACTION_METHOD, scale_pile_source_transaction_id
 
-import boto3
+from ....libs.startup import lazy_module
+
+boto3 = lazy_module('boto3')
 
 from sqlalchemy import cast, String, text
 from sqlalchemy.orm import Session, joinedload
@@ -2260,39 +2265,10 @@ This is an automated message from GEPP Platform. Please do not reply to this ema
 
     def _resolve_descendant_ids(self, organization_id: int, origin_ids: List[int]) -> List[int]:
         """Given a list of origin_ids, expand each to include itself + all descendants from org setup tree."""
-        setup = self.db.query(OrganizationSetup).filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True
-        ).first()
-        if not setup or not setup.root_nodes:
+        tree = load_org_tree(self.db, organization_id)
+        if tree is None:
             return origin_ids
-        root_nodes = setup.root_nodes if isinstance(setup.root_nodes, list) else []
-        target_set = set(origin_ids)
-        expanded = set(origin_ids)
-
-        def _collect_descendants(nodes):
-            ids = set()
-            for node in nodes:
-                nid = node.get('nodeId')
-                if nid is not None:
-                    nid = int(nid) if isinstance(nid, str) else nid
-                    ids.add(nid)
-                if node.get('children'):
-                    ids |= _collect_descendants(node['children'])
-            return ids
-
-        def _find_and_expand(nodes):
-            for node in nodes:
-                nid = node.get('nodeId')
-                if nid is not None:
-                    nid = int(nid) if isinstance(nid, str) else nid
-                if nid in target_set and node.get('children'):
-                    expanded.update(_collect_descendants(node['children']))
-                if node.get('children'):
-                    _find_and_expand(node['children'])
-
-        _find_and_expand(root_nodes)
-        return list(expanded)
+        return list(tree.expand(origin_ids))
 
     # ── Shared-location (cross-org) data injection ────────────────────────────
     def _active_root_nodes(self, organization_id: int):
@@ -2318,32 +2294,8 @@ This is an automated message from GEPP Platform. Please do not reply to this ema
         from the chart (e.g. a setup-import replaced it → recycle bin); restoring the location
         puts it back in the tree and the transactions reappear.
         """
-        setup = self.db.query(OrganizationSetup).filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True,  # noqa: E712
-        ).first()
-        if not setup:
-            setup = self.db.query(OrganizationSetup).filter(
-                OrganizationSetup.organization_id == organization_id
-            ).order_by(OrganizationSetup.created_date.desc()).first()
-        if not setup:
-            return None
-        ids: set = set()
-
-        def _collect(nodes):
-            for n in nodes if isinstance(nodes, list) else []:
-                nid = n.get('nodeId')
-                if nid is not None:
-                    try:
-                        ids.add(int(nid))
-                    except (TypeError, ValueError):
-                        pass  # virtual/shared string id — not a real origin
-                _collect(n.get('children') or [])
-
-        _collect(setup.root_nodes or [])
-        hub = setup.hub_node if isinstance(setup.hub_node, dict) else {}
-        _collect(hub.get('children') or [])
-        return ids
+        tree = load_org_tree(self.db, organization_id, fallback_latest=True)
+        return tree.node_ids() if tree is not None else None
 
     def _collect_source_subtree_ids(self, source_org_id: int, source_location_id: int) -> set:
         """Real (positive) location ids for source_location_id + its descendants, from the
@@ -2629,54 +2581,17 @@ This is an automated message from GEPP Platform. Please do not reply to this ema
             active_node_ids = self._active_setup_node_ids(organization_id)
             if active_node_ids is not None:
                 own_conditions.append(or_(
-                    Transaction.origin_id.in_(list(active_node_ids)) if active_node_ids else false(),
+                    in_ids(Transaction.origin_id, active_node_ids),
                     Transaction.origin_id.is_(None),
                 ))
 
             # New multi-select location filter: location_ids + descendants (union)
             own_selected_ids = None  # None => no location filter (all placed shares in scope)
             if location_ids:
-                # Get org tree to find descendants
-                org_setup = self.db.query(OrganizationSetup).filter(
-                    and_(
-                        OrganizationSetup.organization_id == organization_id,
-                        OrganizationSetup.is_active == True
-                    )
-                ).first()
-                if not org_setup:
-                    org_setup = self.db.query(OrganizationSetup).filter(
-                        OrganizationSetup.organization_id == organization_id
-                    ).order_by(OrganizationSetup.created_date.desc()).first()
-
-                all_origin_ids = set(location_ids)
-                if org_setup and org_setup.root_nodes:
-                    def collect_descendants(nodes, collecting=False):
-                        """Collect all descendant nodeIds when collecting=True"""
-                        ids = set()
-                        for node in nodes if isinstance(nodes, list) else []:
-                            node_id = node.get('nodeId')
-                            if node_id is not None:
-                                try:
-                                    node_id = int(node_id) if isinstance(node_id, str) else node_id
-                                except (TypeError, ValueError):
-                                    node_id = None  # virtual/shared or malformed id — skip
-                            children = node.get('children', [])
-                            if collecting:
-                                if node_id is not None:
-                                    ids.add(node_id)
-                                ids.update(collect_descendants(children, True))
-                            elif node_id in all_origin_ids:
-                                # Found a target node, collect all its descendants
-                                ids.update(collect_descendants(children, True))
-                            else:
-                                ids.update(collect_descendants(children, False))
-                        return ids
-
-                    descendant_ids = collect_descendants(org_setup.root_nodes)
-                    all_origin_ids.update(descendant_ids)
-
-                own_selected_ids = all_origin_ids
-                own_conditions.append(Transaction.origin_id.in_(list(all_origin_ids)))
+                # Same tree (active, else latest setup) the orphan filter above uses.
+                tree = load_org_tree(self.db, organization_id, fallback_latest=True)
+                own_selected_ids = tree.expand(location_ids) if tree is not None else set(location_ids)
+                own_conditions.append(descendants_clause(self.db, tree, Transaction.origin_id, location_ids))
 
             own_clause = and_(*own_conditions) if own_conditions else true()
 
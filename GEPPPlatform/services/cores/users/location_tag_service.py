@@ -12,6 +12,7 @@ from sqlalchemy.dialects.postgresql import JSONB
 from GEPPPlatform.models.users.user_related import UserLocationTag
 from GEPPPlatform.models.users.user_location import UserLocation
 from GEPPPlatform.exceptions import NotFoundException, BadRequestException
+from GEPPPlatform.libs import access_scope
 
 
 class LocationTagService:
@@ -163,6 +164,7 @@ class LocationTagService:
 
         self.db.add(tag)
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tag)
 
         # Update the location's tags array if initial location was provided
@@ -252,6 +254,7 @@ class LocationTagService:
         tag.updated_date = datetime.utcnow()
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tag)
 
         return self._serialize_tag(tag)
@@ -286,6 +289,7 @@ class LocationTagService:
             tag.user_locations = []
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         return True
 
     def attach_tag_to_location(
@@ -331,6 +335,7 @@ class LocationTagService:
         self._update_location_tags(user_location_id, tag_id, add=True)
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tag)
 
         return self._serialize_tag(tag)
@@ -368,6 +373,7 @@ class LocationTagService:
         self._update_location_tags(user_location_id, tag_id, add=False)
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tag)
 
         return self._serialize_tag(tag)
@@ -405,6 +411,7 @@ class LocationTagService:
         tag.updated_date = datetime.utcnow()
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tag)
 
         return self._serialize_tag(tag)
@@ -11,6 +11,7 @@ from sqlalchemy import and_, or_, func
 from GEPPPlatform.models.users.user_related import UserTenant
 from GEPPPlatform.models.users.user_location import UserLocation
 from GEPPPlatform.exceptions import NotFoundException, BadRequestException
+from GEPPPlatform.libs import access_scope
 
 
 class TenantService:
@@ -192,6 +193,7 @@ class TenantService:
 
         self.db.add(tenant)
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tenant)
 
         if user_location_id and initial_locations:
@@ -275,6 +277,7 @@ class TenantService:
         tenant.updated_date = datetime.utcnow()
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tenant)
 
         return self._serialize_tenant(tenant)
@@ -308,6 +311,7 @@ class TenantService:
             tenant.user_locations = []
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         return True
 
     def attach_tenant_to_location(
@@ -349,6 +353,7 @@ class TenantService:
         self._update_location_tenants(user_location_id, tenant_id, add=True)
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tenant)
 
         return self._serialize_tenant(tenant)
@@ -382,6 +387,7 @@ class TenantService:
         self._update_location_tenants(user_location_id, tenant_id, add=False)
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tenant)
 
         return self._serialize_tenant(tenant)
@@ -418,6 +424,7 @@ class TenantService:
         tenant.updated_date = datetime.utcnow()
 
         self.db.commit()
+        access_scope.invalidate(organization_id)
         self.db.refresh(tenant)
 
         return self._serialize_tenant(tenant)
@@ -17,6 +17,7 @@ from ....models.users.user_related import (
 )
 from ....models.cores.roles import SystemRole
 from ....models.subscriptions.subscription_models import OrganizationRole
+from ....libs.token_cache import verified_tokens
 
 
 def _normalize_identity(value: Any) -> str:
@@ -384,6 +385,8 @@ class UserCRUD:
             )
 
         self.db.commit()
+        if 'is_active' in changes or 'secret' in changes:
+            verified_tokens.invalidate_user(user_id)
         return user
 
     def update_user_status(
@@ -414,6 +417,9 @@ class UserCRUD:
             )
 
         self.db.commit()
+        if not user.is_active:
+            # A suspended user's cached token verifications must stop working here now.
+            verified_tokens.invalidate_user(user_id)
         return user
 
     def assign_user_role(
@@ -482,6 +488,7 @@ class UserCRUD:
             self.db.delete(user)
 
         self.db.commit()
+        verified_tokens.invalidate_user(user_id)
         return True
 
     # ========== INVITATION OPERATIONS ==========
@@ -9,6 +9,7 @@ from datetime import datetime
 from .user_service import UserService
 from .location_tag_service import LocationTagService
 from .tenant_service import TenantService
+from ....libs import access_scope, location_closure
 from ....exceptions import (
     APIException,
     UnauthorizedException,
@@ -1394,6 +1395,7 @@ def handle_update_location(
 
         db_session.flush()
         db_session.commit()
+        access_scope.invalidate(organization_id)
 
         # Re-query to get fresh data
         db_session.expire(location)
@@ -1945,6 +1947,8 @@ def handle_delete_location_with_transactions(
                     hub_copy['children'] = remove_node_from_tree(hub_copy['children'], target_node_id)
                 setup.hub_node = hub_copy
                 flag_modified(setup, 'hub_node')
+            db_session.flush()
+            location_closure.rebuild(db_session, organization_id)
             db_session.commit()
 
         # If location doesn't exist or is already deleted, still clean up tree (stale data) then return
@@ -16,7 +16,9 @@ from ....models.subscriptions.organizations import Organization
 from ....models.users.user_related import UserRoleEnum
 from ....models.users.user_location_materials import UserLocationMaterial
 from ....models.cores.references import Material
-from ....libs.node_ids import to_node_id
+from ....libs import access_scope, location_paths
+from ....libs.org_tree import ROOT, OrgTreeIndex, load_org_tree
+from ....libs.request_timing import timed
 
 
 def _normalize_identity(value: Any) -> str:
@@ -164,35 +166,6 @@ def resolve_headcount_scope(
     return {'total': total if present else None, 'covered_ids': covered_ids}
 
 
-def collect_path_ancestors(root_nodes: Any, target_ids: Set[int]) -> Set[int]:
-    """
-    Every node on the path from a root down to any node in `target_ids`.
-
-    Tier-2 context: the org chart needs the branch/building above a location the user
-    can reach, or the node renders detached from the tree. Excludes the targets themselves.
-    """
-    ancestors: Set[int] = set()
-    if not isinstance(root_nodes, list):
-        return ancestors
-
-    def walk(nodes, path):
-        for node in nodes:
-            if not isinstance(node, dict):
-                continue
-            try:
-                nid = int(node.get('nodeId', 0))
-            except (TypeError, ValueError):
-                nid = None
-            if nid is not None and nid in target_ids:
-                ancestors.update(path)
-            children = node.get('children') or []
-            if children:
-                walk(children, path + [nid] if nid is not None else path)
-
-    walk(root_nodes, [])
-    return ancestors - target_ids
-
-
 def expand_with_descendants(root_nodes: Any, target_ids: Set[int]) -> Set[int]:
     """
     Expand `target_ids` with every descendant of those nodes in the org tree.
@@ -831,6 +804,9 @@ class UserService:
             if 'organization_role_id' in updates and user.organization_role_id:
                 self._sync_member_role_in_locations(int(user_id), user.organization_id, user.organization_role_id)
 
+            # The created-by chain and a sorter binding both feed access scopes.
+            access_scope.invalidate(user.organization_id, self.db)
+
             return {
                 'success': True,
                 'user': self._serialize_user(user)
@@ -1307,17 +1283,14 @@ class UserService:
         ``manageable_user_ids``, plus ``total_assigned`` (full count of the
         assigned set across all pages).
         """
-        from types import SimpleNamespace
-
         paginate = bool(page and page_size and page_size > 0)
         if paginate:
             page = max(int(page), 1)
             page_size = min(max(int(page_size), 1), 200)
 
         # ── PHASE 1: Determine the candidate ID universe (cheap projection).
-        # We only fetch (id, members) here so tier resolution can run without
-        # paying for the 40+ column row each location carries. The full row is
-        # loaded later, only for the page slice.
+        # We only fetch (id, members) here rather than the 40+ column row each
+        # location carries. The full row is loaded later, only for the page slice.
         # headcount rides along: the rollup for any node needs the whole org's values,
         # not just the page slice, and this query already spans the org.
         light_query = self.db.query(
@@ -1345,7 +1318,6 @@ class UserService:
 
         # Stable order for pagination — newest first matches the legacy CRUD.
         light_rows = light_query.order_by(UserLocation.created_date.desc()).all()
-        light_locs = [SimpleNamespace(id=r.id, members=r.members) for r in light_rows]
         headcount_by_id: Dict[int, Optional[int]] = {r.id: r.headcount for r in light_rows}
 
         # Tree, loaded once — the headcount rollup walks it per serialized location.
@@ -1359,7 +1331,7 @@ class UserService:
         if not isinstance(setup_root_nodes, list):
             setup_root_nodes = [setup_root_nodes] if setup_root_nodes else []
 
-        # ── PHASE 2: Resolve 3-tier access with the lightweight projection.
+        # ── PHASE 2: Resolve 3-tier access (cached per user, see libs/access_scope.py).
         # Non-owners ALWAYS go through tier filtering, even when the caller
         # passes ?all=true. `include_all` is meant to expose orphans (rows
         # outside the org_setup tree) to admins — it is not an access-control
@@ -1368,9 +1340,7 @@ class UserService:
         # loop paginating through tens of thousands of rows it can't act on.
         tiers = None
         if current_user_id:
-            tiers = self.resolve_access_scope(
-                organization_id, current_user_id, locations=light_locs
-            )
+            tiers = self.resolve_access_scope(organization_id, current_user_id)
 
         is_owner_now = tiers['is_owner'] if tiers else True
 
@@ -1810,7 +1780,8 @@ class UserService:
         locations: list,
         organization_id: int,
         current_user_id: int,
-        org_setup: Any = None
+        org_setup: Any = None,
+        tree: Optional[OrgTreeIndex] = None
     ) -> dict:
         """
         3-tier location access control:
@@ -1836,23 +1807,22 @@ class UserService:
         if org and org.owner_id == current_user_id:
             return {'is_owner': True, 'assigned_ids': set(), 'ancestor_ids': set(), 'member_ids': set()}
 
-        # Get org setup root_nodes for tree traversal. Callers that already hold the
-        # setup (e.g. resolve_access_scope) pass it in so we don't re-query per request.
-        if org_setup is None:
-            org_setup = self.db.query(OrganizationSetup).filter(
-                OrganizationSetup.organization_id == organization_id,
-                OrganizationSetup.is_active == True,
-                OrganizationSetup.deleted_date.is_(None)
-            ).order_by(OrganizationSetup.created_date.desc()).first()
-
-        if not org_setup or not org_setup.root_nodes or (isinstance(org_setup.root_nodes, list) and len(org_setup.root_nodes) == 0):
+        # The compiled tree of the setup. resolve_access_scope passes the cached
+        # index; other callers may pass the setup row they already hold.
+        if tree is None:
+            if org_setup is None:
+                org_setup = self.db.query(OrganizationSetup).filter(
+                    OrganizationSetup.organization_id == organization_id,
+                    OrganizationSetup.is_active == True,
+                    OrganizationSetup.deleted_date.is_(None)
+                ).order_by(OrganizationSetup.created_date.desc()).first()
+            if org_setup is not None:
+                tree = OrgTreeIndex(org_setup.root_nodes, org_setup.hub_node, organization_id=organization_id)
+
+        if tree is None or not tree.node_ids(ROOT):
             # No setup or empty root_nodes — user already failed owner check above, so not owner
             return {'is_owner': False, 'assigned_ids': set(), 'ancestor_ids': set(), 'member_ids': set()}
 
-        root_nodes = org_setup.root_nodes
-        if not isinstance(root_nodes, list):
-            root_nodes = [root_nodes] if root_nodes else []
-
         # Build the set of user IDs whose membership grants visibility:
         # current user + all created_by_id chain descendants
         chain_user_ids = {current_user_id} | self._get_created_by_descendants(current_user_id, organization_id)
@@ -1875,51 +1845,14 @@ class UserService:
         if not member_loc_ids:
             return {'is_owner': False, 'assigned_ids': set(), 'ancestor_ids': set(), 'member_ids': set()}
 
-        assigned_ids = set()
-        ancestor_ids = set()
-
-        def walk_tree(nodes, path_from_root):
-            """Walk tree to find member nodes, collect their descendants and trace ancestors."""
-            for node in nodes:
-                nid = to_node_id(node.get('nodeId'))
-                children = node.get('children', [])
-                if nid is None:
-                    # Cannot match a membership, but its subtree may still contain
-                    # real nodes — carry the path through unchanged.
-                    if children:
-                        walk_tree(children, path_from_root)
-                    continue
-
-                if nid in member_loc_ids:
-                    # This node + all descendants → assigned (tier 1)
-                    assigned_ids.add(nid)
-                    if children:
-                        collect_all_descendants(children, assigned_ids)
-                    # All nodes in path from root → ancestor (tier 2)
-                    for aid in path_from_root:
-                        if aid not in assigned_ids:
-                            ancestor_ids.add(aid)
-                else:
-                    # Continue searching deeper
-                    if children:
-                        walk_tree(children, path_from_root + [nid])
-
-        walk_tree(root_nodes, [])
-
-        # Also walk hub_node.children so hub (destination) memberships grant the SAME
-        # assigned/ancestor visibility as origins. Hub nodes live under hub_node, not
-        # root_nodes, so the root walk above never reaches them — without this, a hub
-        # member would never land in assigned_ids and every hub stays unseen for
-        # non-owners (org chart, destination pickers, and report filters all rely on
-        # these sets). Hubs are typically flat leaves; walk_tree still handles nesting.
-        hub_node = org_setup.hub_node if org_setup else None
-        if isinstance(hub_node, dict):
-            hub_children = hub_node.get('children') or []
-            if isinstance(hub_children, list) and hub_children:
-                walk_tree(hub_children, [])
-
-        # Remove any ancestor IDs that ended up in assigned (edge case: overlapping paths)
-        ancestor_ids -= assigned_ids
+        # Member node + all descendants → assigned (tier 1); every node above a
+        # member → ancestor (tier 2). Hub (destination) memberships count the same
+        # as origins: the org chart, destination pickers and report filters all
+        # rely on these sets, so a hub member must see their hub. Memberships of
+        # locations that are not in the tree grant nothing here.
+        in_tree = {nid for nid in member_loc_ids if nid in tree}
+        assigned_ids = tree.expand(in_tree, include_hub=True)
+        ancestor_ids = tree.path_ancestors(in_tree) - assigned_ids
 
         return {
             'is_owner': False,
@@ -1928,6 +1861,7 @@ class UserService:
             'member_ids': member_loc_ids
         }
 
+    @timed('access_scope')
     def resolve_access_scope(
         self,
         organization_id: int,
@@ -1960,8 +1894,43 @@ class UserService:
 
         Use `libs.locationAccess.build_visibility_clause()` to turn this into a filter —
         do not hand-roll the predicate at call sites, or reads will drift apart.
+
+        Scopes resolved without an explicit `locations` list are cached per (org, user)
+        until the setup or the org's grants change — see `libs/access_scope.py`.
         """
-        from ....models.subscriptions.organizations import OrganizationSetup
+        user_id = int(current_user_id)
+        if locations is not None:
+            return self._resolve_access_scope(
+                organization_id, user_id, locations, load_org_tree(self.db, organization_id)
+            )
+
+        scope = access_scope.memoized(self.db, organization_id, user_id)
+        if scope is not None:
+            return scope
+        tree = load_org_tree(self.db, organization_id)
+        version = access_scope.scope_version(self.db, organization_id, tree.version if tree else None)
+        scope = access_scope.access_scopes.get(organization_id, user_id, version)
+        if scope is None:
+            # Tier resolution reads only `id` and `members`; skip the 40+ column rows.
+            locations = self.db.query(UserLocation.id, UserLocation.members).filter(
+                UserLocation.is_location == True,
+                UserLocation.is_active == True,
+                UserLocation.deleted_date.is_(None),
+                UserLocation.organization_id == organization_id,
+            ).all()
+            scope = self._resolve_access_scope(organization_id, user_id, locations, tree)
+            access_scope.access_scopes.put(organization_id, user_id, version, scope)
+        access_scope.memoize(self.db, organization_id, user_id, scope)
+        return scope
+
+    def _resolve_access_scope(
+        self,
+        organization_id: int,
+        current_user_id: int,
+        locations: list,
+        tree: Optional[OrgTreeIndex]
+    ) -> Dict[str, Any]:
+        """Uncached body of `resolve_access_scope`."""
         from ....models.users.user_related import UserLocationTag, UserTenant
 
         empty_scope = {
@@ -1970,30 +1939,17 @@ class UserService:
             'scoped_by_location': {},
         }
 
-        org_setup = self.db.query(OrganizationSetup).filter(
-            OrganizationSetup.organization_id == organization_id,
-            OrganizationSetup.is_active == True,
-            OrganizationSetup.deleted_date.is_(None)
-        ).order_by(OrganizationSetup.created_date.desc()).first()
-
-        if locations is None:
-            locations = self.crud.get_user_locations(organization_id=organization_id)
-
         tiers = self._resolve_location_tiers(
-            locations, organization_id, int(current_user_id), org_setup=org_setup
+            locations, organization_id, current_user_id, tree=tree
         )
 
         # Owners see everything; no point resolving grants.
         if tiers['is_owner']:
             return {**tiers, **empty_scope}
 
-        root_nodes = (org_setup.root_nodes if org_setup else None) or []
-        if not isinstance(root_nodes, list):
-            root_nodes = [root_nodes] if root_nodes else []
-
         # Same identity set the tier resolver uses: the user plus anyone they created.
-        chain_user_ids = {int(current_user_id)} | self._get_created_by_descendants(
-            int(current_user_id), organization_id
+        chain_user_ids = {current_user_id} | self._get_created_by_descendants(
+            current_user_id, organization_id
         )
 
         scoped_grants: List[Dict[str, Any]] = []
@@ -2022,7 +1978,8 @@ class UserService:
                 if not attached:
                     continue
 
-                location_ids = expand_with_descendants(root_nodes, attached)
+                # Cascades through the location tree only, like membership does.
+                location_ids = tree.expand(attached) if tree is not None else attached
 
                 scoped_grants.append({
                     'kind': kind,
@@ -2046,8 +2003,8 @@ class UserService:
         # Scoped locations need their path context too, or the org chart renders them
         # detached. Same tier-2 semantics as assigned locations get.
         ancestor_ids = set(tiers['ancestor_ids'])
-        if scoped_ids:
-            ancestor_ids |= collect_path_ancestors(root_nodes, scoped_ids)
+        if scoped_ids and tree is not None:
+            ancestor_ids |= tree.path_ancestors(nid for nid in scoped_ids if tree.section(nid) == ROOT)
             ancestor_ids -= (tiers['assigned_ids'] | scoped_ids)
 
         return {
@@ -2081,110 +2038,14 @@ class UserService:
 
     def _build_location_paths(self, organization_id: int, location_data: List[Dict[str, Any]]) -> Dict[int, str]:
         """
-        Build path traces for all locations from their branch root to the location.
-        Returns a dict mapping location_id to path string (e.g., "Branch A → Building 1 → Floor 2")
+        Path traces for locations from their branch root down to (not including)
+        the location. Returns a dict mapping location_id to path string
+        (e.g., "Branch A, Building 1, Floor 2"), '' for a root node.
 
-        Uses organization_setup.root_nodes tree structure to trace the hierarchy.
-        Tree structure: branch -> building -> floor -> room
+        Served from the cached org tree by `libs/location_paths.py`.
         """
         try:
-            from GEPPPlatform.models.users.user_location import UserLocation
-            from GEPPPlatform.models.subscriptions.organizations import OrganizationSetup
-
-            # Fetch organization setup to get the tree structure
-            setup = self.db.query(OrganizationSetup).filter(
-                OrganizationSetup.organization_id == organization_id,
-                OrganizationSetup.is_active == True
-            ).first()
-
-            if not setup or not setup.root_nodes:
-                return {}
-
-            # Build parent map from tree structure
-            # key: nodeId, value: parentId
-            parent_map: Dict[int, int] = {}
-
-            def build_parent_map(nodes: List[Dict], parent_id: Optional[int] = None):
-                """Recursively build parent map from tree structure"""
-                for node in nodes:
-                    node_id = node.get('nodeId')
-                    if node_id is not None:
-                        node_id = int(node_id) if isinstance(node_id, str) else node_id
-                        if parent_id is not None:
-                            parent_map[node_id] = parent_id
-                        # Process children
-                        children = node.get('children', [])
-                        if children:
-                            build_parent_map(children, node_id)
-
-            # Build the parent map from root_nodes
-            root_nodes = setup.root_nodes
-            if isinstance(root_nodes, list):
-                build_parent_map(root_nodes, None)
-
-            # Fetch names ONLY for nodes that participate in path traces.
-            # Previously we loaded every UserLocation in the org just to map
-            # IDs → names; that scaled with org size and crushed paginated
-            # responses. The set we actually need is:
-            #   - every parent in the tree (parent_map values)
-            #   - every location currently being serialized (location_data ids)
-            needed_ids: set = set(parent_map.values())
-            for loc in location_data:
-                lid = loc.get('id')
-                if lid is not None:
-                    needed_ids.add(lid)
-
-            location_names: Dict[int, str] = {}
-            if needed_ids:
-                rows = self.db.query(
-                    UserLocation.id,
-                    UserLocation.display_name,
-                    UserLocation.name_en,
-                    UserLocation.name_th,
-                ).filter(
-                    UserLocation.id.in_(needed_ids),
-                    UserLocation.is_active == True,
-                    UserLocation.deleted_date.is_(None),
-                ).all()
-                for r in rows:
-                    location_names[r.id] = r.display_name or r.name_en or r.name_th or f"Location {r.id}"
-
-            # Build paths for each location
-            location_paths = {}
-
-            def get_ancestors(loc_id: int, visited: set = None) -> List[str]:
-                """Get list of ancestor names from root to parent (not including current node)"""
-                if visited is None:
-                    visited = set()
-
-                # Prevent infinite loops
-                if loc_id in visited:
-                    return []
-                visited.add(loc_id)
-
-                parent_id = parent_map.get(loc_id)
-                if parent_id is None:
-                    # This is a root node, return empty (no ancestors)
-                    return []
-
-                # Get parent's ancestors recursively, then add parent
-                parent_ancestors = get_ancestors(parent_id, visited)
-                parent_name = location_names.get(parent_id, f"Location {parent_id}")
-                return parent_ancestors + [parent_name]
-
-            # Build paths only for the locations in location_data
-            for loc in location_data:
-                loc_id = loc['id']
-                ancestors = get_ancestors(loc_id)
-
-                if ancestors:
-                    location_paths[loc_id] = ', '.join(ancestors)
-                else:
-                    # Root node - no ancestors to show
-                    location_paths[loc_id] = ''
-
-            return location_paths
-
+            return location_paths.labels(self.db, organization_id, [loc['id'] for loc in location_data])
         except Exception as e:
             print(f"Error building location paths for organization {organization_id}: {str(e)}")
             return {}
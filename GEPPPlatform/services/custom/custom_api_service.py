@@ -4,7 +4,10 @@ Custom API Service
 Handles organization lookup, API access validation, and quota tracking.
 """
 
-from typing import Optional, Tuple, Dict, Any
+import os
+import threading
+import time
+from typing import Optional, Tuple, Dict, Any, List, NamedTuple
 from datetime import datetime, timezone
 from sqlalchemy.orm import Session
 
@@ -13,6 +16,121 @@ from GEPPPlatform.models.custom.custom_apis import CustomApi, OrganizationCustom
 from GEPPPlatform.exceptions import APIException
 
 
+class IndexedCustomApi(NamedTuple):
+    id: int
+    name: str
+    service_path: str
+    root_fn_name: str
+
+
+class IndexedOrganization(NamedTuple):
+    id: int
+    name: str
+
+
+class CustomApiIndex:
+    """
+    Per-container index of custom API service paths and organization api_paths.
+
+    Resolving /api/userapi/{api_path}/{service_path}/... used to probe
+    ``custom_apis`` once per candidate service path (longest first) and then
+    look the organization up by api_path — up to N+1 queries before the
+    access check. Both tables are tiny and change only when an API is
+    published or an organization is given an api_path, so they are loaded
+    whole and matched in memory.
+
+    The index reloads after ``CUSTOM_API_INDEX_TTL`` seconds (default 60). A
+    lookup that misses also reloads, at most once every
+    ``CUSTOM_API_INDEX_RETRY`` seconds (default 5), so a newly published API
+    is reachable straight away without letting unknown paths hit the database
+    on every call. Access itself (enable, expiry, quota) is not cached: the
+    ``organization_custom_apis`` row is always read fresh.
+    """
+
+    def __init__(self, ttl_seconds: Optional[float] = None, retry_seconds: Optional[float] = None):
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else float(
+            os.environ.get('CUSTOM_API_INDEX_TTL', 60))
+        self.retry_seconds = retry_seconds if retry_seconds is not None else float(
+            os.environ.get('CUSTOM_API_INDEX_RETRY', 5))
+        self._apis: Dict[str, IndexedCustomApi] = {}
+        self._organizations: Dict[str, IndexedOrganization] = {}
+        self._loaded_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def load(self, db_session: Session) -> None:
+        """(Re)build the index from the database."""
+        apis = db_session.query(
+            CustomApi.id, CustomApi.name, CustomApi.service_path, CustomApi.root_fn_name
+        ).filter(CustomApi.deleted_date.is_(None)).all()
+        organizations = db_session.query(
+            Organization.id, Organization.name, Organization.api_path
+        ).filter(
+            Organization.api_path.isnot(None),
+            Organization.deleted_date.is_(None)
+        ).all()
+        with self._lock:
+            self._apis = {row.service_path: IndexedCustomApi(*row) for row in apis}
+            self._organizations = {
+                row.api_path: IndexedOrganization(row.id, row.name) for row in organizations
+            }
+            self._loaded_at = time.monotonic()
+
+    def invalidate(self) -> None:
+        """Force a reload on the next lookup."""
+        with self._lock:
+            self._loaded_at = None
+
+    def _age(self) -> float:
+        return float('inf') if self._loaded_at is None else time.monotonic() - self._loaded_at
+
+    def _ensure_loaded(self, db_session: Session) -> None:
+        if self._age() >= self.ttl_seconds:
+            self.load(db_session)
+
+    def _reload_after_miss(self, db_session: Session) -> bool:
+        if self._age() < self.retry_seconds:
+            return False
+        self.load(db_session)
+        return True
+
+    def match_service(
+        self,
+        db_session: Session,
+        segments: List[str]
+    ) -> Optional[Tuple[IndexedCustomApi, str, str]]:
+        """
+        Longest-prefix match of *segments* against the published service paths.
+
+        Returns:
+            (custom_api, service_path, remaining_path), or None if nothing matches
+        """
+        self._ensure_loaded(db_session)
+        match = self._longest_prefix(segments)
+        if match is None and self._reload_after_miss(db_session):
+            match = self._longest_prefix(segments)
+        return match
+
+    def _longest_prefix(self, segments: List[str]) -> Optional[Tuple[IndexedCustomApi, str, str]]:
+        apis = self._apis
+        for i in range(len(segments), 0, -1):
+            service_path = '/'.join(segments[:i]).split('?')[0]
+            custom_api = apis.get(service_path)
+            if custom_api is not None:
+                return custom_api, service_path, '/'.join(segments[i:])
+        return None
+
+    def organization(self, db_session: Session, api_path: str) -> Optional[IndexedOrganization]:
+        """The live organization owning *api_path*, if any."""
+        self._ensure_loaded(db_session)
+        organization = self._organizations.get(api_path)
+        if organization is None and self._reload_after_miss(db_session):
+            organization = self._organizations.get(api_path)
+        return organization
+
+
+custom_api_index = CustomApiIndex()
+
+
 class CustomApiService:
     """Service for managing custom API access and execution"""
     
@@ -16,6 +16,7 @@ from collections import defaultdict
 from sqlalchemy.orm import Session
 from sqlalchemy import and_, or_
 
+from GEPPPlatform.libs.org_tree import load_org_tree
 from GEPPPlatform.services.cores.reports.ghg_equivalents import (
     kg_co2_to_trees,
     kg_co2_to_forest_rai,
@@ -298,47 +299,7 @@ def _resolve_descendant_locations(
     organization_id: int,
     user_location_id: int,
 ) -> Set[int]:
-    from GEPPPlatform.models.subscriptions.organizations import OrganizationSetup
-
-    setup = db_session.query(OrganizationSetup).filter(
-        OrganizationSetup.organization_id == organization_id,
-        OrganizationSetup.is_active == True,
-        OrganizationSetup.deleted_date.is_(None),
-    ).order_by(OrganizationSetup.id.desc()).first()
-
-    if not setup:
+    tree = load_org_tree(db_session, organization_id)
+    if tree is None:
         return set()
-
-    target_id = str(user_location_id)
-    root_nodes = setup.root_nodes or []
-    hub_node = setup.hub_node or {}
-
-    target_node = _find_node(root_nodes, target_id)
-    if not target_node and hub_node.get('children'):
-        target_node = _find_node(hub_node['children'], target_id)
-
-    if not target_node:
-        return {user_location_id}
-
-    ids: Set[int] = set()
-    _collect_ids(target_node, ids)
-    return ids
-
-
-def _find_node(nodes: list, target_id: str) -> dict:
-    for node in nodes:
-        if str(node.get('nodeId', '')) == target_id:
-            return node
-        children = node.get('children') or []
-        found = _find_node(children, target_id)
-        if found:
-            return found
-    return None
-
-
-def _collect_ids(node: dict, ids: Set[int]) -> None:
-    nid = node.get('nodeId', '')
-    if nid and str(nid).isdigit():
-        ids.add(int(nid))
-    for child in (node.get('children') or []):
-        _collect_ids(child, ids)
+    return tree.expand([user_location_id], include_hub=True)
@@ -418,23 +418,28 @@ class EsgDashboardService:
                     organization_id, user_id, jwt_user_id=jwt_user_id)
             ]
 
-        # Line chart: monthly tCO2e trend
-        monthly_data = []
-        for month in range(1, 13):
-            val = (
+        # Line chart: monthly tCO2e trend — one grouped query for the
+        # year, months without records filled with 0.
+        month_col = extract('month', EsgRecord.entry_date)
+        month_totals = {
+            int(month): float(val or 0)
+            for month, val in (
                 base
-                .filter(
-                    extract('year', EsgRecord.entry_date) == year,
-                    extract('month', EsgRecord.entry_date) == month,
-                )
-                .with_entities(func.coalesce(func.sum((EsgRecord.kgco2e / 1000.0)), 0))
-                .scalar()
+                .filter(extract('year', EsgRecord.entry_date) == year)
+                .with_entities(month_col, func.coalesce(func.sum((EsgRecord.kgco2e / 1000.0)), 0))
+                .group_by(month_col)
+                .all()
             )
-            monthly_data.append({
+            if month is not None
+        }
+        monthly_data = [
+            {
                 'month': month,
                 'label': datetime(year, month, 1).strftime('%b'),
-                'tco2e': float(val or 0),
-            })
+                'tco2e': month_totals.get(month, 0.0),
+            }
+            for month in range(1, 13)
+        ]
 
         return {
             'year': year,
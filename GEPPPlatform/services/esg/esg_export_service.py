@@ -6,11 +6,12 @@ import io
 import os
 import uuid
 from datetime import datetime
+from typing import Iterable
 
 import boto3
-from openpyxl import Workbook
 from openpyxl.styles import Font, PatternFill, Alignment, Border, Side
 
+from GEPPPlatform.libs.streaming import XlsxStreamWriter, stream_query
 from GEPPPlatform.models.esg.records import EsgRecord
 
 
@@ -26,17 +27,17 @@ class EsgExportService:
 
     def export_to_excel(self, organization_id: int) -> dict:
         """Generate .xlsx and return download link."""
-        entries = self._query_entries(organization_id)
-        wb = self._create_excel_workbook(entries)
-        return self._upload_workbook(wb, organization_id, 'xlsx')
+        entries = stream_query(self._entries_query(organization_id))
+        content = self._write_excel(entries)
+        return self._upload_bytes(content, organization_id, 'xlsx', XlsxStreamWriter.content_type)
 
     def export_to_pdf(self, organization_id: int) -> dict:
         """Generate PDF report and return download link."""
-        entries = self._query_entries(organization_id)
+        entries = self._entries_query(organization_id).all()
         pdf_bytes = self._create_pdf(entries, organization_id)
         return self._upload_bytes(pdf_bytes, organization_id, 'pdf', 'application/pdf')
 
-    def _query_entries(self, organization_id: int) -> list:
+    def _entries_query(self, organization_id: int):
         return (
             self.session.query(EsgRecord)
             .filter(
@@ -44,47 +45,43 @@ class EsgExportService:
                 EsgRecord.is_active == True,
             )
             .order_by(EsgRecord.entry_date.desc())
-            .all()
         )
 
-    def _create_excel_workbook(self, entries: list) -> Workbook:
-        wb = Workbook()
-        ws = wb.active
-        ws.title = 'ESG Data'
-
-        header_font = Font(bold=True, color='FFFFFF', size=11)
-        header_fill = PatternFill(start_color='76B900', end_color='76B900', fill_type='solid')
+    def _write_excel(self, entries: Iterable[EsgRecord]) -> bytes:
+        """Write *entries* row by row into a write-only workbook (libs/streaming.py)."""
         thin_border = Border(
             left=Side(style='thin'), right=Side(style='thin'),
             top=Side(style='thin'), bottom=Side(style='thin'),
         )
+        writer = XlsxStreamWriter()
+        ws = writer.add_sheet(
+            'ESG Data',
+            headers=['#', 'Source', 'Category', 'Value', 'Unit', 'tCO2e', 'Date', 'Scope', 'Status', 'Evidence', 'Notes'],
+            header_style={
+                'font': Font(bold=True, color='FFFFFF', size=11),
+                'fill': PatternFill(start_color='76B900', end_color='76B900', fill_type='solid'),
+                'alignment': Alignment(horizontal='center'),
+                'border': thin_border,
+            },
+            min_width=0, max_width=40, padding=4,
+        )
+
+        for seq, entry in enumerate(entries, 1):
+            ws.append([
+                seq,
+                entry.entry_source.value if entry.entry_source else '',
+                entry.category or str(entry.category_id or ''),
+                float(entry.value) if entry.value else 0,
+                entry.unit or '',
+                float(entry.calculated_tco2e) if entry.calculated_tco2e else '',
+                str(entry.entry_date) if entry.entry_date else '',
+                entry.scope_tag or '',
+                entry.status.value if entry.status else '',
+                entry.file_name or '',
+                entry.notes or '',
+            ])
 
-        headers = ['#', 'Source', 'Category', 'Value', 'Unit', 'tCO2e', 'Date', 'Scope', 'Status', 'Evidence', 'Notes']
-        for col_idx, header in enumerate(headers, 1):
-            cell = ws.cell(row=1, column=col_idx, value=header)
-            cell.font = header_font
-            cell.fill = header_fill
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = thin_border
-
-        for row_idx, entry in enumerate(entries, 2):
-            ws.cell(row=row_idx, column=1, value=row_idx - 1)
-            ws.cell(row=row_idx, column=2, value=entry.entry_source.value if entry.entry_source else '')
-            ws.cell(row=row_idx, column=3, value=entry.category or str(entry.category_id or ''))
-            ws.cell(row=row_idx, column=4, value=float(entry.value) if entry.value else 0)
-            ws.cell(row=row_idx, column=5, value=entry.unit or '')
-            ws.cell(row=row_idx, column=6, value=float(entry.calculated_tco2e) if entry.calculated_tco2e else '')
-            ws.cell(row=row_idx, column=7, value=str(entry.entry_date) if entry.entry_date else '')
-            ws.cell(row=row_idx, column=8, value=entry.scope_tag or '')
-            ws.cell(row=row_idx, column=9, value=entry.status.value if entry.status else '')
-            ws.cell(row=row_idx, column=10, value=entry.file_name or '')
-            ws.cell(row=row_idx, column=11, value=entry.notes or '')
-
-        for col in ws.columns:
-            max_len = max(len(str(cell.value or '')) for cell in col)
-            ws.column_dimensions[col[0].column_letter].width = min(max_len + 4, 40)
-
-        return wb
+        return writer.to_bytes()
 
     def _create_pdf(self, entries: list, organization_id: int) -> bytes:
         """Generate a simple PDF report using reportlab."""
@@ -136,13 +133,6 @@ class EsgExportService:
         doc.build(elements)
         return buffer.getvalue()
 
-    def _upload_workbook(self, wb: Workbook, organization_id: int, ext: str) -> dict:
-        buffer = io.BytesIO()
-        wb.save(buffer)
-        buffer.seek(0)
-        content_type = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        return self._upload_bytes(buffer.getvalue(), organization_id, ext, content_type)
-
     def _upload_bytes(self, data: bytes, organization_id: int, ext: str, content_type: str) -> dict:
         timestamp = datetime.utcnow().strftime('%Y%m%d_%H%M%S')
         file_key = f'exports/org_{organization_id}/esg_report_{timestamp}_{uuid.uuid4().hex[:8]}.{ext}'
@@ -12,7 +12,6 @@ from .esg_document_service import EsgDocumentService
 from .esg_ideas_service import EsgIdeasService
 from .esg_line_service import EsgLineService
 from .esg_data_entry_service import EsgDataEntryService
-from .esg_export_service import EsgExportService
 from .esg_dashboard_service import EsgDashboardService
 from .esg_carbon_service import EsgCarbonService
 from .esg_notification_service import EsgNotificationService
@@ -193,6 +192,7 @@ def handle_esg_routes(event: Dict[str, Any], data: Dict[str, Any], **params) ->
 
         elif path == '/api/esg/liff/export' and method == 'POST':
             fmt = (data or {}).get('format', 'xlsx')
+            from .esg_export_service import EsgExportService  # openpyxl + boto3: export only
             export_service = EsgExportService(db_session)
             if fmt == 'pdf':
                 return export_service.export_to_pdf(current_user_org_id)
@@ -429,6 +429,7 @@ def handle_esg_routes(event: Dict[str, Any], data: Dict[str, Any], **params) ->
         # ===== EXPORT =====
         elif path == '/api/esg/export' and method == 'POST':
             fmt = (data or {}).get('format', 'xlsx')
+            from .esg_export_service import EsgExportService  # openpyxl + boto3: export only
             export_service = EsgExportService(db_session)
             if fmt == 'pdf':
                 return export_service.export_to_pdf(current_user_org_id)
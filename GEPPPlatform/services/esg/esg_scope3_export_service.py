@@ -40,6 +40,7 @@ from openpyxl.utils import get_column_letter
 from sqlalchemy import extract
 from sqlalchemy.orm import Session
 
+from GEPPPlatform.libs.streaming import stream_query
 from GEPPPlatform.models.esg.records import EsgRecord
 
 logger = logging.getLogger(__name__)
@@ -247,7 +248,10 @@ class EsgScope3ExportService:
     def _fetch_records(
         self, organization_id: int, year: int,
     ) -> dict[int, list[EsgRecord]]:
-        rows = (
+        # Read through a server-side cursor so the driver does not buffer the
+        # whole result next to the ORM objects. The workbook itself stays
+        # in memory: the template layout writes cells out of order.
+        rows = stream_query(
             self.session.query(EsgRecord)
             .filter(
                 EsgRecord.organization_id == organization_id,
@@ -256,7 +260,6 @@ class EsgScope3ExportService:
                 EsgRecord.scope3_category_id.isnot(None),
             )
             .order_by(EsgRecord.scope3_category_id, EsgRecord.entry_date)
-            .all()
         )
         out: dict[int, list[EsgRecord]] = defaultdict(list)
         for r in rows:
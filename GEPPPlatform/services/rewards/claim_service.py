@@ -360,32 +360,27 @@ class ClaimService:
         # different table (organization_reward_users) — using the wrong id silently
         # passes emit_event() but blows up on COMMIT with a FK violation.
         try:
-            from GEPPPlatform.services.admin.crm.crm_service import emit_event
+            from GEPPPlatform.services.admin.crm.crm_service import emit_events
             _props = {
                 'campaign_id': campaign_id,
                 'transaction_id': transaction_id,
                 'total_points': float(total_points),
                 'total_weight_kg': float(total_weight),
             }
-            emit_event(
-                self.db, event_type='reward_claimed', event_category='reward',
-                organization_id=campaign.organization_id,
-                user_location_id=origin_id,
-                properties=_props, event_source='server', commit=False,
-            )
-            emit_event(
-                self.db, event_type='points_earned', event_category='reward',
-                organization_id=campaign.organization_id,
-                user_location_id=origin_id,
-                properties=_props, event_source='server', commit=False,
-            )
+            _base = {
+                'event_category': 'reward',
+                'organization_id': campaign.organization_id,
+                'user_location_id': origin_id,
+                'event_source': 'server',
+            }
+            _events = [
+                dict(_base, event_type='reward_claimed', properties=_props),
+                dict(_base, event_type='points_earned', properties=_props),
+            ]
             if _is_new_member:
-                emit_event(
-                    self.db, event_type='campaign_joined', event_category='reward',
-                    organization_id=campaign.organization_id,
-                    user_location_id=origin_id,
-                    properties={'campaign_id': campaign_id}, event_source='server', commit=False,
-                )
+                _events.append(dict(_base, event_type='campaign_joined',
+                                    properties={'campaign_id': campaign_id}))
+            emit_events(self.db, _events)
         except Exception as _exc:
             import logging as _log
             _log.getLogger(__name__).warning("CRM emit_event non-fatal (claim): %s", _exc)
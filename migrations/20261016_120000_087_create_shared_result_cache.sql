@@ -0,0 +1,36 @@
+-- ============================================================
+-- Migration 087 — shared_result_cache
+-- ============================================================
+-- Date: 2026-10-16
+--
+-- Why: GEPPPlatform/libs/shared_cache.py lets warm Lambda containers share
+-- expensive computed results (report aggregates, organisation trees,
+-- permission sets). Per-container caches start empty after every scale-out,
+-- so each new container recomputed the same heavy results; this table is the
+-- one place they can all read from.
+--
+-- UNLOGGED: writes skip the WAL and the table is emptied after a crash, and is
+-- not copied to replicas. That is the right durability for a cache — every row
+-- can be recomputed — and keeps cache writes off the replication stream.
+--
+-- value holds JSON-encoded bytes (bytea rather than jsonb: nothing queries
+-- inside it, and bytea skips jsonb's parse and normalisation on every write).
+-- A read only hits when cache_key, version_tag and expires_at all agree;
+-- expired rows are ignored by reads and reclaimed by purge_expired().
+--
+-- Additive — safe to run on a live database.
+-- ============================================================
+
+CREATE UNLOGGED TABLE IF NOT EXISTS shared_result_cache (
+    cache_key   TEXT        PRIMARY KEY,
+    version_tag TEXT        NOT NULL DEFAULT '',
+    value       BYTEA       NOT NULL,
+    created_at  TIMESTAMPTZ NOT NULL DEFAULT now(),
+    expires_at  TIMESTAMPTZ NOT NULL
+);
+
+CREATE INDEX IF NOT EXISTS idx_shared_result_cache_expires_at
+    ON shared_result_cache (expires_at);
+
+COMMENT ON TABLE shared_result_cache IS
+'Cross-container result cache (libs/shared_cache.py). UNLOGGED: emptied on crash, every row is recomputable.';
@@ -0,0 +1,50 @@
+-- ============================================================
+-- Migration 088 — location_closure
+-- ============================================================
+-- Date: 2026-10-16
+--
+-- Why: "everything under node X" was answered in Python — walk
+-- organization_setup.root_nodes, then ship the expanded ids to Postgres as an
+-- IN (...) list. Large orgs send thousands of literals per statement; planning
+-- cost grows with the list and nothing is reused between statements.
+-- location_closure holds one row per (ancestor, descendant) pair of the org's
+-- current setup tree (including each node paired with itself at depth 0), so
+-- the same filter becomes a semi-join on an indexed table:
+--
+--     origin_id IN (SELECT descendant_id FROM location_closure
+--                    WHERE organization_id = :org AND ancestor_id IN (:selected))
+--
+-- The rows are derived, never edited: GEPPPlatform/libs/location_closure.py
+-- rebuilds an org's rows whenever a setup version is saved or edited in place.
+-- location_closure_state records which setup version (id + updated_date) the
+-- rows were built from. Readers only use the closure when that matches the
+-- setup they are filtering against and fall back to an id list otherwise, so
+-- a missed rebuild costs speed, never correctness.
+--
+-- Backfill existing orgs with: python scripts/rebuild_location_closure.py
+--
+-- Additive — safe to run on a live database.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS location_closure (
+    organization_id BIGINT  NOT NULL,
+    ancestor_id     BIGINT  NOT NULL,
+    descendant_id   BIGINT  NOT NULL,
+    depth           INTEGER NOT NULL,
+    PRIMARY KEY (organization_id, ancestor_id, descendant_id)
+);
+
+CREATE INDEX IF NOT EXISTS idx_location_closure_descendant
+    ON location_closure (organization_id, descendant_id);
+
+CREATE TABLE IF NOT EXISTS location_closure_state (
+    organization_id    BIGINT      PRIMARY KEY,
+    setup_id           BIGINT      NOT NULL,
+    setup_updated_date TIMESTAMP,
+    built_at           TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE location_closure IS
+'Ancestor/descendant pairs of each org''s current setup tree (libs/location_closure.py). Derived; rebuilt on setup save.';
+COMMENT ON TABLE location_closure_state IS
+'Setup version (id, updated_date) location_closure was last built from, per org.';
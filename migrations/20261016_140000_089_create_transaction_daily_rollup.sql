@@ -0,0 +1,66 @@
+-- ============================================================
+-- Migration 089 — transaction_daily_rollup
+-- ============================================================
+-- Date: 2026-10-16
+--
+-- Why: the report pickers and month/year dashboards rescanned every
+-- transaction record of the org on each load — loading full ORM rows only to
+-- collect distinct material ids, or distinct origin/tag/tenant combinations
+-- for a date range. transaction_daily_rollup holds one row per org, local
+-- calendar day (ROLLUP_TIMEZONE, default Asia/Bangkok) and combination of the
+-- attributes report filters look at:
+--
+--     origin_id, location_tag_id, tenant_id    visibility / origin filters
+--     destination_id                           active-setup / destination filters
+--     material_id, category_id                 material filters
+--     transaction_status, record_status        rejected rows are kept
+--     is_internal_transfer                     movement legs are kept
+--
+-- with record_count and the sums of origin_weight_kg, origin_quantity and
+-- total_amount. Deleted records and transactions are left out. GHG is
+-- weight_kg * materials.calc_ghg at read time, so it is not stored.
+--
+-- The rows are derived, never edited: GEPPPlatform/libs/transaction_rollup.py
+-- recomputes the affected (org, day) buckets in the same transaction whenever
+-- records or transactions are created, edited, approved, rejected or deleted.
+-- transaction_rollup_state marks the orgs whose rollup is complete (and the
+-- zone it was built in); readers use the rollup only for those and read the
+-- raw records otherwise, so an org that was never built, or whose refresh
+-- failed, costs speed, never a wrong number.
+--
+-- Backfill existing orgs with: python scripts/rebuild_transaction_rollup.py
+--
+-- Additive — safe to run on a live database.
+-- ============================================================
+
+CREATE TABLE IF NOT EXISTS transaction_daily_rollup (
+    organization_id      BIGINT        NOT NULL,
+    day                  DATE,
+    origin_id            BIGINT,
+    location_tag_id      BIGINT,
+    tenant_id            BIGINT,
+    destination_id       BIGINT,
+    material_id          BIGINT,
+    category_id          BIGINT,
+    transaction_status   VARCHAR(50),
+    record_status        VARCHAR(50),
+    is_internal_transfer BOOLEAN       NOT NULL DEFAULT FALSE,
+    record_count         INTEGER       NOT NULL DEFAULT 0,
+    weight_kg            NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    quantity             NUMERIC(20, 4) NOT NULL DEFAULT 0,
+    amount               NUMERIC(20, 4) NOT NULL DEFAULT 0
+);
+
+CREATE INDEX IF NOT EXISTS idx_transaction_daily_rollup_org_day
+    ON transaction_daily_rollup (organization_id, day);
+
+CREATE TABLE IF NOT EXISTS transaction_rollup_state (
+    organization_id BIGINT      PRIMARY KEY,
+    timezone        TEXT        NOT NULL,
+    built_at        TIMESTAMPTZ NOT NULL DEFAULT now()
+);
+
+COMMENT ON TABLE transaction_daily_rollup IS
+'Per org, local day and report-filter attributes: record count and weight/quantity/amount sums (libs/transaction_rollup.py). Derived; refreshed on every transaction write.';
+COMMENT ON TABLE transaction_rollup_state IS
+'Orgs whose transaction_daily_rollup is complete, and the time zone its days are in.';
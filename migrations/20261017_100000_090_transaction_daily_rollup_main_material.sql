@@ -0,0 +1,24 @@
+-- ============================================================
+-- Migration 090 — transaction_daily_rollup.main_material_id
+-- ============================================================
+-- Date: 2026-10-17
+--
+-- Why: the materials and comparison reports now read their totals from
+-- transaction_daily_rollup (ReportsService.get_overview_totals). They fall
+-- back to the record's own main_material_id when the material has none, so
+-- the rollup keeps it as one more key.
+--
+-- The state rows are cleared as well: rollups built before this migration
+-- lack the column, and put records on the wrong local day (the timestamptz
+-- transaction_date was converted from UTC twice). Readers use the raw records
+-- for every org until it is rebuilt with:
+--
+--     python scripts/rebuild_transaction_rollup.py
+--
+-- Additive — safe to run on a live database.
+-- ============================================================
+
+ALTER TABLE transaction_daily_rollup
+    ADD COLUMN IF NOT EXISTS main_material_id BIGINT;
+
+DELETE FROM transaction_rollup_state;
@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""
+GEPP Platform — benchmark the overview report's monthly bucketing
+
+Times the three ways of putting N transaction records into Bangkok months
+that were considered for the overview report (reports_handlers
+_handle_overview_report):
+
+  * per record   astimezone(ZoneInfo('Asia/Bangkok')) on every record, as the
+                 overview used to
+  * one offset   libs/local_periods.local_times — one UTC offset for the
+                 whole span, what the overview does now
+  * numpy        the timestamps converted to a datetime64 array and bucketed
+                 in whole-array operations, conversion included (skipped when
+                 numpy is not installed)
+
+Each way sums the same synthetic weights into {year: {month: kg}} and the
+results are checked to be identical before any timing is printed.
+
+Usage:
+    python scripts/benchmark_report_aggregation.py                # 200000 records
+    python scripts/benchmark_report_aggregation.py --rows 1000000 --repeat 5
+
+Needs no database. Run from the repository root.
+"""
+
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from zoneinfo import ZoneInfo
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from GEPPPlatform.libs.local_periods import local_times  # noqa: E402
+
+
+def _records(count, seed):
+    rng = random.Random(seed)
+    start = datetime(2025, 1, 1)
+    span = 86400 * 540
+    return [
+        (None if rng.random() < 0.02 else start + timedelta(seconds=rng.randrange(span)),
+         rng.uniform(0, 40))
+        for _ in range(count)
+    ]
+
+
+def per_record(records):
+    bangkok = ZoneInfo('Asia/Bangkok')
+    totals = {}
+    for tx_date, weight in records:
+        if tx_date:
+            dt_local = tx_date.replace(tzinfo=timezone.utc).astimezone(bangkok)
+            months = totals.setdefault(dt_local.year, {})
+            months[dt_local.month] = months.get(dt_local.month, 0.0) + weight
+    return totals
+
+
+def one_offset(records):
+    totals = {}
+    for dt_local, (_, weight) in zip(local_times([r[0] for r in records], 'Asia/Bangkok'), records):
+        if dt_local is not None:
+            months = totals.setdefault(dt_local.year, {})
+            months[dt_local.month] = months.get(dt_local.month, 0.0) + weight
+    return totals
+
+
+def numpy_arrays(records):
+    import numpy as np
+
+    stamps = np.array([r[0] for r in records], dtype='datetime64[us]')
+    weights = np.array([r[1] for r in records], dtype=np.float64)
+    valid = ~np.isnat(stamps)
+    month_index = (stamps[valid] + np.timedelta64(7, 'h')).astype('datetime64[M]').astype(np.int64)
+    keys, codes = np.unique(month_index, return_inverse=True)
+    # bincount adds in row order, so the sums match the loops to the last bit.
+    sums = np.bincount(codes, weights=weights[valid], minlength=len(keys))
+    totals = {}
+    for key, total in zip(keys.tolist(), sums.tolist()):
+        totals.setdefault(key // 12 + 1970, {})[key % 12 + 1] = total
+    return totals
+
+
+def _best_of(fn, records, repeat):
+    best = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn(records)
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--rows', type=int, default=200000, help='Synthetic records to bucket')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per way; the best is reported')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    records = _records(args.rows, args.seed)
+    ways = [('per record', per_record), ('one offset', one_offset)]
+    try:
+        import numpy  # noqa: F401
+        ways.append(('numpy', numpy_arrays))
+    except ImportError:
+        print('numpy is not installed; skipping the numpy variant')
+
+    timings = []
+    expected = None
+    for name, fn in ways:
+        elapsed, result = _best_of(fn, records, args.repeat)
+        if expected is None:
+            expected = result
+        elif result != expected:
+            sys.exit(f"{name} disagrees with per record")
+        timings.append((name, elapsed))
+
+    baseline = timings[0][1]
+    print(f"{args.rows} records, best of {args.repeat}:")
+    for name, elapsed in timings:
+        print(f"  {name:<11} {elapsed * 1000:9.1f} ms   {baseline / elapsed:5.2f}x")
+
+
+if __name__ == '__main__':
+    main()
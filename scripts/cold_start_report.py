@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+GEPP Platform — cold-start import cost per API route
+
+For every route registered in GEPPPlatform/entry_points/routes.py this runs a
+fresh interpreter with `python -X importtime`, imports the main entry point and
+then the modules the route's adapter imports, and reports what the route adds on
+top of the bare entry point — in total and per top-level package, so you can see
+that e.g. `/api/esg` is the one paying for openpyxl.
+
+Usage:
+    python scripts/cold_start_report.py                 # all routes
+    python scripts/cold_start_report.py --route /api/reports --route /api/esg
+    python scripts/cold_start_report.py --repeat 5      # median of 5 runs per route
+    python scripts/cold_start_report.py --json          # machine-readable
+
+No database is needed: importing the entry point builds the engine but does not
+connect. Run from the repository root.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from GEPPPlatform.entry_points.routes import AUTHED_ROUTES, PUBLIC_ROUTES  # noqa: E402
+from GEPPPlatform.libs.startup import (  # noqa: E402
+    handler_imports,
+    parse_importtime,
+    top_level_packages,
+)
+
+ENTRY = 'GEPPPlatform.entry_points.GEPPPlatform'
+
+# Packages worth calling out by name in the table.
+HEAVY = ('boto3', 'botocore', 'numpy', 'scipy', 'pandas', 'openpyxl', 'reportlab',
+         'PIL', 'openai', 'langchain_core', 'google', 'firebase_admin', 'pymilvus')
+
+
+def _run(modules):
+    code = '; '.join(f'import {m}' for m in [ENTRY, *modules])
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONHASHSEED='0')
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code],
+        cwd=ROOT, env=env, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        tail = proc.stderr.strip().splitlines()[-1:] or ['']
+        raise RuntimeError(f"import failed for {modules}: {tail[0]}")
+    return parse_importtime(proc.stderr)
+
+
+def _measure(modules, repeat):
+    runs = [_run(modules) for _ in range(repeat)]
+    # Median per module across runs keeps one noisy run from dominating.
+    by_name = {}
+    for records in runs:
+        for r in records:
+            by_name.setdefault(r.name, []).append(r)
+    merged = []
+    for name, rs in by_name.items():
+        rep = rs[0]
+        rep.self_us = int(statistics.median(x.self_us for x in rs))
+        merged.append(rep)
+    return merged
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--route', action='append', help='Only report these patterns')
+    parser.add_argument('--repeat', type=int, default=1, help='Runs per route (median)')
+    parser.add_argument('--json', action='store_true', help='Emit JSON instead of a table')
+    args = parser.parse_args()
+
+    baseline = _measure([], args.repeat)
+    baseline_names = {r.name for r in baseline}
+    baseline_ms = sum(r.self_us for r in baseline) / 1000
+
+    rows = []
+    for table in (PUBLIC_ROUTES, AUTHED_ROUTES):
+        for route in table.routes():
+            if args.route and route.pattern not in args.route:
+                continue
+            modules = handler_imports(route.handler)
+            added = [r for r in _measure(modules, args.repeat) if r.name not in baseline_names]
+            packages = top_level_packages(added)
+            rows.append({
+                'route': route.key,
+                'table': table.name,
+                'added_ms': round(sum(r.self_us for r in added) / 1000, 1),
+                'modules_added': len(added),
+                'heavy': {p: round(us / 1000, 1) for p, us in sorted(packages.items(), key=lambda kv: -kv[1])
+                          if p in HEAVY},
+            })
+    rows.sort(key=lambda row: row['added_ms'], reverse=True)
+
+    if args.json:
+        print(json.dumps({'entry_point_ms': round(baseline_ms, 1), 'routes': rows}, indent=2))
+        return
+
+    print(f"Entry point ({ENTRY}): {baseline_ms:.1f} ms, {len(baseline)} modules\n")
+    print(f"{'route':<48} {'+ms':>8} {'+mods':>6}  heavy dependencies")
+    print('-' * 100)
+    for row in rows:
+        heavy = ', '.join(f"{p} {ms}ms" for p, ms in row['heavy'].items()) or '-'
+        print(f"{row['route']:<48} {row['added_ms']:>8.1f} {row['modules_added']:>6}  {heavy}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+"""
+GEPP Platform — query-plan regression report for the hot read paths
+
+Runs a catalogue of real service calls (reports overview/materials/origins,
+transaction listing, reward leaderboard, EPR duplicate search, IoT /sync)
+against a seeded local database, captures every statement they execute and
+EXPLAIN ANALYZEs each one. It then reports:
+
+  * sequential scans on large tables, with a suggested index for filtered ones
+  * regressions against a stored baseline — a table that used to be reached
+    through an index and is now scanned, or a statement touching far more
+    buffers than before
+
+Usage:
+    python scripts/query_plan_report.py                       # report only
+    python scripts/query_plan_report.py --baseline plans.json # fail (exit 1) on regressions
+    python scripts/query_plan_report.py --baseline plans.json --update-baseline
+    python scripts/query_plan_report.py --only reports.overview --json
+    python scripts/query_plan_report.py --org 8 --device 12   # pick the seed rows yourself
+
+Needs PostgreSQL with pgvector, migrated and seeded (run_local.sh's local DB,
+migrations/sync_from_prod.sh or the scripts/seed_*.sql files). The same DB_*
+env vars as the app select it. Everything runs in one transaction that is
+rolled back, so writes made by the catalogue (the /sync heartbeat) are undone.
+Without --org / --device / --epr-transaction, the organization with the most
+transactions and the first live device and EPR transaction are used. Run from
+the repository root.
+"""
+
+import argparse
+import json
+import os
+import sys
+from datetime import date, timedelta
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine  # noqa: E402
+from sqlalchemy.orm.session import Session  # noqa: E402
+
+from GEPPPlatform.libs.query_plans import (  # noqa: E402
+    DEFAULT_LARGE_TABLE_ROWS,
+    RecordingConnection,
+    capture_statements,
+    compare,
+    large_seq_scans,
+    load_baseline,
+    save_baseline,
+    suggest_index,
+    summarize_all,
+    table_rows,
+)
+
+
+def _reports_overview(ctx):
+    from GEPPPlatform.services.cores.reports.reports_service import ReportsService
+    ReportsService(ctx['session']).get_overview_data(ctx['org'], filters=ctx['year'])
+
+
+def _reports_materials(ctx):
+    from GEPPPlatform.services.cores.reports.reports_service import ReportsService
+    ReportsService(ctx['session']).get_material_by_organization(ctx['org'], filters=ctx['year'])
+
+
+def _reports_origins(ctx):
+    from GEPPPlatform.services.cores.reports.reports_service import ReportsService
+    ReportsService(ctx['session']).get_origin_by_organization(ctx['org'], filters=ctx['year'])
+
+
+def _transactions_list(ctx):
+    from GEPPPlatform.services.cores.transactions.transaction_service import TransactionService
+    service = TransactionService(ctx['session'])
+    service.list_transactions(organization_id=ctx['org'], page=1, page_size=20)
+    service.list_transactions(organization_id=ctx['org'], page=1, page_size=20, include_records=True,
+                              date_from=ctx['year']['date_from'], date_to=ctx['year']['date_to'])
+
+
+def _rewards_leaderboard(ctx):
+    from GEPPPlatform.services.rewards.leaderboard_service import LeaderboardService
+    LeaderboardService(ctx['session']).get_leaderboard(ctx['org'], period='month')
+
+
+def _epr_duplicates(ctx):
+    from GEPPPlatform.services.cores.epr_ai_audit.cron.duplicates import find_duplicates
+    find_duplicates(RecordingConnection(ctx['dbapi'], ctx['raw_captured']), ctx['epr_tx'])
+
+
+def _iot_sync(ctx):
+    from GEPPPlatform.services.cores.iot_devices.iot_devices_handlers import handle_iot_sync
+    handle_iot_sync(ctx['session'], {'device_id': ctx['device']}, {
+        'kind': 'delta',
+        'hb': {},
+        'events': [{'event_type': 'nav', 'route': '/weigh', 'payload': {}}],
+    })
+
+
+# (name, seed rows it needs, callable)
+CATALOGUE = [
+    ('reports.overview', ('org',), _reports_overview),
+    ('reports.materials', ('org',), _reports_materials),
+    ('reports.origins', ('org',), _reports_origins),
+    ('transactions.list', ('org',), _transactions_list),
+    ('rewards.leaderboard', ('org',), _rewards_leaderboard),
+    ('epr.duplicates', ('epr_tx',), _epr_duplicates),
+    ('iot.sync', ('device',), _iot_sync),
+]
+
+_DISCOVER = {
+    'org': "SELECT organization_id FROM transactions WHERE deleted_date IS NULL "
+           "GROUP BY organization_id ORDER BY count(*) DESC LIMIT 1",
+    'device': "SELECT id FROM iot_devices WHERE deleted_date IS NULL ORDER BY id LIMIT 1",
+    'epr_tx': "SELECT id FROM epr_transactions_embeded WHERE deleted_date IS NULL ORDER BY id DESC LIMIT 1",
+}
+
+
+def _database_url():
+    return "postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}".format(
+        user=os.environ.get('DB_USER', 'postgres'),
+        password=os.environ.get('DB_PASS', ''),
+        host=os.environ.get('DB_HOST', 'localhost'),
+        port=os.environ.get('DB_PORT', '5432'),
+        name=os.environ.get('DB_NAME', 'gepp_platform'),
+    )
+
+
+def _discover(dbapi, name, given):
+    if given is not None:
+        return given
+    with dbapi.cursor() as cur:
+        cur.execute("SAVEPOINT discover")
+        try:
+            cur.execute(_DISCOVER[name])
+            row = cur.fetchone()
+            return row[0] if row else None
+        except Exception:
+            cur.execute("ROLLBACK TO SAVEPOINT discover")
+            return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--only', action='append', help='Only run these catalogue entries')
+    parser.add_argument('--baseline', help='Baseline JSON to compare against (or write)')
+    parser.add_argument('--update-baseline', action='store_true', help='Write this run as the baseline')
+    parser.add_argument('--large-table-rows', type=int, default=DEFAULT_LARGE_TABLE_ROWS,
+                        help='Flag sequential scans of tables at least this big')
+    parser.add_argument('--org', type=int)
+    parser.add_argument('--device', type=int)
+    parser.add_argument('--epr-transaction', type=int, dest='epr_tx')
+    parser.add_argument('--json', action='store_true', help='Emit JSON instead of a table')
+    args = parser.parse_args()
+
+    engine = create_engine(_database_url())
+    connection = engine.connect()
+    outer = connection.begin()
+    # Service commits release a savepoint; the outer rollback undoes them all.
+    session = Session(bind=connection, join_transaction_mode='create_savepoint')
+    dbapi = connection.connection.dbapi_connection
+
+    this_year = date.today().replace(month=1, day=1)
+    ctx = {
+        'session': session,
+        'dbapi': dbapi,
+        'year': {'date_from': this_year.isoformat(), 'date_to': (date.today() + timedelta(days=1)).isoformat()},
+        'org': _discover(dbapi, 'org', args.org),
+        'device': _discover(dbapi, 'device', args.device),
+        'epr_tx': _discover(dbapi, 'epr_tx', args.epr_tx),
+    }
+    sizes = table_rows(dbapi)
+
+    plans, skipped = {}, []
+    try:
+        for name, needs, run in CATALOGUE:
+            if args.only and name not in args.only:
+                continue
+            missing = [need for need in needs if ctx.get(need) is None]
+            if missing:
+                skipped.append(f"{name} (no {', '.join(missing)} in this database)")
+                continue
+            ctx['raw_captured'] = []
+            with capture_statements(engine) as captured:
+                try:
+                    run(ctx)
+                    session.flush()
+                except Exception as exc:  # noqa: BLE001 — one broken entry must not hide the rest
+                    session.rollback()
+                    skipped.append(f"{name} (failed: {exc})")
+                    continue
+            plans.update(summarize_all(dbapi, name, captured + ctx['raw_captured']))
+    finally:
+        session.close()
+        outer.rollback()
+        connection.close()
+        engine.dispose()
+
+    regressions = []
+    if args.baseline and not args.update_baseline and os.path.exists(args.baseline):
+        regressions = compare(load_baseline(args.baseline), plans)
+    if args.baseline and args.update_baseline:
+        save_baseline(args.baseline, plans)
+
+    findings = []
+    for plan in plans.values():
+        for scan in large_seq_scans(plan, sizes, args.large_table_rows):
+            findings.append({
+                'key': plan.key,
+                'entry': plan.entry,
+                'table': scan.relation,
+                'table_rows': int(sizes.get(scan.relation, 0)),
+                'filter': scan.filter,
+                'suggested_index': suggest_index(scan),
+            })
+
+    if args.json:
+        print(json.dumps({
+            'plans': [plan.to_dict() for plan in plans.values()],
+            'seq_scans': findings,
+            'regressions': regressions,
+            'skipped': skipped,
+        }, indent=2, ensure_ascii=False))
+    else:
+        print(f"{'statement':<34} {'ms':>9} {'plan ms':>8} {'buffers':>9}  scans")
+        print('-' * 100)
+        for plan in sorted(plans.values(), key=lambda p: -p.buffers):
+            scans = ', '.join(f"{s.node_type.replace(' Scan', '')}:{s.relation}" for s in plan.scans) or '-'
+            print(f"{plan.key:<34} {plan.execution_ms:>9.1f} {plan.planning_ms:>8.1f} {plan.buffers:>9}  {scans}")
+        if findings:
+            print(f"\nSequential scans on tables over {args.large_table_rows} rows:")
+            for f in findings:
+                print(f"  {f['key']}: {f['table']} (~{f['table_rows']} rows) filter {f['filter'] or '-'}")
+                if f['suggested_index']:
+                    print(f"      {f['suggested_index']}")
+        if regressions:
+            print("\nRegressions against the baseline:")
+            for line in regressions:
+                print(f"  {line}")
+        for line in skipped:
+            print(f"skipped: {line}")
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,83 @@
+#!/usr/bin/env python3
+"""
+GEPP Platform — rebuild location_closure from the organization setups
+
+Rebuilds the ancestor/descendant rows (migration 088, libs/location_closure.py)
+for every organization that has a setup, or just the ones given. Setup saves
+keep the table current on their own; run this once after applying the
+migration, and again whenever the table is suspected of drifting (readers fall
+back to id lists for any org whose rows are stale, so drift is never wrong,
+only slower).
+
+Usage:
+    python scripts/rebuild_location_closure.py             # every org with a setup
+    python scripts/rebuild_location_closure.py --org 8 --org 12
+    python scripts/rebuild_location_closure.py --stale     # only orgs whose rows are out of date
+
+The same DB_* env vars as the app select the database. Each org is committed
+on its own, so an interrupted run keeps what it finished. Run from the
+repository root.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm.session import Session  # noqa: E402
+
+from GEPPPlatform.libs import location_closure  # noqa: E402
+from GEPPPlatform.libs.org_tree import load_org_tree  # noqa: E402
+
+_ORGS = text("SELECT DISTINCT organization_id FROM organization_setup "
+             "WHERE deleted_date IS NULL ORDER BY organization_id")
+
+
+def _database_url():
+    return "postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}".format(
+        user=os.environ.get('DB_USER', 'postgres'),
+        password=os.environ.get('DB_PASS', ''),
+        host=os.environ.get('DB_HOST', 'localhost'),
+        port=os.environ.get('DB_PORT', '5432'),
+        name=os.environ.get('DB_NAME', 'gepp_platform'),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--org', type=int, action='append', help='Only rebuild these organizations')
+    parser.add_argument('--stale', action='store_true', help='Skip orgs whose rows match their setup')
+    args = parser.parse_args()
+
+    engine = create_engine(_database_url())
+    session = Session(engine)
+    try:
+        orgs = args.org or [row[0] for row in session.execute(_ORGS)]
+        session.rollback()
+        total_rows = skipped = 0
+        started = time.perf_counter()
+        for org in orgs:
+            if args.stale:
+                tree = load_org_tree(session, org, fallback_latest=True)
+                if tree is not None and location_closure.is_current(session, tree):
+                    skipped += 1
+                    session.rollback()
+                    continue
+            written = location_closure.rebuild(session, org)
+            session.commit()
+            total_rows += written
+            print(f"org {org}: {written} rows")
+        print(f"\n{len(orgs) - skipped} orgs rebuilt, {skipped} already current, "
+              f"{total_rows} rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        session.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+GEPP Platform — rebuild transaction_daily_rollup from the transaction records
+
+Recomputes the per-day report rollup (migrations 089 and 090,
+libs/transaction_rollup.py) for every organization that has transactions, or
+just the ones given. Transaction writes keep the rollup current on their own
+once an org has been built; run this once after applying the migrations,
+after changing ROLLUP_TIMEZONE, and for any org whose rollup was marked stale
+by a failed refresh (readers use the raw records for such orgs, so it is
+never wrong, only slower).
+
+Usage:
+    python scripts/rebuild_transaction_rollup.py             # every org with transactions
+    python scripts/rebuild_transaction_rollup.py --org 8 --org 12
+    python scripts/rebuild_transaction_rollup.py --stale     # only orgs not built in the current zone
+
+The same DB_* env vars as the app select the database, and ROLLUP_TIMEZONE
+the zone days are cut in. Each org is committed on its own, so an
+interrupted run keeps what it finished. Run from the repository root.
+"""
+
+import argparse
+import os
+import sys
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT))
+
+from sqlalchemy import create_engine, text  # noqa: E402
+from sqlalchemy.orm.session import Session  # noqa: E402
+
+from GEPPPlatform.libs import transaction_rollup  # noqa: E402
+
+_ORGS = text("SELECT DISTINCT organization_id FROM transactions "
+             "WHERE organization_id IS NOT NULL ORDER BY organization_id")
+
+
+def _database_url():
+    return "postgresql+psycopg2://{user}:{password}@{host}:{port}/{name}".format(
+        user=os.environ.get('DB_USER', 'postgres'),
+        password=os.environ.get('DB_PASS', ''),
+        host=os.environ.get('DB_HOST', 'localhost'),
+        port=os.environ.get('DB_PORT', '5432'),
+        name=os.environ.get('DB_NAME', 'gepp_platform'),
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split('\n\n')[1])
+    parser.add_argument('--org', type=int, action='append', help='Only rebuild these organizations')
+    parser.add_argument('--stale', action='store_true', help='Skip orgs whose rollup is already built')
+    args = parser.parse_args()
+
+    # Models must be registered before the rollup query touches them.
+    import GEPPPlatform.libs.database  # noqa: F401
+
+    engine = create_engine(_database_url())
+    session = Session(engine)
+    try:
+        orgs = args.org or [row[0] for row in session.execute(_ORGS)]
+        session.rollback()
+        total_rows = skipped = 0
+        started = time.perf_counter()
+        for org in orgs:
+            if args.stale and transaction_rollup.is_current(session, org):
+                skipped += 1
+                session.rollback()
+                continue
+            written = transaction_rollup.rebuild(session, org)
+            session.commit()
+            total_rows += written
+            print(f"org {org}: {written} rollup rows")
+        print(f"\n{len(orgs) - skipped} orgs rebuilt, {skipped} already built, "
+              f"{total_rows} rows in {time.perf_counter() - started:.1f}s")
+    finally:
+        session.close()
+        engine.dispose()
+
+
+if __name__ == '__main__':
+    main()
@@ -266,3 +266,31 @@ def pytest_collection_finish(session):
     """
     _restore_snapshot()
     _rebind_exception_names_in_test_modules()
+
+
+@pytest.fixture
+def max_queries():
+    """Fail the test when a block issues more SQL than it should.
+
+    ``with max_queries(3): service.list_things()`` counts statements on every
+    engine inside the block and fails with the statements it saw — the usual way
+    an N+1 (one query per row) shows up. ``max_repeats`` bounds how often any one
+    fingerprint may run, for blocks whose total legitimately scales with input.
+    """
+    from contextlib import contextmanager
+
+    from GEPPPlatform.libs.query_stats import count_queries
+
+    @contextmanager
+    def bound(limit, max_repeats=None):
+        with count_queries() as stats:
+            yield stats
+        seen = '\n'.join(f'  {sql}' for sql in stats.statements)
+        assert stats.queries <= limit, (
+            f'{stats.queries} queries, expected at most {limit}:\n{seen}')
+        if max_repeats is not None:
+            worst = max(stats.counts.items(), key=lambda kv: kv[1], default=(None, 0))
+            assert worst[1] <= max_repeats, (
+                f'{worst[1]} runs of one statement, expected at most {max_repeats}: {worst[0]}')
+
+    return bound
@@ -0,0 +1,129 @@
+"""The per-user access scope cache.
+
+A cached scope may only be served while the setup version, the org's grants
+and the local invalidation generation are all unchanged, and callers must
+never be able to corrupt it by editing what they were handed.
+"""
+
+import pytest
+from sqlalchemy import create_engine
+
+from GEPPPlatform.libs import access_scope
+from GEPPPlatform.libs.access_scope import AccessScopeCache, grants_version
+from GEPPPlatform.libs.org_tree import OrgTreeIndex
+from GEPPPlatform.services.cores.users import user_service as user_service_module
+from GEPPPlatform.services.cores.users.user_service import UserService
+
+ORG_ID = 8
+USER_ID = 501
+
+SCOPE = {
+    'is_owner': False,
+    'assigned_ids': {1, 2},
+    'ancestor_ids': set(),
+    'member_ids': {1},
+    'scoped_ids': {5},
+    'scoped_grants': [{'kind': 'tag', 'id': 3, 'name': 'A', 'location_ids': {5},
+                       'start_date': None, 'end_date': None}],
+    'scoped_by_location': {5: {'tag_ids': {3}, 'tenant_ids': set()}},
+}
+
+
+def test_cache_serves_copies_of_the_matching_version_only():
+    cache = AccessScopeCache(max_entries=2, ttl_seconds=60)
+    cache.put(ORG_ID, USER_ID, 'v1', SCOPE)
+    assert cache.get(ORG_ID, USER_ID, 'v2') is None
+    cache.put(ORG_ID, USER_ID, 'v1', SCOPE)
+
+    got = cache.get(ORG_ID, USER_ID, 'v1')
+    got['assigned_ids'].add(99)
+    got['scoped_grants'][0]['location_ids'].add(99)
+    got['scoped_by_location'][5]['tag_ids'].add(99)
+    again = cache.get(ORG_ID, USER_ID, 'v1')
+    assert again['assigned_ids'] == {1, 2}
+    assert again['scoped_grants'][0]['location_ids'] == {5}
+    assert again['scoped_by_location'][5]['tag_ids'] == {3}
+    assert (cache.hits, cache.misses) == (2, 1)
+
+
+def test_invalidate_drops_the_org_and_moves_its_generation():
+    cache = AccessScopeCache(ttl_seconds=60)
+    cache.put(ORG_ID, USER_ID, 'v1', SCOPE)
+    cache.put(ORG_ID + 1, USER_ID, 'v1', SCOPE)
+    cache.invalidate(ORG_ID)
+    assert cache.generation(ORG_ID) == 1 and cache.generation(ORG_ID + 1) == 0
+    assert cache.get(ORG_ID, USER_ID, 'v1') is None
+    assert cache.get(ORG_ID + 1, USER_ID, 'v1') is not None
+
+
+def test_entries_expire_after_the_ttl():
+    cache = AccessScopeCache(ttl_seconds=0)
+    cache.put(ORG_ID, USER_ID, 'v1', SCOPE)
+    assert cache.get(ORG_ID, USER_ID, 'v1') is None
+
+
+@pytest.fixture
+def session():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.exec_driver_sql('CREATE TABLE organizations (id INTEGER PRIMARY KEY, owner_id INTEGER)')
+        conn.exec_driver_sql(
+            'CREATE TABLE user_locations (id INTEGER PRIMARY KEY, organization_id INTEGER, members JSON, '
+            'is_location BOOLEAN, is_active BOOLEAN, deleted_date DATETIME, updated_date DATETIME)')
+        for name in ('user_location_tags', 'user_tenants'):
+            conn.exec_driver_sql(f'CREATE TABLE {name} (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+                                 f'updated_date DATETIME)')
+        conn.exec_driver_sql(f'INSERT INTO organizations VALUES ({ORG_ID}, 1)')
+        conn.exec_driver_sql(
+            f"INSERT INTO user_locations VALUES (1, {ORG_ID}, '[501]', 1, 1, NULL, '2026-01-01 00:00:00')")
+    access_scope.access_scopes.clear()
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+    access_scope.access_scopes.clear()
+
+
+def test_grants_version_moves_with_membership_and_grant_writes(session):
+    before = grants_version(session, ORG_ID)
+    assert grants_version(session, ORG_ID) == before
+    session.connection().exec_driver_sql(
+        f"INSERT INTO user_tenants VALUES (1, {ORG_ID}, '2026-01-02 00:00:00')")
+    after_tenant = grants_version(session, ORG_ID)
+    assert after_tenant != before
+    session.connection().exec_driver_sql(
+        "UPDATE user_locations SET updated_date = '2026-01-03 00:00:00' WHERE id = 1")
+    assert grants_version(session, ORG_ID) != after_tenant
+
+
+def test_resolve_access_scope_reuses_the_cached_scope(session, monkeypatch):
+    tree = OrgTreeIndex([{'nodeId': 1, 'children': [{'nodeId': 2}]}], organization_id=ORG_ID, version=(1, None))
+    monkeypatch.setattr(user_service_module, 'load_org_tree', lambda db, org: tree)
+    calls = []
+
+    svc = UserService.__new__(UserService)
+    svc.db = session
+
+    def resolve(organization_id, user_id, locations, tree_):
+        calls.append([loc.id for loc in locations])
+        return dict(SCOPE)
+
+    monkeypatch.setattr(svc, '_resolve_access_scope', resolve)
+
+    first = svc.resolve_access_scope(ORG_ID, str(USER_ID))
+    assert calls == [[1]] and first['assigned_ids'] == {1, 2}
+    svc.resolve_access_scope(ORG_ID, USER_ID)  # same transaction: memoized
+    session.commit()
+    svc.resolve_access_scope(ORG_ID, USER_ID)  # new transaction, same versions: cached
+    assert len(calls) == 1
+
+    access_scope.invalidate(ORG_ID, session)
+    svc.resolve_access_scope(ORG_ID, USER_ID)
+    assert len(calls) == 2
+
+    # An explicit location list is never served from, or written to, the cache.
+    svc.resolve_access_scope(ORG_ID, USER_ID, locations=[])
+    assert calls[-1] == [] and len(calls) == 3
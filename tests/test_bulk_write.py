@@ -0,0 +1,129 @@
+"""Set-based inserts: COPY text encoding and the multi-row INSERT path.
+
+COPY has no parameter binding — every value is rendered as text the server
+parses — so the encoding has to produce exactly what the column's own bind
+processor would have sent. The INSERT path runs against SQLite; COPY itself
+needs Postgres and is exercised on a real server only.
+"""
+
+import enum
+from datetime import datetime, timezone
+
+import pytest
+from sqlalchemy import (
+    BigInteger, Column, DateTime, Enum, Integer, MetaData, String, Table, UniqueConstraint,
+    column, create_engine, func, table,
+)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB, psycopg2
+from sqlalchemy.orm import declarative_base
+
+from GEPPPlatform.libs import query_stats
+from GEPPPlatform.libs.bulk_write import bulk_insert, encode_copy_rows
+
+
+class Kind(enum.Enum):
+    NAV = 'nav'
+    CLICK = 'click'
+
+
+_pg_types = Table(
+    'typed', MetaData(),
+    Column('payload', JSONB),
+    Column('kind', Enum(Kind)),
+    Column('tags', ARRAY(String)),
+    Column('at', DateTime(timezone=True)),
+    Column('note', String),
+)
+
+
+def test_values_are_encoded_through_their_bind_processors():
+    row = [{'target': 'a\tb'}, Kind.CLICK, ['x y', 'say "hi"', None],
+           datetime(2026, 5, 1, 9, 30, tzinfo=timezone.utc), 'line1\nC:\\tmp']
+    encoded = encode_copy_rows(list(_pg_types.columns), [row], psycopg2.dialect())
+
+    payload, kind, tags, at, note = encoded.rstrip('\n').split('\t')
+    assert payload == '{"target": "a\\\\tb"}'
+    assert kind == 'CLICK'
+    assert tags == '{"x y","say \\\\"hi\\\\"",NULL}'
+    assert at == '2026-05-01T09:30:00+00:00'
+    assert note == 'line1\\nC:\\\\tmp'
+
+
+def test_nulls_use_the_copy_null_marker():
+    encoded = encode_copy_rows(list(_pg_types.columns), [[None] * 5], psycopg2.dialect())
+    assert encoded == '\t'.join(['\\N'] * 5) + '\n'
+
+
+def test_vectors_render_as_pgvector_literals():
+    pgvector = pytest.importorskip('pgvector.sqlalchemy')
+    embedding = Column('embedding', pgvector.Vector(3))
+    assert encode_copy_rows([embedding], [[[1, 2.5, 3]]], psycopg2.dialect()) == '[1.0,2.5,3.0]\n'
+
+
+Base = declarative_base()
+
+
+class Event(Base):
+    __tablename__ = 'event'
+    __table_args__ = (UniqueConstraint('device_id', 'type'),)
+
+    id = Column(BigInteger().with_variant(Integer, 'sqlite'), primary_key=True, autoincrement=True)
+    device_id = Column(BigInteger, nullable=False)
+    event_type = Column('type', String(48), nullable=False)
+    source = Column(String(16), nullable=False, default='server')
+    count = Column(Integer)
+    received_at = Column(DateTime, server_default=func.now())
+
+
+@pytest.fixture
+def session():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    Base.metadata.create_all(engine)
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+
+
+def _events(session):
+    return [(e.device_id, e.event_type, e.source, e.count)
+            for e in session.query(Event).order_by(Event.device_id, Event.event_type)]
+
+
+def test_rows_are_written_in_one_statement_with_defaults_applied(session):
+    rows = [{'device_id': n, 'event_type': 'nav'} for n in range(5)]
+    rows.append(Event(device_id=9, event_type='click', count=2))
+
+    with query_stats.count_queries(session.get_bind()) as stats:
+        assert bulk_insert(session, Event, rows) == 6
+    session.commit()
+
+    assert _events(session)[-2:] == [(4, 'nav', 'server', None), (9, 'click', 'server', 2)]
+    assert all(e.received_at is not None for e in session.query(Event))
+    assert [s.split(' (')[0] for s in stats.statements] == ['INSERT INTO event']
+
+
+def test_conflicting_rows_are_skipped_or_updated(session):
+    bulk_insert(session, Event, [{'device_id': 1, 'event_type': 'nav', 'count': 1}])
+
+    assert bulk_insert(session, Event, [{'device_id': 1, 'event_type': 'nav', 'count': 5},
+                                        {'device_id': 2, 'event_type': 'nav', 'count': 5}],
+                       conflict=['device_id', 'type']) == 1
+    assert _events(session) == [(1, 'nav', 'server', 1), (2, 'nav', 'server', 5)]
+
+    bulk_insert(session, Event, [{'device_id': 1, 'event_type': 'nav', 'count': 7}],
+                conflict=['device_id', 'type'], update=['count'])
+    assert _events(session)[0] == (1, 'nav', 'server', 7)
+
+
+def test_plain_table_clauses_and_unknown_columns(session):
+    session.connection().exec_driver_sql('CREATE TABLE log (device_id INTEGER, message TEXT)')
+    log = table('log', column('device_id', Integer), column('message', String))
+
+    assert bulk_insert(session, log, [{'device_id': 1, 'message': 'a'}, {'device_id': 1}]) == 2
+    assert bulk_insert(session, log, []) == 0
+    with pytest.raises(ValueError, match='no column'):
+        bulk_insert(session, log, [{'device_id': 1}], columns=['level'])
@@ -0,0 +1,250 @@
+"""Conditional GETs for the endpoints dashboards poll.
+
+A 304 is only a win if it is never wrong: the ETag must move whenever the probe,
+the query, or the caller does, and anything the probe cannot vouch for must fall
+through to the real handler rather than to a stale "not modified".
+"""
+
+from contextlib import contextmanager
+
+import pytest
+from sqlalchemy import create_engine
+
+from GEPPPlatform.entry_points import version_probes
+from GEPPPlatform.entry_points.routes import AUTHED_ROUTES, RouteRequest
+from GEPPPlatform.libs import report_cache
+from GEPPPlatform.libs.conditional import conditional_get, etag_matches, make_etag
+
+CORS = {'Access-Control-Allow-Origin': '*', 'Content-Type': 'application/json'}
+
+
+def _req(path='/api/reports/overview', method='GET', query=None, if_none_match=None,
+         user_id=7, org_id=3):
+    headers = {'If-None-Match': if_none_match} if if_none_match else {}
+    return RouteRequest(
+        event={'headers': headers}, context=None, path=path, method=method, body={},
+        query_params=query or {}, session=None, common_params={}, headers=CORS,
+        current_user={'user_id': user_id, 'organization_id': org_id},
+    )
+
+
+class Endpoint:
+    """A route adapter plus the probe in front of it, both observable."""
+
+    def __init__(self, version=('2026-05-01T00:00:00', 10)):
+        self.version = version
+        self.calls = 0
+
+    def probe(self, req):
+        if isinstance(self.version, Exception):
+            raise self.version
+        return self.version
+
+    def handler(self, req):
+        self.calls += 1
+        return {'success': True, 'data': {'total_kg': 12.5}}
+
+    @property
+    def route(self):
+        return conditional_get(self.probe)(self.handler)
+
+
+def test_a_first_request_runs_the_handler_and_gets_an_etag():
+    endpoint = Endpoint()
+    out = endpoint.route(_req())
+    assert endpoint.calls == 1
+    assert out['statusCode'] == 200
+    assert out['headers']['ETag'].startswith('"')
+    assert out['headers']['Cache-Control'] == 'private, no-cache'
+    assert out['headers']['Access-Control-Allow-Origin'] == '*'
+    assert out['body'] == '{"success":true,"data":{"total_kg":12.5}}'
+
+
+def test_an_unchanged_poll_is_answered_304_without_running_the_handler():
+    endpoint = Endpoint()
+    etag = endpoint.route(_req())['headers']['ETag']
+    out = endpoint.route(_req(if_none_match=etag))
+    assert out == {'statusCode': 304, 'body': '',
+                   'headers': {**CORS, 'ETag': etag, 'Cache-Control': 'private, no-cache'}}
+    assert endpoint.calls == 1
+
+
+def test_a_changed_version_serves_fresh_data():
+    endpoint = Endpoint()
+    etag = endpoint.route(_req())['headers']['ETag']
+    endpoint.version = ('2026-05-01T00:00:05', 11)
+    out = endpoint.route(_req(if_none_match=etag))
+    assert out['statusCode'] == 200
+    assert out['headers']['ETag'] != etag
+    assert endpoint.calls == 2
+
+
+@pytest.mark.parametrize('other', [
+    dict(query={'year': '2025'}),
+    dict(user_id=8),
+    dict(org_id=4),
+    dict(path='/api/reports/materials'),
+])
+def test_the_etag_is_specific_to_the_query_and_the_caller(other):
+    """Visibility is per user; one user's 304 must never validate another's copy."""
+    endpoint = Endpoint()
+    etag = endpoint.route(_req())['headers']['ETag']
+    assert endpoint.route(_req(if_none_match=etag, **other))['statusCode'] == 200
+
+
+def test_writes_are_never_conditional():
+    endpoint = Endpoint()
+    etag = endpoint.route(_req())['headers']['ETag']
+    out = endpoint.route(_req(method='POST', if_none_match=etag))
+    assert out == {'success': True, 'data': {'total_kg': 12.5}}
+
+
+@pytest.mark.parametrize('version', [None, RuntimeError('relation does not exist')])
+def test_without_a_usable_probe_the_handler_always_runs(version):
+    endpoint = Endpoint(version=version)
+    out = endpoint.route(_req(if_none_match='*'))
+    assert out == {'success': True, 'data': {'total_kg': 12.5}}
+    assert endpoint.calls == 1
+
+
+def test_a_full_proxy_response_keeps_its_body_and_gains_the_etag():
+    def pdf(req):
+        return {'statusCode': 200, 'headers': {'Content-Type': 'application/pdf'},
+                'body': 'JVBERi0=', 'isBase64Encoded': True}
+
+    out = conditional_get(lambda req: (1,))(pdf)(_req())
+    assert out['isBase64Encoded'] is True and out['body'] == 'JVBERi0='
+    assert out['headers']['Content-Type'] == 'application/pdf'
+    assert 'ETag' in out['headers']
+
+
+def test_an_error_response_gets_no_etag():
+    def failing(req):
+        return {'statusCode': 404, 'headers': {}, 'body': '{}'}
+
+    assert conditional_get(lambda req: (1,))(failing)(_req()) == {'statusCode': 404, 'headers': {}, 'body': '{}'}
+
+
+@pytest.mark.parametrize('header,expected', [
+    ('"abc"', True),
+    ('W/"abc"', True),
+    ('"zzz", "abc"', True),
+    ('*', True),
+    ('"abcd"', False),
+    ('', False),
+    (None, False),
+])
+def test_if_none_match_uses_weak_comparison(header, expected):
+    assert etag_matches(header, '"abc"') is expected
+
+
+def test_make_etag_depends_on_every_part():
+    assert make_etag(1, 'a') == make_etag(1, 'a')
+    assert make_etag(1, 'a') != make_etag('1', 'a')
+
+
+# ── the registered routes ─────────────────────────────────────────────────
+
+@pytest.mark.parametrize('path,probe', [
+    ('/api/reports/overview', version_probes.reports_version),
+    ('/api/traceability/hierarchy', version_probes.traceability_version),
+    ('/api/rewards/overview', version_probes.rewards_overview_version),
+])
+def test_polled_read_endpoints_declare_a_version_probe(path, probe):
+    handler = AUTHED_ROUTES.match(path, 'GET').route.handler
+    assert handler.version_probe is probe
+
+
+def test_the_rewards_probe_only_covers_the_overview():
+    assert version_probes.rewards_overview_version(_req(path='/api/rewards/members')) is None
+
+
+def test_probes_without_an_organisation_disable_the_etag():
+    assert version_probes.reports_version(_req(org_id=None)) is None
+
+
+
+class AbortingSession:
+    """A failed statement aborts the transaction until its savepoint rolls back, as on Postgres."""
+
+    def __init__(self, missing='traceability_transaction_group'):
+        self.missing = missing
+        self.aborted = False
+
+    @contextmanager
+    def begin_nested(self):
+        try:
+            yield
+        except Exception:
+            self.aborted = False
+            raise
+
+    def execute(self, sql, params=None):
+        if self.aborted:
+            raise RuntimeError('current transaction is aborted')
+        if self.missing in str(sql):
+            self.aborted = True
+            raise RuntimeError(f'relation "{self.missing}" does not exist')
+        return type('Result', (), {'fetchone': lambda result: (1,)})()
+
+
+def test_a_failing_probe_leaves_the_handler_a_usable_transaction():
+    def handler(req):
+        req.session.execute('SELECT 1')
+        return {'success': True}
+
+    req = _req(path='/api/traceability/hierarchy')
+    req.session = AbortingSession()
+    # No ETag, but the handler's own queries still run: a 200 rather than a 500.
+    assert conditional_get(version_probes.traceability_version)(handler)(req) == {'success': True}
+
+
+@pytest.fixture
+def watermarks(monkeypatch):
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    calls = []
+
+    def data_watermark(db_session, organization_id):
+        calls.append(organization_id)
+        return f'watermark-{len(calls)}'
+
+    monkeypatch.setattr(report_cache, 'data_watermark', data_watermark)
+    engine = create_engine('sqlite://')
+    session = Session(engine)
+    yield session, calls
+    session.close()
+    engine.dispose()
+
+
+def _probe_req(session, path='/api/reports/overview', timezone=None):
+    req = _req(path=path)
+    req.session = session
+    if timezone:
+        req.current_user['timezone'] = timezone
+    return req
+
+
+def test_the_reports_etag_and_the_report_cache_share_one_watermark(watermarks, monkeypatch):
+    session, calls = watermarks
+    monkeypatch.setattr(report_cache.shared_cache, 'get_or_compute',
+                        lambda key, compute, ttl, version: (version, compute()))
+    assert version_probes.reports_version(_probe_req(session)) == ('watermark-1', None)
+    assert report_cache.cached(session, '/api/reports/overview', 3, {}, None, lambda: 12.5) == ('watermark-1', 12.5)
+    assert calls == [3]
+
+    session.commit()
+    assert version_probes.reports_version(_probe_req(session))[0] == 'watermark-2'
+
+
+def test_the_reports_probe_follows_the_callers_timezone(watermarks):
+    session, _ = watermarks
+    assert version_probes.reports_version(_probe_req(session, timezone='Asia/Tokyo')) != \
+        version_probes.reports_version(_probe_req(session))
+
+
+def test_exports_are_never_conditional(watermarks):
+    session, calls = watermarks
+    assert version_probes.reports_version(_probe_req(session, path='/api/reports/export/pdf')) is None
+    assert calls == []
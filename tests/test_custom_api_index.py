@@ -0,0 +1,108 @@
+"""In-memory resolution of /api/userapi/{api_path}/{service_path}/... paths.
+
+The index replaces one query per candidate service path (plus the organization
+lookup) with dictionary probes, so these tests pin the matching rules the old
+probing loop had and check how often the tables are actually read.
+"""
+
+from collections import namedtuple
+
+from GEPPPlatform.services.custom.custom_api_service import CustomApiIndex
+
+ApiRow = namedtuple('ApiRow', 'id name service_path root_fn_name')
+OrgRow = namedtuple('OrgRow', 'id name api_path')
+
+
+class FakeSession:
+    """Serves the two index queries from lists and counts full loads."""
+
+    def __init__(self, apis=(), organizations=()):
+        self.apis = list(apis)
+        self.organizations = list(organizations)
+        self.loads = 0
+        self._rows = None
+
+    def query(self, *columns):
+        table = columns[0].class_.__tablename__
+        if table == 'custom_apis':
+            self.loads += 1
+            self._rows = self.apis
+        else:
+            self._rows = self.organizations
+        return self
+
+    def filter(self, *criteria):
+        return self
+
+    def all(self):
+        return list(self._rows)
+
+
+def _session():
+    return FakeSession(
+        apis=[ApiRow(1, 'AI Audit', 'ai_audit', 'ai_audit_v0'),
+              ApiRow(2, 'AI Audit v1', 'ai_audit/v1', 'ai_audit_v1'),
+              ApiRow(3, 'Events', 'event_dashboard/v1', 'event_dashboard_v1')],
+        organizations=[OrgRow(10, 'Acme', 'acme-path')],
+    )
+
+
+def test_the_longest_published_prefix_wins():
+    index = CustomApiIndex(ttl_seconds=60, retry_seconds=60)
+    session = _session()
+    api, service_path, remaining = index.match_service(session, ['ai_audit', 'v1', 'call', 'abc'])
+    assert (api.id, service_path, remaining) == (2, 'ai_audit/v1', 'call/abc')
+    api, service_path, remaining = index.match_service(session, ['ai_audit', 'v2'])
+    assert (api.id, service_path, remaining) == (1, 'ai_audit', 'v2')
+
+
+def test_a_query_string_glued_to_the_last_segment_is_ignored():
+    index = CustomApiIndex(ttl_seconds=60, retry_seconds=60)
+    api, service_path, remaining = index.match_service(_session(), ['event_dashboard', 'v1?from=2026-01-01'])
+    assert (api.root_fn_name, service_path, remaining) == ('event_dashboard_v1', 'event_dashboard/v1', '')
+
+
+def test_repeat_calls_are_answered_without_touching_the_database():
+    index = CustomApiIndex(ttl_seconds=60, retry_seconds=60)
+    session = _session()
+    for _ in range(5):
+        assert index.match_service(session, ['ai_audit', 'v1', 'call'])
+        assert index.organization(session, 'acme-path') == (10, 'Acme')
+    assert session.loads == 1
+
+
+def test_a_miss_reloads_once_so_a_new_api_is_found_immediately():
+    index = CustomApiIndex(ttl_seconds=60, retry_seconds=0)
+    session = _session()
+    assert index.match_service(session, ['new_api', 'v1']) is None
+    session.apis.append(ApiRow(4, 'New', 'new_api/v1', 'new_api_v1'))
+    api, _, _ = index.match_service(session, ['new_api', 'v1'])
+    assert api.id == 4
+
+
+def test_unknown_paths_do_not_reload_more_than_once_per_retry_window():
+    index = CustomApiIndex(ttl_seconds=60, retry_seconds=60)
+    session = _session()
+    for _ in range(5):
+        assert index.match_service(session, ['nope']) is None
+        assert index.organization(session, 'nobody') is None
+    assert session.loads == 1
+
+
+def test_the_index_expires_after_its_ttl():
+    index = CustomApiIndex(ttl_seconds=0, retry_seconds=60)
+    session = _session()
+    index.match_service(session, ['ai_audit'])
+    session.apis = [row for row in session.apis if row.service_path != 'ai_audit']
+    assert index.match_service(session, ['ai_audit']) is None
+    assert session.loads >= 2
+
+
+def test_invalidate_forces_a_reload():
+    index = CustomApiIndex(ttl_seconds=60, retry_seconds=60)
+    session = _session()
+    index.organization(session, 'acme-path')
+    session.organizations.append(OrgRow(11, 'Globex', 'globex-path'))
+    index.invalidate()
+    assert index.organization(session, 'globex-path') == (11, 'Globex')
+    assert session.loads == 2
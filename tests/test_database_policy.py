@@ -0,0 +1,133 @@
+"""Connection policy and per-route statement budgets.
+
+Lambda scale-out multiplies whatever each container holds, so the pool sizes
+per mode are pinned here; and a route's budget has to reach the database as
+transaction-local settings, or a runaway export keeps its connection pinned.
+"""
+
+import pytest
+
+from GEPPPlatform.entry_points.routes import AUTHED_ROUTES, PUBLIC_ROUTES
+from GEPPPlatform.libs import database
+from GEPPPlatform.libs.database import (
+    STATEMENT_BUDGETS,
+    current_statement_budget,
+    engine_options,
+    pool_mode,
+    statement_budget,
+)
+
+
+@pytest.mark.parametrize('env,mode', [
+    ({}, 'queue'),
+    ({'AWS_LAMBDA_FUNCTION_NAME': 'dev-GEPPPlatform'}, 'lambda'),
+    ({'AWS_LAMBDA_FUNCTION_NAME': 'dev-GEPPPlatform', 'DB_POOL_MODE': 'null'}, 'null'),
+    ({'DB_POOL_MODE': ' Lambda '}, 'lambda'),
+])
+def test_the_pool_mode_follows_the_environment(monkeypatch, env, mode):
+    for name in ('AWS_LAMBDA_FUNCTION_NAME', 'DB_POOL_MODE'):
+        monkeypatch.delenv(name, raising=False)
+    for name, value in env.items():
+        monkeypatch.setenv(name, value)
+    assert pool_mode() == mode
+
+
+def test_an_unknown_pool_mode_is_rejected(monkeypatch):
+    monkeypatch.setenv('DB_POOL_MODE', 'pgpool')
+    with pytest.raises(ValueError):
+        pool_mode()
+
+
+def test_a_lambda_container_holds_at_most_three_connections(monkeypatch):
+    monkeypatch.delenv('DB_POOL_SIZE', raising=False)
+    monkeypatch.delenv('DB_MAX_OVERFLOW', raising=False)
+    options = engine_options('lambda')
+    assert options['pool_size'] + options['max_overflow'] == 3
+    assert options['pool_pre_ping'] is True
+
+
+def test_null_mode_leaves_pooling_to_the_proxy():
+    from sqlalchemy.pool import NullPool
+    assert engine_options('null') == {'poolclass': NullPool}
+
+
+def test_budgets_nest_and_unwind():
+    assert current_statement_budget() is None
+    with statement_budget('interactive'):
+        with statement_budget('export'):
+            assert current_statement_budget() == 'export'
+        assert current_statement_budget() == 'interactive'
+    assert current_statement_budget() is None
+
+
+def test_an_unknown_budget_is_rejected():
+    with pytest.raises(ValueError):
+        with statement_budget('forever'):
+            pass
+
+
+class FakeConnection:
+    def __init__(self, dialect='postgresql'):
+        self.dialect = type('Dialect', (), {'name': dialect})()
+        self.executed = []
+
+    def execute(self, statement, params):
+        self.executed.append((str(statement), params))
+
+
+def test_a_transaction_begun_under_a_budget_sets_local_timeouts():
+    conn = FakeConnection()
+    with statement_budget('export'):
+        database._apply_statement_budget(None, None, conn)
+    [(sql, params)] = conn.executed
+    assert "set_config('statement_timeout'" in sql and ', true)' in sql
+    assert params == {'statement_timeout': '300000ms', 'idle_timeout': '60000ms'}
+
+
+@pytest.mark.parametrize('budget,dialect', [(None, 'postgresql'), ('interactive', 'sqlite')])
+def test_no_budget_or_no_postgres_means_no_extra_statement(budget, dialect):
+    conn = FakeConnection(dialect)
+    with statement_budget(budget):
+        database._apply_statement_budget(None, None, conn)
+    assert conn.executed == []
+
+
+def test_the_listener_runs_on_every_session_transaction():
+    """A handler that commits mid-request starts a new transaction; it must get the budget too."""
+    from sqlalchemy import create_engine, event
+    from sqlalchemy.orm.session import sessionmaker
+
+    seen = []
+    factory = sessionmaker(bind=create_engine('sqlite://'))
+    event.listen(factory, 'after_begin', lambda session, tx, conn: seen.append(current_statement_budget()))
+    session = factory()
+    with statement_budget('interactive'):
+        session.connection().exec_driver_sql('SELECT 1')
+        session.commit()
+        session.connection().exec_driver_sql('SELECT 1')
+    session.close()
+    assert seen == ['interactive', 'interactive']
+
+
+@pytest.mark.parametrize('path,method,budget', [
+    ('/api/reports/export/pdf', 'GET', 'export'),
+    ('/api/traceability/export/pdf', 'GET', 'export'),
+    ('/api/esg/scope3-export', 'POST', 'export'),
+    ('/api/admin/organizations/12/transactions-export', 'GET', 'export'),
+    ('/api/reports/overview', 'GET', None),
+    ('/api/admin/organizations/12', 'GET', None),
+])
+def test_export_routes_declare_the_export_budget(path, method, budget):
+    assert AUTHED_ROUTES.match(path, method).route.options.get('db_budget') == budget
+
+
+def test_every_declared_budget_exists():
+    for table in (PUBLIC_ROUTES, AUTHED_ROUTES):
+        for route in table.routes():
+            name = route.options.get('db_budget')
+            assert name is None or name in STATEMENT_BUDGETS, route.key
+
+
+def test_export_sub_routes_share_their_parent_handler():
+    for parent, export in [('/api/reports/x', '/api/reports/export'), ('/api/esg/x', '/api/esg/export')]:
+        assert AUTHED_ROUTES.match(parent, 'GET').route.handler is AUTHED_ROUTES.match(export, 'POST').route.handler
@@ -0,0 +1,148 @@
+"""Pre-rendered documentation pages.
+
+Caching the docs is only safe while the cached artifact is what a fresh render
+would produce and the spec describes routes that actually exist. The drift
+tests below fail when either stops being true, so a renamed route or a stale
+spec is caught here instead of by an integrator reading the docs.
+"""
+
+import json
+import re
+
+import pytest
+
+from GEPPPlatform.docs.docs_cache import DocsCache, content_etag, docs_cache
+from GEPPPlatform.docs.docs_handlers import handle_docs_routes, render_docs_page, resolve_docs_page
+from GEPPPlatform.docs.swagger.aggregator import get_full_swagger_spec
+from GEPPPlatform.docs.swagger.bma_public import get_bma_public_swagger_spec
+from GEPPPlatform.entry_points.routes import AUTHED_ROUTES, PUBLIC_ROUTES, RouteRequest
+from GEPPPlatform.services.custom import FUNCTION_REGISTRY
+
+BMA = '/docs/bma/0a70bf9ef2fcb7c2dc6c2b046ebb052c'
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    docs_cache.clear()
+    yield
+    docs_cache.clear()
+
+
+def _docs_request(path, if_none_match=None):
+    headers = {'If-None-Match': if_none_match} if if_none_match else {}
+    return RouteRequest(
+        event={'rawPath': path, 'headers': headers}, context=None, path=path, method='GET',
+        body={}, query_params={}, session=None,
+        common_params={'method': 'GET', 'path_params': {'deployment_state': 'dev'}},
+        headers={}, current_user={},
+    )
+
+
+def _serve(path, if_none_match=None):
+    request = _docs_request(path, if_none_match)
+    return PUBLIC_ROUTES.match(path, 'GET').route.handler(request)
+
+
+# ── the cache ────────────────────────────────────────────────────────────
+
+def test_a_page_is_rendered_once():
+    cache = DocsCache()
+    renders = []
+
+    def render():
+        renders.append(1)
+        return 'text/html', '<html></html>'
+
+    first = cache.get('page', render)
+    second = cache.get('page', render)
+    assert first is second and len(renders) == 1
+    assert first.etag == content_etag('<html></html>')
+
+
+def test_a_failed_render_is_not_cached():
+    cache = DocsCache()
+
+    def broken():
+        raise ImportError('no swagger module')
+
+    with pytest.raises(ImportError):
+        cache.get('page', broken)
+    assert 'page' not in cache
+
+
+@pytest.mark.parametrize('path,page', [
+    ('/documents/api-docs', 'swagger'),
+    ('/documents/api-docs/', 'swagger'),
+    ('/documents/api-docs/swagger/', 'swagger'),
+    ('/documents/api-docs/redoc', 'redoc'),
+    ('/documents/api-docs/openapi.json', 'openapi.json'),
+    ('/documents/api-docs/openapi.yml', 'openapi.yaml'),
+    ('/documents/api-docs/anything-else', 'index'),
+    (BMA, 'bma_swagger'),
+    (BMA + '/openapi.json', 'bma_openapi.json'),
+    ('/docs/bma/wrong-hash', 'not_found'),
+])
+def test_paths_map_to_a_fixed_set_of_pages(path, page):
+    """Arbitrary suffixes must not mint new cache entries."""
+    assert resolve_docs_page(path) == page
+
+
+def test_the_docs_route_serves_a_strong_etag_and_answers_304():
+    out = _serve('/documents/api-docs/openapi.json')
+    etag = out['headers']['ETag']
+    assert out['statusCode'] == 200 and etag == content_etag(out['body'])
+    assert out['headers']['Cache-Control'] == 'public, no-cache'
+    again = _serve('/documents/api-docs/openapi.json', if_none_match=etag)
+    assert again['statusCode'] == 304 and again['body'] == ''
+    assert len(docs_cache) == 1
+
+
+def test_userapi_docs_are_cached_per_service():
+    out = _serve('/api/userapi/documents/ai_audit/v1')
+    assert out['statusCode'] == 200 and 'AI Audit V1 API' in out['body']
+    assert _serve('/api/userapi/documents/ai_audit/v1', out['headers']['ETag'])['statusCode'] == 304
+    missing = _serve('/api/userapi/documents/no_such/v9')
+    assert missing['statusCode'] == 404
+    assert len(docs_cache) == 1
+
+
+# ── drift ────────────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize('path', [
+    '/documents/api-docs', '/documents/api-docs/redoc', '/documents/api-docs/openapi.json',
+    '/documents/api-docs/openapi.yaml', '/documents/api-docs/index', BMA, BMA + '/openapi.json',
+])
+def test_the_cached_artifact_matches_a_fresh_render(path):
+    served = handle_docs_routes({'rawPath': path}, path_params={'deployment_state': 'dev'})
+    content_type, body = render_docs_page(resolve_docs_page(path), 'dev')
+    assert (served['content_type'], served['body']) == (content_type, body)
+    assert served['etag'] == content_etag(body)
+
+
+def _sample(path):
+    return re.sub(r'\{[^}]+\}', 'x', path)
+
+
+@pytest.mark.parametrize('spec', [get_full_swagger_spec('dev'), get_bma_public_swagger_spec('dev')],
+                         ids=['full', 'bma_public'])
+def test_every_documented_path_is_served_by_the_route_table(spec):
+    for path, operations in spec['paths'].items():
+        for method in operations:
+            if method.lower() not in ('get', 'post', 'put', 'patch', 'delete'):
+                continue
+            found = (PUBLIC_ROUTES.match(_sample(path), method.upper())
+                     or AUTHED_ROUTES.match(_sample(path), method.upper()))
+            assert found is not None, f'{method.upper()} {path} is documented but not routed'
+
+
+def test_the_served_spec_is_the_live_spec():
+    served = handle_docs_routes({'rawPath': '/documents/api-docs/openapi.json'},
+                                path_params={'deployment_state': 'dev'})
+    assert json.loads(served['body']) == json.loads(json.dumps(get_full_swagger_spec('dev')))
+
+
+@pytest.mark.parametrize('root_fn_name', sorted(FUNCTION_REGISTRY))
+def test_every_custom_function_has_a_documentation_page(root_fn_name):
+    service_path = root_fn_name.rsplit('_', 1)[0] + '/' + root_fn_name.rsplit('_', 1)[1]
+    out = _serve(f'/api/userapi/documents/{service_path}')
+    assert out['statusCode'] == 200, f'no docs page for {root_fn_name}'
@@ -0,0 +1,95 @@
+"""Serializing handler results into the response body.
+
+The fast path trades byte-for-byte equality for speed, so what has to hold is
+that a client parsing the body sees the same values either way, and that the
+compat mode really is the old `json.dumps(..., cls=DateTimeEncoder)` output.
+"""
+
+import enum
+import json
+import uuid
+from datetime import date, datetime, timezone
+from decimal import Decimal
+
+import pytest
+
+from GEPPPlatform.libs import http_response
+from GEPPPlatform.libs.http_response import DateTimeEncoder, get_serializer
+
+orjson = pytest.importorskip('orjson')
+
+
+class Status(enum.Enum):
+    APPROVED = 'approved'
+
+
+class Level(str, enum.Enum):
+    HIGH = 'high'
+
+
+def _report_like(rows=50):
+    return {
+        'success': True,
+        'data': {
+            'generated_at': datetime(2026, 5, 1, 8, 30, 15, 123456, tzinfo=timezone.utc),
+            'rows': [
+                {'id': i, 'weight_kg': Decimal('12.345'), 'co2': 1.5 * i,
+                 'recorded_at': datetime(2026, 4, 30, 23, 59, 59),
+                 'origin': 'ห้องขยะ อาคาร A', 'tags': None, 'level': Level.HIGH}
+                for i in range(rows)
+            ],
+            'by_month': {1: 10.0, 2: 20.5},
+        },
+    }
+
+
+def test_compat_mode_is_byte_identical_to_the_old_encoder():
+    payload = _report_like()
+    assert get_serializer('compat')(payload) == json.dumps(payload, cls=DateTimeEncoder)
+
+
+def test_the_fast_path_parses_to_the_same_values():
+    payload = _report_like()
+    fast = get_serializer('orjson')(payload)
+    assert json.loads(fast) == json.loads(get_serializer('compat')(payload))
+
+
+def test_the_fast_path_writes_thai_as_utf8_not_escapes():
+    fast = get_serializer('orjson')({'name': 'กระดาษ'})
+    assert fast == '{"name":"กระดาษ"}'
+
+
+@pytest.mark.parametrize('name', ['compat', 'orjson'])
+def test_dates_uuids_and_enums_are_serialized(name):
+    ident = uuid.UUID('12345678-1234-5678-1234-567812345678')
+    out = json.loads(get_serializer(name)({
+        'day': date(2026, 5, 1), 'id': ident, 'status': Status.APPROVED,
+        'amount': Decimal('1.5'),
+    }))
+    assert out == {'day': '2026-05-01', 'id': str(ident), 'status': 'approved', 'amount': 1.5}
+
+
+def test_what_orjson_cannot_encode_falls_back_to_the_stdlib():
+    huge = 2 ** 70
+    assert get_serializer('orjson')({'n': huge}) == json.dumps({'n': huge})
+
+
+def test_an_unserializable_result_still_raises_type_error():
+    """The dispatcher's 500 handling depends on it failing, not on a silent str()."""
+    with pytest.raises(TypeError):
+        get_serializer('orjson')({'x': object()})
+
+
+def test_the_serializer_is_chosen_by_environment(monkeypatch):
+    monkeypatch.setenv('GEPP_JSON_SERIALIZER', 'compat')
+    assert get_serializer() is http_response._dumps_compat
+    monkeypatch.setenv('GEPP_JSON_SERIALIZER', '')
+    assert get_serializer() is http_response._dumps_orjson
+    monkeypatch.setenv('GEPP_JSON_SERIALIZER', 'no-such-encoder')
+    assert get_serializer() is http_response._dumps_orjson
+
+
+def test_numpy_scalars_from_the_aggregation_code_are_plain_numbers():
+    np = pytest.importorskip('numpy')
+    out = get_serializer('orjson')({'total': np.float64(1.5), 'count': np.int64(3)})
+    assert out == '{"total":1.5,"count":3}'
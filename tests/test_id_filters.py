@@ -0,0 +1,66 @@
+"""Id-list filters bound as one array parameter.
+
+On Postgres the statement text must not depend on how many ids are in scope;
+everywhere the rows selected must be exactly those of ``column IN (ids)``,
+including when a cached statement is re-executed with different ids.
+"""
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select
+from sqlalchemy.dialects import postgresql
+
+from GEPPPlatform.libs.id_filters import in_ids
+from GEPPPlatform.libs.locationAccess import build_visibility_clause
+
+_rows = Table('tx', MetaData(), Column('id', Integer, primary_key=True), Column('origin_id', Integer),
+              Column('tag_id', Integer), Column('tenant_id', Integer))
+
+
+def _pg(clause):
+    compiled = select(_rows.c.id).where(clause).compile(dialect=postgresql.dialect())
+    return str(compiled), compiled.params
+
+
+def test_the_statement_does_not_grow_with_the_scope():
+    small_sql, small_params = _pg(in_ids(_rows.c.origin_id, [3, 1, '2']))
+    large_sql, _ = _pg(in_ids(_rows.c.origin_id, range(1, 500)))
+    assert small_sql == large_sql
+    assert '= ANY (%(param_1)s::BIGINT[])' in small_sql
+    assert small_params == {'param_1': [1, 2, 3]}
+
+
+def test_very_large_scopes_become_a_relation(monkeypatch):
+    monkeypatch.setenv('ID_FILTER_UNNEST_MIN', '3')
+    assert 'ANY' in _pg(in_ids(_rows.c.origin_id, [1, 2]))[0]
+    sql, params = _pg(in_ids(_rows.c.origin_id, [1, 2, 3]))
+    assert 'IN (SELECT unnest(%(param_1)s::BIGINT[])' in sql
+    assert params == {'param_1': [1, 2, 3]}
+
+
+def test_visibility_clause_binds_each_scope_once():
+    scope = {'is_owner': False, 'assigned_ids': set(range(1, 300)), 'scoped_grants': [
+        {'kind': 'tag', 'id': 7, 'location_ids': {400, 401}, 'start_date': None, 'end_date': None}]}
+    sql, params = _pg(build_visibility_clause(scope, _rows.c.origin_id, _rows.c.tag_id, _rows.c.tenant_id))
+    assert sql.count('ANY') == 2 and len(params) == 3
+
+
+@pytest.fixture
+def conn():
+    engine = create_engine('sqlite://')
+    _rows.create(engine)
+    with engine.begin() as conn:
+        conn.execute(_rows.insert(), [{'origin_id': n} for n in range(10)])
+        yield conn
+    engine.dispose()
+
+
+@pytest.mark.parametrize('ids', [[1, 2], [5], ['7', 8, None], []])
+def test_other_dialects_select_the_same_rows(conn, ids):
+    got = conn.execute(select(_rows.c.origin_id).where(in_ids(_rows.c.origin_id, ids))).scalars().all()
+    assert sorted(got) == sorted(int(i) for i in ids if i is not None)
+
+
+def test_a_cached_statement_is_rebound_with_new_ids(conn):
+    first = conn.execute(select(_rows.c.origin_id).where(in_ids(_rows.c.origin_id, [1, 2]))).scalars().all()
+    second = conn.execute(select(_rows.c.origin_id).where(in_ids(_rows.c.origin_id, [8, 9]))).scalars().all()
+    assert sorted(first) == [1, 2] and sorted(second) == [8, 9]
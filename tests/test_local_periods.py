@@ -0,0 +1,57 @@
+"""Local times of many UTC timestamps, with one offset when the zone allows.
+
+The shortcut is only safe if it agrees with ``astimezone`` row by row: the
+overview report puts each record into the month these times fall in, and a
+record 17:00 UTC on the last of a month belongs to the next one in Bangkok.
+"""
+
+import random
+from datetime import datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+import pytest
+
+from GEPPPlatform.libs.local_periods import fixed_offset, local_times
+
+
+def _per_row(values, zone):
+    tz = ZoneInfo(zone)
+    return [v.replace(tzinfo=timezone.utc).astimezone(tz).replace(tzinfo=None) for v in values]
+
+
+@pytest.mark.parametrize('zone', ['Asia/Bangkok', 'America/New_York', 'Europe/London'])
+def test_matches_astimezone_row_by_row(zone):
+    rng = random.Random(7)
+    start = datetime(2025, 1, 1)
+    values = [start + timedelta(seconds=rng.randrange(86400 * 540)) for _ in range(2000)]
+    assert local_times(values, zone) == _per_row(values, zone)
+
+
+def test_month_boundaries_follow_the_local_calendar():
+    assert local_times([datetime(2026, 1, 31, 17, 0)]) == [datetime(2026, 2, 1, 0, 0)]
+    assert local_times([datetime(2026, 1, 31, 16, 59)]) == [datetime(2026, 1, 31, 23, 59)]
+
+
+def test_offsets_are_fixed_only_without_a_transition():
+    bangkok, new_york = ZoneInfo('Asia/Bangkok'), ZoneInfo('America/New_York')
+    assert fixed_offset(bangkok, datetime(2020, 1, 1), datetime(2026, 12, 31)) == timedelta(hours=7)
+    assert fixed_offset(new_york, datetime(2026, 1, 1), datetime(2026, 2, 28)) == timedelta(hours=-5)
+    # DST starts 2026-03-08, inside the span but after its last month start.
+    assert fixed_offset(new_york, datetime(2026, 3, 1), datetime(2026, 3, 20)) is None
+
+
+def test_aware_strings_and_missing_values():
+    values = [
+        datetime(2026, 1, 31, 17, 0, tzinfo=timezone.utc),
+        datetime(2026, 2, 1, 0, 0, tzinfo=ZoneInfo('Asia/Bangkok')),
+        '2026-01-31T17:00:00',
+        '2026-01-31T17:00:00+00:00',
+        None,
+        '',
+        'not a date',
+        42,
+    ]
+    expected = datetime(2026, 2, 1, 0, 0)
+    assert local_times(values) == [expected] * 4 + [None] * 4
+    assert local_times([None, 'junk']) == [None, None]
+    assert local_times([]) == []
@@ -0,0 +1,113 @@
+"""location_closure rows, rebuilds and the descendant filter built on them.
+
+The closure must select exactly what the Python expansion selects, and must
+never be used once it no longer matches the setup being filtered against.
+"""
+
+import json
+
+import pytest
+from sqlalchemy import Column, Integer, MetaData, Table, create_engine, select
+
+from GEPPPlatform.libs import location_closure, org_tree
+from GEPPPlatform.libs.location_closure import closure_rows, descendants_clause, rebuild
+from GEPPPlatform.libs.org_tree import OrgTreeIndex, load_org_tree
+
+ROOT_NODES = [
+    {'nodeId': 1, 'children': [
+        {'nodeId': 2, 'children': [{'nodeId': 3, 'children': []}]},
+        {'nodeId': 4, 'children': []},
+    ]},
+    {'nodeId': 5, 'children': []},
+]
+HUB_NODE = {'children': [{'nodeId': 9, 'children': [{'nodeId': 10, 'children': []}]}]}
+
+_rows = Table('tx', MetaData(), Column('id', Integer, primary_key=True), Column('origin_id', Integer))
+
+
+def test_every_node_pairs_with_itself_and_each_ancestor():
+    rows = {(r['ancestor_id'], r['descendant_id'], r['depth'])
+            for r in closure_rows(OrgTreeIndex(ROOT_NODES, HUB_NODE, organization_id=8))}
+    assert {(1, 3, 2), (2, 3, 1), (3, 3, 0), (9, 10, 1)} <= rows
+    assert len(rows) == 7 + 4 + 1  # self pairs, depth-1 pairs, one depth-2 pair
+
+
+@pytest.fixture
+def session():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE organization_setup (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+            'root_nodes JSON, hub_node JSON, is_active BOOLEAN, created_date DATETIME, '
+            'updated_date DATETIME, deleted_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE location_closure (organization_id INTEGER, ancestor_id INTEGER, '
+            'descendant_id INTEGER, depth INTEGER, PRIMARY KEY (organization_id, ancestor_id, descendant_id))')
+        conn.exec_driver_sql(
+            'CREATE TABLE location_closure_state (organization_id INTEGER PRIMARY KEY, setup_id INTEGER, '
+            'setup_updated_date DATETIME, built_at DATETIME)')
+        _rows.create(conn)
+        conn.execute(_rows.insert(), [{'origin_id': n} for n in (1, 2, 3, 4, 5, 9, 10, 77)])
+        conn.exec_driver_sql(
+            "INSERT INTO organization_setup VALUES (1, 8, ?, ?, 1, '2026-01-01', '2026-01-01 10:00:00', NULL)",
+            (json.dumps(ROOT_NODES), json.dumps(HUB_NODE)))
+    org_tree.org_trees.clear()
+    location_closure._current.clear()
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+    org_tree.org_trees.clear()
+    location_closure._current.clear()
+
+
+def _origins(session, clause):
+    return sorted(session.execute(select(_rows.c.origin_id).where(clause)).scalars())
+
+
+@pytest.mark.parametrize('selected, include_hub, joins', [
+    ([2], False, True), ([1, 5], False, True), ([9], False, False), ([9], True, True),
+    ([3, 77], False, True), (['2'], False, True),
+])
+def test_closure_filter_matches_the_python_expansion(session, selected, include_hub, joins):
+    assert rebuild(session, 8) == 12
+    session.commit()
+    tree = load_org_tree(session, 8)
+    assert location_closure.is_current(session, tree)
+
+    sql = str(descendants_clause(session, tree, _rows.c.origin_id, selected, include_hub).compile())
+    assert ('location_closure' in sql) is joins
+    expected = sorted(n for n in tree.expand(selected, include_hub=include_hub) if n in {1, 2, 3, 4, 5, 9, 10, 77})
+    assert _origins(session, descendants_clause(session, tree, _rows.c.origin_id, selected, include_hub)) == expected
+
+
+def test_a_stale_closure_is_not_used(session):
+    rebuild(session, 8)
+    session.commit()
+    session.connection().exec_driver_sql(
+        "UPDATE organization_setup SET root_nodes = '[{\"nodeId\": 2, \"children\": []}]', "
+        "updated_date = '2026-02-01 00:00:00' WHERE id = 1")
+    session.commit()
+
+    tree = load_org_tree(session, 8)
+    clause = descendants_clause(session, tree, _rows.c.origin_id, [2])
+    assert 'location_closure' not in str(clause.compile())
+    assert _origins(session, clause) == [2]
+
+    rebuild(session, 8)
+    session.commit()
+    assert 'location_closure' in str(descendants_clause(session, tree, _rows.c.origin_id, [2]).compile())
+
+
+def test_without_the_table_the_filter_falls_back(session, monkeypatch):
+    session.connection().exec_driver_sql('DROP TABLE location_closure_state')
+    session.commit()
+    tree = load_org_tree(session, 8)
+    assert _origins(session, descendants_clause(session, tree, _rows.c.origin_id, [2])) == [2, 3]
+    assert rebuild(session, 8) == 0  # non-fatal
+
+    monkeypatch.setenv('LOCATION_CLOSURE', 'off')
+    assert 'location_closure' not in str(descendants_clause(session, tree, _rows.c.origin_id, [2]).compile())
@@ -0,0 +1,76 @@
+"""Location path labels from the cached org tree.
+
+Labels must read exactly as the per-call tree walk produced them ("Branch,
+Building" for a floor, '' at the top or outside the tree), cost one names
+query per call, and show a rename on the very next call.
+"""
+
+import json
+
+import pytest
+from sqlalchemy import create_engine, event
+
+from GEPPPlatform.libs import org_tree
+from GEPPPlatform.libs.location_paths import LocationPath, labels, lookup
+
+ROOT_NODES = [
+    {'nodeId': 1, 'children': [
+        {'nodeId': 2, 'children': [{'nodeId': 3, 'children': []}]},
+        {'nodeId': 'tmp_child', 'children': [{'nodeId': 4, 'children': []}]},
+    ]},
+]
+HUB_NODE = {'children': [{'nodeId': 9, 'children': []}]}
+NAMES = {1: 'Branch A', 2: 'Building 1', 3: 'Floor 2', 4: 'Kitchen', 9: 'Hub'}
+
+
+@pytest.fixture
+def session():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE organization_setup (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+            'root_nodes JSON, hub_node JSON, is_active BOOLEAN, created_date DATETIME, '
+            'updated_date DATETIME, deleted_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE user_locations (id INTEGER PRIMARY KEY, display_name TEXT, name_en TEXT, '
+            'name_th TEXT, is_active BOOLEAN, deleted_date DATETIME, updated_date DATETIME)')
+        conn.exec_driver_sql(
+            "INSERT INTO organization_setup VALUES (1, 8, ?, ?, 1, '2026-01-01', '2026-01-01 10:00:00', NULL)",
+            (json.dumps(ROOT_NODES), json.dumps(HUB_NODE)))
+        for nid, name in NAMES.items():
+            conn.exec_driver_sql(
+                "INSERT INTO user_locations VALUES (?, ?, NULL, NULL, 1, NULL, '2026-01-01 10:00:00')",
+                (nid, name))
+    org_tree.org_trees.clear()
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+    org_tree.org_trees.clear()
+
+
+def test_labels_read_like_the_tree_walk(session):
+    assert labels(session, 8, [3, 4, 1, 9, 77]) == {
+        3: 'Branch A, Building 1', 4: 'Branch A', 1: '', 9: '', 77: ''}
+    assert lookup(session, 8, ['3'])[3] == LocationPath((1, 2, 3), 'Branch A, Building 1')
+    assert labels(session, 99, [3]) == {}
+
+
+def test_one_names_query_once_the_tree_is_cached(session):
+    labels(session, 8, [3])
+    statements = []
+    event.listen(session.get_bind(), 'before_cursor_execute',
+                 lambda conn, cursor, sql, *args: statements.append(sql))
+    assert labels(session, 8, [3, 4, 9]) == {3: 'Branch A, Building 1', 4: 'Branch A', 9: ''}
+    assert len([sql for sql in statements if 'user_locations' in sql]) == 1
+
+
+def test_a_renamed_ancestor_shows_on_the_next_call(session):
+    assert labels(session, 8, [3]) == {3: 'Branch A, Building 1'}
+    session.connection().exec_driver_sql(
+        "UPDATE user_locations SET display_name = 'Tower 1', updated_date = '2026-02-01 00:00:00' WHERE id = 2")
+    session.commit()
+    assert labels(session, 8, [3]) == {3: 'Branch A, Tower 1'}
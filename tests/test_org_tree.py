@@ -0,0 +1,114 @@
+"""The compiled org-tree index and its versioned cache.
+
+The index replaces several hand-written walks over ``root_nodes``; these pin
+the answers those walks gave (descendants, root-only expansion, unsaved ids)
+and the cache rules that keep a changed setup from being served stale.
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+
+from GEPPPlatform.libs import org_tree
+from GEPPPlatform.libs.org_tree import HUB, ROOT, OrgTreeCache, OrgTreeIndex, load_org_tree
+
+ROOT_NODES = [
+    {'nodeId': 1, 'children': [
+        {'nodeId': '2', 'children': [{'nodeId': 3, 'is_destination': True, 'children': []}]},
+        {'nodeId': '1_1768891622748_child', 'children': [{'nodeId': 4, 'children': []}]},
+    ]},
+    {'nodeId': 5, 'children': []},
+]
+HUB_NODE = {'children': [{'nodeId': 9, 'children': [{'nodeId': 10, 'children': []}]}]}
+
+
+@pytest.fixture
+def tree():
+    return OrgTreeIndex(ROOT_NODES, HUB_NODE, organization_id=8, version=(1, None))
+
+
+def test_structure_and_paths(tree):
+    assert tree.order == [1, 2, 3, 4, 5, 9, 10]
+    assert tree.roots == [1, 5]
+    assert tree.children[1] == [2, 4]
+    assert tree.path('3') == (1, 2, 3) and tree.ancestors(3) == (1, 2)
+    assert tree.depth(3) == 2 and tree.depth(10) == 1
+    assert tree.section(1) == ROOT and tree.section(10) == HUB
+    assert tree.node_ids(HUB) == {9, 10}
+    assert tree.ids_where('is_destination') == {3}
+    assert tree.path(99) == () and 99 not in tree
+
+
+def test_unsaved_ids_hand_their_children_to_the_nearest_real_ancestor(tree):
+    assert tree.parent[4] == 1
+    assert tree.descendants(1) == {1, 2, 3, 4}
+    assert tree.descendants(1, include_self=False) == {2, 3, 4}
+
+
+def test_expand_follows_the_location_tree_only_unless_asked(tree):
+    assert tree.expand([2, '5', 77]) == {2, 3, 5, 77}
+    assert tree.expand([9]) == {9}
+    assert tree.expand([9], include_hub=True) == {9, 10}
+    assert tree.path_ancestors([3, 4]) == {1, 2}
+
+
+def test_cache_serves_only_the_matching_version():
+    cache = OrgTreeCache(max_entries=2)
+    cache.put(OrgTreeIndex([], organization_id=1, version=(1, 'a')))
+    assert cache.get(1, (1, 'a')) is not None
+    assert cache.get(1, (1, 'b')) is None
+    cache.put(OrgTreeIndex([], organization_id=2, version=(2, 'a')))
+    cache.put(OrgTreeIndex([], organization_id=3, version=(3, 'a')))
+    assert len(cache) == 2 and cache.get(1, (1, 'a')) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+@pytest.fixture
+def session():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE organization_setup (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+            'root_nodes JSON, hub_node JSON, is_active BOOLEAN, created_date DATETIME, '
+            'updated_date DATETIME, deleted_date DATETIME)')
+    org_tree.org_trees.clear()
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+    org_tree.org_trees.clear()
+
+
+def _add_setup(session, setup_id, root_nodes, is_active=True, updated=None):
+    session.connection().exec_driver_sql(
+        'INSERT INTO organization_setup (id, organization_id, root_nodes, hub_node, is_active, '
+        'created_date, updated_date) VALUES (?, 8, ?, NULL, ?, ?, ?)',
+        (setup_id, json.dumps(root_nodes), is_active,
+         datetime(2026, 1, setup_id), updated))
+
+
+def test_load_picks_up_a_new_version_and_falls_back_when_asked(session):
+    assert load_org_tree(session, 8) is None
+
+    _add_setup(session, 1, [{'nodeId': 1, 'children': []}], is_active=False)
+    session.commit()
+    assert load_org_tree(session, 8) is None
+    assert load_org_tree(session, 8, fallback_latest=True).node_ids() == {1}
+
+    _add_setup(session, 2, [{'nodeId': 1, 'children': [{'nodeId': 2}]}])
+    session.commit()
+    first = load_org_tree(session, 8)
+    assert first.node_ids() == {1, 2}
+    session.commit()
+    assert load_org_tree(session, 8) is first  # unchanged version → cached index
+
+    session.connection().exec_driver_sql(
+        "UPDATE organization_setup SET root_nodes = '[]', updated_date = '2026-02-01' WHERE id = 2")
+    assert load_org_tree(session, 8) is first  # memoized for this transaction
+    org_tree.invalidate(8, session)
+    assert load_org_tree(session, 8).node_ids() == set()
@@ -0,0 +1,111 @@
+"""Plan summaries, regression checks and index suggestions.
+
+The report script needs a seeded Postgres; the decisions it makes from a plan
+do not. These tests feed it EXPLAIN JSON of the shape Postgres produces.
+"""
+
+from GEPPPlatform.libs.query_plans import (
+    PlanSummary,
+    Scan,
+    capture_statements,
+    compare,
+    large_seq_scans,
+    statement_key,
+    suggest_index,
+    summarize,
+)
+
+SQL = 'SELECT * FROM transaction_records WHERE organization_id = %(org)s AND deleted_date IS NULL'
+
+
+def _explain(plan, execution_ms=4.2):
+    return [{'Plan': plan, 'Planning Time': 0.3, 'Execution Time': execution_ms}]
+
+
+_INDEXED = _explain({
+    'Node Type': 'Nested Loop', 'Shared Hit Blocks': 120, 'Shared Read Blocks': 5,
+    'Plans': [
+        {'Node Type': 'Index Scan', 'Relation Name': 'transactions', 'Index Name': 'idx_tx_org',
+         'Index Cond': '(organization_id = 8)', 'Actual Rows': 40, 'Actual Loops': 1},
+        {'Node Type': 'Bitmap Heap Scan', 'Relation Name': 'transaction_records', 'Actual Rows': 3,
+         'Actual Loops': 40, 'Recheck Cond': '(created_transaction_id = transactions.id)',
+         'Plans': [{'Node Type': 'Bitmap Index Scan', 'Index Name': 'idx_tr_tx', 'Actual Rows': 3}]},
+    ],
+})
+
+_SEQ = _explain({
+    'Node Type': 'Hash Join', 'Shared Hit Blocks': 9000, 'Shared Read Blocks': 1500,
+    'Plans': [
+        {'Node Type': 'Seq Scan', 'Relation Name': 'transactions', 'Actual Rows': 40, 'Actual Loops': 1,
+         'Filter': "((deleted_date IS NULL) AND (organization_id = 8) AND "
+                   "(transaction_date >= '2026-01-01 00:00:00+00'::timestamp with time zone))",
+         'Rows Removed by Filter': 250000},
+        {'Node Type': 'Bitmap Heap Scan', 'Relation Name': 'transaction_records', 'Actual Rows': 120,
+         'Plans': [{'Node Type': 'Bitmap Index Scan', 'Index Name': 'idx_tr_tx', 'Actual Rows': 120}]},
+    ],
+}, execution_ms=80.0)
+
+
+def test_summaries_keep_scans_buffers_and_timings():
+    plan = summarize('reports.overview', SQL, _INDEXED)
+    assert plan.key == statement_key('reports.overview', SQL)
+    assert plan.buffers == 125 and plan.execution_ms == 4.2 and plan.planning_ms == 0.3
+    assert [(s.relation, s.node_type, s.index) for s in plan.scans] == [
+        ('transactions', 'Index Scan', 'idx_tx_org'),
+        ('transaction_records', 'Bitmap Heap Scan', 'idx_tr_tx'),
+    ]
+    assert plan.scans[1].rows == 120
+    assert PlanSummary.from_dict(plan.to_dict()) == plan
+
+
+def test_statements_differing_only_in_values_share_a_key():
+    assert statement_key('x', 'SELECT 1 FROM t WHERE id = 5') == statement_key('x', 'SELECT 1 FROM t WHERE id = 9')
+    assert statement_key('x', 'SELECT 1 FROM t') != statement_key('y', 'SELECT 1 FROM t')
+
+
+def test_only_large_tables_are_flagged():
+    plan = summarize('reports.overview', SQL, _SEQ)
+    assert [s.relation for s in large_seq_scans(plan, {'transactions': 250_040})] == ['transactions']
+    assert large_seq_scans(plan, {'transactions': 500}) == []
+
+
+def test_losing_an_index_or_blowing_up_buffers_is_a_regression():
+    before = summarize('reports.overview', SQL, _INDEXED)
+    after = summarize('reports.overview', SQL, _SEQ)
+
+    problems = compare({before.key: before}, {after.key: after})
+    assert len(problems) == 2
+    assert 'transactions no longer uses idx_tx_org' in problems[0]
+    assert '10500 buffers, baseline 125' in problems[1]
+
+    assert compare({before.key: before}, {before.key: before}) == []
+    assert compare({}, {after.key: after}) == []
+
+
+def test_an_index_is_suggested_for_a_selective_filter():
+    scan = summarize('reports.overview', SQL, _SEQ).scans[0]
+    assert suggest_index(scan) == (
+        'CREATE INDEX CONCURRENTLY idx_transactions_organization_id_transaction_date '
+        'ON transactions (organization_id, transaction_date) WHERE deleted_date IS NULL;')
+
+
+def test_no_index_is_suggested_when_most_rows_match():
+    scan = Scan('transactions', 'Seq Scan', filter='((status)::text = \'approved\'::text)',
+                rows=9000, removed=1000)
+    assert suggest_index(scan) is None
+    scan.rows, scan.removed = 10, 9000
+    assert suggest_index(scan) == 'CREATE INDEX CONCURRENTLY idx_transactions_status ON transactions (status);'
+
+
+def test_captured_statements_are_the_explainable_single_executes():
+    from sqlalchemy import create_engine
+
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        conn.exec_driver_sql('CREATE TABLE t (id INTEGER)')
+        with capture_statements(engine) as captured:
+            conn.exec_driver_sql('INSERT INTO t VALUES (?)', [(1,), (2,)])
+            conn.exec_driver_sql('SELECT id FROM t WHERE id = ?', (1,))
+            conn.exec_driver_sql('PRAGMA table_info(t)')
+    engine.dispose()
+    assert captured == [('SELECT id FROM t WHERE id = ?', (1,))]
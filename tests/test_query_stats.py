@@ -0,0 +1,111 @@
+"""SQL statistics per request and N+1 detection.
+
+One query per row is the commonest slow path here and it only shows up as many
+statements that differ in their values. These tests pin the fingerprinting that
+groups them, the threshold that flags a request, and that the counts land on the
+active request and nowhere when there is none.
+"""
+
+import json
+import logging
+
+import pytest
+
+from GEPPPlatform.libs import query_stats
+from GEPPPlatform.libs.query_stats import QueryStats, fingerprint
+
+
+@pytest.mark.parametrize('a,b', [
+    ('SELECT * FROM users WHERE id = 5', 'SELECT * FROM users WHERE id = 61'),
+    ("SELECT 1 FROM t WHERE name = 'a'", "SELECT 1 FROM t WHERE name = 'it''s'"),
+    ('SELECT * FROM t WHERE id = %(id_1)s', 'SELECT * FROM t WHERE id = %(id_2)s'),
+    ('SELECT * FROM t WHERE id IN (%(p_1)s, %(p_2)s)', 'SELECT * FROM t WHERE id IN (1, 2, 3)'),
+    ('SELECT *\n  FROM t   WHERE x = ?', 'SELECT * FROM t WHERE x = :x'),
+])
+def test_statements_differing_only_in_values_share_a_fingerprint(a, b):
+    assert fingerprint(a) == fingerprint(b)
+
+
+def test_fingerprints_keep_identifiers_and_casts():
+    assert fingerprint('SELECT col1::int FROM table2 WHERE id = 3') == \
+        'SELECT col1::int FROM table2 WHERE id = ?'
+    assert fingerprint('SELECT a FROM t') != fingerprint('SELECT b FROM t')
+
+
+def test_repeats_over_the_threshold_are_flagged():
+    stats = QueryStats(repeat_threshold=3)
+    for house_id in range(4):
+        stats.record(f'SELECT * FROM bma_house WHERE id = {house_id}', 1.0)
+    for _ in range(3):
+        stats.record('SELECT * FROM users WHERE id = 1', 1.0)
+
+    summary = stats.summary()
+    assert summary['queries'] == 7 and summary['distinct'] == 2
+    assert summary['n_plus_one'] is True
+    assert summary['repeated'] == {'SELECT * FROM bma_house WHERE id = ?': 4}
+
+
+def test_only_the_slowest_statements_are_kept():
+    stats = QueryStats(slowest=2)
+    for ms in (5.0, 50.0, 1.0, 20.0, 20.0):
+        stats.record(f'SELECT {ms}', ms)
+    assert [s['ms'] for s in stats.slowest()] == [50.0, 20.0]
+    assert stats.statements is None
+
+
+def test_statements_outside_a_recording_are_ignored():
+    assert query_stats.current() is None
+    query_stats.record('SELECT 1', 1.0)
+
+
+def test_a_recording_logs_one_line_and_warns_on_repeats(caplog):
+    with caplog.at_level(logging.INFO, logger='GEPPPlatform.libs.query_stats'):
+        with query_stats.recording('campaign_scheduler') as stats:
+            stats.repeat_threshold = 2
+            for event_id in range(3):
+                query_stats.record(f'SELECT * FROM crm_events WHERE id = {event_id}', 2.0)
+    assert query_stats.current() is None
+
+    (line,) = [r for r in caplog.records if r.getMessage().startswith('[SQL] ')]
+    assert line.levelno == logging.WARNING
+    payload = json.loads(line.getMessage()[len('[SQL] '):])
+    assert payload['route'] == 'campaign_scheduler'
+    assert payload['queries'] == 3 and payload['db_ms'] == 6.0
+    assert payload['repeated'] == {'SELECT * FROM crm_events WHERE id = ?': 3}
+
+
+def test_engine_statements_feed_the_active_recording():
+    from sqlalchemy import create_engine
+
+    from GEPPPlatform.libs.database import _time_statements
+
+    engine = create_engine('sqlite://')
+    _time_statements(engine)
+    with query_stats.recording() as stats:
+        with engine.connect() as conn:
+            for n in range(3):
+                conn.exec_driver_sql(f'SELECT {n}')
+    engine.dispose()
+    assert stats.counts == {'SELECT ?': 3}
+
+
+def test_max_queries_fails_a_block_that_runs_too_many(max_queries):
+    from sqlalchemy import create_engine
+
+    engine = create_engine('sqlite://')
+    with engine.connect() as conn:
+        with max_queries(2) as stats:
+            conn.exec_driver_sql('SELECT 1')
+            conn.exec_driver_sql('SELECT 2')
+        assert stats.queries == 2
+
+        with pytest.raises(AssertionError, match='3 queries, expected at most 2'):
+            with max_queries(2):
+                for n in range(3):
+                    conn.exec_driver_sql(f'SELECT {n}')
+
+        with pytest.raises(AssertionError, match='3 runs of one statement'):
+            with max_queries(10, max_repeats=2):
+                for n in range(3):
+                    conn.exec_driver_sql(f'SELECT {n}')
+    engine.dispose()
@@ -0,0 +1,221 @@
+"""Read-replica routing.
+
+Two SQLite databases stand in for the primary and the replica: each holds a
+``marker`` row naming itself, so a read shows which engine answered. What must
+hold is that nothing ever writes to the replica, that a session which wrote
+(or a user who just did) reads its own writes back, and that only GET requests
+on routes declared ``db_role='replica'`` are moved at all.
+"""
+
+import pytest
+
+from GEPPPlatform.entry_points.routes import AUTHED_ROUTES, PUBLIC_ROUTES
+from GEPPPlatform.libs.database import (
+    PRIMARY,
+    REPLICA,
+    RecentWriters,
+    recent_writers,
+    route_reads,
+    routing_session_factory,
+)
+
+
+@pytest.fixture
+def engines(tmp_path):
+    # exec_driver_sql, not text(): another suite rebinds sqlalchemy.text at import time.
+    from sqlalchemy import create_engine
+
+    made = {}
+    for name in (PRIMARY, REPLICA):
+        engine = create_engine('sqlite:///' + str(tmp_path / f'{name}.db'))
+        with engine.begin() as conn:
+            conn.exec_driver_sql('CREATE TABLE marker (name TEXT)')
+            conn.exec_driver_sql('CREATE TABLE note (id INTEGER PRIMARY KEY, body TEXT)')
+            conn.exec_driver_sql(f"INSERT INTO marker VALUES ('{name}')")
+        made[name] = engine
+    yield made
+    for engine in made.values():
+        engine.dispose()
+
+
+@pytest.fixture
+def factory(engines):
+    return routing_session_factory(engines[PRIMARY], engines[REPLICA])
+
+
+@pytest.fixture(autouse=True)
+def _no_recent_writers():
+    recent_writers.clear()
+    yield
+    recent_writers.clear()
+
+
+def _where(session):
+    from sqlalchemy import column, select, table
+    return session.execute(select(column('name')).select_from(table('marker'))).scalar()
+
+
+def _notes(engine):
+    with engine.connect() as conn:
+        return [row[0] for row in conn.exec_driver_sql('SELECT body FROM note')]
+
+
+def test_sessions_read_from_the_primary_by_default(factory):
+    session = factory()
+    assert _where(session) == PRIMARY
+    session.close()
+
+
+def test_a_read_only_session_reads_from_the_replica(factory):
+    session = factory()
+    assert route_reads(session, writer=7, replica=True) is True
+    assert _where(session) == REPLICA
+    session.close()
+
+
+def test_writes_go_to_the_primary_and_pin_later_reads_there(factory, engines):
+    from sqlalchemy.sql import text
+
+    session = factory()
+    route_reads(session, replica=True)
+    assert _where(session) == REPLICA
+    session.execute(text("INSERT INTO note (body) VALUES ('saved')"))
+    assert _where(session) == PRIMARY
+    session.commit()
+    session.close()
+    assert _notes(engines[PRIMARY]) == ['saved'] and _notes(engines[REPLICA]) == []
+
+
+def test_an_orm_flush_goes_to_the_primary(factory, engines):
+    from sqlalchemy import Column, Integer, String
+    from sqlalchemy.orm import declarative_base
+
+    Note = type('Note', (declarative_base(),), {
+        '__tablename__': 'note',
+        'id': Column(Integer, primary_key=True),
+        'body': Column(String),
+    })
+    session = factory()
+    route_reads(session, replica=True)
+    session.add(Note(body='flushed'))
+    session.commit()
+    assert _where(session) == PRIMARY
+    session.close()
+    assert _notes(engines[PRIMARY]) == ['flushed'] and _notes(engines[REPLICA]) == []
+
+
+def test_select_for_update_stays_on_the_primary(factory):
+    from sqlalchemy import column, select, table
+
+    session = factory()
+    route_reads(session, replica=True)
+    stmt = select(column('name')).select_from(table('marker')).with_for_update()
+    assert session.get_bind(clause=stmt) is factory.kw['bind']
+    session.close()
+
+
+@pytest.mark.parametrize('sql', [
+    'SELECT name FROM marker',                       # unmarked: could be anything behind a SELECT
+    "SELECT nextval('note_id_seq')",
+    "SELECT set_config('statement_timeout', '0', false)",
+    'SELECT name FROM marker FOR SHARE',
+])
+def test_raw_text_stays_on_the_primary_unless_marked_replica_safe(factory, sql):
+    from sqlalchemy.sql import text
+
+    session = factory()
+    route_reads(session, replica=True)
+    assert session.get_bind(clause=text(sql)) is factory.kw['bind']
+    assert _where(session) == PRIMARY
+    session.close()
+
+    session = factory()
+    route_reads(session, replica=True)
+    marked = text('SELECT name FROM marker').execution_options(replica_safe=True)
+    assert session.execute(marked).scalar() == REPLICA
+    assert _where(session) == REPLICA
+    session.close()
+
+
+def test_a_bare_connection_is_the_primary(factory):
+    session = factory()
+    route_reads(session, replica=True)
+    assert session.connection().exec_driver_sql('SELECT name FROM marker').scalar() == PRIMARY
+    assert _where(session) == PRIMARY
+    session.close()
+
+
+def test_a_user_who_just_wrote_reads_from_the_primary(factory):
+    recent_writers.note(7)
+    session = factory()
+    assert route_reads(session, writer=7, replica=True) is False
+    assert _where(session) == PRIMARY
+    assert route_reads(session, writer=8, replica=True) is True
+    session.close()
+
+
+def test_the_write_window_expires():
+    writers = RecentWriters(window=0)
+    writers.note(7)
+    assert not writers.active(7)
+    writers = RecentWriters(window=60)
+    writers.note(7)
+    assert writers.active(7) and not writers.active(8)
+
+
+def test_without_a_replica_everything_stays_on_the_primary(engines):
+    session = routing_session_factory(engines[PRIMARY])()
+    assert route_reads(session, writer=7, replica=True) is False
+    assert _where(session) == PRIMARY
+    session.close()
+
+
+def test_get_session_remembers_who_wrote(monkeypatch, factory):
+    from sqlalchemy.orm import scoped_session
+    from sqlalchemy.sql import text
+
+    from GEPPPlatform.libs.database import DatabaseManager
+
+    manager = DatabaseManager()
+    monkeypatch.setattr(manager, '_engine', factory.kw['bind'])
+    monkeypatch.setattr(manager, '_SessionLocal', scoped_session(factory))
+
+    with manager.get_session() as session:
+        route_reads(session, writer=7, replica=True)
+        assert _where(session) == REPLICA
+    assert not recent_writers.active(7)
+
+    with manager.get_session() as session:
+        route_reads(session, writer=7)
+        session.execute(text("INSERT INTO note (body) VALUES ('x')"))
+    assert recent_writers.active(7)
+
+    # The scoped session is reused; routing state from the last request must not leak.
+    with manager.get_session(read_only=True) as session:
+        assert 'wrote' not in session.info and 'writer' not in session.info
+        assert _where(session) == REPLICA
+    manager._SessionLocal.remove()
+
+
+# ── which routes may use it ──────────────────────────────────────────────
+
+@pytest.mark.parametrize('path,role', [
+    ('/api/reports/overview', REPLICA),
+    ('/api/reports/export/pdf', REPLICA),
+    ('/api/gri/306-1', REPLICA),
+    ('/api/traceability/export/pdf', REPLICA),
+    ('/api/esg/liff/summary', REPLICA),
+    ('/api/esg/liff/charts', REPLICA),
+    ('/api/esg/settings', None),
+    ('/api/transactions/5', None),
+    ('/api/users/me', None),
+])
+def test_read_heavy_route_groups_declare_the_replica(path, role):
+    assert AUTHED_ROUTES.match(path, 'GET').route.options.get('db_role') == role
+
+
+def test_declared_roles_are_known_and_public_routes_declare_none():
+    for route in AUTHED_ROUTES.routes():
+        assert route.options.get('db_role') in (None, REPLICA), route.key
+    for route in PUBLIC_ROUTES.routes():
+        assert 'db_role' not in route.options, route.key
@@ -0,0 +1,196 @@
+"""Report responses cached under a data watermark.
+
+A cached report may be served only while nothing it reads has changed: the
+watermark must move on every write a report can see (in this org, or in an
+org sharing data into it) and stay put otherwise, and keys must be equal
+exactly when filters and access scope select the same rows.
+"""
+
+import json
+from datetime import datetime
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.pool import StaticPool
+
+from GEPPPlatform.libs import org_tree, report_cache
+from GEPPPlatform.libs.report_cache import cache_key, data_watermark
+from GEPPPlatform.libs.shared_cache import SharedResultCache
+
+ORG = 8
+OTHER = 9
+
+_ORG_TABLES = ('transactions', 'traceability_transaction_group', 'traceability_transport_transactions',
+               'traceability_consolidations', 'user_locations', 'user_location_tags', 'user_tenants')
+_CATALOGUE = ('materials', 'main_materials', 'material_categories')
+
+
+@pytest.fixture
+def db():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    with engine.begin() as conn:
+        for name in _ORG_TABLES:
+            conn.exec_driver_sql(f'CREATE TABLE {name} (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+                                 'updated_date DATETIME)')
+        for name in _CATALOGUE:
+            conn.exec_driver_sql(f'CREATE TABLE {name} (id INTEGER PRIMARY KEY, updated_date DATETIME)')
+        conn.exec_driver_sql('CREATE TABLE organizations (id INTEGER PRIMARY KEY, owner_id INTEGER)')
+        conn.exec_driver_sql('CREATE TABLE transaction_records (id INTEGER PRIMARY KEY, '
+                             'created_transaction_id INTEGER, updated_date DATETIME)')
+        conn.exec_driver_sql('CREATE TABLE shared_user_locations (id INTEGER PRIMARY KEY, '
+                             'source_organization_id INTEGER, target_organization_id INTEGER, '
+                             'expired_date DATETIME, updated_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE organization_setup (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+            'root_nodes JSON, hub_node JSON, is_active BOOLEAN, created_date DATETIME, '
+            'updated_date DATETIME, deleted_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE shared_result_cache (cache_key TEXT PRIMARY KEY, version_tag TEXT NOT NULL, '
+            'value BLOB NOT NULL, created_at TIMESTAMP, expires_at TIMESTAMP NOT NULL)')
+        conn.exec_driver_sql(
+            "INSERT INTO organization_setup VALUES (1, 8, ?, '{}', 1, '2026-01-01', '2026-01-01', NULL)",
+            (json.dumps([{'nodeId': 1, 'children': []}]),))
+        conn.exec_driver_sql("INSERT INTO organizations VALUES (8, 100), (9, 200)")
+        conn.exec_driver_sql("INSERT INTO transactions VALUES (10, 8, '2026-01-01'), (20, 9, '2026-01-01')")
+        conn.exec_driver_sql("INSERT INTO transaction_records VALUES (100, 10, '2026-01-01'), "
+                             "(200, 20, '2026-01-01')")
+        conn.exec_driver_sql("INSERT INTO materials VALUES (51, '2026-01-01')")
+    org_tree.org_trees.clear()
+    session = Session(engine)
+    yield session
+    session.close()
+    engine.dispose()
+    org_tree.org_trees.clear()
+
+
+def _write(db, sql):
+    # Committed: the org tree is memoized per transaction, as it is per request.
+    db.connection().exec_driver_sql(sql)
+    db.commit()
+
+
+def test_keys_ignore_selection_order_and_follow_scope():
+    filters = {'location_ids': [3, 1, 2], 'origin_combos': [(2, None, 4), (1, 7, None)],
+               'date_from': '2025-12-31T17:00:00+00:00'}
+    reordered = {'date_from': '2025-12-31T17:00:00+00:00', 'origin_combos': [(1, 7, None), (2, None, 4)],
+                 'location_ids': [1, 2, 3]}
+    member = {'is_owner': False, 'assigned_ids': {1, 2}, 'scoped_grants': []}
+    same_member = {'is_owner': False, 'assigned_ids': {2, 1}, 'scoped_grants': [], 'ancestor_ids': {0}}
+    tag_member = {'is_owner': False, 'assigned_ids': {1, 2}, 'scoped_grants': [
+        {'kind': 'tag', 'id': 7, 'location_ids': {3}, 'start_date': None, 'end_date': None}]}
+
+    key = cache_key('/api/reports/overview', ORG, filters, None)
+    assert key.startswith('reports:org:8:api/reports/overview:')
+    assert key == cache_key('/api/reports/overview', ORG, reordered, {'is_owner': True})
+    assert key != cache_key('/api/reports/materials', ORG, filters, None)
+    assert key != cache_key('/api/reports/overview', OTHER, filters, None)
+    assert key != cache_key('/api/reports/overview', ORG, dict(filters, material_ids=[51]), None)
+    assert cache_key('/x', ORG, filters, member) == cache_key('/x', ORG, filters, same_member)
+    assert cache_key('/x', ORG, filters, member) not in (cache_key('/x', ORG, filters, None),
+                                                          cache_key('/x', ORG, filters, tag_member))
+    assert cache_key('/x', ORG, filters, None, extra='Asia/Bangkok') != cache_key('/x', ORG, filters, None)
+    # Same grants, but a role that narrows the pickers to the user's own locations.
+    assert cache_key('/x', ORG, filters, dict(member, filter_by_member=True)) != cache_key('/x', ORG, filters, member)
+    assert cache_key('/x', ORG, filters, {'is_owner': True, 'filter_by_member': True}) != \
+        cache_key('/x', ORG, filters, {'is_owner': True})
+
+
+@pytest.mark.parametrize('write', [
+    "INSERT INTO transaction_records VALUES (101, 10, '2026-01-01')",
+    "UPDATE transaction_records SET updated_date = '2026-02-01' WHERE id = 100",
+    "UPDATE transactions SET updated_date = '2026-02-01' WHERE id = 10",
+    "INSERT INTO traceability_transaction_group VALUES (1, 8, '2026-01-01')",
+    "INSERT INTO traceability_transport_transactions VALUES (1, 8, '2026-01-01')",
+    "INSERT INTO user_location_tags VALUES (1, 8, '2026-01-01')",
+    "UPDATE materials SET updated_date = '2026-02-01'",
+    "UPDATE organization_setup SET updated_date = '2026-02-01'",
+    "INSERT INTO shared_user_locations VALUES (1, 9, 8, NULL, '2026-01-01')",
+])
+def test_the_watermark_moves_on_writes_a_report_can_see(db, write):
+    before = data_watermark(db, ORG)
+    _write(db, write)
+    assert data_watermark(db, ORG) != before
+
+
+def test_the_watermark_ignores_other_orgs_until_they_share_in(db):
+    before = data_watermark(db, ORG)
+    _write(db, "UPDATE transaction_records SET updated_date = '2026-02-01' WHERE id = 200")
+    _write(db, "INSERT INTO traceability_transaction_group VALUES (2, 9, '2026-01-01')")
+    assert data_watermark(db, ORG) == before
+
+    _write(db, "INSERT INTO shared_user_locations VALUES (1, 9, 8, '2999-01-01', '2026-01-01')")
+    shared = data_watermark(db, ORG)
+    _write(db, "UPDATE transaction_records SET updated_date = '2026-03-01' WHERE id = 200")
+    assert data_watermark(db, ORG) != shared
+
+
+def test_renamed_locations_move_the_watermark_also_in_sharing_orgs(db):
+    _write(db, "INSERT INTO user_locations VALUES (1, 8, '2026-01-01'), (2, 9, '2026-01-01')")
+    before = data_watermark(db, ORG)
+    _write(db, "UPDATE user_locations SET updated_date = '2026-02-01' WHERE id = 1")
+    renamed = data_watermark(db, ORG)
+    assert renamed != before
+
+    _write(db, "UPDATE user_locations SET updated_date = '2026-02-01' WHERE id = 2")
+    assert data_watermark(db, ORG) == renamed
+    _write(db, "INSERT INTO shared_user_locations VALUES (1, 9, 8, '2999-01-01', '2026-01-01')")
+    shared = data_watermark(db, ORG)
+    _write(db, "UPDATE user_locations SET updated_date = '2026-03-01' WHERE id = 2")
+    assert data_watermark(db, ORG) != shared
+
+
+def test_a_share_running_out_moves_the_watermark(db):
+    _write(db, "INSERT INTO shared_user_locations VALUES (1, 9, 8, '2999-01-01', '2026-01-01')")
+    live = data_watermark(db, ORG)
+    _write(db, f"UPDATE shared_user_locations SET expired_date = '{datetime(2000, 1, 1)}'")
+    _write(db, "UPDATE shared_user_locations SET updated_date = '2026-01-01'")   # expiry is not a write
+    assert data_watermark(db, ORG) != live
+
+
+@pytest.fixture
+def cache(db, monkeypatch):
+    monkeypatch.setattr(report_cache, 'shared_cache', SharedResultCache(bind=db.get_bind()))
+
+
+class Report:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return {'total_kg': 12.5, 'calls': self.calls}
+
+
+def test_unchanged_data_is_served_from_the_cache(db, cache):
+    report = Report()
+    first = report_cache.cached(db, '/api/reports/overview', ORG, {'material_ids': [51]}, None, report)
+    second = report_cache.cached(db, '/api/reports/overview', ORG, {'material_ids': [51]}, None, report)
+    assert first == second == {'total_kg': 12.5, 'calls': 1}
+
+    _write(db, "UPDATE transaction_records SET updated_date = '2026-02-01' WHERE id = 100")
+    third = report_cache.cached(db, '/api/reports/overview', ORG, {'material_ids': [51]}, None, report)
+    assert third == {'total_kg': 12.5, 'calls': 2}
+
+
+def test_disabled_or_failing_caches_compute(db, cache, monkeypatch):
+    report = Report()
+    monkeypatch.setenv('REPORT_CACHE', 'off')
+    report_cache.cached(db, '/api/reports/overview', ORG, {}, None, report)
+    report_cache.cached(db, '/api/reports/overview', ORG, {}, None, report)
+    assert report.calls == 2
+
+    monkeypatch.delenv('REPORT_CACHE')
+    _write(db, 'DROP TABLE traceability_consolidations')
+    assert report_cache.cached(db, '/api/reports/overview', ORG, {}, None, report) == {'total_kg': 12.5, 'calls': 3}
+    assert db.connection().exec_driver_sql('SELECT count(*) FROM transactions').scalar() == 2
+
+
+def test_report_errors_propagate(db, cache):
+    def broken():
+        raise ValueError('date_from and date_to are required')
+
+    with pytest.raises(ValueError):
+        report_cache.cached(db, '/api/reports/comparison', ORG, {}, None, broken)
@@ -0,0 +1,257 @@
+"""Report totals summed in SQL.
+
+The materials and comparison reports read get_overview_totals — one row per
+status, material attributes (and Bangkok day) with the quantities summed —
+instead of one row per record. Fed the per-record rows of get_overview_data
+as single-record groups, the same handlers reproduce the old per-record
+aggregation, so both outputs must match exactly on every synthetic org.
+Once the org's daily rollup is built its groups come from there, and the
+reports must not change either.
+"""
+
+import json
+from datetime import datetime, timezone
+from typing import Any, NamedTuple
+from zoneinfo import ZoneInfo
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.dialects import postgresql
+
+import GEPPPlatform.libs.database  # noqa: F401  (registers every model)
+from GEPPPlatform.libs import org_tree, transaction_rollup
+from GEPPPlatform.services.cores.reports import reports_handlers
+from GEPPPlatform.services.cores.reports.reports_service import ReportsService
+from GEPPPlatform.services.cores.transactions.transaction_service import TransactionService
+
+ORG = 8
+ROOT_NODES = [{'nodeId': 1, 'children': [{'nodeId': 2, 'children': []}, {'nodeId': 3, 'children': []}]}]
+
+MATERIALS = [
+    # id, category, main material, unit weight, ghg factor, name
+    (51, 1, 11, 2, 0.5, 'PET'),
+    (52, 1, 11, 0.5, 1.25, 'HDPE'),
+    (53, 9, 11, 1, 0, 'Dirty bags'),      # waste to energy, shares the plastic main material
+    (54, None, None, 0, 0, 'Mixed'),      # no unit weight: comparison falls back to kilograms
+    (55, 4, 12, 1, 0.25, 'Food'),
+]
+TRANSACTIONS = [
+    # id, org, origin, tag, tenant, status, internal
+    (10, ORG, 2, None, None, 'approved', 0),
+    (11, ORG, 3, 7, None, 'rejected', 0),
+    (12, ORG, 3, None, 4, 'pending', 0),
+    (13, ORG, 2, None, None, 'approved', 1),
+    (14, 9, 20, None, None, 'approved', 0),   # shared into org 8
+]
+RECORDS = [
+    # id, transaction, transaction_date (UTC), status, material, record category/main, quantity, weight, deleted
+    (100, 10, '2026-01-05 03:00:00.000000', 'approved', 51, 1, 11, 1.5, 3, None),
+    (101, 10, '2026-01-05 04:00:00.000000', 'approved', 51, 1, 11, 2.25, 4.5, None),
+    (102, 10, '2026-01-31 18:00:00.000000', 'approved', 52, 1, 11, 8, 4, None),   # 1 February in Bangkok
+    (103, 11, '2026-01-06 03:00:00.000000', 'pending', 51, 1, 11, 16, 32, None),
+    (104, 12, '2026-02-03 03:00:00.000000', 'approved', 53, 9, 11, 3.75, 3.75, None),
+    (105, 12, '2026-02-04 03:00:00.000000', 'approved', 54, 4, 12, 5, 6.5, None),
+    (106, 12, '2026-02-04 05:00:00.000000', 'approved', 55, 4, 12, 10.5, 10.5, None),
+    (107, 12, '2026-02-05 03:00:00.000000', 'rejected', 55, 4, 12, 64, 64, None),
+    (108, 12, '2026-02-05 03:00:00.000000', 'approved', 55, 4, 12, 128, 128, '2026-02-06'),
+    (109, 13, '2026-01-07 03:00:00.000000', 'approved', 51, 1, 11, 256, 512, None),
+    (110, 12, None, 'approved', 52, 1, 11, 0.75, 0.375, None),
+    (111, 10, '2025-01-10 03:00:00.000000', 'approved', 55, 4, 12, 7, 7, None),   # last year
+    (112, 10, '2025-02-10 03:00:00.000000', 'approved', 52, 1, 11, 12, 6, None),
+    (113, 14, '2026-01-08 03:00:00.000000', 'approved', 51, 1, 11, 0.25, 0.5, None),
+    (114, 14, '2026-01-09 03:00:00.000000', 'approved', 51, 1, 11, 1.75, 3.5, None),
+]
+SHARE = {'share_id': 5, 'source_org_id': 9, 'src_ids': [20], 'start_date': None, 'end_date': None,
+         'label': 'Partner', 'source_org_name': 'Org 9', 'placed_parent_node_id': 1}
+
+BANGKOK = ZoneInfo('Asia/Bangkok')
+
+
+class _Group(NamedTuple):
+    status: Any
+    unit_weight: Any
+    calc_ghg: Any
+    category_id: Any
+    main_material_id: Any
+    record_category_id: Any
+    record_main_material_id: Any
+    material_id: Any
+    material_name_en: Any
+    material_name_th: Any
+    day: Any
+    record_count: int
+    origin_quantity: Any
+    origin_weight_kg: Any
+
+
+@pytest.fixture
+def service(monkeypatch):
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        conn.exec_driver_sql(
+            'CREATE TABLE transactions (id INTEGER PRIMARY KEY, organization_id INTEGER, origin_id INTEGER, '
+            'location_tag_id INTEGER, tenant_id INTEGER, status VARCHAR, is_internal_transfer BOOLEAN, '
+            'transaction_date DATETIME, deleted_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE transaction_records (id INTEGER PRIMARY KEY, created_transaction_id INTEGER, '
+            'transaction_date DATETIME, status VARCHAR, material_id INTEGER, category_id INTEGER, '
+            'main_material_id INTEGER, origin_quantity NUMERIC, origin_weight_kg NUMERIC, '
+            'destination_id INTEGER, disposal_method VARCHAR, traceability_group_id INTEGER, '
+            'deleted_date DATETIME, total_amount NUMERIC)')
+        conn.exec_driver_sql(
+            'CREATE TABLE transaction_daily_rollup (organization_id INTEGER, day DATE, origin_id INTEGER, '
+            'location_tag_id INTEGER, tenant_id INTEGER, destination_id INTEGER, material_id INTEGER, '
+            'category_id INTEGER, main_material_id INTEGER, transaction_status VARCHAR, '
+            'record_status VARCHAR, is_internal_transfer BOOLEAN, record_count INTEGER, '
+            'weight_kg NUMERIC, quantity NUMERIC, amount NUMERIC)')
+        conn.exec_driver_sql(
+            'CREATE TABLE transaction_rollup_state (organization_id INTEGER PRIMARY KEY, timezone TEXT, '
+            'built_at DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE materials (id INTEGER PRIMARY KEY, category_id INTEGER, main_material_id INTEGER, '
+            'unit_weight NUMERIC, calc_ghg NUMERIC, tags JSON, name_en VARCHAR, name_th VARCHAR)')
+        conn.exec_driver_sql(
+            'CREATE TABLE organization_setup (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+            'root_nodes JSON, hub_node JSON, is_active BOOLEAN, created_date DATETIME, '
+            'updated_date DATETIME, deleted_date DATETIME)')
+        conn.exec_driver_sql(
+            "INSERT INTO organization_setup VALUES (1, 8, ?, '{}', 1, '2026-01-01', '2026-01-01', NULL)",
+            (json.dumps(ROOT_NODES),))
+        for mid, category, main, unit_weight, ghg, name in MATERIALS:
+            conn.exec_driver_sql('INSERT INTO materials VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                                 (mid, category, main, unit_weight, ghg, '[]', name, name + ' th'))
+        for row in TRANSACTIONS:
+            conn.exec_driver_sql('INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL)', row)
+        for rid, tid, when, status, material, category, main, quantity, weight, deleted in RECORDS:
+            conn.exec_driver_sql(
+                'INSERT INTO transaction_records VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL, ?, NULL)',
+                (rid, tid, when, status, material, category, main, quantity, weight, deleted))
+
+    monkeypatch.setattr(TransactionService, '_resolve_shared_branches',
+                        lambda self, org, selected, visible_parent_ids=None: ([SHARE], {}))
+    org_tree.org_trees.clear()
+    session = Session(engine)
+    service = ReportsService(session)
+    # SQLite compares timestamps as text, so the handlers' ISO bounds go in as
+    # naive UTC datetimes; Postgres casts the strings itself.
+    for name in ('get_overview_data', 'get_overview_totals'):
+        method = getattr(service, name)
+        monkeypatch.setattr(service, name, lambda *a, _method=method, filters=None, **kw: _method(
+            *a, filters=_naive_dates(filters), **kw))
+    yield service
+    session.close()
+    engine.dispose()
+    org_tree.org_trees.clear()
+
+
+def _naive_dates(filters):
+    if not filters:
+        return filters
+    converted = dict(filters)
+    for key in ('date_from', 'date_to'):
+        if isinstance(converted.get(key), str):
+            converted[key] = datetime.fromisoformat(converted[key]).astimezone(timezone.utc).replace(tzinfo=None)
+    return converted
+
+
+def _per_record(service):
+    """The pre-GROUP BY path: every get_overview_data record as a group of its own."""
+    def totals(organization_id, filters=None, current_user_id=None, report_type=None, by_day=False):
+        rows = service.get_overview_data(organization_id=organization_id, filters=filters,
+                                         current_user_id=current_user_id, report_type=report_type)['rows']
+        groups = [_Group(
+            r.status, r.unit_weight, r.calc_ghg, r.category_id, r.main_material_id, r.record_category_id,
+            r.record_main_material_id, r.material_id, r.material_name_en, r.material_name_th,
+            r.transaction_date.replace(tzinfo=timezone.utc).astimezone(BANGKOK).date()
+            if by_day and r.transaction_date else None,
+            1, r.origin_quantity, r.origin_weight_kg,
+        ) for r in rows]
+        return {'success': True, 'rows': groups, 'total_records': len(groups)}
+    return totals
+
+
+def _both(service, monkeypatch, handler, **kwargs):
+    grouped = handler(service, ORG, **kwargs)
+    monkeypatch.setattr(service, 'get_overview_totals', _per_record(service))
+    return grouped, handler(service, ORG, **kwargs)
+
+
+# January and February 2026 picked in Bangkok.
+JAN_FEB = {'date_from': '2025-12-31T17:00:00+00:00', 'date_to': '2026-02-28T16:59:59.999999+00:00'}
+
+
+@pytest.mark.parametrize('filters', [
+    {},
+    JAN_FEB,
+    {'material_ids': [51, 53]},
+    {'origin_ids': [3]},
+    {'origin_combos': [(2, None, None), (3, None, 4)]},
+    {'location_ids': [2], 'date_from': '2026-01-04T17:00:00+00:00'},
+])
+def test_materials_report_matches_the_per_record_aggregation(service, monkeypatch, filters):
+    grouped, per_record = _both(service, monkeypatch, reports_handlers._handle_materials_report,
+                                filters=filters)
+    assert grouped == per_record
+
+
+def test_materials_report_sums_each_material_once(service):
+    totals = service.get_overview_totals(ORG, filters={})
+    records = service.get_overview_data(ORG, filters={})
+    assert totals['total_records'] == records['total_records'] == 12
+    assert len(totals['rows']) < len(records['rows'])
+    pet = [row for row in totals['rows'] if row.material_id == 51 and row.status.value == 'approved']
+    assert sorted(float(row.origin_quantity) for row in pet) == [2.0, 3.75]   # shared branch, own org
+
+
+@pytest.mark.parametrize('filters', [
+    JAN_FEB,
+    dict(JAN_FEB, material_ids=[52, 54, 55]),
+    dict(JAN_FEB, location_ids=[3]),
+])
+def test_comparison_report_matches_the_per_record_aggregation(service, monkeypatch, filters):
+    grouped, per_record = _both(service, monkeypatch, reports_handlers._handle_comparison_report,
+                                filters=filters)
+    assert grouped == per_record
+
+
+def test_comparison_months_are_bangkok_months(service):
+    right = reports_handlers._handle_comparison_report(service, ORG, filters=JAN_FEB)['right']
+    # 102 is 31 January in UTC and 1 February in Bangkok; 54 has no unit weight and counts its kilograms.
+    assert right['month'] == {'Jan': 11.5, 'Feb': 24.75}
+
+
+@pytest.mark.parametrize('handler, filters', [
+    (reports_handlers._handle_materials_report, {}),
+    (reports_handlers._handle_materials_report, JAN_FEB),
+    (reports_handlers._handle_materials_report, {'origin_combos': [(2, None, None), (3, None, 4)]}),
+    (reports_handlers._handle_materials_report, {'location_ids': [2], 'date_from': '2026-01-04T17:00:00+00:00'}),
+    (reports_handlers._handle_comparison_report, JAN_FEB),
+    (reports_handlers._handle_comparison_report, dict(JAN_FEB, material_ids=[52, 54, 55])),
+    (reports_handlers._handle_comparison_report, dict(JAN_FEB, location_ids=[3])),
+])
+def test_reports_read_from_the_rollup_unchanged(service, handler, filters):
+    from_records = handler(service, ORG, filters=filters)
+    assert transaction_rollup.rebuild(service.db, ORG) > 0
+    service.db.commit()
+    assert service._rollup_overview_totals(ORG, _naive_dates(filters), None, by_day=True) is not None
+    assert handler(service, ORG, filters=filters) == from_records
+
+
+def test_comparison_days_are_bangkok_days_on_postgres(service, monkeypatch):
+    # SQLite stores naive UTC; in Postgres transaction_date is timestamptz and
+    # needs exactly one AT TIME ZONE, or records cross month boundaries.
+    queries = []
+    overview_query = service._overview_query
+
+    def recording(*args, **kwargs):
+        queries.append(overview_query(*args, **kwargs))
+        return queries[-1]
+
+    monkeypatch.setattr(service, '_overview_query', recording)
+    service.get_overview_totals(ORG, filters=JAN_FEB, by_day=True)
+    sql = str(queries[0].statement.compile(dialect=postgresql.dialect()))
+    assert "CAST(timezone('Asia/Bangkok', transaction_records.transaction_date) AS DATE) AS day" in sql
+    assert "'UTC'" not in sql
@@ -0,0 +1,125 @@
+"""Offloading responses that are still over Lambda's 6 MB cap after gzip.
+
+Past the cap the client gets an error rather than a partial body, so the failure
+modes that matter are: a small response must come back exactly as before, a big
+one must be retrievable byte for byte from where the 303 points, and a storage
+problem must never turn a servable response into a broken one.
+"""
+
+import base64
+import gzip
+import json
+from pathlib import Path
+from urllib.parse import urlparse
+
+from GEPPPlatform.libs.http_response import maybe_gzip
+from GEPPPlatform.libs.response_offload import (
+    LocalResponseStore,
+    S3ResponseStore,
+    default_store,
+    offload_large_response,
+    response_size,
+)
+
+GZIP_EVENT = {"headers": {"accept-encoding": "gzip"}}
+
+
+def _response(body, **extra):
+    return {"statusCode": 200,
+            "headers": {"Content-Type": "application/json", "X-App-Version": "1.2.3"},
+            "body": body, **extra}
+
+
+def _stored_bytes(out):
+    return Path(urlparse(out["headers"]["Location"]).path).read_bytes()
+
+
+def test_a_response_under_the_threshold_is_returned_untouched(tmp_path):
+    response = _response(json.dumps({"data": "x" * 500}))
+    assert offload_large_response(response, LocalResponseStore(tmp_path), threshold=10_000) is response
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_a_large_response_becomes_a_303_to_the_stored_body(tmp_path):
+    body = json.dumps({"data": ["card"] * 2000})
+    out = offload_large_response(_response(body), LocalResponseStore(tmp_path), threshold=1000)
+
+    assert out["statusCode"] == 303
+    assert out["headers"]["X-App-Version"] == "1.2.3"
+    assert _stored_bytes(out) == body.encode("utf-8")
+    envelope = json.loads(out["body"])
+    assert envelope["offloaded"] is True
+    assert envelope["url"] == out["headers"]["Location"]
+    assert envelope["size_bytes"] == len(body)
+
+
+def test_a_gzipped_response_is_stored_compressed_and_labelled(tmp_path):
+    body = json.dumps({"data": [{"origin": "ห้องขยะ อาคาร A"}] * 5000}, ensure_ascii=False)
+    gzipped = maybe_gzip(_response(body), GZIP_EVENT)
+    out = offload_large_response(gzipped, LocalResponseStore(tmp_path), threshold=1000)
+
+    assert "Content-Encoding" not in out["headers"]
+    assert json.loads(out["body"])["content_encoding"] == "gzip"
+    assert out["headers"]["Location"].endswith(".json.gz")
+    assert gzip.decompress(_stored_bytes(out)).decode("utf-8") == body
+
+
+def test_only_successful_responses_are_offloaded(tmp_path):
+    response = _response("x" * 5000)
+    response["statusCode"] = 500
+    assert offload_large_response(response, LocalResponseStore(tmp_path), threshold=1000) is response
+
+
+def test_a_storage_failure_returns_the_original_response():
+    class BrokenStore:
+        def put(self, *args, **kwargs):
+            raise OSError("bucket unavailable")
+
+    response = _response("x" * 5000)
+    assert offload_large_response(response, BrokenStore(), threshold=1000) is response
+
+
+def test_offloading_can_be_switched_off(tmp_path, monkeypatch):
+    monkeypatch.setenv("RESPONSE_OFFLOAD", "off")
+    response = _response("x" * 5000)
+    assert offload_large_response(response, LocalResponseStore(tmp_path), threshold=1000) is response
+
+
+def test_thai_text_is_sized_as_lambda_escapes_it():
+    """Six bytes per character once the runtime JSON-encodes it, not three."""
+    thai = _response("ก" * 1000)
+    ascii_ = _response("a" * 1000)
+    assert response_size(thai) - response_size(ascii_) >= 5000
+
+
+def test_a_base64_body_is_sized_as_sent():
+    packed = base64.b64encode(b"\0" * 3000).decode()
+    assert response_size(_response(packed, isBase64Encoded=True)) >= len(packed)
+
+
+def test_the_local_directory_overrides_s3(tmp_path, monkeypatch):
+    monkeypatch.setenv("RESPONSE_OFFLOAD_DIR", str(tmp_path))
+    assert isinstance(default_store(), LocalResponseStore)
+
+
+def test_the_s3_store_keeps_the_encoding_and_presigns_the_prefixed_key():
+    class FakeS3:
+        def __init__(self):
+            self.calls = []
+
+        def put_object(self, **kwargs):
+            self.calls.append(('put', kwargs))
+
+        def generate_presigned_url(self, op, Params, ExpiresIn):
+            self.calls.append((op, Params, ExpiresIn))
+            return 'https://example.invalid/signed'
+
+    store = S3ResponseStore('bucket', prefix='tmp/api-responses/')
+    store._client = FakeS3()
+    out = offload_large_response(maybe_gzip(_response('{"a": "' + 'b' * 9000 + '"}'), GZIP_EVENT),
+                                 store, threshold=100)
+
+    (_, put), (op, params, ttl) = store._client.calls
+    assert put['Key'].startswith('tmp/api-responses/') and put['ContentEncoding'] == 'gzip'
+    assert (op, params['Key'], ttl) == ('get_object', put['Key'], 300)
+    assert out['headers']['Location'] == 'https://example.invalid/signed'
@@ -0,0 +1,185 @@
+"""Dispatching requests through the compiled route table.
+
+The elif chain this replaced matched on `"/api/x" in path`, so the only thing
+keeping a request out of the wrong handler was the order of the branches. These
+tests pin the cases where that order mattered, and list the whole table so a
+route that silently disappears fails here rather than on a deployed stage.
+"""
+
+import pytest
+
+from GEPPPlatform.entry_points.routes import (
+    AUTHED_ROUTES,
+    PUBLIC_ROUTES,
+    available_routes,
+    match_route,
+)
+from GEPPPlatform.libs.routing import RouteTable
+
+
+def _public(path, method='GET'):
+    found = match_route(PUBLIC_ROUTES, path, method)
+    return found.route.pattern if found else None
+
+
+def _authed(path, method='GET'):
+    found = match_route(AUTHED_ROUTES, path, method)
+    return found.route.pattern if found else None
+
+
+# ── the table itself ──────────────────────────────────────────────────────
+
+def test_every_route_is_listed():
+    assert set(available_routes()) == {
+        # public
+        '/api/admin/login', '/api/auth', '/api/iot-hardwares', '/api/epr/ai_audit',
+        '/documents/api-docs', '/docs/bma', '/health', '/api/version',
+        '/api/webhooks/mailchimp/inbound', '/api/webhooks/mailchimp',
+        '/api/crm/unsubscribe/{token}', '/api/public/leads',
+        '/api/public/customer-leads', '/api/public/cookie-consent',
+        '/api/userapi/documents/{service}', '/api/esg/liff/invitation/accept',
+        '/api/esg/line/webhook', '/api/scale-report/{token}',
+        '/api/input-channel/{hash}', '/api/materials', '/api/rewards/public',
+        # authenticated
+        '/api/admin', '/api/crm/events', '/api/iot-devices', '/api/users',
+        '/api/locations', '/api/input-channels', '/api/organizations',
+        '/api/shared-locations', '/api/reports', '/api/gri', '/api/rewards',
+        '/api/import-files', '/api/transactions', '/api/transaction_audit',
+        '/api/traceability', '/api/audit-settings', '/api/audit/manual',
+        '/api/audit', '/api/esg', '/api/debug', '/api/integration/bma',
+        '/api/integration', '/api/userapi',
+        # export sub-routes, registered for their statement budget
+        '/api/admin/organizations/{id}/transactions-export',
+        '/api/admin/organizations/{id}/setup-export', '/api/reports/export',
+        '/api/gri/export', '/api/traceability/export', '/api/esg/export',
+        '/api/esg/scope3-export', '/api/esg/liff/export', '/api/esg/liff/scope3-export',
+        # ESG dashboard sub-routes, registered to read from the replica
+        '/api/esg/liff/summary', '/api/esg/liff/charts', '/api/esg/liff/report',
+        '/api/esg/completeness', '/api/esg/positioning',
+    }
+
+
+def test_route_keys_are_stable_across_ids_in_the_url():
+    """Metrics group by this key; an id in the path must not split the series."""
+    a = match_route(PUBLIC_ROUTES, '/api/scale-report/tok-1', 'GET')
+    b = match_route(PUBLIC_ROUTES, '/api/scale-report/tok-2', 'GET')
+    assert a.key == b.key == '* /api/scale-report/{token}'
+    assert match_route(AUTHED_ROUTES, '/api/crm/events', 'POST').key == 'POST /api/crm/events'
+
+
+# ── prefixes that contain one another ─────────────────────────────────────
+
+@pytest.mark.parametrize('path,expected', [
+    ('/api/audit-settings/doc-types', '/api/audit-settings'),
+    ('/api/audit/manual/12', '/api/audit/manual'),
+    ('/api/audit/rules', '/api/audit'),
+    ('/api/transaction_audit/run', '/api/transaction_audit'),
+    ('/api/transactions/5', '/api/transactions'),
+    ('/api/integration/bma/transaction', '/api/integration/bma'),
+    ('/api/integration/other', '/api/integration'),
+    ('/api/input-channels/3', '/api/input-channels'),
+])
+def test_the_most_specific_authenticated_route_wins(path, expected):
+    assert _authed(path) == expected
+
+
+def test_a_segment_is_never_matched_as_a_substring():
+    assert _authed('/api/auditing') is None
+    assert _authed('/api/esg-export') is None
+
+
+def test_a_health_segment_deep_in_an_api_path_is_not_the_health_check():
+    """`"/health" in path` used to answer these with {"status": "healthy"}."""
+    assert _public('/api/iot-devices/health') is None
+    assert _authed('/api/iot-devices/health') == '/api/iot-devices'
+
+
+def test_rewards_public_is_served_without_a_token_and_the_rest_is_not():
+    assert _public('/api/rewards/public/catalog') == '/api/rewards/public'
+    assert _public('/api/rewards/catalog') is None
+    assert _authed('/api/rewards/catalog') == '/api/rewards'
+
+
+def test_userapi_documentation_is_public_but_calls_are_not():
+    assert _public('/api/userapi/documents/ai_audit/v1') == '/api/userapi/documents/{service}'
+    assert _public('/api/userapi/acme/ai_audit/v1') is None
+    assert _authed('/api/userapi/acme/ai_audit/v1') == '/api/userapi'
+
+
+# ── methods ───────────────────────────────────────────────────────────────
+
+def test_admin_login_is_public_only_for_post():
+    assert _public('/api/admin/login', 'POST') == '/api/admin/login'
+    assert _public('/api/admin/login', 'GET') is None
+    assert _authed('/api/admin/organizations', 'GET') == '/api/admin'
+
+
+def test_the_inbound_webhook_is_preferred_for_post_only():
+    assert _public('/api/webhooks/mailchimp/inbound', 'POST') == '/api/webhooks/mailchimp/inbound'
+    assert _public('/api/webhooks/mailchimp/inbound', 'GET') is None
+    assert _public('/api/webhooks/mailchimp/events', 'POST') == '/api/webhooks/mailchimp'
+
+
+def test_materials_reads_go_through_the_channel_aware_route():
+    assert _public('/api/materials/categories', 'GET') == '/api/materials'
+    assert _public('/api/materials', 'POST') is None
+    assert _authed('/api/materials', 'POST') == '/api/materials'
+
+
+def test_method_matching_is_case_insensitive():
+    assert _public('/api/admin/login', 'post') == '/api/admin/login'
+
+
+# ── exact routes and path parameters ──────────────────────────────────────
+
+def test_exact_routes_do_not_match_longer_paths():
+    assert _public('/api/version') == '/api/version'
+    assert _public('/api/version/extra') is None
+    assert _public('/api/esg/line/webhook/x', 'POST') is None
+
+
+def test_a_token_route_needs_the_token():
+    """The old `split('/api/scale-report/')[1]` raised IndexError on a bare prefix."""
+    assert _public('/api/scale-report') is None
+    assert _public('/api/crm/unsubscribe/', 'GET') is None
+
+
+def test_path_parameters_are_captured_without_the_query_string():
+    found = match_route(PUBLIC_ROUTES, '/api/input-channel/abc123/submit?x=1', 'POST')
+    assert found.params == {'hash': 'abc123'}
+
+
+# ── stage prefixes ────────────────────────────────────────────────────────
+
+@pytest.mark.parametrize('path,expected', [
+    ('/dev/health', '/health'),
+    ('/v1/documents/api-docs/redoc', '/documents/api-docs'),
+    ('/v1/docs/bma/0a70bf9ef2fcb7c2dc6c2b046ebb052c', '/docs/bma'),
+])
+def test_non_api_routes_accept_a_stage_prefix(path, expected):
+    assert _public(path) == expected
+
+
+# ── the table mechanics ───────────────────────────────────────────────────
+
+def test_a_duplicate_registration_is_rejected():
+    table = RouteTable()
+    table.add('/api/x', lambda req: None)
+    with pytest.raises(ValueError):
+        table.add('/api/x/', lambda req: None)
+
+
+def test_routes_added_after_a_lookup_are_picked_up():
+    table = RouteTable()
+    table.add('/api/a', lambda req: 'a')
+    assert table.match('/api/b', 'GET') is None
+    table.add('/api/b', lambda req: 'b')
+    assert table.match('/api/b', 'GET').route.handler(None) == 'b'
+
+
+def test_a_literal_segment_beats_a_parameter():
+    table = RouteTable()
+    table.add('/api/x/{id}', lambda req: 'param')
+    table.add('/api/x/new', lambda req: 'literal')
+    assert table.match('/api/x/new', 'GET').route.handler(None) == 'literal'
+    assert table.match('/api/x/7', 'GET').params == {'id': '7'}
@@ -0,0 +1,257 @@
+"""Cross-container result cache on Postgres.
+
+The cache may only ever save work: a miss, a version change, an expired row or
+a broken database must all end with the caller's own computation, run exactly
+once, and no connection may stay checked out while it computes. Claims and
+polling are exercised on SQLite; the concurrent runs also go against
+PostgreSQL when ``SHARED_CACHE_TEST_DSN`` names a scratch database (the test
+creates and finally drops ``shared_result_cache`` there).
+"""
+
+import os
+import threading
+import time
+from decimal import Decimal
+from pathlib import Path
+
+import pytest
+
+from GEPPPlatform.libs.shared_cache import SharedResultCache
+
+_MIGRATION = next(Path(__file__).resolve().parents[1].glob('migrations/*_create_shared_result_cache.sql'))
+
+
+
+def _schema(dialect):
+    sql = _MIGRATION.read_text()
+    statements = [s for s in sql.split(';') if 'CREATE' in s and 'COMMENT ON' not in s]
+    if dialect == 'sqlite':
+        statements = [s.replace('UNLOGGED ', '').replace('TIMESTAMPTZ', 'TIMESTAMP')
+                       .replace('DEFAULT now()', 'DEFAULT CURRENT_TIMESTAMP') for s in statements]
+    return statements
+
+
+@pytest.fixture
+def sqlite_cache():
+    # exec_driver_sql, not text(): another suite rebinds sqlalchemy.text at import time.
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import StaticPool
+
+    engine = create_engine('sqlite://', poolclass=StaticPool, connect_args={'check_same_thread': False})
+    with engine.begin() as conn:
+        for statement in _schema('sqlite'):
+            conn.exec_driver_sql(statement)
+    return SharedResultCache(bind=engine)
+
+
+class Counter:
+    def __init__(self, delay=0.0):
+        self.value = {'total_kg': Decimal('12.50'), 'rows': [1, 2]}
+        self.delay = delay
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def __call__(self):
+        with self._lock:
+            self.calls += 1
+        time.sleep(self.delay)
+        return self.value
+
+
+def test_the_second_call_reads_the_first_calls_result(sqlite_cache):
+    compute = Counter()
+    first = sqlite_cache.get_or_compute('reports:org:1', compute, ttl_seconds=60, version='v1')
+    second = sqlite_cache.get_or_compute('reports:org:1', compute, ttl_seconds=60, version='v1')
+    assert first == compute.value
+    assert second == {'total_kg': 12.5, 'rows': [1, 2]}
+    assert compute.calls == 1
+
+
+def test_a_new_version_tag_misses(sqlite_cache):
+    compute = Counter()
+    sqlite_cache.get_or_compute('reports:org:1', compute, ttl_seconds=60, version='v1')
+    sqlite_cache.get_or_compute('reports:org:1', compute, ttl_seconds=60, version='v2')
+    assert compute.calls == 2
+    assert sqlite_cache.get('reports:org:1', version='v1') is None
+
+
+def test_expired_entries_miss_and_are_purged(sqlite_cache):
+    sqlite_cache.set('k', [1], ttl_seconds=-1)
+    assert sqlite_cache.get('k', default='miss') == 'miss'
+    sqlite_cache.purge_expired()
+    with sqlite_cache.bind.connect() as conn:
+        assert conn.exec_driver_sql('SELECT COUNT(*) FROM shared_result_cache').scalar() == 0
+
+
+def test_none_is_a_cacheable_result(sqlite_cache):
+    calls = []
+    compute = lambda: calls.append(1)  # noqa: E731 — returns None
+    sqlite_cache.get_or_compute('empty', compute, ttl_seconds=60)
+    assert sqlite_cache.get_or_compute('empty', compute, ttl_seconds=60) is None
+    assert len(calls) == 1
+
+
+def test_invalidate_prefix_only_matches_the_prefix(sqlite_cache):
+    for key in ('org:4:tree', 'org:4:perms', 'org:42:tree', 'org_4:tree'):
+        sqlite_cache.set(key, key, ttl_seconds=60)
+    sqlite_cache.invalidate_prefix('org:4:')
+    assert [sqlite_cache.get(k) for k in ('org:4:tree', 'org:4:perms', 'org:42:tree', 'org_4:tree')] == \
+        [None, None, 'org:42:tree', 'org_4:tree']
+
+
+def test_a_failing_computation_propagates_and_is_not_cached(sqlite_cache):
+    def broken():
+        raise ValueError('bad filter')
+
+    with pytest.raises(ValueError, match='bad filter'):
+        sqlite_cache.get_or_compute('k', broken, ttl_seconds=60)
+    assert sqlite_cache.get('k', default='miss') == 'miss'
+    with sqlite_cache.bind.connect() as conn:   # the claim was dropped with it
+        assert conn.exec_driver_sql('SELECT COUNT(*) FROM shared_result_cache').scalar() == 0
+
+
+def test_a_live_claim_is_waited_for(sqlite_cache):
+    compute = Counter()
+    assert sqlite_cache._claim('k', 'v1') is True
+    assert sqlite_cache._claim('k', 'v1') is False
+    storer = threading.Timer(0.1, lambda: sqlite_cache.set('k', 'stored', ttl_seconds=60, version='v1'))
+    storer.start()
+    assert sqlite_cache.get_or_compute('k', compute, ttl_seconds=60, version='v1') == 'stored'
+    storer.join()
+    assert compute.calls == 0
+
+
+def test_an_expired_or_other_version_claim_is_taken_over(sqlite_cache):
+    assert SharedResultCache(bind=sqlite_cache.bind, lock_wait_ms=0)._claim('k', 'v1') is True
+    compute = Counter()
+    assert sqlite_cache.get_or_compute('k', compute, ttl_seconds=60, version='v1') == compute.value
+    assert sqlite_cache._claim('k', 'v2') is True
+    assert compute.calls == 1
+
+
+def test_a_waiter_gives_up_after_the_wait_and_computes(sqlite_cache):
+    sqlite_cache._claim('k', 'v1')
+    compute = Counter()
+    impatient = SharedResultCache(bind=sqlite_cache.bind, lock_wait_ms=50)
+    assert impatient.get_or_compute('k', compute, ttl_seconds=60, version='v1') == compute.value
+    assert compute.calls == 1
+
+
+@pytest.fixture
+def file_cache(tmp_path):
+    from sqlalchemy import create_engine
+    from sqlalchemy.pool import QueuePool
+
+    engine = create_engine('sqlite:///' + str(tmp_path / 'cache.db'), poolclass=QueuePool,
+                           connect_args={'check_same_thread': False, 'timeout': 30})
+    with engine.begin() as conn:
+        for statement in _schema('sqlite'):
+            conn.exec_driver_sql(statement)
+    yield engine
+    engine.dispose()
+
+
+def test_no_connection_is_held_while_computing(file_cache):
+    checked_out = []
+
+    def compute():
+        checked_out.append(file_cache.pool.checkedout())
+        return 1
+
+    SharedResultCache(bind=file_cache).get_or_compute('k', compute, ttl_seconds=60)
+    assert checked_out == [0]
+
+
+def test_concurrent_misses_on_one_database_compute_once(file_cache):
+    compute = Counter(delay=0.3)
+    cache = SharedResultCache(bind=file_cache)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(
+        cache.get_or_compute('burst', compute, ttl_seconds=60, version='v1'))) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert compute.calls == 1
+    assert len(results) == 6
+
+
+class BrokenEngine:
+    dialect = None
+
+    def connect(self):
+        raise ConnectionError('database is down')
+
+    begin = connect
+
+
+def test_an_unreachable_database_falls_back_to_computing_once():
+    compute = Counter()
+    cache = SharedResultCache(bind=BrokenEngine())
+    assert cache.get_or_compute('k', compute, ttl_seconds=60) == compute.value
+    assert compute.calls == 1
+    cache.set('k', 1, ttl_seconds=60)
+    cache.invalidate('k')
+
+
+def test_the_cache_can_be_switched_off(monkeypatch):
+    monkeypatch.setenv('SHARED_CACHE', 'off')
+    compute = Counter()
+    cache = SharedResultCache(bind=BrokenEngine())
+    cache.get_or_compute('k', compute, ttl_seconds=60)
+    cache.get_or_compute('k', compute, ttl_seconds=60)
+    assert compute.calls == 2
+
+
+# ── single flight (PostgreSQL) ───────────────────────────────────────────
+
+@pytest.fixture(scope='module')
+def pg_engine():
+    from sqlalchemy import create_engine
+    from sqlalchemy.exc import OperationalError
+
+    dsn = os.environ.get('SHARED_CACHE_TEST_DSN')
+    if not dsn:
+        pytest.skip('SHARED_CACHE_TEST_DSN not set')
+    try:
+        engine = create_engine(dsn, pool_size=10)
+        with engine.begin() as conn:
+            conn.exec_driver_sql('DROP TABLE IF EXISTS shared_result_cache')
+            for statement in _schema('postgresql'):
+                conn.exec_driver_sql(statement)
+    except (ImportError, OperationalError) as exc:
+        pytest.skip('PostgreSQL not usable: {0}'.format(exc))
+    yield engine
+    with engine.begin() as conn:
+        conn.exec_driver_sql('DROP TABLE IF EXISTS shared_result_cache')
+    engine.dispose()
+
+
+def test_concurrent_misses_compute_once(pg_engine):
+    compute = Counter(delay=0.3)
+    cache = SharedResultCache(bind=pg_engine)
+    results = []
+
+    def worker():
+        results.append(cache.get_or_compute('burst', compute, ttl_seconds=60, version='v1'))
+
+    threads = [threading.Thread(target=worker) for _ in range(6)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert compute.calls == 1
+    assert len(results) == 6
+    assert all(result == {'total_kg': 12.5, 'rows': [1, 2]} for result in results)
+
+
+def test_a_lock_wait_timeout_computes_locally(pg_engine):
+    slow = Counter(delay=0.5)
+    impatient = Counter()
+    holder = threading.Thread(target=lambda: SharedResultCache(bind=pg_engine).get_or_compute(
+        'slow', slow, ttl_seconds=60))
+    holder.start()
+    time.sleep(0.1)
+    out = SharedResultCache(bind=pg_engine, lock_wait_ms=50).get_or_compute('slow', impatient, ttl_seconds=60)
+    holder.join()
+    assert out == impatient.value and impatient.calls == 1 and slow.calls == 1
@@ -0,0 +1,123 @@
+"""Cold-start import accounting and deferred heavy dependencies.
+
+Every module the entry point imports at the top is paid for by every cold start,
+whichever route the request is for. These tests keep the deferred dependencies
+deferred, and cover the pieces `scripts/cold_start_report.py` is built on.
+"""
+
+import subprocess
+import sys
+import types
+
+from GEPPPlatform.entry_points.routes import AUTHED_ROUTES
+from GEPPPlatform.libs import startup
+from GEPPPlatform.libs.startup import (
+    ImportProfiler,
+    LazyModule,
+    handler_imports,
+    lazy_module,
+    parse_importtime,
+    top_level_packages,
+)
+
+
+def _fake_module(monkeypatch, name, **attrs):
+    module = types.ModuleType(name)
+    module.__dict__.update(attrs)
+    monkeypatch.setitem(sys.modules, name, module)
+    return module
+
+
+# ── lazy_module ───────────────────────────────────────────────────────────
+
+def test_a_lazy_module_imports_on_first_attribute_access(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'gepp_lazy_probe', raising=False)
+    proxy = LazyModule('gepp_lazy_probe')
+    assert 'not loaded' in repr(proxy)
+
+    _fake_module(monkeypatch, 'gepp_lazy_probe', client=lambda name: f'client:{name}')
+    assert proxy.client('lambda') == 'client:lambda'
+    assert 'not loaded' not in repr(proxy)
+
+
+def test_attribute_writes_reach_the_real_module(monkeypatch):
+    """mock.patch.object(service_module.boto3, 'client', ...) must still work."""
+    real = _fake_module(monkeypatch, 'gepp_lazy_probe', client=None)
+    proxy = LazyModule('gepp_lazy_probe')
+    proxy.client = 'patched'
+    assert real.client == 'patched'
+    del proxy.client
+    assert not hasattr(real, 'client')
+
+
+def test_an_already_imported_module_is_returned_as_is():
+    assert lazy_module('json') is sys.modules['json']
+    assert isinstance(lazy_module('gepp_not_a_real_module'), LazyModule)
+
+
+def test_the_entry_point_does_not_import_the_heavy_dependencies():
+    code = (
+        "import sys, GEPPPlatform.entry_points.GEPPPlatform\n"
+        "print(','.join(m for m in ('boto3', 'numpy', 'openpyxl') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.run([sys.executable, '-c', code], capture_output=True, text=True, check=True)
+    assert out.stdout.strip() == ''
+
+
+# ── in-container profiler ─────────────────────────────────────────────────
+
+def test_the_profiler_records_first_time_imports_against_the_active_route(monkeypatch):
+    monkeypatch.delitem(sys.modules, 'wave', raising=False)
+    profiler = ImportProfiler().install()
+    startup.set_active_route('GET /api/reports')
+    try:
+        import wave  # noqa: F401  (small stdlib module, not imported by the app)
+        import json  # noqa: F401  (already loaded: must not be recorded)
+    finally:
+        profiler.uninstall()
+        startup.set_active_route(None)
+
+    names = {r.name for r in profiler.records}
+    assert 'wave' in names
+    assert 'json' not in names
+    wave_record = next(r for r in profiler.records if r.name == 'wave')
+    assert wave_record.route == 'GET /api/reports'
+    assert wave_record.depth == 0
+    assert profiler.by_route()['GET /api/reports'] >= wave_record.cumulative_us
+
+
+def test_uninstall_restores_the_builtin_import():
+    import builtins
+    original = builtins.__import__
+    profiler = ImportProfiler().install()
+    assert builtins.__import__ is not original
+    profiler.uninstall()
+    assert builtins.__import__ is original
+
+
+# ── offline report helpers ────────────────────────────────────────────────
+
+IMPORTTIME_SAMPLE = """\
+import time: self [us] | cumulative | imported package
+import time:       120 |        120 | _io
+import time:       300 |        900 |     botocore.utils
+import time:       600 |       1500 |   botocore
+import time:      2000 |       3500 | boto3
+"""
+
+
+def test_importtime_output_is_parsed_with_nesting_depth():
+    records = parse_importtime(IMPORTTIME_SAMPLE)
+    assert [(r.name, r.self_us, r.cumulative_us, r.depth) for r in records] == [
+        ('_io', 120, 120, 0),
+        ('botocore.utils', 300, 900, 2),
+        ('botocore', 600, 1500, 1),
+        ('boto3', 2000, 3500, 0),
+    ]
+    assert top_level_packages(records) == {'_io': 120, 'botocore': 900, 'boto3': 2000}
+
+
+def test_handler_imports_reads_a_route_adapters_lazy_imports():
+    found = AUTHED_ROUTES.match('/api/reports/overview', 'GET')
+    assert 'GEPPPlatform.services.cores.reports.reports_handlers' in handler_imports(found.route.handler)
@@ -0,0 +1,188 @@
+"""Verified-token cache in front of AuthHandlers.verify_jwt_token.
+
+The cache may only ever skip work, never change an answer: a token that would
+be rejected must still be rejected, route rules still apply on a hit, and
+rotating a secret or deactivating a user must take effect in this container
+immediately.
+"""
+
+import time
+
+import jwt
+import pytest
+
+from GEPPPlatform.libs.token_cache import VerifiedTokenCache, verified_tokens
+from GEPPPlatform.services.auth.auth_handlers import AuthHandlers
+
+SECRET = 'global-secret-for-the-token-cache-tests'
+USER_SECRET = 'user-secret-for-the-token-cache-tests'
+
+
+@pytest.fixture(autouse=True)
+def _fresh_cache():
+    verified_tokens.clear()
+    yield
+    verified_tokens.clear()
+
+
+def _token(secret=SECRET, **claims):
+    claims.setdefault('user_id', 42)
+    claims.setdefault('exp', int(time.time()) + 3600)
+    return jwt.encode(claims, secret, algorithm='HS256')
+
+
+class FakeSession:
+    """Just enough of a Session for the integration-secret lookup, counting queries."""
+
+    def __init__(self, secret=USER_SECRET, active=True):
+        self.user = type('User', (), {'id': 42, 'secret': secret})() if active else None
+        self.queries = 0
+
+    def query(self, model):
+        self.queries += 1
+        return self
+
+    def filter_by(self, **kwargs):
+        return self
+
+    def first(self):
+        return self.user
+
+
+def _handlers(session=None):
+    handlers = AuthHandlers(session or FakeSession())
+    handlers.jwt_secret = SECRET
+    return handlers
+
+
+# ── VerifiedTokenCache ───────────────────────────────────────────────────
+
+def test_a_cached_verification_returns_a_copy_of_the_claims():
+    cache = VerifiedTokenCache(max_entries=8, ttl_seconds=60)
+    cache.put('tok', {'user_id': 1, 'exp': time.time() + 60}, SECRET)
+    claims = cache.get('tok', SECRET)
+    claims['user_id'] = 'tampered'
+    assert cache.get('tok', SECRET)['user_id'] == 1
+    assert (cache.hits, cache.misses) == (2, 0)
+
+
+def test_entries_expire_with_the_token():
+    cache = VerifiedTokenCache(max_entries=8, ttl_seconds=60)
+    cache.put('expired', {'user_id': 1, 'exp': time.time() - 1}, SECRET)
+    cache.put('expiring', {'user_id': 1, 'exp': time.time() + 0.05}, SECRET)
+    assert cache.get('expired', SECRET) is None
+    time.sleep(0.06)
+    assert cache.get('expiring', SECRET) is None
+    assert len(cache) == 0
+
+
+def test_integration_entries_are_capped_at_the_ttl():
+    cache = VerifiedTokenCache(max_entries=8, ttl_seconds=0.05)
+    cache.put('tok', {'user_id': 1, 'exp': time.time() + 3600}, USER_SECRET, integration=True)
+    assert cache.get('tok') is not None
+    time.sleep(0.06)
+    assert cache.get('tok') is None
+
+
+def test_a_regular_entry_verified_under_another_global_secret_is_a_miss():
+    cache = VerifiedTokenCache(max_entries=8, ttl_seconds=60)
+    cache.put('tok', {'user_id': 1}, 'old-secret')
+    assert cache.get('tok', 'new-secret') is None
+
+
+def test_the_cache_is_bounded_least_recently_used_first():
+    cache = VerifiedTokenCache(max_entries=2, ttl_seconds=60)
+    for name in ('a', 'b'):
+        cache.put(name, {'user_id': 1}, SECRET)
+    cache.get('a', SECRET)
+    cache.put('c', {'user_id': 1}, SECRET)
+    assert len(cache) == 2
+    assert cache.get('b', SECRET) is None
+    assert cache.get('a', SECRET) is not None
+
+
+def test_invalidate_user_drops_tokens_and_secret():
+    cache = VerifiedTokenCache(max_entries=8, ttl_seconds=60)
+    cache.put('mine', {'user_id': 42}, SECRET)
+    cache.put('theirs', {'user_id': 7}, SECRET)
+    cache.put_secret(42, USER_SECRET)
+    cache.invalidate_user('42')
+    assert cache.get('mine', SECRET) is None
+    assert cache.get_secret(42) is None
+    assert cache.get('theirs', SECRET) is not None
+
+
+# ── verify_jwt_token ─────────────────────────────────────────────────────
+
+def test_a_repeated_integration_token_skips_the_secret_lookup():
+    session = FakeSession()
+    handlers = _handlers(session)
+    token = _token(USER_SECRET, type='integration')
+    first = handlers.verify_jwt_token(token, '/api/integration/transactions')
+    second = handlers.verify_jwt_token(token, '/api/integration/transactions')
+    assert first == second and first['user_id'] == 42
+    assert session.queries == 1
+
+
+def test_a_new_integration_token_reuses_the_cached_secret():
+    session = FakeSession()
+    handlers = _handlers(session)
+    handlers.verify_jwt_token(_token(USER_SECRET, type='integration', n=1), '/api/integration/x')
+    assert handlers.verify_jwt_token(_token(USER_SECRET, type='integration', n=2), '/api/integration/x')
+    assert session.queries == 1
+
+
+def test_route_rules_still_apply_on_a_cache_hit():
+    handlers = _handlers()
+    integration = _token(USER_SECRET, type='integration')
+    regular = _token()
+    assert handlers.verify_jwt_token(integration, '/api/integration/x')
+    assert handlers.verify_jwt_token(integration, '/api/reports/overview') is None
+    assert handlers.verify_jwt_token(regular, '/api/reports/overview')
+    assert handlers.verify_jwt_token(regular, '/api/integration/x') is None
+
+
+def test_failed_verifications_are_not_cached():
+    handlers = _handlers()
+    forged = _token('not-the-secret-for-the-token-cache-tests')
+    assert handlers.verify_jwt_token(forged) is None
+    assert handlers.verify_jwt_token(forged) is None
+    assert len(verified_tokens) == 0
+
+
+def test_rotating_the_secret_rejects_the_old_token_immediately():
+    session = FakeSession()
+    handlers = _handlers(session)
+    token = _token(USER_SECRET, type='integration')
+    assert handlers.verify_jwt_token(token, '/api/integration/x')
+    session.user.secret = 'rotated-secret-for-the-token-cache-tests'
+    verified_tokens.invalidate_user(42)
+    assert handlers.verify_jwt_token(token, '/api/integration/x') is None
+
+
+def test_logout_drops_the_cached_token():
+    handlers = _handlers()
+    token = _token()
+    handlers.verify_jwt_token(token)
+    handlers.logout(headers={'Authorization': f'Bearer {token}'})
+    assert verified_tokens.get(token, SECRET) is None
+
+
+@pytest.mark.parametrize('deactivate', [
+    lambda crud: crud.update_user_status('42', 'suspended'),
+    lambda crud: crud.update_user('42', {'is_active': False}),
+])
+def test_deactivating_a_user_rejects_their_cached_tokens_immediately(deactivate):
+    from GEPPPlatform.services.cores.users.user_crud import UserCRUD
+
+    session = FakeSession()
+    handlers = _handlers(session)
+    token = _token(USER_SECRET, type='integration')
+    assert handlers.verify_jwt_token(token, '/api/integration/x')
+
+    crud = UserCRUD(type('Db', (), {'commit': lambda self: None})())
+    user = type('User', (), {'id': 42, 'is_active': True})()
+    crud.get_user_by_id = lambda user_id: user
+    deactivate(crud)
+    session.user = None  # the secret lookup filters on is_active
+    assert handlers.verify_jwt_token(token, '/api/integration/x') is None
@@ -0,0 +1,231 @@
+"""The daily transaction rollup.
+
+Buckets are Bangkok calendar days; every write path the app uses (flushes,
+bulk ORM updates, explicit touches) must leave the touched buckets equal to a
+fresh aggregate at commit, and report queries answered from the rollup must
+return what the raw-record queries return.
+"""
+
+import json
+from datetime import date, datetime
+
+import pytest
+from sqlalchemy import create_engine, select
+from sqlalchemy.dialects import postgresql
+from sqlalchemy.orm import load_only, sessionmaker
+
+import GEPPPlatform.libs.database  # noqa: F401  (registers every model)
+from GEPPPlatform.libs import org_tree, transaction_rollup
+from GEPPPlatform.libs.transaction_rollup import (
+    TRANSACTION_DAILY_ROLLUP, LocalDay, aggregate, day_bounds, is_current, rebuild, refresh, touch,
+)
+from GEPPPlatform.models.transactions.transaction_records import TransactionRecord
+from GEPPPlatform.services.cores.reports.reports_service import ReportsService
+
+ORG = 8
+ROOT_NODES = [{'nodeId': 1, 'children': [{'nodeId': 2, 'children': []}, {'nodeId': 3, 'children': []}]}]
+
+TRANSACTIONS = [
+    # id, org, origin, tag, tenant, status, internal
+    (10, ORG, 2, None, None, 'approved', 0),
+    (11, ORG, 3, 7, None, 'rejected', 0),
+    (12, ORG, 3, None, 4, 'pending', 1),
+    (13, 9, 2, None, None, 'approved', 0),
+]
+RECORDS = [
+    # id, transaction, transaction_date (UTC), status, material, destination, weight
+    (100, 10, '2026-01-01 16:59:00.000000', 'approved', 51, None, 10),
+    (101, 10, '2026-01-01 17:00:00.000000', 'approved', 52, 3, 5),   # 00:00 on 2 Jan in Bangkok
+    (102, 11, '2026-01-02 03:00:00.000000', 'pending', 53, None, 7),
+    (103, 12, '2026-01-05 10:00:00.000000', 'approved', 54, None, 2),
+    (104, 12, None, 'rejected', 55, 99, 1),
+    (105, 13, '2026-01-02 03:00:00.000000', 'approved', 51, None, 3),
+]
+
+
+@pytest.fixture
+def session():
+    # Another suite rebinds sqlalchemy.orm.Session; the defining submodule is untouched.
+    from sqlalchemy.orm.session import Session
+
+    engine = create_engine('sqlite://')
+    with engine.begin() as conn:
+        # Timestamps are stored the way SQLAlchemy's SQLite DateTime writes them,
+        # so range comparisons against bound datetimes sort as they would in Postgres.
+        conn.exec_driver_sql(
+            'CREATE TABLE transactions (id INTEGER PRIMARY KEY, organization_id INTEGER, origin_id INTEGER, '
+            'location_tag_id INTEGER, tenant_id INTEGER, status VARCHAR, is_internal_transfer BOOLEAN, '
+            'transaction_date DATETIME, deleted_date DATETIME, updated_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE transaction_records (id INTEGER PRIMARY KEY, created_transaction_id INTEGER, '
+            'transaction_date DATETIME, status VARCHAR, material_id INTEGER, category_id INTEGER, '
+            'main_material_id INTEGER, destination_id INTEGER, origin_weight_kg NUMERIC, '
+            'origin_quantity NUMERIC, total_amount NUMERIC, deleted_date DATETIME, updated_date DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE transaction_daily_rollup (organization_id INTEGER, day DATE, origin_id INTEGER, '
+            'location_tag_id INTEGER, tenant_id INTEGER, destination_id INTEGER, material_id INTEGER, '
+            'category_id INTEGER, main_material_id INTEGER, transaction_status VARCHAR, record_status VARCHAR, '
+            'is_internal_transfer BOOLEAN, record_count INTEGER, weight_kg NUMERIC, quantity NUMERIC, '
+            'amount NUMERIC)')
+        conn.exec_driver_sql(
+            'CREATE TABLE transaction_rollup_state (organization_id INTEGER PRIMARY KEY, timezone TEXT, '
+            'built_at DATETIME)')
+        conn.exec_driver_sql(
+            'CREATE TABLE organization_setup (id INTEGER PRIMARY KEY, organization_id INTEGER, '
+            'root_nodes JSON, hub_node JSON, is_active BOOLEAN, created_date DATETIME, '
+            'updated_date DATETIME, deleted_date DATETIME)')
+        conn.exec_driver_sql(
+            "INSERT INTO organization_setup VALUES (1, 8, ?, '{}', 1, '2026-01-01', '2026-01-01', NULL)",
+            (json.dumps(ROOT_NODES),))
+        for row in TRANSACTIONS:
+            conn.exec_driver_sql(
+                'INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, NULL, NULL, NULL)', row)
+        for rid, tid, when, status, material, destination, weight in RECORDS:
+            conn.exec_driver_sql(
+                'INSERT INTO transaction_records VALUES (?, ?, ?, ?, ?, 1, 11, ?, ?, 1, ?, NULL, NULL)',
+                (rid, tid, when, status, material, destination, weight, weight * 10))
+    factory = sessionmaker(bind=engine, class_=Session)
+    transaction_rollup.track(factory)
+    org_tree.org_trees.clear()
+    session = factory()
+    yield session
+    session.close()
+    engine.dispose()
+    org_tree.org_trees.clear()
+
+
+def _rows(session, org=ORG):
+    cols = TRANSACTION_DAILY_ROLLUP.c
+    return sorted(
+        (str(r.day), r.material_id, r.transaction_status, r.record_count, float(r.weight_kg))
+        for r in session.execute(select(cols.day, cols.material_id, cols.transaction_status,
+                                        cols.record_count, cols.weight_kg).where(cols.organization_id == org))
+    )
+
+
+def _fresh(session, org=ORG):
+    return sorted(
+        (str(r.day), r.material_id, r.transaction_status, r.record_count, float(r.weight_kg))
+        for r in session.execute(aggregate(org))
+    )
+
+
+def test_days_are_bangkok_calendar_days(session):
+    assert rebuild(session, ORG) == 5
+    session.commit()
+    assert _rows(session) == [
+        ('2026-01-01', 51, 'approved', 1, 10.0),
+        ('2026-01-02', 52, 'approved', 1, 5.0),
+        ('2026-01-02', 53, 'rejected', 1, 7.0),
+        ('2026-01-05', 54, 'pending', 1, 2.0),
+        ('None', 55, 'pending', 1, 1.0),
+    ]
+    assert is_current(session, ORG) and not is_current(session, 9)
+
+
+def test_postgres_days_convert_the_stored_instant_once():
+    # transaction_date is timestamptz in the database: a single AT TIME ZONE
+    # gives Bangkok wall-clock time; a second one from 'UTC' would shift it back.
+    day = LocalDay(TransactionRecord.transaction_date, 'Asia/Bangkok')
+    sql = str(select(day).compile(dialect=postgresql.dialect()))
+    assert "CAST(timezone('Asia/Bangkok', transaction_records.transaction_date) AS DATE)" in sql
+    assert "'UTC'" not in sql
+
+    query = aggregate(ORG, [date(2026, 1, 2)]).compile(dialect=postgresql.dialect())
+    starts = sorted(v for v in query.params.values() if isinstance(v, datetime))
+    assert [s.isoformat() for s in starts] == ['2026-01-01T17:00:00+00:00', '2026-01-02T17:00:00+00:00']
+
+
+def test_date_filters_map_to_days_only_on_day_boundaries():
+    # What the report handlers send for 1–31 January picked in Bangkok.
+    assert day_bounds('2025-12-31T17:00:00+00:00', '2026-01-31T16:59:59.999999+00:00') == (
+        date(2026, 1, 1), date(2026, 1, 31))
+    assert day_bounds(None, '2026-01-31T16:59:59.999999+00:00') == (None, date(2026, 1, 31))
+    assert day_bounds('2026-01-01T00:00:00+00:00', None) is None
+    assert day_bounds('2025-12-31T17:00:00', '2026-01-31T00:00:00') is None
+    # Offsets are honoured, as Postgres does when comparing with a timestamptz.
+    assert day_bounds('2026-01-01T00:00:00+07:00', '2026-01-01T23:59:59.999999+07:00') == (
+        date(2026, 1, 1), date(2026, 1, 1))
+    assert day_bounds('2026-01-01T17:00:00+07:00') is None
+    assert day_bounds('not a date') is None
+
+
+def test_bulk_updates_and_touches_refresh_old_and_new_buckets(session):
+    rebuild(session, ORG)
+    session.commit()
+
+    session.query(TransactionRecord).filter(TransactionRecord.id == 102).update(
+        {TransactionRecord.transaction_date: datetime(2026, 1, 6, 3)}, synchronize_session=False)
+    session.commit()
+    assert _rows(session) == _fresh(session)
+    assert ('2026-01-06', 53, 'rejected', 1, 7.0) in _rows(session)
+
+    touch(session, [10])
+    session.connection().exec_driver_sql("UPDATE transactions SET status = 'rejected' WHERE id = 10")
+    session.connection().exec_driver_sql("UPDATE transaction_records SET deleted_date = '2026-02-01' WHERE id = 100")
+    session.commit()
+    assert _rows(session) == _fresh(session)
+    assert [r for r in _rows(session) if r[1] == 51] == []
+
+
+def test_flushed_edits_refresh_their_buckets(session):
+    rebuild(session, ORG)
+    session.commit()
+    columns = (TransactionRecord.id, TransactionRecord.created_transaction_id, TransactionRecord.transaction_date,
+               TransactionRecord.origin_weight_kg)
+    record = session.query(TransactionRecord).options(load_only(*columns)).filter_by(id=101).one()
+    record.transaction_date = datetime(2026, 1, 3, 1)
+    record.origin_weight_kg = 6
+    session.commit()
+    assert _rows(session) == _fresh(session)
+    assert ('2026-01-03', 52, 'approved', 1, 6.0) in _rows(session)
+
+
+def test_a_rolled_back_write_refreshes_nothing(session, monkeypatch):
+    rebuild(session, ORG)
+    session.commit()
+    touch(session, [10])
+    session.rollback()
+    monkeypatch.setattr(transaction_rollup, 'refresh', lambda *a: pytest.fail('refreshed after rollback'))
+    session.commit()
+
+
+def test_unbuilt_orgs_are_skipped_and_failed_refreshes_mark_the_org_stale(session):
+    assert refresh(session, ORG, {date(2026, 1, 2)}) == 0
+    assert _rows(session) == []
+
+    rebuild(session, ORG)
+    session.commit()
+    session.connection().exec_driver_sql('ALTER TABLE transaction_daily_rollup RENAME TO gone')
+    assert refresh(session, ORG, {date(2026, 1, 2)}) == 0
+    assert not is_current(session, ORG)
+
+
+# Naive UTC datetimes: SQLite compares ISO strings as text, Postgres casts them.
+JAN_FROM, JAN_TO = datetime(2025, 12, 31, 17), datetime(2026, 1, 31, 16, 59, 59, 999999)
+
+
+@pytest.mark.parametrize('filters', [
+    None,
+    {'date_from': JAN_FROM, 'date_to': JAN_TO},
+    {'date_from': datetime(2026, 1, 1, 17), 'date_to': JAN_TO},
+    {'material_ids': [52, 54], 'date_to': datetime(2026, 1, 4, 16, 59, 59, 999999)},
+    {'origin_ids': [1]},
+    {'origin_combos': [(3, 7, None)]},
+    {'destination_ids': [3]},
+])
+def test_material_picker_reads_the_same_from_the_rollup(session, filters):
+    service = ReportsService(session)
+    assert service._rollup_material_ids(ORG, filters, None) is None  # not built yet
+    rebuild(session, ORG)
+    session.commit()
+    assert service._rollup_material_ids(ORG, filters, None) == service._raw_material_ids(ORG, filters, None)
+
+
+def test_bounds_inside_a_day_read_the_raw_records(session):
+    rebuild(session, ORG)
+    session.commit()
+    service = ReportsService(session)
+    filters = {'date_from': datetime(2026, 1, 1, 12)}
+    assert service._rollup_material_ids(ORG, filters, None) is None
+    assert service._raw_material_ids(ORG, filters, None) == {51, 52, 53}